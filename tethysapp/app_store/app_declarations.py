@@ -0,0 +1,222 @@
+import os
+import ast
+from types import SimpleNamespace
+
+from .helpers import logger
+from .app_discovery import load_app_instance
+
+# Methods of an app class that declare its service settings
+SERVICE_SETTING_METHODS = [
+    "persistent_store_settings",
+    "spatial_dataset_service_settings",
+    "dataset_service_settings",
+    "web_processing_service_settings",
+    "scheduler_settings",
+]
+
+# Keywords of the setting declarations and their defaults in Tethys
+SETTING_KEYWORDS = {"name": None, "description": "", "required": False, "default": None}
+
+
+class DynamicDeclarationError(Exception):
+    """Raised when a declaration of app.py can't be read without running the app code"""
+
+
+class AppDeclarations:
+    """The app name, package, and settings declared in app.py, read without importing the app. Provides the same
+    name, package, and custom_settings() as an app instance for the install handlers.
+    """
+
+    def __init__(self, name, package, custom_settings, service_settings):
+        """
+        Args:
+            name (str): Name of the app
+            package (str): Package of the app
+            custom_settings (list): Custom settings with a name, description, required, and default
+            service_settings (dict): Service settings for each settings method. See SERVICE_SETTING_METHODS.
+        """
+        self.name = name
+        self.package = package
+        self.declared_custom_settings = custom_settings
+        self.declared_service_settings = service_settings
+
+    def custom_settings(self):
+        """Get the custom settings declared in app.py
+
+        Returns:
+            list: Custom settings with a name, description, required, and default
+        """
+        return self.declared_custom_settings
+
+
+def get_base_name(node):
+    """Get the name of a base class or of a called class, i.e. TethysAppBase for tethys_sdk.base.TethysAppBase
+
+    Args:
+        node (ast.AST): Name or attribute node
+
+    Returns:
+        str: Name or None if the node is not a name
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def find_app_class(tree):
+    """Find the class of app.py that inherits from TethysAppBase
+
+    Args:
+        tree (ast.Module): Parsed app.py
+
+    Returns:
+        ast.ClassDef: The app class
+    """
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            if any(get_base_name(base) == "TethysAppBase" for base in node.bases):
+                return node
+
+    raise DynamicDeclarationError("No class inherits directly from TethysAppBase")
+
+
+def get_class_attribute(class_node, attribute):
+    """Get the literal value of a class attribute, i.e. name = 'My App'
+
+    Args:
+        class_node (ast.ClassDef): The app class
+        attribute (str): Name of the attribute
+
+    Returns:
+        object: Value of the attribute or None if it is not set
+    """
+    for node in class_node.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == attribute for target in node.targets
+        ):
+            try:
+                return ast.literal_eval(node.value)
+            except (ValueError, TypeError):
+                raise DynamicDeclarationError(f"{attribute} is not a literal")
+
+    return None
+
+
+def get_method_declarations(class_node, method_name):
+    """Get the list of setting declarations returned by a settings method. Only methods that return a list or tuple,
+    directly or through a variable, can be read.
+
+    Args:
+        class_node (ast.ClassDef): The app class
+        method_name (str): Name of the settings method
+
+    Returns:
+        list: Call nodes of the declared settings
+    """
+    method = next(
+        (node for node in class_node.body if isinstance(node, ast.FunctionDef) and node.name == method_name), None
+    )
+    if method is None:
+        return []
+
+    variables = {}
+    for statement in method.body:
+        if isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant):
+            # Docstring
+            continue
+        if (
+            isinstance(statement, ast.Assign)
+            and len(statement.targets) == 1
+            and isinstance(statement.targets[0], ast.Name)
+        ):
+            variables[statement.targets[0].id] = statement.value
+            continue
+        if isinstance(statement, ast.Return):
+            value = statement.value
+            if isinstance(value, ast.Name) and value.id in variables:
+                value = variables[value.id]
+            if value is None or (isinstance(value, ast.Constant) and value.value is None):
+                return []
+            if isinstance(value, (ast.List, ast.Tuple)):
+                return value.elts
+            break
+        break
+
+    raise DynamicDeclarationError(f"{method_name} doesn't return a literal list of settings")
+
+
+def parse_setting(call_node):
+    """Read the name, description, required, and default of a setting declaration
+
+    Args:
+        call_node (ast.AST): Call of the setting class, i.e. CustomSetting(name='max_count', ...)
+
+    Returns:
+        SimpleNamespace: The setting with its type, name, description, required, and default
+    """
+    if not isinstance(call_node, ast.Call) or call_node.args:
+        raise DynamicDeclarationError("Settings must be declared with keyword arguments")
+
+    setting = dict(SETTING_KEYWORDS, setting_class=get_base_name(call_node.func))
+    for keyword in call_node.keywords:
+        if keyword.arg is None:
+            raise DynamicDeclarationError("Settings can't be declared with **kwargs")
+        if keyword.arg in SETTING_KEYWORDS:
+            try:
+                setting[keyword.arg] = ast.literal_eval(keyword.value)
+            except (ValueError, TypeError):
+                raise DynamicDeclarationError(f"The {keyword.arg} of a setting is not a literal")
+
+    if not setting["name"]:
+        raise DynamicDeclarationError("A setting doesn't have a name")
+
+    return SimpleNamespace(**setting)
+
+
+def parse_app_declarations(app_py_path):
+    """Read the app name, package, custom settings, and service settings from app.py without importing it
+
+    Args:
+        app_py_path (str): Path to the app.py file
+
+    Returns:
+        AppDeclarations: The declarations of the app
+    """
+    with open(app_py_path) as f:
+        tree = ast.parse(f.read(), filename=app_py_path)
+
+    class_node = find_app_class(tree)
+    name = get_class_attribute(class_node, "name")
+    package = get_class_attribute(class_node, "package")
+    if not name or not package:
+        raise DynamicDeclarationError("The app class doesn't set its name and package")
+
+    custom_settings = [parse_setting(node) for node in get_method_declarations(class_node, "custom_settings")]
+    service_settings = {}
+    for method_name in SERVICE_SETTING_METHODS:
+        settings = [parse_setting(node) for node in get_method_declarations(class_node, method_name)]
+        if settings:
+            service_settings[method_name] = settings
+
+    return AppDeclarations(name, package, custom_settings, service_settings)
+
+
+def get_app_declarations(app_package_path):
+    """Get the name, package, and settings of an installed app. app.py is read without importing it when its
+    declarations are literals. Otherwise the app is imported and instantiated.
+
+    Args:
+        app_package_path (str): Path to the app package
+
+    Returns:
+        AppDeclarations or TethysAppBase Instance: Object with the name, package, and custom_settings() of the app
+    """
+    app_py_path = os.path.join(app_package_path, "app.py")
+    try:
+        return parse_app_declarations(app_py_path)
+    except (DynamicDeclarationError, SyntaxError, OSError, UnicodeDecodeError) as e:
+        logger.info(f"Importing the app to read its settings. Couldn't read them from {app_py_path}: {e}")
+
+    return load_app_instance(app_package_path)
@@ -0,0 +1,176 @@
+import os
+import re
+import sys
+import inspect
+import threading
+import importlib
+import importlib.metadata
+
+import tethysapp
+from tethys_apps.base import TethysAppBase
+from .helpers import logger
+from .collect_helpers import get_app_package_path
+from .resource_helpers import get_app_instance_from_path
+from .package_index import get_package_files
+
+# Matches the app.py of a tethys app in the file list of a conda package or a python distribution
+APP_PY_PATTERN = re.compile(r"(^|/)tethysapp/(?P<package>[^/]+)/app\.py$")
+
+# App instances that are already imported and synced with the database, keyed by package and path
+_app_instances = {}
+_app_instances_lock = threading.Lock()
+
+
+def find_app_package_in_conda_meta(app_name, prefix=None):
+    """Find the directory of an app package from the file list that conda records for the installed package
+
+    Args:
+        app_name (str): Name of the conda package of the app
+        prefix (str, optional): Path to the conda environment. Defaults to the running environment.
+
+    Returns:
+        str: Path to the app package, i.e. <site-packages>/tethysapp/app_name, or None if it can't be found
+    """
+    prefix = prefix or sys.prefix
+    for file_path in get_package_files(app_name, prefix) or []:
+        if APP_PY_PATTERN.search(file_path):
+            return os.path.dirname(os.path.join(prefix, file_path))
+
+    return None
+
+
+def find_app_package_in_dist_info(app_name):
+    """Find the directory of an app package from the RECORD of the installed python distribution
+
+    Args:
+        app_name (str): Name of the app. The distribution can be named app_name or tethysapp-app_name
+
+    Returns:
+        str: Path to the app package, i.e. <site-packages>/tethysapp/app_name, or None if it can't be found
+    """
+    for distribution_name in [app_name, f"tethysapp-{app_name}", f"tethysapp_{app_name}"]:
+        try:
+            distribution = importlib.metadata.distribution(distribution_name)
+        except importlib.metadata.PackageNotFoundError:
+            continue
+
+        for file_path in distribution.files or []:
+            if APP_PY_PATTERN.search(file_path.as_posix()):
+                return os.path.dirname(str(distribution.locate_file(file_path)))
+
+    return None
+
+
+def find_app_package(app_name):
+    """Find the directory of a newly installed app package without reloading the tethysapp namespace
+
+    Args:
+        app_name (str): Name of the installed app
+
+    Returns:
+        str: Path to the app package, i.e. <site-packages>/tethysapp/app_name, or None if it can't be found
+    """
+    app_package_path = find_app_package_in_conda_meta(app_name) or find_app_package_in_dist_info(app_name)
+    if app_package_path is None:
+        app_package_path = get_app_package_path(app_name)
+
+    if app_package_path and os.path.isfile(os.path.join(app_package_path, "app.py")):
+        return app_package_path
+
+    return None
+
+
+def add_to_tethysapp_path(app_package_path):
+    """Make a new app package importable by adding its parent folder to the tethysapp namespace
+
+    Args:
+        app_package_path (str): Path to the app package
+    """
+    namespace_path = os.path.dirname(os.path.abspath(app_package_path))
+    if namespace_path not in [os.path.abspath(path) for path in tethysapp.__path__]:
+        tethysapp.__path__.append(namespace_path)
+    importlib.invalidate_caches()
+
+
+def get_app_class(app_module):
+    """Find the app class of an app.py module
+
+    Args:
+        app_module (module): The imported app.py module
+
+    Returns:
+        class: The class that inherits from TethysAppBase or None if the module doesn't have one
+    """
+    app_classes = [
+        obj
+        for _, obj in inspect.getmembers(app_module, inspect.isclass)
+        if issubclass(obj, TethysAppBase) and obj is not TethysAppBase
+    ]
+    # Prefer the class defined in app.py over base classes it imports
+    for app_class in app_classes:
+        if app_class.__module__ == app_module.__name__:
+            return app_class
+
+    return app_classes[0] if app_classes else None
+
+
+def get_app_instance_key(app_package_path):
+    """Get the key of an app package in the app instance registry
+
+    Args:
+        app_package_path (str): Path to the app package
+
+    Returns:
+        tuple: Package name and real path of the app package
+    """
+    return os.path.basename(os.path.normpath(app_package_path)), os.path.realpath(app_package_path)
+
+
+def load_app_instance(app_package_path):
+    """Import the app.py of a single app package and instantiate its app class. The instance is kept so the following
+    steps of the install reuse it instead of importing the app and syncing it with the database again.
+
+    Args:
+        app_package_path (str): Path to the app package. The folder that contains the app packages is also accepted,
+            in which case every app in the folder is imported to find the app.
+
+    Returns:
+        Instantiated TethysApp: A tethyspp instance for the installed application or None if it can't be loaded
+    """
+    if not os.path.isfile(os.path.join(app_package_path, "app.py")):
+        return get_app_instance_from_path([app_package_path])
+
+    key = get_app_instance_key(app_package_path)
+    with _app_instances_lock:
+        if key in _app_instances:
+            return _app_instances[key]
+
+        add_to_tethysapp_path(app_package_path)
+        package_name = key[0]
+        app_module = importlib.import_module(f"tethysapp.{package_name}.app")
+        app_class = get_app_class(app_module)
+        if app_class is None:
+            logger.error(f"Couldn't find the app class in {app_module.__name__}")
+            return None
+
+        app_instance = app_class()
+        app_instance.sync_with_tethys_db()
+        _app_instances[key] = app_instance
+
+    return app_instance
+
+
+def invalidate_app_instance(package_name):
+    """Forget the app instances and the imported modules of an app package after it is installed, updated, or
+    uninstalled so the next step imports the new code
+
+    Args:
+        package_name (str): Name of the app package, i.e. app_name in tethysapp.app_name
+    """
+    with _app_instances_lock:
+        for key in [key for key in _app_instances if key[0] == package_name]:
+            del _app_instances[key]
+
+        module_name = f"tethysapp.{package_name}"
+        for name in [name for name in sys.modules if name == module_name or name.startswith(f"{module_name}.")]:
+            del sys.modules[name]
@@ -1,18 +1,24 @@
 import os
-import importlib
-import subprocess
-import tethysapp
-import site
 import yaml
 
-from django.core.cache import cache
-
-from subprocess import call
-
-from .helpers import check_all_present, logger, send_notification
-from .resource_helpers import get_resource, get_app_instance_from_path
-from .proxy_app_handlers import create_proxy_app, list_proxy_apps
-from .mamba_helpers import mamba_download, mamba_install
+from .helpers import logger, send_notification
+from .process_runner import run_process, check_cancelled, get_process_owner, ProcessCancelled
+from .resource_helpers import get_resource
+from .app_discovery import find_app_package, add_to_tethysapp_path, invalidate_app_instance
+from .app_declarations import get_app_declarations
+from .proxy_app_handlers import create_proxy_app, delete_proxy_app, list_proxy_apps
+from .mamba_helpers import mamba_download, mamba_install, mamba_batch_install
+from .install_plan import get_cached_install_plan
+from .package_index import find_proxy_app_config
+from .management_commands import sync_tethys_db
+from .install_journal import (
+    InstallJournal,
+    CONDA_INSTALL,
+    APP_DEPENDENCIES,
+    JOURNAL_RUNNING,
+    JOURNAL_FAILED,
+    JOURNAL_CANCELLED,
+)
 from tethys_apps.base.workspace import TethysWorkspace
 
 
@@ -49,52 +55,39 @@ def detect_app_dependencies(
             which is a WebSocket.
     """
 
-    logger.info("Running a DB sync")
-    call(["tethys", "db", "sync"])
-    cache.clear()
-
-    # After install we need to update the sys.path variable so we can see the new apps that are installed.
-    # We need to do a reload here of the sys.path and then reload the tethysapp
-    # https://stackoverflow.com/questions/25384922/how-to-refresh-sys-path
-    importlib.reload(site)
-    importlib.reload(tethysapp)
+    # Find the new app from the files its package installed instead of reloading site and the tethysapp namespace
+    app_package_path = find_app_package(app_name)
+    if app_package_path is not None:
+        # Drop the instance of a previous install of the app
+        invalidate_app_instance(os.path.basename(os.path.normpath(app_package_path)))
+        add_to_tethysapp_path(app_package_path)
 
-    installed_app_paths = [path for path in tethysapp.__path__ if app_name in path]
+    # The in process DB sync harvests the apps, so it runs after the new app is on the path
+    logger.info("Running a DB sync")
+    sync_tethys_db()
 
-    if len(installed_app_paths) < 1:
+    if app_package_path is None:
         logger.error("Can't find the installed app location.")
         return
 
-    installed_app_path = installed_app_paths[0]
-    app_folders = next(os.walk(installed_app_path))[1]
-    app_scripts_path = os.path.join(installed_app_path, app_folders[0], "scripts")
+    app_scripts_path = os.path.join(app_package_path, "scripts")
     pip_install_script_path = os.path.join(app_scripts_path, "install_pip.sh")
 
     if os.path.exists(pip_install_script_path):
         logger.info("PIP dependencies found. Running Pip install script")
 
         notification_method("Running PIP install....", channel_layer)
-        process = subprocess.Popen(
-            ["sh", pip_install_script_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-        )
-        while True:
-            output = process.stdout.readline()
-            if output == "":
-                break
-            if output:
-                str_output = str(output.strip())
-                logger.info(str_output)
-                if check_all_present(str_output, ["PIP Install Complete"]):
-                    break
-
-        notification_method("PIP install completed", channel_layer)
+        result = run_process(["sh", pip_install_script_path], on_line=logger.info)
+        if result.success:
+            notification_method("PIP install completed", channel_layer)
+        else:
+            logger.error(f"PIP install failed. {result.describe()}")
+            notification_method("PIP install failed. Check logs for more details.", channel_layer)
 
     # @TODO: Add support for post installation scripts as well.
     process_post_install_scripts(app_scripts_path)
 
-    app_instance = get_app_instance_from_path(installed_app_paths)
+    app_instance = get_app_declarations(app_package_path)
     custom_settings_json = []
     custom_settings = app_instance.custom_settings()
 
@@ -117,13 +110,37 @@ def detect_app_dependencies(
         "data": custom_settings_json,
         "returnMethod": "set_custom_settings",
         "jsHelperFunction": "processCustomSettings",
-        "app_py_path": str(installed_app_path),
+        "app_py_path": str(app_package_path),
     }
     notification_method(get_data_json, channel_layer)
 
     return
 
 
+def get_default_version(resource, channel, label):
+    """Get the version to install when the request doesn't pick one. process_resources marks the latest version with
+    an asterisk when it isn't compatible with the portal, and that version is never picked on its own.
+
+    Args:
+        resource (dict): Dictionary representing an app and its conda metadata
+        channel (str): Name of the conda channel to install from
+        label (str): Name of the conda label to install from
+
+    Returns:
+        str: The latest version or None if it isn't compatible with the portal
+    """
+    latest_version = resource["latestVersion"][channel][label]
+    if latest_version.endswith("*"):
+        return None
+    return latest_version
+
+
+def get_incompatible_version_message(app_name):
+    return (
+        f"The latest version of {app_name} is not compatible with this Tethys Portal. Choose a version to install."
+    )
+
+
 def begin_install(installData, channel_layer, app_workspace):
     """Using the install data, this function will retrieve a specific app resource and install the application as well
     as update any app dependencies
@@ -149,6 +166,8 @@ def begin_install(installData, channel_layer, app_workspace):
     )
     send_notification(f"Installing Version: {installData['version']}", channel_layer)
 
+    proxy_app_name = None
+    install_journal = None
     try:
         if resource["app_type"] == "proxyapp":
             proxy_apps = list_proxy_apps()
@@ -170,21 +189,16 @@ def begin_install(installData, channel_layer, app_workspace):
                 channel_layer,
             )
 
-            site_packages = os.path.join(
-                os.path.dirname(subprocess.__file__), "site-packages"
-            )
-            proxy_package = [
-                package
-                for package in os.listdir(site_packages)
-                if resource["name"] in package
-            ][0]
-            proxyapp_yaml = os.path.join(
-                site_packages, proxy_package, "config", "proxyapp.yaml"
-            )
+            proxyapp_yaml = find_proxy_app_config(resource["name"])
+            if proxyapp_yaml is None:
+                raise Exception(f"Couldn't find the proxyapp.yaml of {resource['name']}")
             with open(proxyapp_yaml) as f:
                 proxy_app_data = yaml.safe_load(f)
 
+            check_cancelled()
             create_proxy_app(proxy_app_data, channel_layer)
+            proxy_app_name = proxy_app_data["app_name"]
+            check_cancelled()
 
             get_data_json = {
                 "data": {
@@ -196,20 +210,263 @@ def begin_install(installData, channel_layer, app_workspace):
             }
             send_notification(get_data_json, channel_layer)
         else:
-            successful_install = mamba_install(
-                resource,
-                installData["channel"],
-                installData["label"],
-                installData["version"],
-                channel_layer,
-            )
+            app_version = installData["version"]
+            if not app_version:
+                app_version = get_default_version(resource, installData["channel"], installData["label"])
+            if not app_version:
+                message = get_incompatible_version_message(resource["name"])
+                send_notification(message, channel_layer)
+                raise Exception(message)
+            apps = [
+                {
+                    "name": resource["name"],
+                    "channel": installData["channel"],
+                    "label": installData["label"],
+                    "version": app_version,
+                }
+            ]
+            install_journal = InstallJournal.create(app_workspace, apps)
+            install_plan = get_cached_install_plan(apps)
+            install_journal.record_solve(install_plan["specs"] if install_plan else None)
+            install_journal.start_step(CONDA_INSTALL)
+            if install_plan:
+                # Reuse the solution from the install preview since the environment hasn't changed
+                send_notification("Installing the packages from the install plan", channel_layer)
+                successful_install = mamba_batch_install(
+                    apps, channel_layer, specs=install_plan["specs"]
+                )
+            else:
+                successful_install = mamba_install(
+                    resource,
+                    installData["channel"],
+                    installData["label"],
+                    installData["version"],
+                    channel_layer,
+                )
             if not successful_install:
                 raise Exception("Mamba install script failed to install application.")
-            detect_app_dependencies(resource["name"], channel_layer)
+            install_journal.complete_step(CONDA_INSTALL)
+            detect_journaled_app_dependencies(install_journal, resource["name"], channel_layer)
+            install_journal.finish()
+    except ProcessCancelled:
+        if install_journal:
+            install_journal.finish(JOURNAL_CANCELLED)
+        rollback_cancelled_install(proxy_app_name, channel_layer)
+        raise
     except Exception as e:
         logger.error(e)
+        if install_journal:
+            install_journal.finish(JOURNAL_FAILED, str(e))
         send_notification(
             "Application installation failed. Check logs for more details.",
             channel_layer,
         )
         return
+
+
+def rollback_cancelled_install(proxy_app_name, channel_layer):
+    """Remove what a cancelled install has created so far. Packages that were already linked into the environment are
+    left for conda to manage.
+
+    Args:
+        proxy_app_name (str): Name of the proxy app created by the install or None
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+    """
+    if proxy_app_name:
+        try:
+            delete_proxy_app({"app_name": proxy_app_name}, channel_layer)
+        except Exception as e:
+            logger.error(f"Failed to remove the proxy app {proxy_app_name} of the cancelled install: {e}")
+
+    send_notification("Application installation cancelled.", channel_layer)
+
+
+def batch_install(installData, channel_layer, app_workspace):
+    """Install several apps with a single mamba solve and transaction and then update the dependencies of each app.
+    Proxy apps don't need a solve and are installed one at a time.
+
+    Args:
+        installData (dict): User provided information about the applications that should be installed. See the
+            example below.
+
+            {
+                'apps': [
+                    {'name': 'app_name', 'channel': 'conda_channel', 'label': 'main', 'version': '1.0'},
+                    {'name': 'app_name2', 'channel': 'conda_channel', 'label': 'dev', 'version': ''}
+                ]
+            }
+
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+    """
+    tethysapps = []
+    for app_data in installData["apps"]:
+        resource = get_resource(
+            app_data["name"], app_data["channel"], app_data["label"], app_workspace
+        )
+        if not resource:
+            send_notification(
+                f"Failed to get the {app_data['name']} resource", channel_layer
+            )
+            continue
+
+        if resource["app_type"] == "proxyapp":
+            begin_install(app_data, channel_layer, app_workspace)
+            continue
+
+        version = app_data.get("version")
+        if not version:
+            version = get_default_version(resource, app_data["channel"], app_data["label"])
+        if not version:
+            send_notification(get_incompatible_version_message(resource["name"]), channel_layer)
+            continue
+        tethysapps.append(
+            {
+                "name": resource["name"],
+                "channel": app_data["channel"],
+                "label": app_data["label"],
+                "version": version,
+            }
+        )
+
+    if not tethysapps:
+        return
+
+    send_notification(
+        "Starting installation of apps: "
+        + ", ".join(f"{app['name']} ({app['version']})" for app in tethysapps),
+        channel_layer,
+    )
+
+    install_journal = InstallJournal.create(app_workspace, tethysapps)
+    try:
+        install_plan = get_cached_install_plan(tethysapps)
+        install_journal.record_solve(install_plan["specs"] if install_plan else None)
+        install_journal.start_step(CONDA_INSTALL)
+        successful_install = mamba_batch_install(
+            tethysapps, channel_layer, specs=install_journal.specs
+        )
+        if not successful_install:
+            raise Exception("Mamba install script failed to install applications.")
+        install_journal.complete_step(CONDA_INSTALL)
+    except ProcessCancelled:
+        install_journal.finish(JOURNAL_CANCELLED)
+        rollback_cancelled_install(None, channel_layer)
+        raise
+    except Exception as e:
+        logger.error(e)
+        install_journal.finish(JOURNAL_FAILED, str(e))
+        send_notification(
+            "Application installation failed. Check logs for more details.",
+            channel_layer,
+        )
+        return
+
+    detect_installed_apps_dependencies(install_journal, channel_layer)
+
+
+def detect_journaled_app_dependencies(install_journal, app_name, channel_layer):
+    """Process the dependencies of an installed app unless that step completed before a server restart
+
+    Args:
+        install_journal (InstallJournal): Journal of the install
+        app_name (str): Name of the installed app
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+    """
+    if install_journal.is_completed(APP_DEPENDENCIES, app_name):
+        return
+
+    install_journal.start_step(APP_DEPENDENCIES, app_name)
+    try:
+        detect_app_dependencies(app_name, channel_layer)
+    except Exception:
+        install_journal.update_step(APP_DEPENDENCIES, False, app_name)
+        raise
+    install_journal.complete_step(APP_DEPENDENCIES, app_name)
+
+
+def detect_installed_apps_dependencies(install_journal, channel_layer):
+    """Process the dependencies of each app of a journaled install. A failure of one app doesn't stop the others.
+
+    Args:
+        install_journal (InstallJournal): Journal of the install
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+    """
+    failed_apps = []
+    for app in install_journal.apps:
+        try:
+            detect_journaled_app_dependencies(install_journal, app["name"], channel_layer)
+        except ProcessCancelled:
+            install_journal.finish(JOURNAL_CANCELLED)
+            rollback_cancelled_install(None, channel_layer)
+            raise
+        except Exception as e:
+            logger.error(e)
+            failed_apps.append(app["name"])
+            send_notification(
+                f"Failed to process the dependencies of {app['name']}. Check logs for more details.",
+                channel_layer,
+            )
+
+    if failed_apps:
+        install_journal.finish(JOURNAL_FAILED, f"Failed to process the dependencies of {', '.join(failed_apps)}")
+    else:
+        install_journal.finish()
+
+
+def resume_install(installData, channel_layer, app_workspace):
+    """Resume an install that was interrupted by a server restart from the last step recorded in its journal. The
+    environment is not solved again when the journal has the packages picked by the original solve.
+
+    Args:
+        installData (dict): ID of the install journal and the apps of the install. See the example below.
+
+            {
+                'journalId': '3f2a...',
+                'apps': [{'name': 'app_name', 'channel': 'conda_channel', 'label': 'main', 'version': '1.0'}]
+            }
+
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+    """
+    install_journal = InstallJournal.load(app_workspace, installData["journalId"])
+    if not install_journal:
+        send_notification("Failed to resume the interrupted installation", channel_layer)
+        return
+
+    # The install finished or another process took it over after this job was queued
+    if install_journal.journal["state"] != JOURNAL_RUNNING or not install_journal.is_owned():
+        logger.info(f"Skipping the resume of install {install_journal.journal_id}. It is no longer interrupted")
+        return
+    # The environment lock is now held by this job, which tells the other hosts that the install is running again
+    install_journal.claim(get_process_owner())
+
+    send_notification(
+        "Resuming the interrupted installation of apps: "
+        + ", ".join(f"{app['name']} ({app['version']})" for app in install_journal.apps),
+        channel_layer,
+    )
+
+    if not install_journal.is_completed(CONDA_INSTALL):
+        try:
+            install_journal.start_step(CONDA_INSTALL)
+            successful_install = mamba_batch_install(
+                install_journal.apps, channel_layer, specs=install_journal.specs
+            )
+            if not successful_install:
+                raise Exception("Mamba install script failed to install applications.")
+            install_journal.complete_step(CONDA_INSTALL)
+        except ProcessCancelled:
+            install_journal.finish(JOURNAL_CANCELLED)
+            rollback_cancelled_install(None, channel_layer)
+            raise
+        except Exception as e:
+            logger.error(e)
+            install_journal.finish(JOURNAL_FAILED, str(e))
+            send_notification(
+                "Application installation failed. Check logs for more details.",
+                channel_layer,
+            )
+            return
+
+    detect_installed_apps_dependencies(install_journal, channel_layer)
@@ -0,0 +1,336 @@
+import sys
+import json
+import hashlib
+
+# Keys of the legacy app resource dictionary that are stored as dedicated attributes on the AppRecord
+RECORD_KEYS = [
+    "name",
+    "app_type",
+    "installed",
+    "installedVersion",
+    "latestVersion",
+    "updateAvailable",
+    "versions",
+    "versionURLs",
+    "channels_and_labels",
+    "timestamp",
+    "compatibility",
+    "license",
+    "licenses",
+]
+
+MAX_SHARED_TUPLES = 100000
+MAX_LICENSES = 10000
+
+_shared_tuples = {}
+
+
+class _Unset:
+    """Marker for metadata keys that exist for the conda channel but have no value for the conda label"""
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "UNSET"
+
+    def __repr__(self):
+        return "UNSET"
+
+
+UNSET = _Unset()
+
+
+def intern_string(value):
+    """Intern a string so that identical channel names, labels, and versions share a single object
+
+    Args:
+        value (any): value to intern
+
+    Returns:
+        any: The interned string or the original value if it was not a string
+    """
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def share_tuple(values):
+    """Convert a list of values to a tuple that is shared with any other identical tuple of values. Apps published in
+    several channels and labels usually have the same versions and urls.
+
+    Args:
+        values (list): List of values to store in the tuple
+
+    Returns:
+        tuple: A shared tuple of the values
+    """
+    shared = tuple(intern_string(value) for value in values)
+    if len(_shared_tuples) > MAX_SHARED_TUPLES:
+        _shared_tuples.clear()
+
+    try:
+        return _shared_tuples.setdefault(shared, shared)
+    except TypeError:
+        # Unhashable values can't be shared
+        return shared
+
+
+class LicenseTable:
+    """Deduplicates the license metadata of conda packages. Packages usually publish the same json metadata string in
+    the license field for every version, so each unique string is stored and parsed only once. Parsed metadata is
+    shared between versions and apps and should be treated as read only.
+    """
+
+    __slots__ = ("_licenses",)
+
+    def __init__(self):
+        self._licenses = {}
+
+    def __len__(self):
+        return len(self._licenses)
+
+    def _get_entry(self, license):
+        digest = hashlib.sha1(license.encode("utf-8")).digest()
+        entry = self._licenses.get(digest)
+        if entry is None:
+            if len(self._licenses) >= MAX_LICENSES:
+                self._licenses.clear()
+            entry = [license, None, False]
+            self._licenses[digest] = entry
+        return entry
+
+    def share(self, license):
+        """Get the shared copy of a license string
+
+        Args:
+            license (str): license field of a conda package
+
+        Returns:
+            str: A shared license string with the same content
+        """
+        if not isinstance(license, str):
+            return license
+        return self._get_entry(license)[0]
+
+    def parse(self, license):
+        """Parse the json metadata stored in the license field of a conda package. Each unique license is only parsed
+        once.
+
+        Args:
+            license (str): license field of a conda package
+
+        Returns:
+            dict: The parsed license metadata or None if the license doesn't contain json metadata
+        """
+        if not isinstance(license, str):
+            return None
+
+        entry = self._get_entry(license)
+        if not entry[2]:
+            try:
+                license_metadata = json.loads(license.replace("'", '"'))
+            except ValueError:
+                license_metadata = None
+            entry[1] = license_metadata if isinstance(license_metadata, dict) else None
+            entry[2] = True
+
+        return entry[1]
+
+    def clear(self):
+        """Remove all the stored licenses"""
+        self._licenses.clear()
+
+
+license_table = LicenseTable()
+
+
+class AppRecord:
+    """Compact representation of an app resource for a single conda channel and conda label. Records are stored in the
+    catalog cache and converted to the legacy app resource dictionary with to_dict only when they are needed.
+    """
+
+    __slots__ = (
+        "name",
+        "app_type",
+        "channel",
+        "label",
+        "installed",
+        "installed_version",
+        "latest_version",
+        "update_available",
+        "versions",
+        "version_urls",
+        "licenses",
+        "compatibility",
+        "timestamp",
+        "license",
+        "metadata",
+    )
+
+    def __init__(
+        self,
+        name,
+        app_type,
+        channel,
+        label,
+        installed=False,
+        installed_version=None,
+        latest_version=None,
+        update_available=None,
+        versions=(),
+        version_urls=(),
+        licenses=(),
+        compatibility=(),
+        timestamp=None,
+        license=None,
+        metadata=(),
+    ):
+        self.name = intern_string(name)
+        self.app_type = intern_string(app_type)
+        self.channel = intern_string(channel)
+        self.label = intern_string(label)
+        self.installed = installed
+        self.installed_version = intern_string(installed_version)
+        self.latest_version = intern_string(latest_version)
+        self.update_available = update_available
+        self.versions = share_tuple(versions)
+        self.version_urls = share_tuple(version_urls)
+        self.licenses = share_tuple(licenses)
+        self.compatibility = share_tuple(compatibility)
+        self.timestamp = timestamp
+        self.license = intern_string(license)
+        self.metadata = metadata
+
+    def __eq__(self, other):
+        if not isinstance(other, AppRecord):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        return f"AppRecord({self.name}, {self.channel}, {self.label})"
+
+    @classmethod
+    def from_dict(cls, resource, conda_channel, conda_label):
+        """Create a record from a legacy app resource dictionary
+
+        Args:
+            resource (dict): Dictionary representing an app and its conda metadata
+            conda_channel (str): Name of the conda channel of the resource
+            conda_label (str): Name of the conda label of the resource
+
+        Returns:
+            AppRecord: compact record of the resource
+        """
+
+        def label_value(key, default=None):
+            return resource.get(key, {}).get(conda_channel, {}).get(conda_label, default)
+
+        versions = label_value("versions", [])
+        compatibility = label_value("compatibility", {})
+
+        metadata = []
+        for key in resource:
+            if key in RECORD_KEYS:
+                continue
+            metadata.append(
+                (intern_string(key), intern_string(label_value(key, UNSET)))
+            )
+
+        return cls(
+            name=resource["name"],
+            app_type=resource["app_type"],
+            channel=conda_channel,
+            label=conda_label,
+            installed=label_value("installed", False),
+            installed_version=label_value("installedVersion"),
+            latest_version=label_value("latestVersion"),
+            update_available=label_value("updateAvailable"),
+            versions=versions,
+            version_urls=label_value("versionURLs", []),
+            licenses=label_value("licenses", []),
+            compatibility=[compatibility.get(version) for version in versions],
+            timestamp=label_value("timestamp"),
+            license=label_value("license"),
+            metadata=tuple(metadata),
+        )
+
+    def to_dict(self):
+        """Convert the record to the legacy app resource dictionary that is used by the rest of the app store and the
+        javascript. See the example below.
+
+        {
+            'name': 'app_name',
+            'app_type': 'tethysapp',
+            'installed': {'conda_channel': {'main': False}},
+            'versions': {'conda_channel': {'main': ['1.0']}},
+            'versionURLs': {'conda_channel': {'main': ['url']}},
+            ...
+        }
+
+        Returns:
+            dict: Dictionary representing an app and its conda metadata
+        """
+        channel = self.channel
+        label = self.label
+
+        compatibility = {}
+        for version, compatible in zip(self.versions, self.compatibility):
+            if compatible is not None:
+                compatibility[version] = compatible
+
+        resource = {
+            "name": self.name,
+            "app_type": self.app_type,
+            "installed": {channel: {label: self.installed}},
+            "versions": {channel: {label: list(self.versions)}},
+            "versionURLs": {channel: {label: list(self.version_urls)}},
+            "channels_and_labels": {channel: {label: []}},
+            "timestamp": {channel: {label: self.timestamp}},
+            "compatibility": {channel: {label: compatibility}},
+            "license": {channel: {label: self.license}},
+            "licenses": {channel: {label: list(self.licenses)}},
+        }
+        if self.installed_version is not None:
+            resource["installedVersion"] = {channel: {label: self.installed_version}}
+        if self.latest_version is not None:
+            resource["latestVersion"] = {channel: {label: self.latest_version}}
+        if self.update_available is not None:
+            resource["updateAvailable"] = {channel: {label: self.update_available}}
+
+        for key, value in self.metadata:
+            resource[key] = {channel: {} if value is UNSET else {label: value}}
+
+        return resource
+
+
+def records_from_resources(resources, conda_channel, conda_label):
+    """Convert a list of legacy app resource dictionaries to compact records
+
+    Args:
+        resources (list): List of dictionaries representing apps and their conda metadata
+        conda_channel (str): Name of the conda channel of the resources
+        conda_label (str): Name of the conda label of the resources
+
+    Returns:
+        list: List of AppRecords
+    """
+    return [
+        AppRecord.from_dict(resource, conda_channel, conda_label)
+        for resource in resources
+    ]
+
+
+def resources_from_records(records):
+    """Convert a list of compact records to legacy app resource dictionaries. Dictionaries are passed through so that
+    catalogs cached before records were introduced can still be used.
+
+    Args:
+        records (list): List of AppRecords
+
+    Returns:
+        list: List of dictionaries representing apps and their conda metadata
+    """
+    return [
+        record.to_dict() if isinstance(record, AppRecord) else record
+        for record in records
+    ]
@@ -0,0 +1,185 @@
+import os
+import shutil
+import importlib.util
+
+from django.conf import settings
+from .helpers import logger, get_app_store_setting
+
+# Folders of an app package that hold its static files, in the order Tethys looks for them
+STATIC_FOLDERS = ["public", "static"]
+
+
+def is_incremental_collect_enabled():
+    """Check if only the installed apps should be collected after an install instead of every app of the portal.
+    Disabled with the APP_STORE_INCREMENTAL_COLLECT portal setting
+
+    Returns:
+        bool: True if incremental collection is enabled
+    """
+    return bool(get_app_store_setting("APP_STORE_INCREMENTAL_COLLECT", True))
+
+
+def get_app_package_path(app_name):
+    """Get the directory of an installed tethys app package
+
+    Args:
+        app_name (str): Name of the app package, i.e. app_name in tethysapp.app_name
+
+    Returns:
+        str: Path to the app package or None if the app can't be found
+    """
+    try:
+        spec = importlib.util.find_spec(f"tethysapp.{app_name}")
+    except (ImportError, ValueError):
+        return None
+
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return list(spec.submodule_search_locations)[0]
+
+
+def is_file_unchanged(source, destination):
+    """Check if a collected file is the same as its source. Collected files keep the modification time of the source,
+    so matching sizes and modification times mean the file has not changed.
+
+    Args:
+        source (str): Path to the source file
+        destination (str): Path to the collected file
+
+    Returns:
+        bool: True if the collected file is up to date
+    """
+    if not os.path.isfile(destination):
+        return False
+
+    source_stat = os.stat(source)
+    destination_stat = os.stat(destination)
+    return (
+        source_stat.st_size == destination_stat.st_size
+        and int(source_stat.st_mtime) == int(destination_stat.st_mtime)
+    )
+
+
+def sync_directory(source, destination, remove_stale=True):
+    """Copy the files of a directory that are new or have changed since the last copy
+
+    Args:
+        source (str): Path to the source directory
+        destination (str): Path to the destination directory
+        remove_stale (bool, optional): Remove files from the destination that are no longer in the source. Defaults
+            to True.
+
+    Returns:
+        dict: Number of copied, skipped, and removed files. See the example below.
+
+        {'copied': 2, 'skipped': 120, 'removed': 1}
+    """
+    stats = {"copied": 0, "skipped": 0, "removed": 0}
+    source_files = set()
+    for root, _directories, filenames in os.walk(source):
+        relative_root = os.path.relpath(root, source)
+        destination_root = os.path.normpath(os.path.join(destination, relative_root))
+        os.makedirs(destination_root, exist_ok=True)
+        for filename in filenames:
+            source_file = os.path.join(root, filename)
+            destination_file = os.path.join(destination_root, filename)
+            source_files.add(os.path.normpath(os.path.join(relative_root, filename)))
+            if is_file_unchanged(source_file, destination_file):
+                stats["skipped"] += 1
+                continue
+
+            shutil.copy2(source_file, destination_file)
+            stats["copied"] += 1
+
+    if remove_stale:
+        for root, _directories, filenames in os.walk(destination):
+            relative_root = os.path.relpath(root, destination)
+            for filename in filenames:
+                if os.path.normpath(os.path.join(relative_root, filename)) not in source_files:
+                    os.remove(os.path.join(root, filename))
+                    stats["removed"] += 1
+
+    return stats
+
+
+def collect_app_static(app_name, app_path, static_root):
+    """Collect the static files of one app into the static root, like pre_collectstatic and collectstatic do for every
+    app
+
+    Args:
+        app_name (str): Name of the app package
+        app_path (str): Path to the app package
+        static_root (str): Path to the STATIC_ROOT of the portal
+
+    Returns:
+        dict: Number of copied, skipped, and removed files
+    """
+    for static_folder in STATIC_FOLDERS:
+        source = os.path.join(app_path, static_folder)
+        if os.path.isdir(source):
+            return sync_directory(source, os.path.join(static_root, app_name))
+
+    return {"copied": 0, "skipped": 0, "removed": 0}
+
+
+def collect_app_workspace(app_name, app_path, workspaces_root):
+    """Move the workspaces of one app into the workspaces root and link them back into the app package, like
+    collectworkspaces does for every app. Files that already exist in the workspaces root are kept since they can hold
+    user data.
+
+    Args:
+        app_name (str): Name of the app package
+        app_path (str): Path to the app package
+        workspaces_root (str): Path to the TETHYS_WORKSPACES_ROOT of the portal
+
+    Returns:
+        dict: Number of copied, skipped, and removed files
+    """
+    app_workspaces = os.path.join(app_path, "workspaces")
+    if os.path.islink(app_workspaces) or not os.path.isdir(app_workspaces):
+        return {"copied": 0, "skipped": 0, "removed": 0}
+
+    destination = os.path.join(workspaces_root, app_name)
+    stats = sync_directory(app_workspaces, destination, remove_stale=False)
+    shutil.rmtree(app_workspaces)
+    os.symlink(destination, app_workspaces)
+
+    return stats
+
+
+def collect_apps(apps):
+    """Collect the static files and workspaces of the given apps only
+
+    Args:
+        apps (list): Names of the installed or updated apps
+
+    Returns:
+        bool: True if every app was collected. False if the portal-wide commands are needed instead.
+    """
+    static_root = getattr(settings, "STATIC_ROOT", None)
+    workspaces_root = getattr(settings, "TETHYS_WORKSPACES_ROOT", None)
+    if not static_root or not workspaces_root:
+        logger.info("STATIC_ROOT or TETHYS_WORKSPACES_ROOT is not set. Collecting all apps")
+        return False
+
+    app_paths = {}
+    for app_name in apps:
+        app_path = get_app_package_path(app_name)
+        if app_path is None:
+            logger.info(f"Couldn't find the {app_name} package. Collecting all apps")
+            return False
+        app_paths[app_name] = app_path
+
+    try:
+        for app_name, app_path in app_paths.items():
+            static_stats = collect_app_static(app_name, app_path, static_root)
+            workspace_stats = collect_app_workspace(app_name, app_path, workspaces_root)
+            logger.info(
+                f"Collected {app_name}: {static_stats['copied']} static files copied, {static_stats['skipped']} "
+                f"unchanged, {static_stats['removed']} removed. {workspace_stats['copied']} workspace files copied"
+            )
+    except OSError as e:
+        logger.error(f"Failed to collect the apps: {e}")
+        return False
+
+    return True
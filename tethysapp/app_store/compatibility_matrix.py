@@ -0,0 +1,222 @@
+import re
+import semver
+from array import array
+
+# Assume if not found, that it is compatible with Tethys Platform 3.4.4
+DEFAULT_COMPATIBILITY = "<=3.4.4"
+
+# Compatibility expressions that can be evaluated with the bound columns. Anything else is evaluated with semver
+SIMPLE_SPEC_REGEX = re.compile(r"^(>=|<=|==|!=|>|<)(\d+)\.(\d+)\.(\d+)$")
+VERSION_REGEX = re.compile(r"^(\d+)(?:\.(\d+))?(?:\.(\d+))?")
+
+MIN_KEY = -1
+MAX_KEY = 2**62
+COMPONENT_BITS = 20
+
+
+def version_key(version):
+    """Convert a version string into an integer that sorts the same way as the major, minor, and patch numbers of the
+    version
+
+    Args:
+        version (str): version string, i.e. 4.2.0
+
+    Returns:
+        int: Integer key for the version or -1 if the version can't be parsed
+    """
+    match = VERSION_REGEX.match(str(version))
+    if not match:
+        return MIN_KEY
+
+    major, minor, patch = (int(part or 0) for part in match.groups())
+    return (major << (2 * COMPONENT_BITS)) | (minor << COMPONENT_BITS) | patch
+
+
+def parse_compatibility(compatibility):
+    """Convert a tethys compatibility expression into lower and upper bounds
+
+    Args:
+        compatibility (str): semver match expression, i.e. >=4.0.0
+
+    Returns:
+        tuple: lower bound, lower inclusive, upper bound, upper inclusive, and excluded version key. None is returned
+            if the expression can't be represented with bounds.
+    """
+    match = SIMPLE_SPEC_REGEX.match(str(compatibility).strip())
+    if not match:
+        return None
+
+    operator = match.group(1)
+    key = version_key(".".join(match.groups()[1:]))
+    if operator == ">=":
+        return key, True, MAX_KEY, True, MIN_KEY
+    if operator == ">":
+        return key, False, MAX_KEY, True, MIN_KEY
+    if operator == "<=":
+        return MIN_KEY, True, key, True, MIN_KEY
+    if operator == "<":
+        return MIN_KEY, True, key, False, MIN_KEY
+    if operator == "==":
+        return key, True, key, True, MIN_KEY
+    return MIN_KEY, True, MAX_KEY, True, key
+
+
+class CompatibilityMatrix:
+    """Columnar table of every app version and the range of Tethys Platform versions it is compatible with. Each row is
+    an app version. Checking which versions are compatible with a Tethys Platform version is a single pass over the
+    bound columns instead of a semver match for every app version.
+    """
+
+    def __init__(self):
+        self.apps = []
+        self.versions = []
+        self.specs = []
+        self.app_ids = array("I")
+        self.version_keys = array("q")
+        self.lower = array("q")
+        self.lower_inclusive = array("b")
+        self.upper = array("q")
+        self.upper_inclusive = array("b")
+        self.excluded = array("q")
+        self.fallback = array("b")
+
+    def __len__(self):
+        return len(self.versions)
+
+    def add_app(self, app_name, versions, compatibility):
+        """Add the versions of an app to the matrix
+
+        Args:
+            app_name (str): name of the app
+            versions (list): List of app versions
+            compatibility (dict): Dictionary of tethys compatibility expressions keyed by app version
+
+        Returns:
+            int: id of the app in the matrix
+        """
+        app_id = len(self.apps)
+        self.apps.append(app_name)
+        for version in versions:
+            spec = compatibility.get(version, DEFAULT_COMPATIBILITY)
+            bounds = parse_compatibility(spec)
+            self.versions.append(version)
+            self.specs.append(spec)
+            self.app_ids.append(app_id)
+            self.version_keys.append(version_key(version))
+            if bounds is None:
+                bounds = (MIN_KEY, True, MAX_KEY, True, MIN_KEY)
+                self.fallback.append(1)
+            else:
+                self.fallback.append(0)
+            self.lower.append(bounds[0])
+            self.lower_inclusive.append(bounds[1])
+            self.upper.append(bounds[2])
+            self.upper_inclusive.append(bounds[3])
+            self.excluded.append(bounds[4])
+
+        return app_id
+
+    @classmethod
+    def from_resources(cls, resources, conda_channel, conda_label):
+        """Create a matrix from a list of app resources for a conda channel and conda label
+
+        Args:
+            resources (list): List of dictionaries representing apps and their conda metadata
+            conda_channel (str): Name of the conda channel of the resources
+            conda_label (str): Name of the conda label of the resources
+
+        Returns:
+            CompatibilityMatrix: matrix with a row for each version of each resource
+        """
+        matrix = cls()
+        for resource in resources:
+            matrix.add_app(
+                resource["name"],
+                resource["versions"][conda_channel][conda_label],
+                resource["compatibility"][conda_channel][conda_label],
+            )
+        return matrix
+
+    def compatible(self, tethys_version):
+        """Check every app version for compatibility with a Tethys Platform version
+
+        Args:
+            tethys_version (str): Tethys Platform version, i.e. 4.2.0
+
+        Returns:
+            list: List of booleans with one value for each row in the matrix
+        """
+        target = version_key(tethys_version)
+        mask = [
+            (target > lower or (lower_inclusive and target == lower))
+            and (target < upper or (upper_inclusive and target == upper))
+            and target != excluded
+            for lower, lower_inclusive, upper, upper_inclusive, excluded in zip(
+                self.lower,
+                self.lower_inclusive,
+                self.upper,
+                self.upper_inclusive,
+                self.excluded,
+            )
+        ]
+
+        # Expressions that aren't simple bounds keep the semver behavior
+        for row, fallback in enumerate(self.fallback):
+            if fallback:
+                mask[row] = semver.match(tethys_version, self.specs[row])
+
+        return mask
+
+    def compatible_batch(self, tethys_versions):
+        """Check every app version for compatibility with several Tethys Platform versions
+
+        Args:
+            tethys_versions (list): List of Tethys Platform versions
+
+        Returns:
+            dict: Dictionary of compatibility masks keyed by the Tethys Platform version
+        """
+        return {
+            tethys_version: self.compatible(tethys_version)
+            for tethys_version in tethys_versions
+        }
+
+    def split_versions(self, mask):
+        """Split the versions of each app into compatible and incompatible versions based on a compatibility mask
+
+        Args:
+            mask (list): compatibility mask from the compatible method
+
+        Returns:
+            list: List of (compatible versions, incompatible versions) for each app id. See the example below.
+
+            [
+                (['1.0', '1.1'], []),
+                (['2.0'], ['1.0'])
+            ]
+        """
+        split = [([], []) for _ in self.apps]
+        for app_id, version, is_compatible in zip(self.app_ids, self.versions, mask):
+            split[app_id][0 if is_compatible else 1].append(version)
+
+        return split
+
+    def latest_compatible(self, mask):
+        """Get the latest compatible version of each app based on a compatibility mask
+
+        Args:
+            mask (list): compatibility mask from the compatible method
+
+        Returns:
+            list: The latest compatible version for each app id or None if no version is compatible
+        """
+        latest = [None for _ in self.apps]
+        latest_keys = [MIN_KEY - 1 for _ in self.apps]
+        for app_id, version, key, is_compatible in zip(
+            self.app_ids, self.versions, self.version_keys, mask
+        ):
+            if is_compatible and key >= latest_keys[app_id]:
+                latest[app_id] = version
+                latest_keys[app_id] = key
+
+        return latest
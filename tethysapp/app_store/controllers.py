@@ -4,9 +4,13 @@ from django.http import JsonResponse
 from django.shortcuts import render
 from tethys_sdk.routing import controller
 
-from .resource_helpers import get_stores_reformatted
+from .resource_helpers import get_stores_reformatted, get_compatibility_report, get_resource
 from .helpers import get_conda_stores, html_label_styles, get_color_label_dict
 from .proxy_app_handlers import list_proxy_apps
+from .workspace_storage import get_workspace_usage
+from .install_plan import request_install_plan
+from .begin_install import get_default_version, get_incompatible_version_message
+from .job_queue import cancel_job as cancel_scheduled_job, CANCEL_PENDING
 
 ALL_RESOURCES = []
 CACHE_KEY = "warehouse_app_resources"
@@ -99,3 +103,140 @@ def get_merged_resources(request, app_workspace):
     object_stores_formatted_by_label_and_channel["tethysVersion"] = tethys_version_regex
 
     return JsonResponse(object_stores_formatted_by_label_and_channel)
+
+
+@controller(
+    name="get_workspace_storage_usage",
+    url="app-store/workspace_usage",
+    permissions_required="use_app_store",
+    app_workspace=True,
+)
+def get_workspace_storage_usage(request, app_workspace):
+    """Retrieves usage statistics for the packages downloaded to the app workspace through an ajax request
+
+    Args:
+        request (Django Request): Django request object containing information about the user and user request
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        JsonResponse: A json reponse of the workspace storage usage
+    """
+    return JsonResponse(get_workspace_usage(app_workspace))
+
+
+@controller(
+    name="get_tethys_compatibility_report",
+    url="app-store/compatibility_report",
+    permissions_required="use_app_store",
+    app_workspace=True,
+)
+def get_tethys_compatibility_report(request, app_workspace):
+    """Retrieves a report of the installed apps that are compatible with a list of target Tethys Platform versions
+    through an ajax request. The target versions are given as a comma separated tethys_versions query parameter.
+
+    Args:
+        request (Django Request): Django request object containing information about the user and user request
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        JsonResponse: A json reponse of the compatibility report
+    """
+    tethys_versions = [
+        version.strip()
+        for version in request.GET.get("tethys_versions", "").split(",")
+        if version.strip()
+    ]
+    if not tethys_versions:
+        return JsonResponse({"error": "At least one Tethys Platform version is required"}, status=400)
+
+    try:
+        report = get_compatibility_report(
+            app_workspace, tethys_versions, conda_channels=request.GET.get("active_store", "all")
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(report)
+
+
+@controller(
+    name="get_install_plan",
+    url="app-store/install_plan",
+    permissions_required="use_app_store",
+    app_workspace=True,
+)
+def get_install_plan(request, app_workspace):
+    """Retrieves a preview of the packages that an app install or update would add, remove, or change through an ajax
+    request. The app is given with the name, channel, label, and version query parameters. Set the update query
+    parameter to true to preview an update. The solve runs outside of the request thread, and a 202 response is sent
+    when it takes longer than the APP_STORE_PLAN_REQUEST_TIMEOUT setting. Repeat the request to get the plan.
+
+    Args:
+        request (Django Request): Django request object containing information about the user and user request
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        JsonResponse: A json reponse of the install plan
+    """
+    app_name = request.GET.get("name")
+    conda_channel = request.GET.get("channel")
+    conda_label = request.GET.get("label", "main")
+    app_version = request.GET.get("version")
+    if not app_name or not conda_channel:
+        return JsonResponse({"error": "The app name and channel are required"}, status=400)
+
+    if not app_version:
+        resource = get_resource(app_name, conda_channel, conda_label, app_workspace)
+        if not resource:
+            return JsonResponse({"error": f"Failed to get the {app_name} resource"}, status=404)
+        app_version = get_default_version(resource, conda_channel, conda_label)
+        if not app_version:
+            return JsonResponse({"error": get_incompatible_version_message(app_name)}, status=400)
+
+    apps = [{"name": app_name, "channel": conda_channel, "label": conda_label, "version": app_version}]
+    install_plan = request_install_plan(
+        apps,
+        update=request.GET.get("update", "false").lower() == "true",
+        refresh=request.GET.get("refresh", "false").lower() == "true",
+    )
+    if install_plan is None:
+        return JsonResponse(
+            {"pending": True, "message": "The install plan is still being solved. Try again in a moment."}, status=202
+        )
+
+    return JsonResponse(install_plan)
+
+
+@controller(
+    name="cancel_job",
+    url="app-store/cancel_job",
+    permissions_required="use_app_store",
+    app_workspace=True,
+)
+def cancel_job(request, app_workspace):
+    """Cancels a queued or running install, update, or uninstall. The job is given with the job_id parameter or, when
+    the ID is not known, with the name of the app. A job that runs in another worker process is cancelled by that
+    process, and a 202 response is sent.
+
+    Args:
+        request (Django Request): Django request object containing information about the user and user request
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        JsonResponse: A json reponse of the cancelled job
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Jobs can only be cancelled with a POST request"}, status=405)
+
+    job_id = request.POST.get("job_id")
+    app_name = request.POST.get("name")
+    if not job_id and not app_name:
+        return JsonResponse({"error": "The job_id or the app name is required"}, status=400)
+
+    job = cancel_scheduled_job(app_workspace, job_id=job_id, name=app_name)
+    if job is None:
+        return JsonResponse({"error": "The job can no longer be cancelled"}, status=409)
+    if job["state"] == CANCEL_PENDING:
+        return JsonResponse({"job": job}, status=202)
+
+    return JsonResponse({"job": job})
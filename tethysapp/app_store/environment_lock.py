@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import socket
+import threading
+
+from .helpers import logger, get_app_store_setting
+from .process_runner import check_cancelled
+
+LOCK_FILE = "environment_lock.json"
+DEFAULT_LEASE_SECONDS = 120
+POLL_INTERVAL = 1
+GUARD_POLL_INTERVAL = 0.05
+GUARD_STALE_SECONDS = 30
+
+HOSTNAME = socket.gethostname()
+
+
+class EnvironmentLockTimeout(Exception):
+    """Raised when the environment lock can't be acquired in time"""
+
+
+def get_lock_path(app_workspace):
+    """Get the path of the environment lock file in the app workspace
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        str: Path to the lock file
+    """
+    return os.path.join(app_workspace.path, "install_status", LOCK_FILE)
+
+
+def get_lease_seconds():
+    return float(get_app_store_setting("APP_STORE_LOCK_LEASE_SECONDS", DEFAULT_LEASE_SECONDS))
+
+
+class LockGuard:
+    """Serializes the changes to the lock file across threads, processes, and nodes that share the app workspace. The
+    guard file is created exclusively, so only one holder can change the lock file at a time. A guard left behind by a
+    crashed process is removed once it is older than GUARD_STALE_SECONDS.
+    """
+
+    def __init__(self, lock_path):
+        self.guard_path = f"{lock_path}.guard"
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.guard_path), exist_ok=True)
+        while True:
+            try:
+                os.close(os.open(self.guard_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.guard_path) > GUARD_STALE_SECONDS:
+                        os.remove(self.guard_path)
+                        continue
+                except OSError:
+                    continue
+                time.sleep(GUARD_POLL_INTERVAL)
+
+    def __exit__(self, *args):
+        try:
+            os.remove(self.guard_path)
+        except OSError:
+            pass
+
+
+def read_lock_state(lock_path):
+    """Read the lock file
+
+    Args:
+        lock_path (str): Path to the lock file
+
+    Returns:
+        dict: The lease that holds the lock and the owners waiting for it. See the example below.
+
+        {
+            'lease': {'owner': 'job_id', 'pid': 1234, 'host': 'node1', 'acquired': 1700000000.0,
+                      'heartbeat': 1700000060.0, 'expires': 1700000180.0},
+            'queue': [{'owner': 'job_id2', 'pid': 1235, 'host': 'node2', 'enqueued': 1700000010.0,
+                       'heartbeat': 1700000060.0, 'expires': 1700000180.0}]
+        }
+    """
+    try:
+        with open(lock_path, "r") as lock_file:
+            state = json.load(lock_file)
+    except (OSError, ValueError):
+        state = {}
+
+    return {"lease": state.get("lease"), "queue": state.get("queue", [])}
+
+
+def write_lock_state(lock_path, state):
+    temp_path = f"{lock_path}.tmp"
+    with open(temp_path, "w") as lock_file:
+        json.dump(state, lock_file)
+    os.replace(temp_path, lock_path)
+
+
+def is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def is_expired(entry, now=None):
+    """Check if a lease or a waiter is stale. Entries expire when their heartbeat stops, or right away when their
+    process is gone from this host.
+
+    Args:
+        entry (dict): Lease or waiter from the lock file
+        now (float, optional): Current time. Defaults to time.time().
+
+    Returns:
+        bool: True if the entry is stale
+    """
+    now = now or time.time()
+    if entry["expires"] < now:
+        return True
+    return entry["host"] == HOSTNAME and not is_process_alive(entry["pid"])
+
+
+def remove_expired(state):
+    """Drop the stale lease and waiters of a lock state
+
+    Args:
+        state (dict): Lock state from read_lock_state
+    """
+    now = time.time()
+    lease = state["lease"]
+    if lease and is_expired(lease, now):
+        logger.warning(f"Releasing the expired environment lock of {lease['owner']}")
+        state["lease"] = None
+    state["queue"] = [waiter for waiter in state["queue"] if not is_expired(waiter, now)]
+
+
+def new_entry(owner, lease_seconds):
+    now = time.time()
+    return {
+        "owner": owner,
+        "pid": os.getpid(),
+        "host": HOSTNAME,
+        "heartbeat": now,
+        "expires": now + lease_seconds,
+    }
+
+
+class EnvironmentLease:
+    """A held environment lock. A heartbeat thread renews the lease until it is released, so the lease only expires
+    when the holder stops.
+    """
+
+    def __init__(self, lock_path, owner, lease_seconds):
+        """
+        Args:
+            lock_path (str): Path to the lock file
+            owner (str): ID of the job that holds the lock
+            lease_seconds (float): Seconds the lease stays valid without a heartbeat
+        """
+        self.lock_path = lock_path
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.heartbeat_thread = threading.Thread(target=self.beat, name="EnvironmentLockHeartbeat", daemon=True)
+        self.heartbeat_thread.start()
+
+    def beat(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            if not self.renew():
+                logger.warning(f"The environment lock of {self.owner} was taken over by another owner")
+                return
+
+    def renew(self):
+        """Extend the lease
+
+        Returns:
+            bool: False if the lease is no longer held by its owner
+        """
+        with LockGuard(self.lock_path):
+            state = read_lock_state(self.lock_path)
+            lease = state["lease"]
+            if not lease or lease["owner"] != self.owner:
+                return False
+
+            now = time.time()
+            lease["heartbeat"] = now
+            lease["expires"] = now + self.lease_seconds
+            write_lock_state(self.lock_path, state)
+        return True
+
+    def release(self):
+        """Stop the heartbeat and release the lock"""
+        self.stopped.set()
+        with LockGuard(self.lock_path):
+            state = read_lock_state(self.lock_path)
+            if state["lease"] and state["lease"]["owner"] == self.owner:
+                state["lease"] = None
+                write_lock_state(self.lock_path, state)
+        logger.info(f"Released the environment lock of {self.owner}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def acquire_environment_lock(app_workspace, owner, timeout=None, on_wait=None, lease_seconds=None):
+    """Wait for the lock that guards changes to the conda environment and the portal. Owners get the lock in the order
+    they asked for it, across the worker processes and nodes that share the app workspace.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        owner (str): ID of the job that needs the lock
+        timeout (float, optional): Maximum seconds to wait. Defaults to waiting until the lock is free.
+        on_wait (function, optional): Called with the position of the owner in the queue whenever it changes.
+        lease_seconds (float, optional): Seconds the lease stays valid without a heartbeat. Defaults to the
+            APP_STORE_LOCK_LEASE_SECONDS setting.
+
+    Raises:
+        EnvironmentLockTimeout: The lock wasn't acquired before the timeout
+        ProcessCancelled: The job of the current thread was cancelled while waiting
+
+    Returns:
+        EnvironmentLease: The held lock. Release it with release() or use it as a context manager.
+    """
+    lock_path = get_lock_path(app_workspace)
+    if lease_seconds is None:
+        lease_seconds = get_lease_seconds()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    position = None
+    enqueued = time.time()
+
+    try:
+        while True:
+            with LockGuard(lock_path):
+                state = read_lock_state(lock_path)
+                remove_expired(state)
+                queue = [waiter for waiter in state["queue"] if waiter["owner"] != owner]
+                waiter = new_entry(owner, lease_seconds)
+                waiter["enqueued"] = enqueued
+                queue.append(waiter)
+                queue.sort(key=lambda waiter: waiter["enqueued"])
+                state["queue"] = queue
+
+                lease = state["lease"]
+                if lease and lease["owner"] == owner:
+                    lease = None
+                if lease is None and queue[0]["owner"] == owner:
+                    state["queue"] = queue[1:]
+                    state["lease"] = new_entry(owner, lease_seconds)
+                    state["lease"]["acquired"] = time.time()
+                    write_lock_state(lock_path, state)
+                    logger.info(f"Acquired the environment lock for {owner}")
+                    return EnvironmentLease(lock_path, owner, lease_seconds)
+
+                write_lock_state(lock_path, state)
+                new_position = [waiter["owner"] for waiter in queue].index(owner) + 1
+
+            if new_position != position:
+                position = new_position
+                logger.info(f"{owner} is waiting for the environment lock. Position in queue: {position}")
+                if on_wait:
+                    on_wait(position)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise EnvironmentLockTimeout(f"Timed out waiting for the environment lock for {owner}")
+
+            check_cancelled()
+            time.sleep(POLL_INTERVAL)
+    except BaseException:
+        leave_queue(lock_path, owner)
+        raise
+
+
+def leave_queue(lock_path, owner):
+    with LockGuard(lock_path):
+        state = read_lock_state(lock_path)
+        queue = [waiter for waiter in state["queue"] if waiter["owner"] != owner]
+        if len(queue) != len(state["queue"]):
+            state["queue"] = queue
+            write_lock_state(lock_path, state)
+
+
+def get_environment_lock_status(app_workspace):
+    """Get the current holder of the environment lock and the owners waiting for it. Stale entries are left out.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        dict: The lease and the queue. See read_lock_state.
+    """
+    state = read_lock_state(get_lock_path(app_workspace))
+    remove_expired(state)
+    return state
@@ -23,7 +23,10 @@ from datetime import datetime
 
 from conda.cli.python_api import run_command as conda_run, Commands
 from .app import AppStore as app
-from .helpers import get_override_key, logger, restart_server, clear_github_cache_list
+from .helpers import get_override_key, logger, clear_github_cache_list
+from .restart_coordinator import restart_server
+from .management_commands import sync_tethys_db
+from .environment_lock import acquire_environment_lock
 
 FNULL = open(os.devnull, "w")
 
@@ -71,14 +74,15 @@ def run_pending_installs():
                     if "name" in install_options:
                         app_name = install_options["name"]
 
-                    continue_install(
-                        data["workspacePath"],
-                        git_install_logger,
-                        file_path,
-                        install_options,
-                        app_name,
-                        app_workspace,
-                    )
+                    with acquire_environment_lock(app_workspace, get_lock_owner(file_path)):
+                        continue_install(
+                            data["workspacePath"],
+                            git_install_logger,
+                            file_path,
+                            install_options,
+                            app_name,
+                            app_workspace,
+                        )
 
 
 def update_status_file(path, status, status_key, error_msg=""):
@@ -174,10 +178,9 @@ def continue_install(
         app_name (str): Name of the application that is being installed
         app_workspace (TethysWorkspace): workspace object bound to the app workspace.
     """
-    process = Popen(["tethys", "db", "sync"], stdout=PIPE, stderr=STDOUT)
-    write_logs(logger, process.stdout, "Tethys DB Sync : ")
-    exitcode = process.wait()
-    if exitcode == 0:
+    db_sync = sync_tethys_db()
+    logger.info(f"Tethys DB Sync : finished in {db_sync['seconds']} seconds")
+    if db_sync["success"]:
         update_status_file(status_file_path, True, "dbSync")
     else:
         update_status_file(
@@ -227,62 +230,76 @@ def install_worker(
         develop (boolean): True if running installing in dev mode. False if installing in production mode
         app_workspace (TethysWorkspace): workspace object bound to the app workspace.
     """
-    logger.info("Installing dependencies...")
-    file_path = Path(os.path.join(workspace_apps_path, "install.yml"))
-    install_options = open_file(file_path)
+    with acquire_environment_lock(app_workspace, get_lock_owner(status_file_path)):
+        logger.info("Installing dependencies...")
+        file_path = Path(os.path.join(workspace_apps_path, "install.yml"))
+        install_options = open_file(file_path)
+
+        if "name" in install_options:
+            app_name = install_options["name"]
+
+        if validate_schema("requirements", install_options):
+            requirements_config = install_options["requirements"]
+            skip = False
+            if "skip" in requirements_config:
+                skip = requirements_config["skip"]
+
+            if skip:
+                logger.info("Skipping package installation, Skip option found.")
+            else:
+                if validate_schema("conda", requirements_config):  # noqa: E501
+                    conda_config = requirements_config["conda"]
+                    install_packages(conda_config, logger, status_file_path)
+                if validate_schema("pip", requirements_config):
+                    logger.info("Running pip installation tasks...")
+                    process = Popen(
+                        ["pip", "install", *requirements_config["pip"]],
+                        stdout=PIPE,
+                        stderr=STDOUT,
+                    )
+                    write_logs(logger, process.stdout, "PIP Install: ")
+                    exitcode = process.wait()
+                    logger.info(f"PIP Install exited with: {str(exitcode)}")
+
+        update_status_file(status_file_path, True, "conda")
+        update_status_file(status_file_path, True, "pip")
+        update_status_file(status_file_path, "Running", "setupPy")
+
+        # Run Setup.py
+        logger.info("Running application install....")
+        command = "develop" if develop else "install"
+        process = Popen(
+            ["python", "setup.py", command],
+            cwd=workspace_apps_path,
+            stdout=PIPE,
+            stderr=STDOUT,
+        )
+        write_logs(logger, process.stdout, "Python Install SubProcess: ")
+        exitcode = process.wait()
+        logger.info("Python Application install exited with: " + str(exitcode))
 
-    if "name" in install_options:
-        app_name = install_options["name"]
+        # This step might cause a server restart and will not have the rest of the code execute.
+        continue_install(
+            workspace_apps_path,
+            logger,
+            status_file_path,
+            install_options,
+            app_name,
+            app_workspace,
+        )
 
-    if validate_schema("requirements", install_options):
-        requirements_config = install_options["requirements"]
-        skip = False
-        if "skip" in requirements_config:
-            skip = requirements_config["skip"]
 
-        if skip:
-            logger.info("Skipping package installation, Skip option found.")
-        else:
-            if validate_schema("conda", requirements_config):  # noqa: E501
-                conda_config = requirements_config["conda"]
-                install_packages(conda_config, logger, status_file_path)
-            if validate_schema("pip", requirements_config):
-                logger.info("Running pip installation tasks...")
-                process = Popen(
-                    ["pip", "install", *requirements_config["pip"]],
-                    stdout=PIPE,
-                    stderr=STDOUT,
-                )
-                write_logs(logger, process.stdout, "PIP Install: ")
-                exitcode = process.wait()
-                logger.info(f"PIP Install exited with: {str(exitcode)}")
-
-    update_status_file(status_file_path, True, "conda")
-    update_status_file(status_file_path, True, "pip")
-    update_status_file(status_file_path, "Running", "setupPy")
-
-    # Run Setup.py
-    logger.info("Running application install....")
-    command = "develop" if develop else "install"
-    process = Popen(
-        ["python", "setup.py", command],
-        cwd=workspace_apps_path,
-        stdout=PIPE,
-        stderr=STDOUT,
-    )
-    write_logs(logger, process.stdout, "Python Install SubProcess: ")
-    exitcode = process.wait()
-    logger.info("Python Application install exited with: " + str(exitcode))
-
-    # This step might cause a server restart and will not have the rest of the code execute.
-    continue_install(
-        workspace_apps_path,
-        logger,
-        status_file_path,
-        install_options,
-        app_name,
-        app_workspace,
-    )
+def get_lock_owner(status_file_path):
+    """Get the owner of the environment lock for a git install
+
+    Args:
+        status_file_path (str): Path to the file tracking the app installation process
+
+    Returns:
+        str: Owner of the environment lock
+    """
+    install_id = os.path.splitext(os.path.basename(status_file_path))[0]
+    return f"github_install-{install_id}"
 
 
 def get_log_file(install_id, workspace_directory):
@@ -518,8 +535,6 @@ def run_git_install_main(request, app_workspace):
     if not os.path.exists(install_status_dir):
         os.makedirs(install_status_dir)
 
-    Path(os.path.join(workspace_directory, "install_status", "installRunning")).touch()
-
     received_json_data = json.loads(request.body)
     develop = True if received_json_data.get("develop", True) is True else False
 
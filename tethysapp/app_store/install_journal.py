@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+from channels.layers import get_channel_layer
+from .helpers import logger
+from .process_runner import get_process_owner
+from .environment_lock import HOSTNAME, is_process_alive, get_environment_lock_status
+
+JOURNAL_DIRECTORY = "conda"
+MAX_FINISHED_JOURNALS = 20
+
+# Steps of a conda install in the order they run
+SOLVE = "solve"
+CONDA_INSTALL = "condaInstall"
+APP_DEPENDENCIES = "appDependencies"
+
+# Step and journal states. Completed steps are True and failed steps are False like the GitHub install status files
+PENDING = "Pending"
+RUNNING = "Running"
+JOURNAL_RUNNING = "running"
+JOURNAL_COMPLETED = "completed"
+JOURNAL_FAILED = "failed"
+JOURNAL_CANCELLED = "cancelled"
+
+# Identifies the journals written by this server process, which are never resumed by it. The pid and host of the
+# process are recorded as well so other worker processes can tell if the install is still running.
+PROCESS_TOKEN = uuid.uuid4().hex
+
+_journal_lock = threading.Lock()
+
+
+def get_journal_dir(app_workspace):
+    """Get the folder of the conda install journals in the app workspace
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        str: Path to the journal folder
+    """
+    return os.path.join(app_workspace.path, "install_status", JOURNAL_DIRECTORY)
+
+
+class InstallJournal:
+    """Records the progress of a conda install in the app workspace so an install that was interrupted by a server
+    restart resumes from the last completed step
+    """
+
+    def __init__(self, path, journal):
+        """
+        Args:
+            path (str): Path to the journal file
+            journal (dict): Content of the journal
+        """
+        self.path = path
+        self.journal = journal
+
+    @classmethod
+    def create(cls, app_workspace, apps):
+        """Start the journal of a new install
+
+        Args:
+            app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+            apps (list): List of dictionaries with the name, channel, label, and version of each app to install
+
+        Returns:
+            InstallJournal: The new journal
+        """
+        journal_dir = get_journal_dir(app_workspace)
+        os.makedirs(journal_dir, exist_ok=True)
+        prune_journals(journal_dir)
+
+        journal_id = uuid.uuid4().hex
+        now = time.time()
+        journal = {
+            "journalId": journal_id,
+            "owner": PROCESS_TOKEN,
+            "pid": os.getpid(),
+            "host": HOSTNAME,
+            "jobId": get_process_owner(),
+            "state": JOURNAL_RUNNING,
+            "created": now,
+            "updated": now,
+            "apps": apps,
+            "specs": None,
+            "steps": {
+                SOLVE: PENDING,
+                CONDA_INSTALL: PENDING,
+                APP_DEPENDENCIES: {app["name"]: PENDING for app in apps},
+            },
+            "errorMessage": None,
+        }
+        install_journal = cls(os.path.join(journal_dir, f"{journal_id}.json"), journal)
+        install_journal.save()
+        return install_journal
+
+    @classmethod
+    def load(cls, app_workspace, journal_id):
+        """Load the journal of an install
+
+        Args:
+            app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+            journal_id (str): ID of the journal
+
+        Returns:
+            InstallJournal: The journal or None if it doesn't exist or is corrupted
+        """
+        path = os.path.join(get_journal_dir(app_workspace), f"{journal_id}.json")
+        try:
+            with open(path, "r") as journal_file:
+                return cls(path, json.load(journal_file))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load the install journal {journal_id}: {e}")
+            return None
+
+    @property
+    def journal_id(self):
+        return self.journal["journalId"]
+
+    @property
+    def apps(self):
+        return self.journal["apps"]
+
+    @property
+    def specs(self):
+        return self.journal["specs"]
+
+    def save(self):
+        """Write the journal to the workspace. The file is replaced in one step so a restart never leaves a partial
+        journal
+        """
+        with _journal_lock:
+            self.journal["updated"] = time.time()
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as journal_file:
+                json.dump(self.journal, journal_file)
+            os.replace(temp_path, self.path)
+
+    def is_completed(self, step, app_name=None):
+        """Check if a step of the install is completed
+
+        Args:
+            step (str): Step of the install
+            app_name (str, optional): App of a step that runs for each app. Defaults to None.
+
+        Returns:
+            bool: True if the step is completed
+        """
+        status = self.journal["steps"][step]
+        if app_name is not None:
+            status = status.get(app_name)
+        return status is True
+
+    def update_step(self, step, status, app_name=None):
+        """Set the status of a step and save the journal
+
+        Args:
+            step (str): Step of the install
+            status (str or bool): Pending, Running, True if completed, or False if failed
+            app_name (str, optional): App of a step that runs for each app. Defaults to None.
+        """
+        if app_name is None:
+            self.journal["steps"][step] = status
+        else:
+            self.journal["steps"][step][app_name] = status
+        self.save()
+
+    def start_step(self, step, app_name=None):
+        self.update_step(step, RUNNING, app_name)
+
+    def complete_step(self, step, app_name=None):
+        self.update_step(step, True, app_name)
+
+    def record_solve(self, specs):
+        """Record the packages picked by the solve so a resumed install doesn't solve the environment again
+
+        Args:
+            specs (list): Pinned package specs of the install plan or None if the install solves on its own
+        """
+        self.journal["specs"] = specs
+        self.complete_step(SOLVE)
+
+    def finish(self, state=JOURNAL_COMPLETED, error_message=None):
+        """Mark the install as finished so it is not resumed
+
+        Args:
+            state (str, optional): completed, failed, or cancelled. Defaults to completed.
+            error_message (str, optional): Why the install failed. Defaults to None.
+        """
+        self.journal["state"] = state
+        self.journal["errorMessage"] = error_message
+        self.save()
+
+    def claim(self, job_id=None):
+        """Take over the journal of an interrupted install so this process resumes it
+
+        Args:
+            job_id (str, optional): ID of the job that resumes the install. Defaults to None until the job starts.
+        """
+        self.journal["owner"] = PROCESS_TOKEN
+        self.journal["pid"] = os.getpid()
+        self.journal["host"] = HOSTNAME
+        self.journal["jobId"] = job_id
+        self.save()
+
+    def is_owned(self):
+        """Check if the install of the journal belongs to this process
+
+        Returns:
+            bool: True if this process started or claimed the install
+        """
+        return self.journal["owner"] == PROCESS_TOKEN
+
+
+def prune_journals(journal_dir):
+    """Remove the oldest finished journals so only the most recent ones are kept
+
+    Args:
+        journal_dir (str): Path to the journal folder
+    """
+    finished_journals = []
+    for install_journal in list_journals(journal_dir):
+        if install_journal.journal["state"] != JOURNAL_RUNNING:
+            finished_journals.append(install_journal)
+
+    finished_journals.sort(key=lambda install_journal: install_journal.journal["updated"], reverse=True)
+    for install_journal in finished_journals[MAX_FINISHED_JOURNALS:]:
+        try:
+            os.remove(install_journal.path)
+        except OSError:
+            pass
+
+
+def list_journals(journal_dir):
+    """Load every journal of a journal folder
+
+    Args:
+        journal_dir (str): Path to the journal folder
+
+    Returns:
+        list: The journals. Corrupted journals are skipped.
+    """
+    if not os.path.isdir(journal_dir):
+        return []
+
+    journals = []
+    for file_name in os.listdir(journal_dir):
+        if not file_name.endswith(".json"):
+            continue
+
+        path = os.path.join(journal_dir, file_name)
+        try:
+            with open(path, "r") as journal_file:
+                journals.append(InstallJournal(path, json.load(journal_file)))
+        except (OSError, ValueError):
+            logger.warning(f"Skipping the corrupted install journal {file_name}")
+
+    return journals
+
+
+def is_interrupted(install_journal, lock_status):
+    """Check if the install of a journal was interrupted. Several worker processes can share the workspace, so a
+    running install of another process is only interrupted when that process is gone from this host. The process of an
+    install on another host can't be checked, so that install is interrupted when its job neither holds nor waits for
+    the environment lock.
+
+    Args:
+        install_journal (InstallJournal): Journal of the install
+        lock_status (dict): Live lease and waiters of the environment lock. See get_environment_lock_status.
+
+    Returns:
+        bool: True if the install was interrupted
+    """
+    journal = install_journal.journal
+    if journal["state"] != JOURNAL_RUNNING or install_journal.is_owned():
+        return False
+
+    if journal.get("host") == HOSTNAME and journal.get("pid"):
+        return not is_process_alive(journal["pid"])
+
+    lock_entries = [lock_status["lease"]] + lock_status["queue"] if lock_status["lease"] else lock_status["queue"]
+    return not any(entry["owner"] == journal.get("jobId") for entry in lock_entries)
+
+
+def get_interrupted_journals(app_workspace):
+    """Get the journals of the installs that were running when their server process stopped
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        list: The interrupted journals, oldest first
+    """
+    lock_status = get_environment_lock_status(app_workspace)
+    journals = [
+        install_journal
+        for install_journal in list_journals(get_journal_dir(app_workspace))
+        if is_interrupted(install_journal, lock_status)
+    ]
+    return sorted(journals, key=lambda install_journal: install_journal.journal["created"])
+
+
+def resume_interrupted_installs(scheduler, channel_layer=None):
+    """Queue a resume job for each install that was interrupted by a server restart
+
+    Args:
+        scheduler (JobScheduler): The job scheduler of this process
+        channel_layer (Django Channels Layer, optional): Channel layer to send the notifications of the resumed
+            installs to. Defaults to the default channel layer.
+
+    Returns:
+        list: IDs of the queued jobs
+    """
+    interrupted_journals = get_interrupted_journals(scheduler.app_workspace)
+    if not interrupted_journals:
+        return []
+
+    # Resume jobs that were queued before the restart are already queued again by the scheduler
+    queued_journals = [job["data"].get("journalId") for job in scheduler.get_active_jobs("resume_install")]
+    if channel_layer is None:
+        channel_layer = get_channel_layer()
+
+    job_ids = []
+    for install_journal in interrupted_journals:
+        # Claim the journal before the resume job can start. The job records its ID once it runs.
+        install_journal.claim()
+        if install_journal.journal_id in queued_journals:
+            continue
+
+        app_names = ", ".join(app["name"] for app in install_journal.apps)
+        logger.info(f"Resuming the interrupted install of {app_names}")
+        data = {"journalId": install_journal.journal_id, "apps": install_journal.apps}
+        job_ids.append(scheduler.submit("resume_install", data, channel_layer, with_workspace=True))
+
+    return job_ids
@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.core.cache import cache
+from conda.cli.python_api import run_command as conda_run, Commands
+
+from .helpers import logger, get_app_store_setting
+from .mamba_helpers import get_app_specs
+
+PLAN_CACHE_PREFIX = "install_plan"
+DEFAULT_PLAN_CACHE_TIMEOUT = 600
+DEFAULT_PLAN_REQUEST_TIMEOUT = 30
+PLAN_SOLVE_WORKERS = 2
+
+# Solves requested by the web server run here so a slow solve doesn't hold a request thread
+_plan_executor = ThreadPoolExecutor(max_workers=PLAN_SOLVE_WORKERS, thread_name_prefix="install-plan")
+_pending_plans = {}
+_pending_plans_lock = threading.Lock()
+
+
+def get_environment_fingerprint(prefix=None):
+    """Get a fingerprint of the state of the conda environment. Every conda or mamba transaction appends to the
+    conda-meta/history file, so its modification time and size change whenever packages are added or removed.
+
+    Args:
+        prefix (str, optional): Path to the conda environment. Defaults to the running environment.
+
+    Returns:
+        str: Fingerprint of the environment
+    """
+    prefix = prefix or sys.prefix
+    history_path = os.path.join(prefix, "conda-meta", "history")
+    try:
+        history_stat = os.stat(history_path)
+        state = f"{prefix}:{history_stat.st_mtime_ns}:{history_stat.st_size}"
+    except OSError:
+        state = f"{prefix}:no-history"
+
+    return hashlib.sha1(state.encode("utf-8")).hexdigest()
+
+
+def get_plan_cache_key(apps, update=False, fingerprint=None):
+    """Get the cache key of the install plan for a request and an environment state
+
+    Args:
+        apps (list): List of dictionaries with the name, channel, label, and version of each app to install
+        update (bool, optional): The plan is for an update instead of an install. Defaults to False.
+        fingerprint (str, optional): Fingerprint of the environment. Defaults to the current fingerprint.
+
+    Returns:
+        str: cache key
+    """
+    if fingerprint is None:
+        fingerprint = get_environment_fingerprint()
+    label_channels, app_specs = get_app_specs(apps)
+    request = json.dumps([sorted(label_channels), sorted(app_specs), update])
+    request_hash = hashlib.sha1(request.encode("utf-8")).hexdigest()
+
+    return f"{PLAN_CACHE_PREFIX}_{fingerprint}_{request_hash}"
+
+
+def get_package_spec(package):
+    """Get a spec that pins a package from a dry run to the exact channel, version, and build
+
+    Args:
+        package (dict): Package information from the dry run json output
+
+    Returns:
+        str: pinned package spec, i.e. conda-forge::numpy==1.26.4=py311h64a7726_0
+    """
+    spec = f"{package['name']}=={package['version']}"
+    build = package.get("build_string") or package.get("build")
+    if build:
+        spec = f"{spec}={build}"
+    if package.get("channel"):
+        spec = f"{package['channel']}::{spec}"
+
+    return spec
+
+
+def parse_dry_run_output(output):
+    """Convert the json output of a conda dry run into an install plan
+
+    Args:
+        output (str): json output of the dry run
+
+    Returns:
+        dict: Install plan. See the example below.
+
+        {
+            'success': True,
+            'error': None,
+            'add': [{'name': 'app_name', 'version': '1.0', 'channel': 'conda_channel'}],
+            'remove': [],
+            'change': [{'name': 'numpy', 'from': '1.25.0', 'to': '1.26.4', 'channel': 'conda-forge'}],
+            'downloadSize': 102400,
+            'specs': ['conda_channel::app_name==1.0=py_0', 'conda-forge::numpy==1.26.4=py311h64a7726_0'],
+            'fetch': [{'fn': 'app_name-1.0-py_0.tar.bz2', 'url': <package url>, 'size': 2048, 'md5': <md5>,
+                       'sha256': <sha256>}]
+        }
+    """
+    plan = {
+        "success": False,
+        "error": None,
+        "add": [],
+        "remove": [],
+        "change": [],
+        "downloadSize": 0,
+        "specs": [],
+        "fetch": [],
+    }
+    try:
+        result = json.loads(output)
+    except (TypeError, ValueError):
+        plan["error"] = "Could not read the output of the dry run"
+        return plan
+
+    if not result.get("success"):
+        plan["error"] = result.get("message") or result.get("error") or "The dry run failed to solve the environment"
+        return plan
+
+    actions = result.get("actions", {})
+    linked = {package["name"]: package for package in actions.get("LINK", [])}
+    unlinked = {package["name"]: package for package in actions.get("UNLINK", [])}
+
+    for name, package in linked.items():
+        if name in unlinked:
+            plan["change"].append(
+                {
+                    "name": name,
+                    "from": unlinked[name]["version"],
+                    "to": package["version"],
+                    "channel": package.get("channel"),
+                }
+            )
+        else:
+            plan["add"].append(
+                {"name": name, "version": package["version"], "channel": package.get("channel")}
+            )
+        plan["specs"].append(get_package_spec(package))
+
+    for name, package in unlinked.items():
+        if name not in linked:
+            plan["remove"].append(
+                {"name": name, "version": package["version"], "channel": package.get("channel")}
+            )
+
+    plan["downloadSize"] = sum(package.get("size") or 0 for package in actions.get("FETCH", []))
+    plan["fetch"] = [
+        {
+            "fn": package.get("fn"),
+            "url": package.get("url"),
+            "size": package.get("size") or 0,
+            "md5": package.get("md5"),
+            "sha256": package.get("sha256"),
+        }
+        for package in actions.get("FETCH", [])
+        if package.get("url")
+    ]
+    plan["success"] = True
+
+    return plan
+
+
+def create_install_plan(apps, update=False, refresh=False, timeout=None):
+    """Run a dry run solve for an install or update and report the packages that would be added, removed, or changed.
+    Plans are cached by the state of the environment and the request, so the install can reuse the solution as long as
+    the environment has not changed.
+
+    Args:
+        apps (list): List of dictionaries with the name, channel, label, and version of each app to install
+        update (bool, optional): The plan is for an update. Installed packages are allowed to change. Defaults to False.
+        refresh (bool, optional): Ignore a cached plan. Defaults to False.
+        timeout (int, optional): Seconds to cache the plan for. Defaults to the APP_STORE_PLAN_CACHE_TIMEOUT setting.
+
+    Returns:
+        dict: Install plan. See parse_dry_run_output for an example.
+    """
+    fingerprint = get_environment_fingerprint()
+    cache_key = get_plan_cache_key(apps, update=update, fingerprint=fingerprint)
+    if not refresh:
+        cached_plan = cache.get(cache_key)
+        if cached_plan is not None:
+            return cached_plan
+
+    label_channels, app_specs = get_app_specs(apps)
+    dry_run_args = ["--dry-run", "--json", "-y", "-q"]
+    if not update:
+        dry_run_args.append("--freeze-installed")
+    for label_channel in label_channels:
+        dry_run_args.extend(["-c", label_channel])
+    dry_run_args.extend(["-c", "tethysplatform", "-c", "conda-forge"])
+    dry_run_args.extend(app_specs)
+
+    logger.info(f"Creating install plan for {', '.join(app_specs)}")
+    try:
+        [resp, err, code] = conda_run(Commands.INSTALL, dry_run_args, use_exception_handler=True)
+    except Exception as e:
+        logger.error(e)
+        resp = None
+
+    plan = parse_dry_run_output(resp)
+    plan["fingerprint"] = fingerprint
+    plan["apps"] = apps
+    plan["update"] = update
+    if plan["success"]:
+        if timeout is None:
+            timeout = get_app_store_setting("APP_STORE_PLAN_CACHE_TIMEOUT", DEFAULT_PLAN_CACHE_TIMEOUT)
+        cache.set(cache_key, plan, int(timeout))
+
+    return plan
+
+
+def request_install_plan(apps, update=False, refresh=False, timeout=None):
+    """Create an install plan in a background thread and wait a limited time for it. A solve that takes longer keeps
+    running and caches its plan, so the same request picks it up later. Identical requests share one solve.
+
+    Args:
+        apps (list): List of dictionaries with the name, channel, label, and version of each app to install
+        update (bool, optional): The plan is for an update. Defaults to False.
+        refresh (bool, optional): Ignore a cached plan. Defaults to False.
+        timeout (float, optional): Seconds to wait for the plan. Defaults to the APP_STORE_PLAN_REQUEST_TIMEOUT
+            setting.
+
+    Returns:
+        dict: Install plan or None if the solve is still running
+    """
+    if timeout is None:
+        timeout = float(get_app_store_setting("APP_STORE_PLAN_REQUEST_TIMEOUT", DEFAULT_PLAN_REQUEST_TIMEOUT))
+
+    plan_key = get_plan_cache_key(apps, update=update)
+    with _pending_plans_lock:
+        future = _pending_plans.get(plan_key)
+        new_solve = future is None
+        if new_solve:
+            future = _plan_executor.submit(create_install_plan, apps, update=update, refresh=refresh)
+            _pending_plans[plan_key] = future
+
+    if new_solve:
+        future.add_done_callback(lambda done: forget_pending_plan(plan_key, done))
+
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        logger.info(f"The install plan for {', '.join(app['name'] for app in apps)} is still being solved")
+        return None
+
+
+def forget_pending_plan(plan_key, future):
+    with _pending_plans_lock:
+        if _pending_plans.get(plan_key) is future:
+            del _pending_plans[plan_key]
+
+
+def get_cached_install_plan(apps, update=False):
+    """Get a successful install plan that was created for the same request and the current state of the environment
+
+    Args:
+        apps (list): List of dictionaries with the name, channel, label, and version of each app to install
+        update (bool, optional): The plan is for an update. Defaults to False.
+
+    Returns:
+        dict: Install plan or None if there is no plan for the request and environment
+    """
+    plan = cache.get(get_plan_cache_key(apps, update=update))
+    if plan and plan["success"] and plan["specs"]:
+        return plan
+    return None
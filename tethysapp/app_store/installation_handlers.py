@@ -1,5 +1,8 @@
+import time
+import threading
 from argparse import Namespace
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import transaction
 
 from tethys_apps.models import CustomSetting, TethysApp
 from tethys_apps.utilities import get_app_settings, link_service_to_app_setting
@@ -10,12 +13,20 @@ from tethys_cli.install_commands import (
 from tethys_cli.services_commands import services_list_command
 
 from .begin_install import detect_app_dependencies
-from .resource_helpers import get_app_instance_from_path, check_if_app_installed
-from .helpers import logger, send_notification
+from .resource_helpers import check_if_app_installed
+from .app_declarations import get_app_declarations
+from .helpers import logger, send_notification, get_app_store_setting
 from .model import *  # noqa: F401, F403
 
 
-def get_service_options(service_type):
+DEFAULT_SERVICE_OPTIONS_TTL = 30
+
+# Service options for each service type with the time they were queried
+_service_options = {}
+_service_options_lock = threading.Lock()
+
+
+def query_service_options(service_type):
     """Use the service list command line command to get available tethys services for spatial, persistent, wps, or
      datasets
 
@@ -42,6 +53,30 @@ def get_service_options(service_type):
     return existing_services
 
 
+def get_service_options(service_type, refresh=False):
+    """Get the available tethys services for a service type. The services are queried once and reused for
+    APP_STORE_SERVICE_OPTIONS_TTL seconds.
+
+    Args:
+        service_type (str): tethys service type. Can be 'spatial', 'persistent', 'wps', or 'dataset'
+        refresh (bool, optional): Query the services again, i.e. after a new service was added. Defaults to False.
+
+    Returns:
+        list: List of tethys services for the specified service type
+    """
+    ttl = float(get_app_store_setting("APP_STORE_SERVICE_OPTIONS_TTL", DEFAULT_SERVICE_OPTIONS_TTL))
+    with _service_options_lock:
+        cached = _service_options.get(service_type)
+        if not refresh and cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+    options = query_service_options(service_type)
+    with _service_options_lock:
+        _service_options[service_type] = (time.monotonic(), options)
+
+    return options
+
+
 def continueAfterInstall(installData, channel_layer):
     """If install is still running, check if the app is installed and check that the correct version is installed
 
@@ -72,7 +107,7 @@ def set_custom_settings(custom_settings_data, channel_layer):
         custom_settings_data (dict): Dictionary containing information about the custom settings of the app
         channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
     """
-    current_app = get_app_instance_from_path([custom_settings_data["app_py_path"]])
+    current_app = get_app_declarations(custom_settings_data["app_py_path"])
 
     if custom_settings_data.get("skip"):
         logger.info("Skip/NoneFound option called.")
@@ -101,15 +136,41 @@ def set_custom_settings(custom_settings_data, channel_layer):
         )
         return
 
+    # Load every setting of the app in one query and validate the new values before anything is written
+    actual_settings = {
+        actual_setting.name: actual_setting
+        for actual_setting in CustomSetting.objects.filter(tethys_app=current_app_tethysapp_instance.id)
+    }
+    changed_settings = []
+    errors = {}
     for setting in custom_settings:
         setting_name = setting.name
-        actual_setting = CustomSetting.objects.get(
-            name=setting_name, tethys_app=current_app_tethysapp_instance.id
-        )
-        if setting_name in custom_settings_data["settings"]:
-            actual_setting.value = custom_settings_data["settings"][setting_name]
+        if setting_name not in custom_settings_data["settings"]:
+            continue
+
+        actual_setting = actual_settings.get(setting_name)
+        if actual_setting is None:
+            errors[setting_name] = "This setting is not registered for the app"
+            continue
+
+        actual_setting.value = custom_settings_data["settings"][setting_name]
+        try:
             actual_setting.clean()
-            actual_setting.save()
+        except ValidationError as e:
+            errors[setting_name] = " ".join(e.messages)
+            continue
+        changed_settings.append(actual_setting)
+
+    if errors:
+        logger.error(f"Invalid custom settings for {current_app_name}: {errors}")
+        send_notification(
+            {"data": {"errors": errors}, "jsHelperFunction": "customSettingConfigErrors"},
+            channel_layer,
+        )
+        return
+
+    with transaction.atomic():
+        CustomSetting.objects.bulk_update(changed_settings, ["value"])
 
     send_notification("Custom Settings configured.", channel_layer)
 
@@ -125,10 +186,15 @@ def process_settings(app_instance, app_py_path, channel_layer):
     options that can be used later for linking
 
     Args:
-        app_instance (TethysAppBase Instance): Tethys app instance for the installed application
+        app_instance (AppDeclarations or TethysAppBase Instance): Declarations or instance of the installed application
         app_py_path (str): Path to the app.py file for the application
         channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
     """
+    # Skip the database lookup when app.py doesn't declare any service settings
+    if getattr(app_instance, "declared_service_settings", None) == {}:
+        send_notification("No Services found to configure.", channel_layer)
+        return
+
     app_settings = get_app_settings(app_instance.package)
 
     # In the case the app isn't installed, has no settings, or it is an extension,
@@ -139,17 +205,21 @@ def process_settings(app_instance, app_py_path, channel_layer):
     unlinked_settings = app_settings["unlinked_settings"]
 
     services = []
+    # Settings of the same service type share the options so each type is queried once
+    service_options = {}
     for setting in unlinked_settings:
         if "CustomSetting" in setting.__class__.__name__:
             continue
         service_type = get_service_type_from_setting(setting)
+        if service_type not in service_options:
+            service_options[service_type] = get_service_options(service_type)
         newSetting = {
             "name": setting.name,
             "required": setting.required,
             "description": setting.description,
             "service_type": service_type,
             "setting_type": get_setting_type_from_setting(setting),
-            "options": get_service_options(service_type),
+            "options": service_options[service_type],
         }
         services.append(newSetting)
 
@@ -191,7 +261,7 @@ def configure_services(services_data, channel_layer):
 
 
 def getServiceList(data, channel_layer):
-    """_summary_
+    """Send the refreshed services of a setting type after a new service is added from the services modal
 
     Args:
         data (dict): Contains the type of setting to be used to get available services
@@ -200,7 +270,7 @@ def getServiceList(data, channel_layer):
     get_data_json = {
         "data": {
             "settingType": data["settingType"],
-            "newOptions": get_service_options(data["settingType"]),
+            "newOptions": get_service_options(data["settingType"], refresh=True),
         },
         "jsHelperFunction": "updateServiceListing",
     }
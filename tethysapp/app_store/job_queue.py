@@ -0,0 +1,743 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+from channels.layers import get_channel_layer
+from .helpers import logger, get_app_store_setting, send_notification
+from .process_runner import (
+    ProcessCancelled,
+    cancel_processes,
+    release_process_owner,
+    request_cancel,
+    set_process_owner,
+)
+from .install_journal import resume_interrupted_installs
+from .environment_lock import acquire_environment_lock, LockGuard
+
+JOB_QUEUE_FILE = "job_queue.json"
+CANCEL_REQUESTS_FILE = "cancel_requests.json"
+CANCEL_POLL_INTERVAL = 1
+CANCEL_REQUEST_TIMEOUT = 60
+DEFAULT_MAX_WORKERS = 4
+MAX_FINISHED_JOBS = 100
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+CANCELLED = "cancelled"
+# State reported for a cancel request that was handed to the other worker processes
+CANCEL_PENDING = "cancelPending"
+FINISHED_STATES = [COMPLETED, FAILED, INTERRUPTED, CANCELLED]
+
+# Commands that change the conda environment or the portal. Only one of these runs at a time. Restarts are batched by
+# the restart coordinator, which holds the exclusive slot while it restarts the server
+EXCLUSIVE_FUNCTIONS = [
+    "begin_install",
+    "batch_install",
+    "resume_install",
+    "continueAfterInstall",
+    "update_app",
+    "uninstall_app",
+]
+
+# Commands that can be cancelled while they are running
+CANCELLABLE_FUNCTIONS = [
+    "begin_install",
+    "batch_install",
+    "resume_install",
+    "update_app",
+    "uninstall_app",
+]
+
+# Higher priorities run first. Everything else uses the default priority
+DEFAULT_PRIORITY = 0
+FUNCTION_PRIORITIES = {
+    "restart_server": -10,
+    "prefetch_packages": -20,
+}
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_queue_path(app_workspace):
+    """Get the path to the file that persists the job queue in the app workspace
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        str: Path to the job queue file
+    """
+    return os.path.join(app_workspace.path, "install_status", JOB_QUEUE_FILE)
+
+
+def get_cancel_requests_path(app_workspace):
+    """Get the path to the file that passes cancel requests between the worker processes that share the app workspace
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        str: Path to the cancel requests file
+    """
+    return os.path.join(app_workspace.path, "install_status", CANCEL_REQUESTS_FILE)
+
+
+def read_cancel_requests(requests_path):
+    """Read the pending cancel requests. Requests that no process picked up in time are dropped.
+
+    Args:
+        requests_path (str): Path to the cancel requests file
+
+    Returns:
+        list: Cancel requests. See the example below.
+
+        [{'id': '3f2a...', 'jobId': 'job_id', 'name': None, 'requested': 1700000000.0}]
+    """
+    try:
+        with open(requests_path, "r") as requests_file:
+            cancel_requests = json.load(requests_file)
+    except (OSError, ValueError):
+        return []
+
+    now = time.time()
+    active_requests = []
+    for cancel_request in cancel_requests:
+        if now - cancel_request["requested"] > CANCEL_REQUEST_TIMEOUT:
+            logger.warning(
+                f"No process has a job for the cancel request of {cancel_request['jobId'] or cancel_request['name']}"
+            )
+        else:
+            active_requests.append(cancel_request)
+    return active_requests
+
+
+def write_cancel_requests(requests_path, cancel_requests):
+    os.makedirs(os.path.dirname(requests_path), exist_ok=True)
+    temp_path = f"{requests_path}.tmp"
+    with open(temp_path, "w") as requests_file:
+        json.dump(cancel_requests, requests_file)
+    os.replace(temp_path, requests_path)
+
+
+def post_cancel_request(app_workspace, job_id=None, name=None):
+    """Ask the worker process that runs a job to cancel it. Every scheduler with active jobs polls the cancel requests
+    and cancels its own matching job.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        job_id (str, optional): ID of the job to cancel.
+        name (str, optional): Name of the app whose install, update, or uninstall should be cancelled when the job ID is
+            not known.
+
+    Returns:
+        dict: The cancel request
+    """
+    cancel_request = {"id": uuid.uuid4().hex, "jobId": job_id, "name": name, "requested": time.time()}
+    requests_path = get_cancel_requests_path(app_workspace)
+    with LockGuard(requests_path):
+        cancel_requests = read_cancel_requests(requests_path)
+        cancel_requests.append(cancel_request)
+        write_cancel_requests(requests_path, cancel_requests)
+
+    logger.info(f"Asked the other worker processes to cancel the job of {job_id or name}")
+    return cancel_request
+
+
+class JobScheduler:
+    """Runs the websocket commands on a bounded pool of worker threads. Commands that change the conda environment are
+    run one at a time while read only commands run concurrently. Every job is persisted in the app workspace so the
+    queue survives a server restart.
+    """
+
+    def __init__(self, app_workspace, resolve_function, max_workers=None):
+        """
+        Args:
+            app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+            resolve_function (function): Returns the function to run for a job type
+            max_workers (int, optional): Maximum number of jobs that run at the same time. Defaults to the
+                APP_STORE_MAX_WORKERS setting.
+        """
+        self.app_workspace = app_workspace
+        self.resolve_function = resolve_function
+        if max_workers is None:
+            max_workers = get_app_store_setting("APP_STORE_MAX_WORKERS", DEFAULT_MAX_WORKERS)
+        self.max_workers = max(1, int(max_workers))
+        self.jobs = {}
+        self.job_args = {}
+        self.workers = []
+        self.cancel_watcher = None
+        self.sequence = 0
+        self.exclusive_running = False
+        self.condition = threading.Condition()
+        self.load_jobs()
+
+    def load_jobs(self):
+        """Load the persisted jobs from the app workspace. Jobs that were running when the server stopped are marked
+        as interrupted and queued jobs are queued again.
+        """
+        queue_path = get_job_queue_path(self.app_workspace)
+        if not os.path.exists(queue_path):
+            return
+
+        try:
+            with open(queue_path, "r") as queue_file:
+                jobs = json.load(queue_file)
+        except ValueError:
+            logger.warning("Job queue file is corrupted. Starting a new job queue")
+            return
+
+        channel_layer = None
+        for job in jobs:
+            self.jobs[job["id"]] = job
+            self.sequence = max(self.sequence, job["sequence"] + 1)
+            if job["state"] == RUNNING:
+                job["state"] = INTERRUPTED
+                job["finished"] = time.time()
+            elif job["state"] == QUEUED:
+                if channel_layer is None:
+                    channel_layer = get_channel_layer()
+                self.job_args[job["id"]] = self.build_args(job, channel_layer)
+
+        self.save_jobs()
+        if self.job_args:
+            self.start_workers()
+
+    def save_jobs(self):
+        """Persist the jobs to the app workspace. Only the most recent finished jobs are kept"""
+        finished_jobs = sorted(
+            [job for job in self.jobs.values() if job["state"] in FINISHED_STATES],
+            key=lambda job: job["sequence"],
+        )
+        for job in finished_jobs[:-MAX_FINISHED_JOBS]:
+            del self.jobs[job["id"]]
+
+        queue_path = get_job_queue_path(self.app_workspace)
+        os.makedirs(os.path.dirname(queue_path), exist_ok=True)
+        temp_path = f"{queue_path}.tmp"
+        with open(temp_path, "w") as queue_file:
+            json.dump(sorted(self.jobs.values(), key=lambda job: job["sequence"]), queue_file)
+        os.replace(temp_path, queue_path)
+
+    def build_args(self, job, channel_layer):
+        args = [job["data"], channel_layer]
+        if job["with_workspace"]:
+            args.append(self.app_workspace)
+        return args
+
+    def submit(self, function_name, data, channel_layer, with_workspace=False, priority=None):
+        """Add a job to the queue
+
+        Args:
+            function_name (str): Name of the websocket command to run
+            data (dict): Data sent with the websocket command
+            channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+            with_workspace (bool, optional): Pass the app workspace to the command. Defaults to False.
+            priority (int, optional): Jobs with higher priorities run first. Defaults to the priority of the command.
+
+        Returns:
+            str: ID of the new job or of the queued or running job that already does the same install
+        """
+        if priority is None:
+            priority = FUNCTION_PRIORITIES.get(function_name, DEFAULT_PRIORITY)
+        idempotency_key = get_idempotency_key(function_name, data)
+
+        with self.condition:
+            duplicate_job = self.find_job_by_key(idempotency_key)
+            if not duplicate_job:
+                job = {
+                    "id": uuid.uuid4().hex,
+                    "type": function_name,
+                    "data": data,
+                    "with_workspace": with_workspace,
+                    "exclusive": function_name in EXCLUSIVE_FUNCTIONS,
+                    "priority": int(priority),
+                    "sequence": self.sequence,
+                    "state": QUEUED,
+                    "created": time.time(),
+                    "started": None,
+                    "finished": None,
+                    "error": None,
+                    "cancelRequested": False,
+                    "idempotencyKey": idempotency_key,
+                }
+                self.sequence += 1
+                self.jobs[job["id"]] = job
+                self.job_args[job["id"]] = self.build_args(job, channel_layer)
+                self.save_jobs()
+                self.condition.notify_all()
+
+        if duplicate_job:
+            logger.info(f"Attached duplicate {function_name} request to job {duplicate_job['id']}")
+            # Progress notifications go to every client, so the duplicate request follows the job already running
+            send_notification(
+                {
+                    "data": {
+                        "jobId": duplicate_job["id"],
+                        "jobType": duplicate_job["type"],
+                        "name": data.get("name"),
+                        "state": duplicate_job["state"],
+                    },
+                    "jsHelperFunction": "jobAttached",
+                },
+                channel_layer,
+            )
+            return duplicate_job["id"]
+
+        logger.info(f"Queued {function_name} job {job['id']}")
+        self.start_workers()
+        return job["id"]
+
+    def start_workers(self):
+        """Start worker threads until the pool is full"""
+        with self.condition:
+            self.workers = [worker for worker in self.workers if worker.is_alive()]
+            active_jobs = len([job for job in self.jobs.values() if job["state"] in [QUEUED, RUNNING]])
+            while len(self.workers) < min(self.max_workers, active_jobs):
+                worker = threading.Thread(target=self.work, daemon=True)
+                self.workers.append(worker)
+                worker.start()
+            if active_jobs and self.cancel_watcher is None:
+                self.cancel_watcher = threading.Thread(target=self.watch_cancel_requests, daemon=True)
+                self.cancel_watcher.start()
+
+    def watch_cancel_requests(self):
+        """Poll the cancel requests of the other worker processes while this scheduler has active jobs"""
+        while True:
+            time.sleep(CANCEL_POLL_INTERVAL)
+            with self.condition:
+                if not any(job["state"] in [QUEUED, RUNNING] for job in self.jobs.values()):
+                    self.cancel_watcher = None
+                    return
+
+            try:
+                self.process_cancel_requests()
+            except Exception as e:
+                logger.error(f"Failed to read the cancel requests: {e}")
+
+    def process_cancel_requests(self):
+        """Cancel the jobs of this scheduler that other worker processes were asked to cancel
+
+        Returns:
+            list: IDs of the jobs that were asked to cancel
+        """
+        requests_path = get_cancel_requests_path(self.app_workspace)
+        if not os.path.exists(requests_path):
+            return []
+
+        job_ids = []
+        with LockGuard(requests_path):
+            cancel_requests = read_cancel_requests(requests_path)
+            remaining_requests = []
+            for cancel_request in cancel_requests:
+                job = self.find_cancel_target(cancel_request["jobId"], cancel_request["name"])
+                if job is None:
+                    remaining_requests.append(cancel_request)
+                else:
+                    job_ids.append(job["id"])
+            if job_ids:
+                write_cancel_requests(requests_path, remaining_requests)
+
+        for job_id in job_ids:
+            self.cancel(job_id)
+        return job_ids
+
+    def find_cancel_target(self, job_id=None, name=None):
+        """Find the active job of this scheduler for a cancel request
+
+        Args:
+            job_id (str, optional): ID of the job to cancel.
+            name (str, optional): Name of the app when the job ID is not known.
+
+        Returns:
+            dict: Copy of the job or None if this scheduler doesn't have a matching active job
+        """
+        if not job_id:
+            return self.find_active_job(name=name)
+
+        job = self.get_job(job_id)
+        if job and job["state"] in [QUEUED, RUNNING]:
+            return job
+        return None
+
+    def next_job(self):
+        """Get the queued job that should run next. Exclusive jobs wait while another exclusive job is running. Must be
+        called while holding the condition.
+
+        Returns:
+            dict: The next job or None if no job can run
+        """
+        runnable_jobs = [
+            job for job in self.jobs.values()
+            if job["state"] == QUEUED and not (job["exclusive"] and self.exclusive_running)
+        ]
+        if not runnable_jobs:
+            return None
+        return min(runnable_jobs, key=lambda job: (-job["priority"], job["sequence"]))
+
+    def work(self):
+        """Run queued jobs until the scheduler is idle"""
+        while True:
+            with self.condition:
+                job = self.next_job()
+                if job is None:
+                    if self.has_queued_jobs():
+                        self.condition.wait()
+                        continue
+                    self.workers = [worker for worker in self.workers if worker is not threading.current_thread()]
+                    return
+
+                job["state"] = RUNNING
+                job["started"] = time.time()
+                if job["exclusive"]:
+                    self.exclusive_running = True
+                args = self.job_args.pop(job["id"])
+                self.save_jobs()
+
+            self.run_job(job, args)
+
+    def has_queued_jobs(self):
+        return any(job["state"] == QUEUED for job in self.jobs.values())
+
+    def run_job(self, job, args):
+        """Run a job and record the outcome
+
+        Args:
+            job (dict): Job to run
+            args (list): Arguments for the job function
+        """
+        logger.info(f"Running {job['type']} job {job['id']}")
+        state = COMPLETED
+        error = None
+        set_process_owner(job["id"])
+        lease = None
+        try:
+            if job["exclusive"]:
+                # Other worker processes and nodes that share the workspace can change the environment too
+                lease = acquire_environment_lock(
+                    self.app_workspace,
+                    job["id"],
+                    on_wait=lambda position: send_notification(
+                        f"Waiting for another install to finish. Position in queue: {position}", args[1]
+                    ),
+                )
+            self.resolve_function(job["type"])(*args)
+        except ProcessCancelled:
+            logger.info(f"{job['type']} job {job['id']} was cancelled")
+            state = CANCELLED
+        except Exception as e:
+            if job.get("cancelRequested"):
+                logger.info(f"{job['type']} job {job['id']} was cancelled")
+                state = CANCELLED
+            else:
+                logger.error(f"{job['type']} job {job['id']} failed: {e}")
+                state = FAILED
+                error = str(e)
+        finally:
+            if lease:
+                lease.release()
+            set_process_owner(None)
+            release_process_owner(job["id"])
+
+        with self.condition:
+            job["state"] = state
+            job["error"] = error
+            job["finished"] = time.time()
+            if job["exclusive"]:
+                self.exclusive_running = False
+            self.save_jobs()
+            self.condition.notify_all()
+
+        if job.get("cancelRequested"):
+            self.notify_cancel_result(job, args[1])
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. A queued job is removed from the queue right away. The processes of a
+        running job are stopped and the job finishes as cancelled once its function has cleaned up.
+
+        Args:
+            job_id (str): ID of the job
+
+        Returns:
+            dict: Copy of the job or None if the job doesn't exist, is not active, or can no longer be cancelled
+        """
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if not job or job["state"] not in [QUEUED, RUNNING]:
+                return None
+
+            cancellable = job["state"] == QUEUED or request_cancel(job_id)
+            if cancellable:
+                job["cancelRequested"] = True
+                if job["state"] == QUEUED:
+                    job["state"] = CANCELLED
+                    job["finished"] = time.time()
+                    channel_layer = self.job_args.pop(job_id)[1]
+                    self.condition.notify_all()
+                self.save_jobs()
+            job_copy = dict(job)
+
+        if not cancellable:
+            # The job has made changes that it can't roll back, like removing the portal records of an app
+            logger.info(f"{job['type']} job {job_id} can no longer be cancelled")
+            self.notify_cancel_result(job_copy, get_channel_layer(), "jobNotCancellable")
+            return None
+
+        logger.info(f"Cancelling {job['type']} job {job_id}")
+        if job_copy["state"] == CANCELLED:
+            self.notify_cancel_result(job_copy, channel_layer)
+        else:
+            cancel_processes(job_id)
+        return job_copy
+
+    def find_job_by_key(self, idempotency_key):
+        """Find the queued or running job with an idempotency key. Must be called while holding the condition.
+
+        Args:
+            idempotency_key (str): Idempotency key from get_idempotency_key or None
+
+        Returns:
+            dict: Copy of the job or None if no active job has the key
+        """
+        if idempotency_key is None:
+            return None
+
+        for job in self.jobs.values():
+            if job.get("idempotencyKey") == idempotency_key and job["state"] in [QUEUED, RUNNING]:
+                return dict(job)
+        return None
+
+    def find_active_job(self, name=None, function_names=None):
+        """Find the job to cancel for a request that doesn't know the job ID. Running jobs are preferred over queued
+        jobs.
+
+        Args:
+            name (str, optional): Name of the app in the job data. Defaults to any app.
+            function_names (list, optional): Job types to look for. Defaults to the cancellable commands.
+
+        Returns:
+            dict: Copy of the job or None if there is no matching active job
+        """
+        function_names = function_names or CANCELLABLE_FUNCTIONS
+        with self.condition:
+            active_jobs = [
+                job for job in self.jobs.values()
+                if job["state"] in [QUEUED, RUNNING]
+                and job["type"] in function_names
+                and (name is None or job_matches_app(job, name))
+            ]
+            if not active_jobs:
+                return None
+            job = min(active_jobs, key=lambda job: (job["state"] != RUNNING, job["sequence"]))
+            return dict(job)
+
+    def notify_cancel_result(self, job, channel_layer, js_helper_function="jobCancelled"):
+        """Send the final state of a job that was asked to cancel to the UI
+
+        Args:
+            job (dict): Job that was asked to cancel
+            channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+            js_helper_function (str, optional): Javascript handler of the notification. Defaults to jobCancelled, or
+                jobNotCancellable when the job refused to cancel.
+        """
+        send_notification(
+            {
+                "data": {
+                    "jobId": job["id"],
+                    "jobType": job["type"],
+                    "name": job["data"].get("name"),
+                    "state": job["state"],
+                },
+                "jsHelperFunction": js_helper_function,
+            },
+            channel_layer,
+        )
+
+    def acquire_exclusive(self):
+        """Wait for the running exclusive job to finish and hold the exclusive slot, so no exclusive job starts until
+        release_exclusive is called
+        """
+        with self.condition:
+            while self.exclusive_running:
+                self.condition.wait()
+            self.exclusive_running = True
+
+    def release_exclusive(self):
+        """Release the exclusive slot taken with acquire_exclusive"""
+        with self.condition:
+            self.exclusive_running = False
+            self.condition.notify_all()
+        self.start_workers()
+
+    def has_exclusive_jobs(self):
+        """Check if a command that changes the conda environment or the portal is queued or running
+
+        Returns:
+            bool: True if an exclusive job is queued or running
+        """
+        with self.condition:
+            return any(job["exclusive"] and job["state"] in [QUEUED, RUNNING] for job in self.jobs.values())
+
+    def get_job(self, job_id):
+        """Get a copy of a job
+
+        Args:
+            job_id (str): ID of the job
+
+        Returns:
+            dict: Copy of the job or None if the job doesn't exist
+        """
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_active_jobs(self, function_name):
+        """Get a copy of the queued and running jobs of a job type
+
+        Args:
+            function_name (str): Name of the websocket command
+
+        Returns:
+            list: List of jobs
+        """
+        with self.condition:
+            return [
+                dict(job)
+                for job in self.jobs.values()
+                if job["type"] == function_name and job["state"] in [QUEUED, RUNNING]
+            ]
+
+    def list_jobs(self):
+        """Get a copy of all the jobs ordered by when they were submitted
+
+        Returns:
+            list: List of jobs
+        """
+        with self.condition:
+            return [dict(job) for job in sorted(self.jobs.values(), key=lambda job: job["sequence"])]
+
+
+def get_app_install_key(app_data):
+    return ":".join(
+        str(app_data.get(field) or "") for field in ["name", "channel", "label", "version"]
+    )
+
+
+def get_idempotency_key(function_name, data):
+    """Get the key that identifies the same install request, so a duplicate request attaches to the job that is already
+    queued or running instead of starting another one
+
+    Args:
+        function_name (str): Name of the websocket command
+        data (dict): Data sent with the websocket command
+
+    Returns:
+        str: Key derived from the app, channel, label, and version of each app to install or None for other commands
+    """
+    if function_name == "begin_install":
+        return f"install|{get_app_install_key(data)}"
+    if function_name == "batch_install":
+        return "install|" + "|".join(sorted(get_app_install_key(app_data) for app_data in data.get("apps", [])))
+    return None
+
+
+def job_matches_app(job, name):
+    """Check if a job works on an app
+
+    Args:
+        job (dict): Job to check
+        name (str): Name of the app
+
+    Returns:
+        bool: True if the app is in the job data
+    """
+    data = job["data"]
+    if data.get("name") == name:
+        return True
+    return any(app.get("name") == name for app in data.get("apps", []))
+
+
+def get_job_scheduler(app_workspace, resolve_function):
+    """Get the job scheduler shared by all the websocket consumers in this process
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        resolve_function (function): Returns the function to run for a job type
+
+    Returns:
+        JobScheduler: The job scheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = JobScheduler(app_workspace, resolve_function)
+            # A new scheduler means the server restarted, so pick up the installs that the restart interrupted
+            resume_interrupted_installs(_scheduler)
+
+    return _scheduler
+
+
+def has_exclusive_jobs():
+    """Check if the job scheduler in this process has an install, update, uninstall, or restart queued or running
+
+    Returns:
+        bool: True if an exclusive job is queued or running
+    """
+    scheduler = _scheduler
+    return scheduler is not None and scheduler.has_exclusive_jobs()
+
+
+def run_exclusive(function, *args):
+    """Run a function while holding the exclusive slot of the job scheduler in this process, so it doesn't overlap with
+    an install, update, or uninstall
+
+    Args:
+        function (function): Function to run
+        *args: Arguments for the function
+
+    Returns:
+        any: The return value of the function
+    """
+    scheduler = _scheduler
+    if scheduler is None:
+        return function(*args)
+
+    scheduler.acquire_exclusive()
+    try:
+        return function(*args)
+    finally:
+        scheduler.release_exclusive()
+
+
+def cancel_job(app_workspace, job_id=None, name=None):
+    """Cancel a job. A job of the job scheduler in this process is cancelled right away. Otherwise the job may run in
+    another worker process, so the request is passed on with post_cancel_request and that process sends the
+    jobCancelled notification.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        job_id (str, optional): ID of the job to cancel.
+        name (str, optional): Name of the app whose install, update, or uninstall should be cancelled when the job ID is
+            not known.
+
+    Returns:
+        dict: Copy of the cancelled job, a job in the cancelPending state for a request that was passed on, or None if
+            the job can no longer be cancelled
+    """
+    scheduler = _scheduler
+    job = scheduler.find_cancel_target(job_id=job_id, name=name) if scheduler else None
+    if job is not None:
+        return scheduler.cancel(job["id"])
+
+    cancel_request = post_cancel_request(app_workspace, job_id=job_id, name=name)
+    return {
+        "id": job_id,
+        "data": {"name": name},
+        "state": CANCEL_PENDING,
+        "cancelRequestId": cancel_request["id"],
+    }
@@ -1,7 +1,12 @@
 import os
-import subprocess
 import time
 from .helpers import logger, send_notification, check_all_present
+from .progress_events import ProgressParser, ProgressNotifier
+from .process_runner import run_process
+
+# With --json, mamba and conda print nothing until the transaction is done, so a long solve and download looks idle.
+# The scripts that use --json are only stopped by the overall process timeout.
+JSON_SCRIPT_IDLE_TIMEOUT = 0
 
 
 def mamba_uninstall(app_name, channel_layer):
@@ -17,26 +22,20 @@ def mamba_uninstall(app_name, channel_layer):
 
     uninstall_command = [script_path, app_name]
 
+    def handle_output(str_output):
+        # Checkpoints for the output
+        logger.info(str_output)
+        if check_all_present(str_output, ["Running Mamba remove"]):
+            send_uninstall_messages("Running uninstall script", channel_layer)
+        if check_all_present(str_output, ["Transaction starting"]):
+            send_uninstall_messages("Starting mamba uninstall", channel_layer)
+        if check_all_present(str_output, ["Transaction finished"]):
+            send_uninstall_messages("Mamba uninstall complete", channel_layer)
+
     # Running this sub process, in case the library isn't installed, triggers a restart.
-    p = subprocess.Popen(
-        uninstall_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
-    )
-    while True:
-        output = p.stdout.readline()
-        if output == "":
-            break
-        if output:
-            # Checkpoints for the output
-            str_output = str(output.strip())
-            logger.info(str_output)
-            if check_all_present(str_output, ["Running Mamba remove"]):
-                send_uninstall_messages("Running uninstall script", channel_layer)
-            if check_all_present(str_output, ["Transaction starting"]):
-                send_uninstall_messages("Starting mamba uninstall", channel_layer)
-            if check_all_present(str_output, ["Transaction finished"]):
-                send_uninstall_messages("Mamba uninstall complete", channel_layer)
-            if check_all_present(str_output, ["Mamba Remove Complete"]):
-                break
+    result = run_process(uninstall_command, on_line=handle_output)
+    if not result.success:
+        logger.error(f"Mamba uninstall of {app_name} failed. {result.describe()}")
 
     return
 
@@ -86,29 +85,24 @@ def mamba_download(app_metadata, app_channel, app_label, app_version, channel_la
 
     install_command = [script_path, app_name, label_channel]
 
+    already_installed = False
+
+    def handle_output(str_output):
+        nonlocal already_installed
+        # Checkpoints for the output
+        logger.info(str_output)
+        if check_all_present(str_output, ["All requested packages already installed"]):
+            already_installed = True
+            send_notification(
+                "Application is already installed in this conda environment.",
+                channel_layer,
+            )
+
     # Running this sub process, in case the library isn't installed, triggers a restart.
-    p = subprocess.Popen(
-        install_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
-    )
-    success = True
-    while True:
-        output = p.stdout.readline()
-        if output == "":
-            break
-        if output:
-            # Checkpoints for the output
-            str_output = str(output.strip())
-            logger.info(str_output)
-            if check_all_present(
-                str_output, ["All requested packages already installed"]
-            ):
-                send_notification(
-                    "Application is already installed in this conda environment.",
-                    channel_layer,
-                )
-                success = False
-            if check_all_present(str_output, ["Mamba Download Complete"]):
-                break
+    result = run_process(install_command, on_line=handle_output, idle_timeout=JSON_SCRIPT_IDLE_TIMEOUT)
+    success = result.success and not already_installed
+    if not result.success:
+        logger.error(f"Mamba download of {app_name} failed. {result.describe()}")
 
     send_notification(
         "Mamba download completed in %.2f seconds." % (time.time() - start_time),
@@ -153,59 +147,9 @@ def mamba_install(app_metadata, app_channel, app_label, app_version, channel_lay
     install_command = [script_path, app_name, label_channel]
 
     # Running this sub process, in case the library isn't installed, triggers a restart.
-    p = subprocess.Popen(
-        install_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    success = run_mamba_install_script(
+        install_command, f"mamba install -c {label_channel} {app_name}", channel_layer
     )
-    success = True
-    while True:
-        output = p.stdout.readline()
-        if output == "":
-            break
-        if output:
-            # Checkpoints for the output
-            str_output = str(output.strip())
-            logger.info(str_output)
-            if check_all_present(str_output, ["Collecting package metadata", "done"]):
-                send_notification("Package Metadata Collection: Done", channel_layer)
-            if check_all_present(str_output, ["Solving environment", "done"]):
-                send_notification("Solving Environment: Done", channel_layer)
-            if check_all_present(str_output, ["Verifying transaction", "done"]):
-                send_notification("Verifying Transaction: Done", channel_layer)
-            if check_all_present(
-                str_output, ["All requested packages already installed."]
-            ):
-                send_notification(
-                    "Application package is already installed in this conda environment.",
-                    channel_layer,
-                )
-            if check_all_present(
-                str_output,
-                ["libmamba Could not solve for environment specs", "critical"],
-            ):
-                success = False
-                send_notification(
-                    "Failed to resolve environment specs when installing.",
-                    channel_layer,
-                )
-            if check_all_present(str_output, ["Found conflicts!"]):
-                success = False
-                send_notification(
-                    "Mamba install found conflicts. "
-                    "Please try running the following command in your terminal's "
-                    "conda environment to attempt a manual installation : "
-                    f"mamba install -c {label_channel} {app_name}",
-                    channel_layer,
-                )
-            if check_all_present(str_output, ["Mamba failed. Trying conda now."]):
-                success = False
-                send_notification(
-                    "Install failed using mamba. Trying now with conda.", channel_layer
-                )
-            if check_all_present(str_output, ["Conda Install Success"]):
-                success = True
-                send_notification("Install succeeded with conda.", channel_layer)
-            if check_all_present(str_output, ["Install Complete"]):
-                break
 
     send_notification(
         "Mamba install completed in %.2f seconds." % (time.time() - start_time),
@@ -213,3 +157,125 @@ def mamba_install(app_metadata, app_channel, app_label, app_version, channel_lay
     )
 
     return success
+
+
+def get_label_channel(app_channel, app_label):
+    """Get the conda channel for a conda label
+
+    Args:
+        app_channel (str): Conda channel of the app
+        app_label (str): Conda label of the app
+
+    Returns:
+        str: The conda channel, i.e. app_channel/label/dev
+    """
+    if app_label != "main":
+        return f"{app_channel}/label/{app_label}"
+    return app_channel
+
+
+def get_app_specs(apps):
+    """Get the conda channels and package specs needed to install a list of apps. Each app is pinned to its own channel
+    so apps with the same name in other channels are not picked.
+
+    Args:
+        apps (list): List of dictionaries with the name, channel, label, and version of each app to install
+
+    Returns:
+        tuple: List of conda channels and list of package specs
+    """
+    label_channels = []
+    app_specs = []
+    for app in apps:
+        label_channel = get_label_channel(app["channel"], app["label"])
+        if label_channel not in label_channels:
+            label_channels.append(label_channel)
+        app_specs.append(f"{label_channel}::{app['name']}={app['version']}")
+
+    return label_channels, app_specs
+
+
+def mamba_batch_install(apps, channel_layer, specs=None):
+    """Install several apps with a single mamba solve and transaction
+
+    Args:
+        apps (list): List of dictionaries with the name, channel, label, and version of each app to install
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+        specs (list, optional): Package specs to install instead of the app specs, i.e. the pinned packages of an
+            install plan. Defaults to None.
+
+    Returns:
+        bool: True if the install succeeded
+    """
+    start_time = time.time()
+    send_notification(
+        f"Installing {len(apps)} apps in a single mamba transaction. This may take a couple minutes to complete "
+        "depending on how complicated the environment is. Please wait....",
+        channel_layer,
+    )
+
+    # Running the conda install as a subprocess to get more visibility into the running process
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    script_path = os.path.join(dir_path, "scripts", "mamba_batch_install.sh")
+
+    label_channels, app_specs = get_app_specs(apps)
+    if specs:
+        app_specs = specs
+
+    install_command = [script_path, ",".join(label_channels)] + app_specs
+
+    channel_args = " ".join(f"-c {label_channel}" for label_channel in label_channels)
+    success = run_mamba_install_script(
+        install_command, f"mamba install {channel_args} {' '.join(app_specs)}", channel_layer
+    )
+
+    send_notification(
+        "Mamba batch install completed in %.2f seconds." % (time.time() - start_time),
+        channel_layer,
+    )
+
+    return success
+
+
+def run_mamba_install_script(
+    install_command,
+    manual_install_command,
+    channel_layer,
+    notification_method=None,
+    package_sizes=None,
+):
+    """Run a mamba install script and send throttled notifications for its progress events
+
+    Args:
+        install_command (list): Install script and its arguments
+        manual_install_command (str): Command the user can run to attempt a manual installation
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+        notification_method (Object, optional): Method of how to send notifications. Defaults to send_notification
+            which is a WebSocket.
+        package_sizes (dict, optional): Download size in bytes keyed by <package name>-<version>. Defaults to None.
+
+    Returns:
+        bool: True if the install succeeded
+    """
+    notification_method = notification_method or send_notification
+    parser = ProgressParser(package_sizes)
+    notifier = ProgressNotifier(channel_layer, notification_method)
+
+    def handle_output(str_output):
+        logger.info(str_output)
+        for event in parser.feed(str_output):
+            notifier.send(event)
+
+    result = run_process(install_command, on_line=handle_output, idle_timeout=JSON_SCRIPT_IDLE_TIMEOUT)
+    if not result.success:
+        notification_method(f"Install script failed. {result.describe()}.", channel_layer)
+
+    success = bool(parser.success) and result.success
+    if not success:
+        notification_method(
+            "Please try running the following command in your terminal's conda environment to attempt a "
+            f"manual installation : {manual_install_command}",
+            channel_layer,
+        )
+
+    return success
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from tethys_sdk.workspaces import get_app_workspace
+
+from ...app import AppStore as app
+from ...resource_helpers import get_compatibility_report
+
+
+class Command(BaseCommand):
+    """Report which installed apps are compatible with a list of target Tethys Platform versions"""
+
+    help = "Report which installed apps are compatible with a list of target Tethys Platform versions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("tethys_versions", nargs="+", help="Target Tethys Platform versions, i.e. 4.2.0 5.0.0")
+        parser.add_argument(
+            "--channels", default="all", help="Comma separated conda channels to check. Defaults to all the stores"
+        )
+        parser.add_argument("--refresh", action="store_true", help="Refresh the cached conda channel resources")
+        parser.add_argument("--json", action="store_true", help="Print the report as json")
+
+    def handle(self, *args, **options):
+        app_workspace = get_app_workspace(app)
+        try:
+            report = get_compatibility_report(
+                app_workspace, options["tethys_versions"], refresh=options["refresh"],
+                conda_channels=options["channels"]
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=4))
+            return
+
+        if not report["installedApps"]:
+            self.stdout.write("No installed apps were found in the app store channels")
+            return
+
+        for tethys_version in report["tethysVersions"]:
+            self.stdout.write(f"Tethys Platform {tethys_version}")
+            for app_name, channels in sorted(report["installedApps"].items()):
+                for conda_channel, labels in channels.items():
+                    for conda_label, app_report in labels.items():
+                        target = app_report["targets"][tethys_version]
+                        status = "compatible" if target["installedCompatible"] else "INCOMPATIBLE"
+                        latest = target["latestCompatible"] or "none"
+                        self.stdout.write(
+                            f"  {app_name} ({conda_channel}/{conda_label}) {app_report['installedVersion']}: "
+                            f"{status}, latest compatible version: {latest}"
+                        )
@@ -0,0 +1,165 @@
+import io
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import call_command
+from django.db import connections
+from tethys_cli.cli_helpers import get_manage_path
+from .helpers import logger, get_app_store_setting
+from .process_runner import run_process, ProcessCancelled
+
+DEFAULT_MANAGEMENT_WORKERS = 4
+MAX_STEP_TIMINGS = 100
+# These commands find the installed apps through the static file and workspace finders. The server process caches
+# the finders and their app locations from startup, so in process they would skip the apps installed since then.
+APP_DISCOVERY_COMMANDS = ["pre_collectstatic", "collectstatic", "collectworkspaces"]
+
+_step_timings = deque(maxlen=MAX_STEP_TIMINGS)
+_timings_lock = threading.Lock()
+
+
+def is_in_process_enabled():
+    """Check if management commands should run in the server process instead of a new manage.py process. Disabled
+    with the APP_STORE_IN_PROCESS_COMMANDS portal setting
+
+    Returns:
+        bool: True if management commands run in process
+    """
+    return bool(get_app_store_setting("APP_STORE_IN_PROCESS_COMMANDS", True))
+
+
+def record_step_timing(step, seconds, success, in_process):
+    """Record how long a post install step took
+
+    Args:
+        step (str): Name of the step, i.e. syncstores app_name -f
+        seconds (float): Duration of the step
+        success (bool): True if the step succeeded
+        in_process (bool): True if the step ran in the server process
+
+    Returns:
+        dict: The recorded timing
+    """
+    timing = {
+        "step": step,
+        "seconds": round(seconds, 3),
+        "success": success,
+        "inProcess": in_process,
+        "finished": time.time(),
+    }
+    with _timings_lock:
+        _step_timings.append(timing)
+
+    logger.info(f"Step '{step}' took {timing['seconds']:.3f} seconds")
+    return timing
+
+
+def get_step_timings():
+    """Get the timings of the most recent post install steps
+
+    Returns:
+        list: Timings from oldest to newest. See record_step_timing for the keys of each timing.
+    """
+    with _timings_lock:
+        return list(_step_timings)
+
+
+def run_management_command(command):
+    """Run a management command in the server process. This skips the Django startup of a new manage.py process. If
+    the command fails in process, it is run again with manage.py. The commands that have to find newly installed apps
+    always run with manage.py.
+
+    Args:
+        command (list): Name of the management command followed by its arguments, i.e. ['syncstores', 'app_name', '-f']
+
+    Returns:
+        dict: Timing of the command
+    """
+    step = " ".join(command)
+    start_time = time.perf_counter()
+    if is_in_process_enabled() and command[0] not in APP_DISCOVERY_COMMANDS:
+        output = io.StringIO()
+        try:
+            call_command(*command, stdout=output, stderr=output)
+            logger.info(output.getvalue())
+            return record_step_timing(step, time.perf_counter() - start_time, True, True)
+        except ProcessCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Running '{step}' in process failed: {e}. Running it with manage.py")
+
+    manage_path = get_manage_path({})
+    result = run_process(["python", manage_path] + list(command))
+    success = result.success
+    return record_step_timing(step, time.perf_counter() - start_time, success, False)
+
+
+def run_command_group(commands):
+    """Run management commands one after the other in the current thread
+
+    Args:
+        commands (list): List of management commands. See run_management_command.
+
+    Returns:
+        list: Timings of the commands
+    """
+    try:
+        return [run_management_command(command) for command in commands]
+    finally:
+        # Threads of the pool don't close their database connections on their own
+        connections.close_all()
+
+
+def run_command_groups(command_groups, max_workers=None):
+    """Run groups of management commands in parallel. The commands within a group depend on each other and run in
+    order, i.e. pre_collectstatic before collectstatic.
+
+    Args:
+        command_groups (list): List of lists of management commands. See run_management_command.
+        max_workers (int, optional): Maximum number of groups that run at the same time. Defaults to the
+            APP_STORE_MANAGEMENT_WORKERS setting.
+
+    Returns:
+        list: Timings of all the commands
+    """
+    if not command_groups:
+        return []
+
+    if max_workers is None:
+        max_workers = get_app_store_setting("APP_STORE_MANAGEMENT_WORKERS", DEFAULT_MANAGEMENT_WORKERS)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        futures = [executor.submit(run_command_group, commands) for commands in command_groups]
+        timings = [timing for future in futures for timing in future.result()]
+
+    logger.info(f"Ran {len(timings)} management commands in {time.perf_counter() - start_time:.3f} seconds")
+    return timings
+
+
+def sync_tethys_db():
+    """Sync the Tethys database with the installed apps in process, like the tethys db sync command does
+
+    Returns:
+        dict: Timing of the sync
+    """
+    start_time = time.perf_counter()
+    if is_in_process_enabled():
+        from tethys_apps.harvester import SingletonHarvester
+
+        output = io.StringIO()
+        try:
+            call_command("migrate", interactive=False, stdout=output, stderr=output)
+            logger.info(output.getvalue())
+            SingletonHarvester().harvest()
+            return record_step_timing("tethys db sync", time.perf_counter() - start_time, True, True)
+        except ProcessCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Running 'tethys db sync' in process failed: {e}. Running it with the tethys command")
+
+    result = run_process(["tethys", "db", "sync"])
+    success = result.success
+    return record_step_timing("tethys db sync", time.perf_counter() - start_time, success, False)
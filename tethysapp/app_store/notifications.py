@@ -1,39 +1,143 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
-from .helpers import restart_server  # noqa: F401
-from .installation_handlers import (  # noqa: F401
+from .restart_coordinator import restart_server
+from .installation_handlers import (
     logger,
     continueAfterInstall,
-    set_custom_settings,  # noqa: F401
+    set_custom_settings,
     configure_services,
 )
-from .uninstall_handlers import uninstall_app  # noqa: F401
-from .git_install_handlers import get_log_file  # noqa: F401
-from .update_handlers import update_app  # noqa: F401
-from .resource_helpers import clear_conda_channel_cache  # noqa: F401
-from .submission_handlers import (  # noqa: F401
+from .uninstall_handlers import uninstall_app
+from .git_install_handlers import get_log_file
+from .update_handlers import update_app
+from .resource_helpers import clear_conda_channel_cache
+from .submission_handlers import (
     submit_tethysapp_to_store,
     initialize_local_repo_for_active_stores,
 )
-from .proxy_app_handlers import (  # noqa: F401
+from .proxy_app_handlers import (
     create_proxy_app,
     delete_proxy_app,
     update_proxy_app,
     submit_proxy_app,
 )
 
-# called with threading.Thread
-from .begin_install import begin_install  # noqa: F401
+# called by the job scheduler
+from .begin_install import begin_install, batch_install, resume_install
+from .prefetch import prefetch_packages, is_prefetch_enabled, schedule_prefetch
 from tethys_sdk.routing import consumer
 from tethys_sdk.workspaces import get_app_workspace
 from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
 
 import json
-import sys
-import threading
 from .app import AppStore as app
+from .job_queue import get_job_scheduler, cancel_job, CANCEL_PENDING
 from channels.db import database_sync_to_async
 
+# Commands the job scheduler runs. Websocket messages of any other type are rejected, and persisted jobs are resolved
+# through this table again when they run after a restart
+JOB_FUNCTIONS = {
+    "begin_install": begin_install,
+    "batch_install": batch_install,
+    "resume_install": resume_install,
+    "continueAfterInstall": continueAfterInstall,
+    "set_custom_settings": set_custom_settings,
+    "configure_services": configure_services,
+    "restart_server": restart_server,
+    "uninstall_app": uninstall_app,
+    "get_log_file": get_log_file,
+    "update_app": update_app,
+    "clear_conda_channel_cache": clear_conda_channel_cache,
+    "submit_tethysapp_to_store": submit_tethysapp_to_store,
+    "initialize_local_repo_for_active_stores": initialize_local_repo_for_active_stores,
+    "create_proxy_app": create_proxy_app,
+    "delete_proxy_app": delete_proxy_app,
+    "update_proxy_app": update_proxy_app,
+    "submit_proxy_app": submit_proxy_app,
+    "prefetch_packages": prefetch_packages,
+}
+
+# Commands that get the app workspace as their last argument
+APP_WORKSPACE_FUNCTIONS = [
+    "begin_install",
+    "batch_install",
+    "resume_install",
+    "restart_server",
+    "get_log_file",
+    "submit_tethysapp_to_store",
+    "initialize_local_repo_for_active_stores",
+    "update_app",
+    "uninstall_app",
+    "submit_proxy_app",
+    "prefetch_packages",
+]
+
+
+def get_job_function(job_type):
+    """Get the function that runs a job type for the job scheduler
+
+    Args:
+        job_type (str): Name of the websocket command
+
+    Raises:
+        ValueError: The job type is not a known command
+
+    Returns:
+        function: The function that runs the command
+    """
+    if job_type not in JOB_FUNCTIONS:
+        raise ValueError(f"Unknown job type {job_type}")
+    return JOB_FUNCTIONS[job_type]
+
+
+def start_prefetch(app_workspace, channel_layer):
+    """Schedule the prefetch of the packages of the store apps. Runs outside of the event loop because the job
+    scheduler reads and writes the job queue in the app workspace.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+    """
+    scheduler = get_job_scheduler(app_workspace, get_job_function)
+    schedule_prefetch(scheduler, channel_layer)
+
+
+def cancel_app_job(job_id, name):
+    """Cancel a job for a websocket request. Runs outside of the event loop because the job may run in another worker
+    process, which is asked to cancel it through the app workspace.
+
+    Args:
+        job_id (str): ID of the job to cancel or None
+        name (str): Name of the app when the job ID is not known
+
+    Returns:
+        dict: See job_queue.cancel_job
+    """
+    return cancel_job(get_app_workspace(app), job_id=job_id, name=name)
+
+
+def submit_job(app_workspace, function_name, data, channel_layer):
+    """Submit a websocket command to the job scheduler. Runs outside of the event loop because the job scheduler
+    writes the job queue to the app workspace and sends notifications with async_to_sync. The command runs with the
+    priority of its type, clients can't change it.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        function_name (str): Name of the websocket command to run
+        data (dict): Data sent with the websocket command
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+
+    Returns:
+        str: ID of the job that runs the command
+    """
+    scheduler = get_job_scheduler(app_workspace, get_job_function)
+    return scheduler.submit(
+        function_name,
+        data,
+        channel_layer,
+        with_workspace=function_name in APP_WORKSPACE_FUNCTIONS,
+    )
+
 
 @database_sync_to_async
 def check_user_permissions(user_id):
@@ -66,6 +170,12 @@ class notificationsConsumer(AsyncWebsocketConsumer):
         if await self.authorized:
             await self.channel_layer.group_add("notifications", self.channel_name)
             logger.info(f"Added {self.channel_name} channel to notifications")
+            if is_prefetch_enabled():
+                # Download packages in the background while the app store is open and idle
+                app_workspace = await sync_to_async(
+                    get_app_workspace, thread_sensitive=True
+                )(app)
+                await sync_to_async(start_prefetch)(app_workspace, self.channel_layer)
         else:
             logger.info("User not authorized for websocket access")
             await self.close(code=4004)
@@ -109,27 +219,26 @@ class notificationsConsumer(AsyncWebsocketConsumer):
                 logger.info("Can't redirect incoming message.")
                 return
 
-            module_name = sys.modules[__name__]
-            args = [text_data_json["data"], self.channel_layer]
-
-            app_workspace_functions = [
-                "begin_install",
-                "restart_server",
-                "get_log_file",
-                "submit_tethysapp_to_store",
-                "initialize_local_repo_for_active_stores",
-                "update_app",
-                "uninstall_app",
-                "submit_proxy_app",
-            ]
-
-            if function_name in app_workspace_functions:
-                app_workspace = await sync_to_async(
-                    get_app_workspace, thread_sensitive=True
-                )(app)
-                args.append(app_workspace)
+            if function_name == "cancel_job":
+                # Cancelling can't wait in the queue behind the job it cancels
+                data = text_data_json.get("data", {})
+                job = await sync_to_async(cancel_app_job)(data.get("jobId"), data.get("name"))
+                if job is None:
+                    logger.info("The job can no longer be cancelled.")
+                elif job["state"] == CANCEL_PENDING:
+                    logger.info("Passed the cancel request to the other worker processes.")
+                return
+
+            if function_name not in JOB_FUNCTIONS:
+                logger.info(f"Can't redirect incoming message of type {function_name}.")
+                return
 
-            thread = threading.Thread(
-                target=getattr(module_name, function_name), args=args
+            app_workspace = await sync_to_async(
+                get_app_workspace, thread_sensitive=True
+            )(app)
+            await sync_to_async(submit_job)(
+                app_workspace,
+                function_name,
+                text_data_json["data"],
+                self.channel_layer,
             )
-            thread.start()
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import threading
+import subprocess
+
+from .helpers import logger
+from .install_plan import get_environment_fingerprint
+
+PROXY_APP_CONFIG = "config/proxyapp.yaml"
+
+# Index of the installed conda packages for each environment prefix, rebuilt when the environment changes
+_package_indexes = {}
+_package_indexes_lock = threading.Lock()
+
+
+def get_package_name_from_record(record_filename):
+    """Get the package name from the name of a conda-meta record, i.e. numpy from numpy-1.26.4-py310_0.json
+
+    Args:
+        record_filename (str): Name of the conda-meta record file
+
+    Returns:
+        str: Name of the package or None if the file is not a package record
+    """
+    if not record_filename.endswith(".json"):
+        return None
+
+    parts = record_filename[: -len(".json")].rsplit("-", 2)
+    if len(parts) != 3:
+        return None
+    return parts[0]
+
+
+def get_package_index(prefix=None):
+    """Get the index of the installed conda packages. The index is built from the names of the conda-meta records and
+    is rebuilt only when the environment changes.
+
+    Args:
+        prefix (str, optional): Path to the conda environment. Defaults to the running environment.
+
+    Returns:
+        dict: Index of the environment. See the example below.
+
+        {
+            'fingerprint': 'a3f...',
+            'records': {'numpy': '<prefix>/conda-meta/numpy-1.26.4-py310_0.json'},
+            'files': {'numpy': ['lib/python3.10/site-packages/numpy/__init__.py', ...]}
+        }
+    """
+    prefix = prefix or sys.prefix
+    fingerprint = get_environment_fingerprint(prefix)
+    with _package_indexes_lock:
+        index = _package_indexes.get(prefix)
+        if index is not None and index["fingerprint"] == fingerprint:
+            return index
+
+        records = {}
+        conda_meta = os.path.join(prefix, "conda-meta")
+        try:
+            record_filenames = os.listdir(conda_meta)
+        except OSError:
+            record_filenames = []
+
+        for record_filename in record_filenames:
+            package_name = get_package_name_from_record(record_filename)
+            if package_name:
+                records[package_name] = os.path.join(conda_meta, record_filename)
+
+        index = {"fingerprint": fingerprint, "records": records, "files": {}}
+        _package_indexes[prefix] = index
+
+    logger.info(f"Indexed {len(records)} installed conda packages")
+    return index
+
+
+def get_package_files(package_name, prefix=None):
+    """Get the files that a conda package installed. The file list of each package is read once per environment state
+
+    Args:
+        package_name (str): Name of the conda package
+        prefix (str, optional): Path to the conda environment. Defaults to the running environment.
+
+    Returns:
+        list: Paths of the files relative to the environment prefix or None if the package is not installed
+    """
+    index = get_package_index(prefix)
+    with _package_indexes_lock:
+        if package_name in index["files"]:
+            return index["files"][package_name]
+
+    record_path = index["records"].get(package_name)
+    if record_path is None:
+        return None
+
+    try:
+        with open(record_path) as f:
+            files = json.load(f).get("files", [])
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to read the conda-meta record of {package_name}: {e}")
+        return None
+
+    files = [file_path.replace("\\", "/") for file_path in files]
+    with _package_indexes_lock:
+        index["files"][package_name] = files
+
+    return files
+
+
+def find_package_file(package_name, relative_path, prefix=None):
+    """Find a file that a conda package installed
+
+    Args:
+        package_name (str): Name of the conda package
+        relative_path (str): End of the path of the file, i.e. config/proxyapp.yaml
+        prefix (str, optional): Path to the conda environment. Defaults to the running environment.
+
+    Returns:
+        str: Absolute path to the file or None if the package didn't install it
+    """
+    prefix = prefix or sys.prefix
+    for file_path in get_package_files(package_name, prefix) or []:
+        if file_path == relative_path or file_path.endswith(f"/{relative_path}"):
+            return os.path.join(prefix, file_path)
+
+    return None
+
+
+def find_proxy_app_config(app_name):
+    """Find the proxyapp.yaml installed by a proxy app package
+
+    Args:
+        app_name (str): Name of the conda package of the proxy app, i.e. proxyapp_app_name
+
+    Returns:
+        str: Path to the proxyapp.yaml or None if it can't be found
+    """
+    proxyapp_yaml = find_package_file(app_name, PROXY_APP_CONFIG)
+    if proxyapp_yaml and os.path.isfile(proxyapp_yaml):
+        return proxyapp_yaml
+
+    # Packages that conda doesn't track are looked up by their folder in site-packages
+    site_packages = os.path.join(os.path.dirname(subprocess.__file__), "site-packages")
+    proxyapp_yaml = os.path.join(site_packages, app_name, PROXY_APP_CONFIG)
+    if os.path.isfile(proxyapp_yaml):
+        return proxyapp_yaml
+
+    return None
@@ -0,0 +1,445 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from conda.core.package_cache_data import PackageCacheData
+
+from .helpers import logger, get_app_store_setting
+from .install_plan import create_install_plan
+from .job_queue import has_exclusive_jobs
+from .process_runner import ProcessCancelled, get_process_owner, is_cancelled
+from .resource_helpers import get_stores_reformatted
+
+PREFETCH_INDEX_FILE = "prefetch_index.json"
+PREFETCH_CACHE_KEY = "app_store_prefetch_scheduled"
+DEFAULT_PREFETCH_BUDGET_MB = 2048
+DEFAULT_PREFETCH_CONCURRENCY = 2
+DEFAULT_PREFETCH_BANDWIDTH_KBPS = 0
+DEFAULT_PREFETCH_LIMIT = 5
+DEFAULT_PREFETCH_INTERVAL = 3600
+CHUNK_SIZE = 64 * 1024
+IDLE_POLL_INTERVAL = 5
+
+_index_lock = threading.Lock()
+_urls_lock = threading.Lock()
+
+
+def is_prefetch_enabled():
+    """Check if packages should be prefetched in the background. Enabled with the APP_STORE_PREFETCH_ENABLED portal
+    setting
+
+    Returns:
+        bool: True if prefetching is enabled
+    """
+    return bool(get_app_store_setting("APP_STORE_PREFETCH_ENABLED", False))
+
+
+def get_prefetch_budget():
+    """Returns the maximum number of bytes that prefetched packages may use in the conda package cache. The budget is
+    set in megabytes with the APP_STORE_PREFETCH_BUDGET_MB portal setting
+
+    Returns:
+        int: budget in bytes
+    """
+    budget_mb = get_app_store_setting("APP_STORE_PREFETCH_BUDGET_MB", DEFAULT_PREFETCH_BUDGET_MB)
+    return int(float(budget_mb) * 1024 * 1024)
+
+
+def get_prefetch_interval():
+    """Returns the number of seconds between prefetch runs. Set with the APP_STORE_PREFETCH_INTERVAL portal setting
+
+    Returns:
+        int: interval in seconds
+    """
+    return int(get_app_store_setting("APP_STORE_PREFETCH_INTERVAL", DEFAULT_PREFETCH_INTERVAL))
+
+
+class BandwidthLimiter:
+    """Token bucket shared by the download threads so that all the prefetch downloads together stay below a rate"""
+
+    def __init__(self, rate):
+        """
+        Args:
+            rate (int): Maximum number of bytes per second. Zero or None disables the limit.
+        """
+        self.rate = rate
+        self.allowance = 0
+        self.last_check = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size):
+        """Wait until a chunk of the given size can be downloaded without going over the rate
+
+        Args:
+            size (int): Number of bytes that were downloaded
+        """
+        if not self.rate:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.last_check) * self.rate)
+            self.last_check = now
+            self.allowance -= size
+            delay = -self.allowance / self.rate if self.allowance < 0 else 0
+
+        if delay:
+            time.sleep(delay)
+
+
+def get_prefetch_index_path(app_workspace):
+    """Get the path to the file tracking the prefetched packages
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        str: Path to the prefetch index file
+    """
+    return os.path.join(app_workspace.path, "apps", PREFETCH_INDEX_FILE)
+
+
+def read_prefetch_index(app_workspace):
+    """Read the prefetch index from the app workspace. Packages that have been removed from the package cache, i.e.
+    with conda clean, are dropped
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        dict: Dictionary of prefetched packages keyed by the package file name. See the example below.
+
+        {
+            'app_name-1.0-py_0.tar.bz2': {
+                'path': '/conda/pkgs/app_name-1.0-py_0.tar.bz2',
+                'size': 102400,
+                'app': 'app_name',
+                'fetched': 1700000000.0
+            }
+        }
+    """
+    index_path = get_prefetch_index_path(app_workspace)
+    if not os.path.exists(index_path):
+        return {}
+
+    try:
+        with open(index_path, "r") as index_file:
+            index = json.load(index_file)
+    except ValueError:
+        logger.warning("Prefetch index is corrupted. Starting a new one")
+        return {}
+
+    return {fn: package for fn, package in index.items() if os.path.exists(package["path"])}
+
+
+def write_prefetch_index(app_workspace, index):
+    """Write the prefetch index to the app workspace
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        index (dict): Dictionary of prefetched packages keyed by the package file name
+    """
+    index_path = get_prefetch_index_path(app_workspace)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, "w") as index_file:
+        json.dump(index, index_file)
+    os.replace(temp_path, index_path)
+
+
+def get_package_cache_dir():
+    """Get the conda package cache that installs read from
+
+    Returns:
+        str: Path to the first writable conda package cache
+    """
+    return PackageCacheData.first_writable().pkgs_dir
+
+
+def is_package_cached(package, pkgs_dir):
+    """Check if a package is already downloaded or extracted in the conda package cache
+
+    Args:
+        package (dict): Package from the fetch list of an install plan
+        pkgs_dir (str): Path to the conda package cache
+
+    Returns:
+        bool: True if the package is in the cache
+    """
+    extracted_name = package["fn"]
+    for extension in [".tar.bz2", ".conda"]:
+        if extracted_name.endswith(extension):
+            extracted_name = extracted_name[: -len(extension)]
+
+    return os.path.exists(os.path.join(pkgs_dir, package["fn"])) or os.path.isdir(
+        os.path.join(pkgs_dir, extracted_name)
+    )
+
+
+def evict_prefetched_packages(app_workspace, size, keep):
+    """Remove the oldest prefetched tarballs from the package cache to free space in the prefetch budget. Nothing is
+    removed unless enough space can be freed.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        size (int): Number of bytes to free
+        keep (set): File names of the packages that are still wanted and must not be removed
+
+    Returns:
+        int: Number of bytes freed
+    """
+    with _index_lock:
+        index = read_prefetch_index(app_workspace)
+        evictable = sorted(
+            [(fn, package) for fn, package in index.items() if fn not in keep],
+            key=lambda item: item[1]["fetched"],
+        )
+        if sum(package["size"] for _, package in evictable) < size:
+            return 0
+
+        freed = 0
+        for fn, package in evictable:
+            if freed >= size:
+                break
+            try:
+                os.remove(package["path"])
+            except FileNotFoundError:
+                pass
+            del index[fn]
+            freed += package["size"]
+            logger.info(f"Evicted prefetched package {fn}")
+
+        write_prefetch_index(app_workspace, index)
+
+    return freed
+
+
+def wait_for_idle(owner):
+    """Wait until no install, update, or uninstall is queued or running so prefetching only uses idle time
+
+    Args:
+        owner (str): ID of the prefetch job
+
+    Raises:
+        ProcessCancelled: The prefetch job was cancelled while waiting
+    """
+    while has_exclusive_jobs():
+        if is_cancelled(owner):
+            raise ProcessCancelled(f"Job {owner} was cancelled")
+        time.sleep(IDLE_POLL_INTERVAL)
+
+
+def download_package(package, pkgs_dir, limiter, owner=None):
+    """Download a package tarball into the conda package cache. The tarball is written to a partial file and only moved
+    into place once the checksum matches, so conda never sees an incomplete package.
+
+    Args:
+        package (dict): Package from the fetch list of an install plan
+        pkgs_dir (str): Path to the conda package cache
+        limiter (BandwidthLimiter): Limiter shared by the download threads
+        owner (str, optional): ID of the prefetch job. Defaults to None.
+
+    Raises:
+        ProcessCancelled: The prefetch job was cancelled during the download
+        ValueError: The checksum of the download doesn't match the package
+
+    Returns:
+        str: Path to the downloaded tarball
+    """
+    package_path = os.path.join(pkgs_dir, package["fn"])
+    partial_path = f"{package_path}.partial"
+    checksum = hashlib.sha256() if package.get("sha256") else hashlib.md5()
+    expected_checksum = package.get("sha256") or package.get("md5")
+
+    try:
+        with urllib.request.urlopen(package["url"]) as response, open(partial_path, "wb") as package_file:
+            while True:
+                if is_cancelled(owner):
+                    raise ProcessCancelled(f"Prefetch of {package['fn']} was cancelled")
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                package_file.write(chunk)
+                checksum.update(chunk)
+                limiter.consume(len(chunk))
+
+        if expected_checksum and checksum.hexdigest() != expected_checksum:
+            raise ValueError(f"Checksum mismatch for {package['fn']}")
+
+        os.replace(partial_path, package_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    # conda reads the channel of a cached tarball from urls.txt
+    with _urls_lock:
+        with open(os.path.join(pkgs_dir, "urls.txt"), "a") as urls_file:
+            urls_file.write(f"{package['url']}\n")
+
+    return package_path
+
+
+def select_prefetch_apps(app_workspace, app_names=None, limit=None):
+    """Choose the apps to prefetch. Named apps are prefetched in the order they are given. Without names, installed
+    apps with an available update come first, followed by the most recently published apps that are not installed.
+    Only versions that are compatible with the portal are considered.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        app_names (list, optional): Names of the apps to prefetch. Defaults to the APP_STORE_PREFETCH_APPS setting.
+        limit (int, optional): Maximum number of apps. Defaults to the APP_STORE_PREFETCH_LIMIT setting.
+
+    Returns:
+        list: List of dictionaries with the name, channel, label, version, and update flag of each app
+    """
+    if app_names is None:
+        app_names = get_app_store_setting("APP_STORE_PREFETCH_APPS", [])
+    if limit is None:
+        limit = get_app_store_setting("APP_STORE_PREFETCH_LIMIT", DEFAULT_PREFETCH_LIMIT)
+
+    stores = get_stores_reformatted(app_workspace, refresh=False, conda_channels="all")
+    candidates = []
+    for app_name, app in stores["availableApps"].items():
+        if app.get("app_type") == "proxyapp":
+            continue
+        for conda_channel, labels in app["versions"].items():
+            for conda_label, versions in labels.items():
+                if not versions:
+                    continue
+                installed = app["installed"].get(conda_channel, {}).get(conda_label, False)
+                update = app.get("updateAvailable", {}).get(conda_channel, {}).get(conda_label, False)
+                if installed and not update:
+                    continue
+                candidates.append(
+                    {
+                        "name": app_name,
+                        "channel": conda_channel,
+                        "label": conda_label,
+                        "version": versions[-1],
+                        "update": bool(installed),
+                        "timestamp": app.get("timestamp", {}).get(conda_channel, {}).get(conda_label) or 0,
+                    }
+                )
+
+    if app_names:
+        candidates = [candidate for candidate in candidates if candidate["name"] in app_names]
+        candidates.sort(key=lambda candidate: app_names.index(candidate["name"]))
+    else:
+        candidates.sort(key=lambda candidate: (not candidate["update"], -candidate["timestamp"]))
+
+    selected = []
+    for candidate in candidates:
+        # An app can be in several channels. Only prefetch the first match
+        if any(app["name"] == candidate["name"] for app in selected):
+            continue
+        del candidate["timestamp"]
+        selected.append(candidate)
+
+    return selected[: int(limit)]
+
+
+def prefetch_packages(data, channel_layer, app_workspace):
+    """Download the packages of the latest compatible versions of selected or popular apps into the conda package
+    cache while the app store is idle. The install plan of each app is cached until the next prefetch, so a later
+    install reuses the solution and only has to link the packages. The oldest prefetched packages that none of the
+    selected apps need are removed to make room in the budget.
+
+    Args:
+        data (dict): Optional list of app names to prefetch under the apps key
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+    """
+    owner = get_process_owner()
+    budget = get_prefetch_budget()
+    interval = get_prefetch_interval()
+    bandwidth = float(get_app_store_setting("APP_STORE_PREFETCH_BANDWIDTH_KBPS", DEFAULT_PREFETCH_BANDWIDTH_KBPS))
+    concurrency = int(get_app_store_setting("APP_STORE_PREFETCH_CONCURRENCY", DEFAULT_PREFETCH_CONCURRENCY))
+    limiter = BandwidthLimiter(bandwidth * 1024)
+    pkgs_dir = get_package_cache_dir()
+
+    with _index_lock:
+        index = read_prefetch_index(app_workspace)
+    used_size = sum(package["size"] for package in index.values())
+
+    downloads = {}
+    keep = set()
+    for app in select_prefetch_apps(app_workspace, app_names=data.get("apps") or None):
+        wait_for_idle(owner)
+        update = app.pop("update")
+        plan = create_install_plan([app], update=update, timeout=interval)
+        if not plan["success"]:
+            logger.info(f"Skipping prefetch of {app['name']}: {plan['error']}")
+            continue
+
+        packages = [
+            package for package in plan["fetch"]
+            if package["fn"] not in downloads and not is_package_cached(package, pkgs_dir)
+        ]
+        app_size = sum(package["size"] for package in packages)
+        app_packages = {package["fn"] for package in plan["fetch"]}
+        if used_size + app_size > budget:
+            used_size -= evict_prefetched_packages(app_workspace, used_size + app_size - budget, keep | app_packages)
+        if used_size + app_size > budget:
+            logger.info(f"Skipping prefetch of {app['name']}. It would exceed the prefetch disk budget")
+            continue
+
+        used_size += app_size
+        keep |= app_packages
+        for package in packages:
+            downloads[package["fn"]] = (app["name"], package)
+
+    def fetch(app_name, package):
+        wait_for_idle(owner)
+        try:
+            package_path = download_package(package, pkgs_dir, limiter, owner=owner)
+        except ProcessCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to prefetch {package['fn']}: {e}")
+            return
+
+        with _index_lock:
+            prefetch_index = read_prefetch_index(app_workspace)
+            prefetch_index[package["fn"]] = {
+                "path": package_path,
+                "size": package["size"],
+                "app": app_name,
+                "fetched": time.time(),
+            }
+            write_prefetch_index(app_workspace, prefetch_index)
+
+    logger.info(f"Prefetching {len(downloads)} packages")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(fetch, app_name, package) for app_name, package in downloads.values()]
+        for future in futures:
+            future.result()
+
+    logger.info("Prefetch complete")
+
+
+def schedule_prefetch(scheduler, channel_layer):
+    """Queue a prefetch job if prefetching is enabled and no prefetch ran within the APP_STORE_PREFETCH_INTERVAL
+    setting. The job has the lowest priority so it only runs when nothing else is waiting.
+
+    Args:
+        scheduler (JobScheduler): Job scheduler of the websocket consumers
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+
+    Returns:
+        str: ID of the prefetch job or None if no job was queued
+    """
+    if not is_prefetch_enabled():
+        return None
+
+    if not cache.add(PREFETCH_CACHE_KEY, True, get_prefetch_interval()):
+        return None
+
+    if scheduler.find_active_job(function_names=["prefetch_packages"]):
+        return None
+
+    return scheduler.submit("prefetch_packages", {}, channel_layer, with_workspace=True)
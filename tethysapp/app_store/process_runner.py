@@ -0,0 +1,394 @@
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+
+from .helpers import logger, get_app_store_setting
+
+DEFAULT_PROCESS_TIMEOUT = 3600
+DEFAULT_PROCESS_IDLE_TIMEOUT = 900
+POLL_INTERVAL = 0.5
+KILL_GRACE_PERIOD = 10
+
+_EOF = object()
+
+# Runners are registered under the job that started them so that a job can be cancelled from another thread
+_owner = threading.local()
+_runners = {}
+_cancelled_owners = set()
+_uncancellable_owners = set()
+_registry_lock = threading.Lock()
+
+
+class ProcessCancelled(Exception):
+    """Raised when the job that is running a process has been cancelled"""
+
+
+class ProcessResult:
+    """Outcome of a process started by a ProcessRunner"""
+
+    __slots__ = ("returncode", "timed_out", "idle_timed_out", "cancelled")
+
+    def __init__(self, returncode, timed_out=False, idle_timed_out=False, cancelled=False):
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.idle_timed_out = idle_timed_out
+        self.cancelled = cancelled
+
+    def __repr__(self):
+        return (
+            f"ProcessResult(returncode={self.returncode}, timed_out={self.timed_out}, "
+            f"idle_timed_out={self.idle_timed_out}, cancelled={self.cancelled})"
+        )
+
+    @property
+    def success(self):
+        """bool: True if the process exited with a zero exit code before any timeout or cancellation"""
+        return (
+            self.returncode == 0
+            and not self.timed_out
+            and not self.idle_timed_out
+            and not self.cancelled
+        )
+
+    def describe(self):
+        """Get a message describing why the process stopped
+
+        Returns:
+            str: Description of the outcome
+        """
+        if self.cancelled:
+            return "The process was cancelled"
+        if self.timed_out:
+            return "The process took too long and was stopped"
+        if self.idle_timed_out:
+            return "The process stopped responding and was stopped"
+        return f"The process exited with code {self.returncode}"
+
+
+class ProcessRunner:
+    """Runs a command in its own process group and streams its output line by line without blocking. The process is
+    stopped when it runs longer than the timeout, when it doesn't print anything for longer than the idle timeout, or
+    when it is cancelled from another thread.
+    """
+
+    def __init__(self, command, timeout=None, idle_timeout=None, cwd=None, env=None):
+        """
+        Args:
+            command (list): Command and arguments to run
+            timeout (float, optional): Maximum number of seconds the process can run. Defaults to the
+                APP_STORE_PROCESS_TIMEOUT setting. Use 0 for no timeout.
+            idle_timeout (float, optional): Maximum number of seconds without any output. Defaults to the
+                APP_STORE_PROCESS_IDLE_TIMEOUT setting. Use 0 for no timeout.
+            cwd (str, optional): Working directory of the process. Defaults to None.
+            env (dict, optional): Environment variables of the process. Defaults to None.
+        """
+        if timeout is None:
+            timeout = get_app_store_setting("APP_STORE_PROCESS_TIMEOUT", DEFAULT_PROCESS_TIMEOUT)
+        if idle_timeout is None:
+            idle_timeout = get_app_store_setting("APP_STORE_PROCESS_IDLE_TIMEOUT", DEFAULT_PROCESS_IDLE_TIMEOUT)
+
+        self.command = command
+        self.timeout = float(timeout)
+        self.idle_timeout = float(idle_timeout)
+        self.cwd = cwd
+        self.env = env
+        self.process = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self, on_line=None):
+        """Start the process and wait for it to finish
+
+        Args:
+            on_line (function, optional): Called with each line of output, without the trailing new line.
+
+        Returns:
+            ProcessResult: outcome of the process
+        """
+        owner = get_process_owner()
+        if not register_runner(owner, self):
+            return ProcessResult(None, cancelled=True)
+
+        try:
+            return self._run(on_line)
+        finally:
+            unregister_runner(owner, self)
+
+    def _run(self, on_line):
+        with self._lock:
+            if self.cancelled:
+                return ProcessResult(None, cancelled=True)
+
+            self.process = subprocess.Popen(
+                self.command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                errors="replace",
+                start_new_session=True,
+                cwd=self.cwd,
+                env=self.env,
+            )
+
+        lines = queue.Queue()
+        reader = threading.Thread(target=self._read_output, args=(lines,), daemon=True)
+        reader.start()
+
+        timed_out = False
+        idle_timed_out = False
+        start_time = last_output_time = time.monotonic()
+        try:
+            while True:
+                try:
+                    line = lines.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    line = None
+
+                if line is _EOF:
+                    break
+
+                now = time.monotonic()
+                if line is not None:
+                    last_output_time = now
+                    if on_line:
+                        self._handle_line(on_line, line)
+
+                if self.cancelled:
+                    self.kill()
+                    break
+                if self.timeout and now - start_time > self.timeout:
+                    logger.error(f"{self.command[0]} ran longer than {self.timeout:.0f} seconds. Stopping it.")
+                    timed_out = True
+                    self.kill()
+                    break
+                if self.idle_timeout and now - last_output_time > self.idle_timeout:
+                    logger.error(
+                        f"{self.command[0]} had no output for {self.idle_timeout:.0f} seconds. Stopping it."
+                    )
+                    idle_timed_out = True
+                    self.kill()
+                    break
+        except BaseException:
+            # The process group would otherwise keep changing the environment after the job released its lock
+            self.kill()
+            self.process.wait()
+            raise
+
+        returncode = self.process.wait()
+        reader.join(timeout=POLL_INTERVAL)
+
+        return ProcessResult(
+            returncode,
+            timed_out=timed_out,
+            idle_timed_out=idle_timed_out,
+            cancelled=self.cancelled,
+        )
+
+    def _handle_line(self, on_line, line):
+        # A failed notification must not stop the output from being read, or the process would block on a full pipe
+        try:
+            on_line(line)
+        except ProcessCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to handle the output of {self.command[0]}: {e}")
+
+    def _read_output(self, lines):
+        try:
+            for line in self.process.stdout:
+                lines.put(line.rstrip("\r\n"))
+        finally:
+            lines.put(_EOF)
+
+    def cancel(self):
+        """Stop the process from another thread. The process group is terminated right away and the thread running
+        the process makes sure it is gone, so this doesn't block the caller.
+        """
+        with self._lock:
+            self.cancelled = True
+            if self.process is not None and self.process.poll() is None:
+                try:
+                    os.killpg(self.process.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    def kill(self):
+        """Terminate the process group of the process, and kill it if it doesn't stop within the grace period"""
+        if self.process is None or self.process.poll() is not None:
+            return
+
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(timeout=KILL_GRACE_PERIOD)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def run_process(command, on_line=None, timeout=None, idle_timeout=None, cwd=None, env=None):
+    """Run a command and stream its output line by line. See ProcessRunner for details.
+
+    Args:
+        command (list): Command and arguments to run
+        on_line (function, optional): Called with each line of output, without the trailing new line.
+        timeout (float, optional): Maximum number of seconds the process can run.
+        idle_timeout (float, optional): Maximum number of seconds without any output.
+        cwd (str, optional): Working directory of the process. Defaults to None.
+        env (dict, optional): Environment variables of the process. Defaults to None.
+
+    Returns:
+        ProcessResult: outcome of the process
+
+    Raises:
+        ProcessCancelled: The job running the process was cancelled
+    """
+    runner = ProcessRunner(command, timeout=timeout, idle_timeout=idle_timeout, cwd=cwd, env=env)
+    result = runner.run(on_line)
+    if result.cancelled:
+        raise ProcessCancelled(f"{command[0]} was cancelled")
+    return result
+
+
+def set_process_owner(owner):
+    """Set the job that owns the processes started by the current thread
+
+    Args:
+        owner (str): ID of the job or None to clear the owner
+    """
+    _owner.value = owner
+
+
+def get_process_owner():
+    """Get the job that owns the processes started by the current thread
+
+    Returns:
+        str: ID of the job or None
+    """
+    return getattr(_owner, "value", None)
+
+
+def register_runner(owner, runner):
+    """Register a runner under its job. Runners without a job are not tracked.
+
+    Args:
+        owner (str): ID of the job
+        runner (ProcessRunner): runner that is about to start a process
+
+    Returns:
+        bool: False if the job has already been cancelled
+    """
+    if owner is None:
+        return True
+
+    with _registry_lock:
+        if owner in _cancelled_owners:
+            return False
+        _runners.setdefault(owner, set()).add(runner)
+    return True
+
+
+def unregister_runner(owner, runner):
+    if owner is None:
+        return
+
+    with _registry_lock:
+        runners = _runners.get(owner)
+        if runners is not None:
+            runners.discard(runner)
+            if not runners:
+                del _runners[owner]
+
+
+def request_cancel(owner):
+    """Mark a job as cancelled unless it has passed the point where it can be cancelled. See disable_cancel.
+
+    Args:
+        owner (str): ID of the job
+
+    Returns:
+        bool: False if the job can no longer be cancelled
+    """
+    with _registry_lock:
+        if owner in _uncancellable_owners:
+            return False
+        _cancelled_owners.add(owner)
+    return True
+
+
+def disable_cancel():
+    """Stop the job of the current thread from being cancelled from now on. Jobs call this right before they make
+    changes that can't be rolled back.
+
+    Raises:
+        ProcessCancelled: The job was cancelled before it got here
+    """
+    owner = get_process_owner()
+    if owner is None:
+        return
+
+    with _registry_lock:
+        if owner in _cancelled_owners:
+            raise ProcessCancelled(f"Job {owner} was cancelled")
+        _uncancellable_owners.add(owner)
+
+
+def cancel_processes(owner):
+    """Cancel the processes of a job. Processes the job starts afterwards are cancelled before they start.
+
+    Args:
+        owner (str): ID of the job
+
+    Returns:
+        int: Number of running processes that were cancelled or None if the job can no longer be cancelled
+    """
+    if not request_cancel(owner):
+        return None
+
+    with _registry_lock:
+        runners = list(_runners.get(owner, []))
+
+    for runner in runners:
+        runner.cancel()
+    return len(runners)
+
+
+def release_process_owner(owner):
+    """Forget a finished job
+
+    Args:
+        owner (str): ID of the job
+    """
+    with _registry_lock:
+        _cancelled_owners.discard(owner)
+        _uncancellable_owners.discard(owner)
+        _runners.pop(owner, None)
+
+
+def is_cancelled(owner=None):
+    """Check if a job has been cancelled
+
+    Args:
+        owner (str, optional): ID of the job. Defaults to the job of the current thread.
+
+    Returns:
+        bool: True if the job has been cancelled
+    """
+    owner = owner or get_process_owner()
+    with _registry_lock:
+        return owner is not None and owner in _cancelled_owners
+
+
+def check_cancelled():
+    """Stop the current job if it has been cancelled
+
+    Raises:
+        ProcessCancelled: The job of the current thread has been cancelled
+    """
+    if is_cancelled():
+        raise ProcessCancelled(f"Job {get_process_owner()} was cancelled")
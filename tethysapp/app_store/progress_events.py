@@ -0,0 +1,256 @@
+import json
+import time
+
+from .helpers import send_notification
+
+# Prefix of the progress lines written by the install scripts, i.e. APPSTORE_EVENT {"type": "solve_start"}
+EVENT_PREFIX = "APPSTORE_EVENT"
+DEFAULT_THROTTLE_INTERVAL = 1.0
+
+SOLVE_START = "solve_start"
+SOLVE_END = "solve_end"
+DOWNLOAD = "download"
+LINK = "link"
+RETRY = "retry"
+MESSAGE = "message"
+ERROR = "error"
+COMPLETE = "complete"
+
+
+def decode_output_line(output):
+    """Convert a line of process output to a string
+
+    Args:
+        output (bytes/str): line read from the process output
+
+    Returns:
+        str: decoded line without the trailing new line and null characters
+    """
+    if isinstance(output, bytes):
+        output = output.decode("utf-8", errors="replace")
+    return output.rstrip("\r\n").replace("\x00", "")
+
+
+class ProgressEvent:
+    """Typed progress event of a conda or mamba transaction"""
+
+    __slots__ = ("type", "message", "package", "percent", "downloaded", "total", "success")
+
+    def __init__(
+        self,
+        event_type,
+        message=None,
+        package=None,
+        percent=None,
+        downloaded=None,
+        total=None,
+        success=None,
+    ):
+        self.type = event_type
+        self.message = message
+        self.package = package
+        self.percent = percent
+        self.downloaded = downloaded
+        self.total = total
+        self.success = success
+
+    def __eq__(self, other):
+        if not isinstance(other, ProgressEvent):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"ProgressEvent({self.to_dict()})"
+
+    def to_dict(self):
+        """Convert the event to a dictionary. Values that are not set are left out
+
+        Returns:
+            dict: Dictionary representing the event
+        """
+        return {
+            slot: getattr(self, slot)
+            for slot in self.__slots__
+            if getattr(self, slot) is not None
+        }
+
+    def describe(self):
+        """Get a message for the event that can be shown to the user
+
+        Returns:
+            str: Description of the event
+        """
+        if self.type == SOLVE_START:
+            return "Solving Environment: Started"
+        if self.type == SOLVE_END:
+            return "Solving Environment: Done"
+        if self.type == DOWNLOAD:
+            description = f"Downloading {self.package}: {self.percent:.0f}%"
+            if self.total:
+                description += f" ({self.downloaded / 1048576:.1f} of {self.total / 1048576:.1f} MB)"
+            return description
+        if self.type == LINK:
+            return f"Linking Packages: {self.total} packages linked"
+        if self.type == RETRY:
+            return f"Install failed. Trying now with {self.message}."
+        if self.type == ERROR:
+            return f"Install error: {self.message}"
+        if self.type == COMPLETE:
+            return "Transaction: Done" if self.success else "Transaction: Failed"
+        return self.message
+
+
+class ProgressParser:
+    """Turns the output of the install scripts into typed progress events. The scripts write APPSTORE_EVENT lines at
+    each stage and run conda/mamba with --json, which streams single line download progress and ends with a json
+    document describing the transaction.
+    """
+
+    def __init__(self, package_sizes=None):
+        """
+        Args:
+            package_sizes (dict, optional): Download size in bytes keyed by <package name>-<version>, i.e. from the
+                FETCH actions of an install plan. Used to report downloaded bytes. Defaults to None.
+        """
+        self.package_sizes = package_sizes or {}
+        self.solving = False
+        self.success = None
+        self.json_lines = None
+
+    def feed(self, output):
+        """Parse a line of output
+
+        Args:
+            output (bytes/str): line read from the process output
+
+        Returns:
+            list: List of ProgressEvents found in the line
+        """
+        line = decode_output_line(output)
+
+        if self.json_lines is not None:
+            self.json_lines.append(line)
+            # The json document printed at the end of a transaction is closed with a brace at the start of a line
+            if line.rstrip() != "}":
+                return []
+            document = "\n".join(self.json_lines)
+            self.json_lines = None
+            try:
+                return self.parse_result(json.loads(document))
+            except ValueError:
+                return []
+
+        stripped_line = line.strip()
+        if stripped_line.startswith(EVENT_PREFIX):
+            try:
+                payload = json.loads(stripped_line[len(EVENT_PREFIX):])
+            except ValueError:
+                return []
+            return self.parse_event(payload)
+
+        if stripped_line == "{":
+            self.json_lines = [line]
+            return []
+
+        if stripped_line.startswith("{") and stripped_line.endswith("}"):
+            try:
+                payload = json.loads(stripped_line)
+            except ValueError:
+                return []
+            if "fetch" in payload:
+                return self.parse_fetch(payload)
+            return self.parse_result(payload)
+
+        return []
+
+    def end_solve(self):
+        if self.solving:
+            self.solving = False
+            return [ProgressEvent(SOLVE_END)]
+        return []
+
+    def parse_event(self, payload):
+        event_type = payload.get("type")
+        if event_type == SOLVE_START:
+            self.solving = True
+        elif event_type == COMPLETE:
+            self.success = bool(payload.get("success"))
+            return self.end_solve() + [ProgressEvent(COMPLETE, success=self.success)]
+        return [
+            ProgressEvent(
+                event_type,
+                message=payload.get("message") or payload.get("tool"),
+                package=payload.get("package"),
+            )
+        ]
+
+    def parse_fetch(self, payload):
+        package = str(payload["fetch"]).split("|")[0].strip()
+        maxval = payload.get("maxval") or 1
+        progress = min(float(payload.get("progress") or 0) / maxval, 1.0)
+        if payload.get("finished"):
+            progress = 1.0
+
+        total = self.package_sizes.get(package)
+        downloaded = int(total * progress) if total else None
+        return self.end_solve() + [
+            ProgressEvent(
+                DOWNLOAD,
+                package=package,
+                percent=round(progress * 100, 1),
+                downloaded=downloaded,
+                total=total,
+            )
+        ]
+
+    def parse_result(self, result):
+        events = self.end_solve()
+        if result.get("success") is False or "error" in result or "exception_name" in result:
+            message = result.get("message") or result.get("error") or result.get("exception_name")
+            return events + [ProgressEvent(ERROR, message=message)]
+
+        actions = result.get("actions", {})
+        linked_packages = len(actions.get("LINK", []))
+        if linked_packages:
+            events.append(ProgressEvent(LINK, percent=100.0, total=linked_packages))
+        if result.get("message"):
+            events.append(ProgressEvent(MESSAGE, message=result["message"]))
+
+        return events
+
+
+class ProgressNotifier:
+    """Sends progress events to the websocket. Download progress is throttled so that a large transaction doesn't
+    flood the channel layer, while stage changes and finished downloads are always sent.
+    """
+
+    def __init__(self, channel_layer, notification_method=send_notification, interval=None):
+        """
+        Args:
+            channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+            notification_method (Object, optional): Method of how to send notifications. Defaults to send_notification
+                which is a WebSocket.
+            interval (float, optional): Minimum number of seconds between download notifications. Defaults to 1.
+        """
+        self.channel_layer = channel_layer
+        self.notification_method = notification_method
+        self.interval = DEFAULT_THROTTLE_INTERVAL if interval is None else interval
+        self.last_sent = None
+
+    def send(self, event):
+        """Send an event unless it is throttled
+
+        Args:
+            event (ProgressEvent): event to send
+
+        Returns:
+            bool: True if the event was sent
+        """
+        if event.type == DOWNLOAD and event.percent < 100:
+            now = time.monotonic()
+            if self.last_sent is not None and now - self.last_sent < self.interval:
+                return False
+            self.last_sent = now
+
+        self.notification_method(event.describe(), self.channel_layer)
+        return True
@@ -1,3 +1,6 @@
+import json
+import hashlib
+
 from .helpers import logger, send_notification
 from .submission_handlers import submit_proxyapp_to_store
 
@@ -71,6 +74,19 @@ def list_proxy_apps():
     return proxy_app_list
 
 
+def get_proxy_app_table_version():
+    """Get a version of the proxy app table that changes whenever a proxy app is added, changed, or removed, including
+    changes made outside of the app store
+
+    Returns:
+        str: Hash of the names and tags of the proxy apps
+    """
+    from tethys_apps.models import ProxyApp
+
+    proxy_apps = ProxyApp.objects.order_by("id").values_list("id", "name", "tags")
+    return hashlib.sha1(json.dumps(list(proxy_apps)).encode("utf-8")).hexdigest()
+
+
 def delete_proxy_app(install_data, channel_layer):
     """Delete the proxy app from the specified app name
 
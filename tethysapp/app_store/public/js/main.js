@@ -72,7 +72,9 @@ const settingsHelper = {
                         .each(function() {
                             if ($(this).hasClass("required_setting") && $(this).val() == "") {
                                 let setting_name = $(this)[0].id
-                                $(`#${setting_name}_warningMessage`).show()
+                                $(`#${setting_name}_warningMessage`)
+                                    .text("This setting is required and must be filled to submit settings")
+                                    .show()
                                 has_errors = true
                             }
                             formData.settings[$(this).attr("id")] = $(this).val()
@@ -107,6 +109,47 @@ const settingsHelper = {
     customSettingConfigComplete: (settingsData, n_content, completeMessage, ws) => {
         $("#custom-settings-modal").modal("hide")
     },
+    customSettingConfigErrors: (errorData, n_content, completeMessage, ws) => {
+        // Keep the form open and show the error of each invalid setting under its field
+        Object.entries(errorData.errors).forEach(([settingName, message]) => {
+            $(`#${settingName}_warningMessage`).text(message).show()
+        })
+    },
+    jobCancelled: (jobData, n_content, completeMessage, ws) => {
+        if (jobData.state != "cancelled") {
+            sendNotification(`The ${jobData.name} job finished before it could be cancelled`, n_content)
+            return
+        }
+        if (jobData.jobType == "update_app") {
+            $("#update-loader").hide()
+            $("#updateCancel").show()
+            sendNotification("Update cancelled", $("#update-notices"))
+        } else if (jobData.jobType == "uninstall_app") {
+            $("#uninstallLoaderEllipsis").hide()
+            $("#doneUninstallButton").show()
+            sendNotification("Uninstall cancelled", $("#uninstallNotices"))
+        } else {
+            hideLoader()
+            $("#mainCancel").show()
+            sendNotification("Install cancelled", n_content)
+            $(`#${jobData.name}_installer`).prop("disabled", false)
+            $(`#${jobData.name}_installer`).css("opacity", "1")
+            resetInstallStatus()
+        }
+    },
+    jobNotCancellable: (jobData, n_content, completeMessage, ws) => {
+        const appName = jobData.name ? `${jobData.name} ` : ""
+        const message = `The ${appName}job has made changes that can't be undone and can no longer be cancelled`
+        if (jobData.jobType == "uninstall_app") {
+            sendNotification(message, $("#uninstallNotices"))
+        } else {
+            sendNotification(message, n_content)
+        }
+    },
+    jobAttached: (jobData, n_content, completeMessage, ws) => {
+        const appName = jobData.name ? `${jobData.name} ` : ""
+        sendNotification(`The ${appName}install is already ${jobData.state}. Following its progress`, n_content)
+    },
     getSettingName: (settingType) => {
         const settingMap = {
             spatial: "Spatial Dataset Service",
@@ -552,6 +595,15 @@ $(document).ready(function() {
     originalProxyAddPortalModal = $('#add-proxyapp-to-portal-modal').clone()
     originalProxySubmitStoreModal = $('#submit-proxyapp-to-store-modal').clone()
 
+    $("#stopInstallButton").click(() => {
+        $("#stopInstallButton").hide()
+        notification_ws.send(
+            JSON.stringify({
+                data: { name: installData.name },
+                type: `cancel_job`
+            })
+        )
+    })
     $("#doneInstallButton").click(() => reloadCacheRefresh())
     $("#doneUninstallButton").click(() => reloadCacheRefresh())
     $("#done-update-button").click(() => reloadCacheRefresh())
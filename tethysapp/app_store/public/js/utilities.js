@@ -68,11 +68,13 @@ function getParameterByName(name, url) {
 
 const hideLoader = (modal = "notification") => {
   $(`#installLoaderEllipsis`).hide()
+  $("#stopInstallButton").hide()
 }
 
 const showLoader = (modal = "notification") => {
   $(`#installLoaderEllipsis`).show()
   $("#mainCancel").hide()
+  $("#stopInstallButton").show()
 }
 
 const sendNotification = (message, n_content) => {
@@ -11,14 +11,25 @@ import inspect
 import os
 import json
 import urllib
+import hashlib
 import shutil
 from pkg_resources import parse_version
 import yaml
 from .helpers import logger, get_conda_stores
-from .proxy_app_handlers import list_proxy_apps
+from .proxy_app_handlers import list_proxy_apps, get_proxy_app_table_version
+from .install_plan import get_environment_fingerprint
+from .catalog import records_from_resources, resources_from_records, license_table
+from .compatibility_matrix import CompatibilityMatrix
+from .workspace_storage import (
+    record_workspace_artifact,
+    touch_workspace_artifact,
+    evict_workspace_artifacts,
+)
 from conda.cli.python_api import run_command as conda_run, Commands
 from conda.exceptions import PackagesNotFoundError
 
+INSTALLED_STATE_PREFIX = "installed_state"
+
 
 def clear_conda_channel_cache(data, channel_layer):
     """Clears Django cache for all the conda stores
@@ -394,37 +405,32 @@ def get_resources_single_store(
     else:
         tethys_version = tethys_portal.__version__
     tethys_version_regex = re.search(r'([\d.]+[\d])', tethys_version).group(1)
-    for resource in all_resources:
+
+    # Evaluate the compatibility of every app version in a single pass over the compatibility matrix
+    compatibility_matrix = CompatibilityMatrix.from_resources(
+        all_resources, conda_channel, conda_label
+    )
+    split_versions = compatibility_matrix.split_versions(
+        compatibility_matrix.compatible(tethys_version_regex)
+    )
+    for resource, (compatible_versions, incompatible_versions) in zip(
+        all_resources, split_versions
+    ):
         resource["name"] = resource["name"].replace("proxyapp_", "")
         if resource["installed"][conda_channel][conda_label]:
             installed_apps[resource["name"]] = resource
 
-        add_compatible = False
-        add_incompatible = False
-        new_compatible_app = copy.deepcopy(resource)
-        new_compatible_app["versions"][conda_channel][conda_label] = []
-        new_incompatible_app = copy.deepcopy(new_compatible_app)
-        for version in resource["versions"][conda_channel][conda_label]:
-            # Assume if not found, that it is compatible with Tethys Platform 3.4.4
-            compatible_tethys_version = "<=3.4.4"
-            if version in resource["compatibility"][conda_channel][conda_label]:
-                compatible_tethys_version = resource["compatibility"][conda_channel][
-                    conda_label
-                ][version]
-            if semver.match(tethys_version_regex, compatible_tethys_version):
-                add_compatible = True
-                new_compatible_app["versions"][conda_channel][conda_label].append(
-                    version
-                )
-            else:
-                add_incompatible = True
-                new_incompatible_app["versions"][conda_channel][conda_label].append(
-                    version
-                )
-
-        if add_compatible:
+        if compatible_versions:
+            new_compatible_app = copy.deepcopy(resource)
+            new_compatible_app["versions"][conda_channel][
+                conda_label
+            ] = compatible_versions
             available_apps[resource["name"]] = new_compatible_app
-        if add_incompatible:
+        if incompatible_versions:
+            new_incompatible_app = copy.deepcopy(resource)
+            new_incompatible_app["versions"][conda_channel][
+                conda_label
+            ] = incompatible_versions
             incompatible_apps[resource["name"]] = new_incompatible_app
 
     return_object = {
@@ -437,6 +443,102 @@ def get_resources_single_store(
     return return_object
 
 
+def get_compatibility_report(
+    app_workspace, tethys_versions, refresh=False, conda_channels="all"
+):
+    """Evaluate the installed apps against several Tethys Platform versions to help plan an upgrade. The versions of
+    each conda channel and conda label are checked against all the target versions in a single batch pass over the
+    compatibility matrix.
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        tethys_versions (list): List of target Tethys Platform versions, i.e. ['4.2.0', '5.0.0']
+        refresh (bool, optional): Indicates whether resources should be refreshed or use a cache. Defaults to False.
+        conda_channels (str/list, optional): Name of the conda channel to use for app discovery. Defaults to 'all'.
+
+    Returns:
+        dict: Compatibility of the installed apps for each target version. See the example below.
+
+        {
+            'tethysVersions': ['4.2.0', '5.0.0'],
+            'installedApps': {
+                'app_name': {
+                    'conda_channel': {
+                        'main': {
+                            'installedVersion': '1.0',
+                            'targets': {
+                                '4.2.0': {
+                                    'compatible': ['1.0', '1.1'],
+                                    'incompatible': [],
+                                    'latestCompatible': '1.1',
+                                    'installedCompatible': True
+                                },
+                                '5.0.0': {
+                                    'compatible': [],
+                                    'incompatible': ['1.0', '1.1'],
+                                    'latestCompatible': None,
+                                    'installedCompatible': False
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    """
+    target_versions = []
+    for tethys_version in tethys_versions:
+        version_match = re.search(r"([\d.]+[\d])", str(tethys_version))
+        if not version_match:
+            raise ValueError(f"Invalid Tethys Platform version: {tethys_version}")
+        target_versions.append(version_match.group(1))
+
+    installed_apps = {}
+    for store in get_conda_stores(conda_channels=conda_channels):
+        conda_channel = store["conda_channel"]
+        for conda_label in store["conda_labels"]:
+            cache_key = f"{conda_channel}_{conda_label}_app_resources"
+            all_resources = fetch_resources(app_workspace, conda_channel, conda_label=conda_label,
+                                            cache_key=cache_key, refresh=refresh)
+            resources = [
+                resource for resource in all_resources
+                if resource["installed"][conda_channel][conda_label]
+            ]
+            if not resources:
+                continue
+            installed_versions = [
+                resource.get("installedVersion", {}).get(conda_channel, {}).get(conda_label)
+                for resource in resources
+            ]
+
+            compatibility_matrix = CompatibilityMatrix.from_resources(
+                resources, conda_channel, conda_label
+            )
+            masks = compatibility_matrix.compatible_batch(target_versions)
+            targets_by_app = [{} for _ in resources]
+            for target_version, mask in masks.items():
+                split_versions = compatibility_matrix.split_versions(mask)
+                latest_versions = compatibility_matrix.latest_compatible(mask)
+                for app_id, installed_version in enumerate(installed_versions):
+                    compatible_versions, incompatible_versions = split_versions[app_id]
+                    targets_by_app[app_id][target_version] = {
+                        "compatible": compatible_versions,
+                        "incompatible": incompatible_versions,
+                        "latestCompatible": latest_versions[app_id],
+                        "installedCompatible": installed_version in compatible_versions,
+                    }
+
+            for resource, installed_version, targets in zip(resources, installed_versions, targets_by_app):
+                app_name = resource["name"].replace("proxyapp_", "")
+                app_report = installed_apps.setdefault(app_name, {}).setdefault(conda_channel, {})
+                app_report[conda_label] = {
+                    "installedVersion": installed_version,
+                    "targets": targets,
+                }
+
+    return {"tethysVersions": target_versions, "installedApps": installed_apps}
+
+
 def check_if_tethysapp_installed(app_name):
     """Check if the app is installed with conda as a tethys app. If so, return additional information about the resource
 
@@ -526,6 +628,98 @@ def check_if_app_installed(app_name, app_type=None):
     return return_obj
 
 
+def get_installed_state_fingerprint():
+    """Get a fingerprint of the installed apps. It changes whenever a conda transaction changes the environment or a
+    proxy app is added, changed, or removed, so installs done outside of the app store are picked up as well.
+
+    Returns:
+        str: Fingerprint of the installed apps
+    """
+    state = f"{get_environment_fingerprint()}:{get_proxy_app_table_version()}"
+    return hashlib.sha1(state.encode("utf-8")).hexdigest()
+
+
+def get_installed_state(resources, refresh=False):
+    """Get the installed state of a list of apps. The states are cached under the fingerprint of the installed apps, so
+    they are checked again only after the environment or the proxy apps change.
+
+    Args:
+        resources (list): List of app resource dictionaries with at least the name and app_type
+        refresh (bool, optional): Check every app again instead of using the cache. Defaults to False.
+
+    Returns:
+        dict: The installed state of each app by app type and name. See the example below.
+
+        {
+            'tethysapp:app_name': {'isInstalled': True, 'channel': 'conda_channel', 'version': '1.0'},
+            'proxyapp:proxyapp_name': {'isInstalled': False}
+        }
+    """
+    state_key = f"{INSTALLED_STATE_PREFIX}_{get_installed_state_fingerprint()}"
+    installed_state = cache.get(state_key) or {}
+
+    missing_resources = [
+        resource
+        for resource in resources
+        if refresh or get_installed_state_key(resource) not in installed_state
+    ]
+    if missing_resources:
+        for resource in missing_resources:
+            installed_state[get_installed_state_key(resource)] = check_if_app_installed(
+                resource["name"], app_type=resource["app_type"]
+            )
+        cache.set(state_key, installed_state)
+
+    return installed_state
+
+
+def get_installed_state_key(resource):
+    return f"{resource['app_type']}:{resource['name']}"
+
+
+def is_update_available(latest_version, installed_version):
+    """Check if the latest version of an app is newer than the installed version
+
+    Args:
+        latest_version (str): Latest version of the app. Versions that aren't compatible end with an asterisk.
+        installed_version (str): Installed version of the app
+
+    Returns:
+        bool: True if the latest version is compatible and newer than the installed version
+    """
+    if installed_version is None or "*" in latest_version:
+        return False
+    return parse_version(latest_version) > parse_version(installed_version)
+
+
+def apply_installed_state(resource, installed_app, conda_channel, conda_label):
+    """Set the installed flag, the installed version, and the available update of an app resource from its installed
+    state. The rest of the resource comes from the catalog cache and doesn't depend on the environment.
+
+    Args:
+        resource (dict): Dictionary representing an app and its conda metadata
+        installed_app (dict): Installed state of the app from check_if_app_installed
+        conda_channel (str): Name of the conda channel of the resource
+        conda_label (str): Name of the conda label of the resource
+    """
+    installed = installed_app["isInstalled"] and installed_app.get("channel") == conda_channel
+    resource["installed"] = {conda_channel: {conda_label: installed}}
+    resource.pop("installedVersion", None)
+    resource.pop("updateAvailable", None)
+    if not installed:
+        return
+
+    installed_version = installed_app["version"]
+    if installed_version is not None:
+        resource["installedVersion"] = {conda_channel: {conda_label: installed_version}}
+
+    latest_version = resource.get("latestVersion", {}).get(conda_channel, {}).get(conda_label)
+    if latest_version is not None:
+        resource["updateAvailable"] = {
+            conda_channel: {conda_label: is_update_available(latest_version, installed_version)}
+        }
+
+
 def fetch_resources(
     app_workspace, conda_channel, conda_label="main", cache_key=None, refresh=False
 ):
@@ -601,11 +795,13 @@ def fetch_resources(
             }
 
             if "license" in conda_search_result[app_package][-1]:
-                newPackage["license"][conda_channel][conda_label] = conda_search_result[
-                    app_package
-                ][-1]["license"]
+                newPackage["license"][conda_channel][conda_label] = license_table.share(
+                    conda_search_result[app_package][-1]["license"]
+                )
 
             for conda_version in conda_search_result[app_package]:
+                # Versions share the same license string and parsed metadata when the content is identical
+                version_license = license_table.share(conda_version.get("license"))
                 newPackage["versions"][conda_channel][conda_label].append(
                     conda_version.get("version")
                 )
@@ -613,28 +809,21 @@ def fetch_resources(
                     conda_version.get("url")
                 )
                 newPackage["licenses"][conda_channel][conda_label].append(
-                    conda_version.get("license")
+                    version_license
                 )
-                if "license" in conda_version:
-                    try:
-                        license_json = json.loads(
-                            conda_version["license"].replace("'", '"')
-                        )
-                        newPackage["app_type"] = license_json.get(
-                            "app_type", "tethysapp"
-                        )
-                        if "tethys_version" in license_json:
-                            newPackage["compatibility"][conda_channel][conda_label][
-                                conda_version["version"]
-                            ] = license_json.get(
-                                "tethys_version"
-                            )  # noqa: E501
-                    except (ValueError, TypeError):
-                        pass
-
-            installed_version = check_if_app_installed(
-                app_package, app_type=newPackage["app_type"]
-            )
+                license_json = license_table.parse(version_license)
+                if license_json:
+                    newPackage["app_type"] = license_json.get("app_type", "tethysapp")
+                    if "tethys_version" in license_json:
+                        newPackage["compatibility"][conda_channel][conda_label][
+                            conda_version["version"]
+                        ] = license_json.get("tethys_version")
+
+            resource_metadata.append(newPackage)
+
+        installed_state = get_installed_state(resource_metadata, refresh=True)
+        for newPackage in resource_metadata:
+            installed_version = installed_state[get_installed_state_key(newPackage)]
             if installed_version["isInstalled"]:
                 if conda_channel == installed_version.get("channel"):
                     newPackage["installed"][conda_channel][conda_label] = True
@@ -643,17 +832,28 @@ def fetch_resources(
                         installed_version["version"]
                     )
 
-            resource_metadata.append(newPackage)
-
         resource_metadata = process_resources(
             resource_metadata, app_workspace, conda_channel, conda_label
         )
 
-        cache.set(cache_key, resource_metadata)
+        # Cache compact records instead of the nested resource dictionaries to keep large catalogs small
+        cache.set(
+            cache_key,
+            records_from_resources(resource_metadata, conda_channel, conda_label),
+        )
         return resource_metadata
     else:
         logger.info("Found in cache")
-        return cached_resources
+        resource_metadata = resources_from_records(cached_resources)
+
+        # The catalog cache only changes on a refresh, so the installed state is applied from its own cache that
+        # follows the environment
+        installed_state = get_installed_state(resource_metadata)
+        for resource in resource_metadata:
+            apply_installed_state(
+                resource, installed_state[get_installed_state_key(resource)], conda_channel, conda_label
+            )
+        return resource_metadata
 
 
 def process_resources(resources, app_workspace, conda_channel, conda_label):
@@ -675,6 +875,7 @@ def process_resources(resources, app_workspace, conda_channel, conda_label):
     else:
         tethys_version = tethys_portal.__version__
 
+    used_artifacts = []
     for app in resources:
         workspace_folder = os.path.join(app_workspace.path, "apps")
         if not os.path.exists(workspace_folder):
@@ -688,14 +889,8 @@ def process_resources(resources, app_workspace, conda_channel, conda_label):
         ][conda_label][-1]
         license = app["license"][conda_channel][conda_label]
 
-        license_metadata = None
         compatible = None
-        try:
-            if license:
-                license.replace("'", '"')
-            license_metadata = json.loads(license)
-        except Exception:
-            pass
+        license_metadata = license_table.parse(license)
 
         if license_metadata and "tethys_version" in license_metadata:
             compatible = license_metadata["tethys_version"]
@@ -713,9 +908,8 @@ def process_resources(resources, app_workspace, conda_channel, conda_label):
             if "installedVersion" in app:
                 latestVersion = app["latestVersion"][conda_channel][conda_label]
                 installedVersion = app["installedVersion"][conda_channel][conda_label]
-                if "*" not in latestVersion:
-                    if parse_version(latestVersion) > parse_version(installedVersion):
-                        app["updateAvailable"] = {conda_channel: {conda_label: True}}
+                if is_update_available(latestVersion, installedVersion):
+                    app["updateAvailable"] = {conda_channel: {conda_label: True}}
 
         latest_version_url = app.get("versionURLs")[conda_channel][conda_label][-1]
         file_name = latest_version_url.split("/")
@@ -767,6 +961,14 @@ def process_resources(resources, app_workspace, conda_channel, conda_label):
                     shutil.rmtree(output_path)
 
                 shutil.unpack_archive(download_path, output_path)
+                record_workspace_artifact(
+                    app_workspace, output_path, [download_path, output_path]
+                )
+            else:
+                touch_workspace_artifact(
+                    app_workspace, output_path, [download_path, output_path]
+                )
+            used_artifacts.append(output_path)
 
             app["filepath"] = {conda_channel: {conda_label: output_path}}
 
@@ -806,6 +1008,9 @@ def process_resources(resources, app_workspace, conda_channel, conda_label):
                 logger.info("Error happened while downloading package for metadata")
                 logger.error(e)
 
+    if used_artifacts:
+        evict_workspace_artifacts(app_workspace, keep=used_artifacts)
+
     return resources
 
 
@@ -0,0 +1,248 @@
+import os
+import sys
+import time
+import uuid
+import subprocess
+import threading
+from pathlib import Path
+
+from .app import AppStore as app
+from .helpers import logger, get_app_store_setting, send_notification
+from .collect_helpers import is_incremental_collect_enabled, collect_apps
+from .management_commands import run_command_groups
+from .job_queue import has_exclusive_jobs, run_exclusive
+from .environment_lock import acquire_environment_lock
+
+DEFAULT_RESTART_DEBOUNCE = 5
+DEFAULT_RESTART_MAX_WAIT = 60
+EXCLUSIVE_POLL_INTERVAL = 1
+
+# Restart types that need the post install management commands
+POST_INSTALL_RESTART_TYPES = [
+    "install",
+    "update",
+    "github_install",
+    "scaffold_install",
+]
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+class RestartCoordinator:
+    """Batches the restart requests of installs, updates, and uninstalls. Requests that arrive within the debounce
+    window are combined so the post install management commands run once for all the apps and the server restarts
+    once. The restart waits while an install, update, or uninstall is queued or running so it doesn't interrupt it.
+    """
+
+    def __init__(self, debounce=None, max_wait=None):
+        """
+        Args:
+            debounce (float, optional): Seconds without a new request before the restart runs. Defaults to the
+                APP_STORE_RESTART_DEBOUNCE setting.
+            max_wait (float, optional): Maximum seconds the first request waits for new requests. Defaults to the
+                APP_STORE_RESTART_MAX_WAIT setting.
+        """
+        if debounce is None:
+            debounce = get_app_store_setting("APP_STORE_RESTART_DEBOUNCE", DEFAULT_RESTART_DEBOUNCE)
+        if max_wait is None:
+            max_wait = get_app_store_setting("APP_STORE_RESTART_MAX_WAIT", DEFAULT_RESTART_MAX_WAIT)
+        self.debounce = float(debounce)
+        self.max_wait = float(max_wait)
+        self.pending = []
+        self.first_request = None
+        self.last_request = None
+        self.worker = None
+        self.condition = threading.Condition()
+
+    def request(self, data, channel_layer, app_workspace, run_collect_all=True):
+        """Add a restart request to the next batch
+
+        Args:
+            data (dict): Dictionary of data with app information and restart type
+            channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+            app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+            run_collect_all (bool, optional): Detemines if collect all needs to be ran. Defaults to True.
+        """
+        with self.condition:
+            now = time.monotonic()
+            if not self.pending:
+                self.first_request = now
+            self.last_request = now
+            self.pending.append(
+                {
+                    "data": data,
+                    "channel_layer": channel_layer,
+                    "app_workspace": app_workspace,
+                    "run_collect_all": run_collect_all,
+                }
+            )
+            self.condition.notify_all()
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.work, daemon=True)
+                self.worker.start()
+
+        logger.info(f"Restart requested for {data.get('name', 'the portal')}. Batching pending restarts")
+
+    def next_batch(self):
+        """Wait for the debounce window to close and for the running installs to finish
+
+        Returns:
+            list: The pending requests or None if there are no requests left
+        """
+        with self.condition:
+            while True:
+                if not self.pending:
+                    self.worker = None
+                    return None
+
+                now = time.monotonic()
+                deadline = min(self.last_request + self.debounce, self.first_request + self.max_wait)
+                if now < deadline:
+                    self.condition.wait(deadline - now)
+                elif has_exclusive_jobs():
+                    self.condition.wait(EXCLUSIVE_POLL_INTERVAL)
+                else:
+                    batch = self.pending
+                    self.pending = []
+                    return batch
+
+    def work(self):
+        """Restart the server for each batch of requests until no requests are left"""
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                return
+
+            try:
+                run_exclusive(self.restart, batch)
+            except Exception as e:
+                logger.error(f"Failed to restart the server: {e}")
+
+    def restart(self, batch):
+        """Run the post install management commands for the union of the apps in a batch and restart the server once
+
+        Args:
+            batch (list): Restart requests
+        """
+        apps = []
+        channel_layers = []
+        run_collect_all = False
+        for restart_request in batch:
+            data = restart_request["data"]
+            if data.get("restart_type") in POST_INSTALL_RESTART_TYPES:
+                if data["name"] not in apps:
+                    apps.append(data["name"])
+                run_collect_all = run_collect_all or restart_request["run_collect_all"]
+            channel_layer = restart_request["channel_layer"]
+            if channel_layer is not None and not any(channel_layer is layer for layer in channel_layers):
+                channel_layers.append(channel_layer)
+
+        logger.info(f"Restarting the server for {len(batch)} restart requests")
+        app_workspace = batch[-1]["app_workspace"]
+        # A lease left behind when the restart stops this process expires with the process
+        with acquire_environment_lock(app_workspace, f"restart-{uuid.uuid4().hex}"):
+            restart_portal(apps, channel_layers, app_workspace, run_collect_all=run_collect_all)
+
+
+def get_restart_coordinator():
+    """Get the restart coordinator shared by all the jobs in this process
+
+    Returns:
+        RestartCoordinator: the restart coordinator
+    """
+    global _coordinator
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = RestartCoordinator()
+
+    return _coordinator
+
+
+def notify_all(msg, channel_layers):
+    """Send a message to every client waiting for the restart
+
+    Args:
+        msg (str): Message to send to the django channel layers
+        channel_layers (list): Asynchronous Django channel layers of the waiting clients
+    """
+    for channel_layer in channel_layers:
+        send_notification(msg, channel_layer)
+
+
+def restart_server(data, channel_layer, app_workspace, run_collect_all=True):
+    """Request a server restart after an application is installed, updated, or removed. Requests are batched so
+    several installs in a row restart the server once.
+
+    Args:
+        data (dict): Dictionary of data with app information and restart type
+        channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        run_collect_all (bool, optional): Detemines if collect all needs to be ran. Defaults to True.
+    """
+    get_restart_coordinator().request(data, channel_layer, app_workspace, run_collect_all=run_collect_all)
+
+
+def restart_portal(apps, channel_layers, app_workspace, run_collect_all=True):
+    """Runs some tethys commands after applications are installed. Once finished, try to restart the server to get
+    the changes made
+
+    Args:
+        apps (list): Names of the installed or updated apps
+        channel_layers (list): Asynchronous Django channel layers of the clients waiting for the restart
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        run_collect_all (bool, optional): Detemines if collect all needs to be ran. Defaults to True.
+    """
+    # Independent commands go in separate groups so they run in parallel
+    command_groups = []
+    for app_name in apps:
+        # Run SyncStores
+        logger.info("Running Syncstores for app: " + app_name)
+        notify_all("Running Syncstores for app: " + app_name, channel_layers)
+        command_groups.append([["syncstores", app_name, "-f"]])
+
+    dev_mode = "runserver" in sys.argv
+    if not dev_mode and run_collect_all and apps:
+
+        logger.info("Running Tethys Collectall")
+        notify_all(
+            "Running Tethys Collectall for apps: " + ", ".join(apps), channel_layers
+        )
+        # Only copy the new and changed files of the installed apps when possible
+        if not (is_incremental_collect_enabled() and collect_apps(apps)):
+            # pre_collectstatic sets up the static files for the main collectstatic
+            command_groups.append([["pre_collectstatic"], ["collectstatic", "--noinput"]])
+            command_groups.append([["collectworkspaces", "--force"]])
+
+    run_command_groups(command_groups)
+
+    if dev_mode:
+
+        logger.info("Dev Mode. Attempting to restart by changing file")
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        file_path = os.path.join(dir_path, "model.py")
+        # An uninstall only batch has no installed apps to report
+        message = f"{', '.join(apps)} installed in dev mode" if apps else "Restarted in dev mode"
+        with open(file_path, "w") as f:
+            f.write(f'print("{message}")')
+            f.write("\n")
+    else:
+        try:
+            notify_all("Server Restarting . . .", channel_layers)
+            command = "supervisorctl restart all"
+            subprocess.run(["sudo", "-h"], check=True)
+            sudoPassword = app.get_custom_setting("sudo_server_pass")
+
+            os.system("echo %s|sudo -S %s" % (sudoPassword, command))
+        except Exception as e:
+            logger.error(e)
+            logger.info("No SUDO. Docker container implied. Restarting without SUDO")
+            # Error encountered while running sudo. Let's try without sudo
+            # Check if the restart dir exists. If yes then use that dir instead of
+            RESTART_FILE_PATH = "/var/lib/tethys_persist/restart"
+
+            if os.path.isdir(RESTART_FILE_PATH):
+                logger.info("Restart Directory found. Creating restart file.")
+                Path(os.path.join(RESTART_FILE_PATH, "restart")).touch()
+            else:
+                os.system(command)
@@ -5,10 +5,10 @@ import shutil
 
 from jinja2 import Template
 from subprocess import Popen, PIPE, STDOUT
-from pathlib import Path
 
 from .git_install_handlers import write_logs
 from .helpers import logger, get_override_key
+from .environment_lock import acquire_environment_lock
 from tethys_cli.scaffold_commands import (
     APP_PATH,
     APP_PREFIX,
@@ -23,6 +23,9 @@ from rest_framework.permissions import AllowAny
 from django.http import JsonResponse, HttpResponse
 from tethys_sdk.routing import controller
 
+# Seconds a scaffold request waits for a running install before it fails
+SCAFFOLD_LOCK_TIMEOUT = 300
+
 
 def install_app(app_path):
     """Run tethys install
@@ -192,14 +195,6 @@ def scaffold_command(request, app_workspace):
         "license_name": received_json_data.get("license_name", ""),
     }
 
-    workspace_directory = app_workspace.path
-    install_status_dir = os.path.join(workspace_directory, "install_status")
-
-    if not os.path.exists(install_status_dir):
-        os.makedirs(install_status_dir)
-
-    Path(os.path.join(workspace_directory, "install_status", "scaffoldRunning")).touch()
-
     logger.debug("Template context: {}".format(context))
 
     # Create root directory
@@ -258,11 +253,13 @@ def scaffold_command(request, app_workspace):
                     pfp.write(template.render(context))
 
     try:
-        install_app(project_root)
+        with acquire_environment_lock(app_workspace, f"scaffold-{project_name}", timeout=SCAFFOLD_LOCK_TIMEOUT):
+            install_app(project_root)
         return JsonResponse(
             {"status": "true", "message": "App scaffold Succeeded."}, status=200
         )
-    except Exception:
+    except Exception as e:
+        logger.error(e)
         return JsonResponse(
             {"status": "false", "message": "App scaffold failed. Check logs."},
             status=500,
@@ -0,0 +1,39 @@
+#!/bin/bash
+
+# Usage: mamba_batch_install.sh <comma separated conda channels> <app spec> [<app spec> ...]
+# Progress is reported with APPSTORE_EVENT lines and the json output of mamba/conda
+event() {
+    echo "APPSTORE_EVENT $1"
+}
+
+echo "Running Mamba Install"
+if hash micromamba; then
+    MAMBA_COMMAND=micromamba
+else
+    MAMBA_COMMAND=mamba
+fi
+
+CHANNEL_ARGS=()
+IFS=',' read -ra CHANNELS <<< "$1"
+for CHANNEL in "${CHANNELS[@]}"; do
+    CHANNEL_ARGS+=(-c "$CHANNEL")
+done
+shift
+
+event "{\"type\": \"solve_start\", \"tool\": \"$MAMBA_COMMAND\"}"
+if $MAMBA_COMMAND install -y --freeze-installed --json "${CHANNEL_ARGS[@]}" -c tethysplatform -c conda-forge "$@"; then
+    echo "Mamba Install Success"
+    event '{"type": "complete", "success": true}'
+else
+    echo "Mamba failed. Trying conda now."
+    event '{"type": "retry", "tool": "conda"}'
+    event '{"type": "solve_start", "tool": "conda"}'
+    if conda install -y --freeze-installed --json "${CHANNEL_ARGS[@]}" -c tethysplatform -c conda-forge "$@"; then
+        echo "Conda Install Success"
+        event '{"type": "complete", "success": true}'
+    else
+        event '{"type": "complete", "success": false}'
+    fi
+fi
+
+echo "Install Complete"
@@ -1,5 +1,10 @@
 #!/bin/bash
 
+# Progress is reported with APPSTORE_EVENT lines and the json output of mamba/conda
+event() {
+    echo "APPSTORE_EVENT $1"
+}
+
 echo "Running Mamba Install"
 if hash micromamba; then
     MAMBA_COMMAND=micromamba
@@ -7,11 +12,20 @@ else
     MAMBA_COMMAND=mamba
 fi
 
-if $MAMBA_COMMAND install -y --freeze-installed -q -c $2 -c tethysplatform -c conda-forge $1; then
+event "{\"type\": \"solve_start\", \"tool\": \"$MAMBA_COMMAND\"}"
+if $MAMBA_COMMAND install -y --freeze-installed --json -c $2 -c tethysplatform -c conda-forge $1; then
     echo "Mamba Install Success"
+    event '{"type": "complete", "success": true}'
 else
     echo "Mamba failed. Trying conda now."
-    conda install -y --freeze-installed -q -c $2 -c tethysplatform -c conda-forge $1 || echo "Conda Install Success"
+    event '{"type": "retry", "tool": "conda"}'
+    event '{"type": "solve_start", "tool": "conda"}'
+    if conda install -y --freeze-installed --json -c $2 -c tethysplatform -c conda-forge $1; then
+        echo "Conda Install Success"
+        event '{"type": "complete", "success": true}'
+    else
+        event '{"type": "complete", "success": false}'
+    fi
 fi
 
 echo "Install Complete"
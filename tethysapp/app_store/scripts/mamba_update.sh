@@ -1,5 +1,10 @@
 #!/bin/bash
 
+# Progress is reported with APPSTORE_EVENT lines and the json output of mamba
+event() {
+    echo "APPSTORE_EVENT $1"
+}
+
 echo "Running Mamba Update"
 if hash micromamba; then
     MAMBA_COMMAND=micromamba
@@ -7,5 +12,10 @@ else
     MAMBA_COMMAND=mamba
 fi
 
-$MAMBA_COMMAND install -y  -q -c $2 -c tethysplatform -c conda-forge $1
-echo "Mamba Update Complete"
\ No newline at end of file
+event "{\"type\": \"solve_start\", \"tool\": \"$MAMBA_COMMAND\"}"
+if $MAMBA_COMMAND install -y --json -c $2 -c tethysplatform -c conda-forge $1; then
+    event '{"type": "complete", "success": true}'
+else
+    event '{"type": "complete", "success": false}'
+fi
+echo "Mamba Update Complete"
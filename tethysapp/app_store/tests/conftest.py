@@ -6,6 +6,7 @@ import json
 from tethys_apps.base import TethysAppBase
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
+from tethysapp.app_store.process_runner import ProcessResult
 
 
 class TestApp(TethysAppBase):
@@ -431,3 +432,24 @@ def app_store_workspace(tmp_path, complex_tethysapp):
     statusfile_log.touch()
 
     return workspace
+
+
+@pytest.fixture()
+def mock_run_process(mocker):
+    """Patch run_process in a module with a fake that streams the given lines and returns the given exit code"""
+
+    def patch_run_process(module, lines=None, returncode=0):
+        mock = mocker.patch(f"{module}.run_process")
+        mock.lines = lines or []
+        mock.returncode = returncode
+
+        def fake_run_process(command, on_line=None, **kwargs):
+            for line in mock.lines:
+                if on_line:
+                    on_line(line)
+            return ProcessResult(mock.returncode)
+
+        mock.side_effect = fake_run_process
+        return mock
+
+    return patch_run_process
@@ -2,6 +2,10 @@ from tethysapp.app_store.controllers import (
     home,
     get_available_stores,
     get_merged_resources,
+    get_workspace_storage_usage,
+    get_tethys_compatibility_report,
+    get_install_plan,
+    cancel_job,
 )
 from tethysapp.app_store.helpers import html_label_styles
 from unittest.mock import call, MagicMock
@@ -197,3 +201,189 @@ def test_get_merged_resources(
         "tethysVersion": "4.0.0",
     }
     assert json.loads(object_stores.content) == expected_list_stores
+
+
+def test_get_workspace_storage_usage(mocker, mock_admin_get_request, tmp_path):
+    request = mock_admin_get_request("/app-store/workspace_usage")
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    usage = {
+        "totalSize": 10,
+        "quota": 100,
+        "percentUsed": 10.0,
+        "artifactCount": 1,
+        "artifacts": [{"path": "artifact", "size": 10, "lastAccess": 10}],
+    }
+    mocker.patch(
+        "tethysapp.app_store.controllers.get_workspace_usage", return_value=usage
+    )
+
+    response = get_workspace_storage_usage(request)
+
+    assert json.loads(response.content) == usage
+
+
+def test_get_tethys_compatibility_report(mocker, mock_admin_get_request, tmp_path):
+    request = mock_admin_get_request(
+        "/app-store/compatibility_report", {"tethys_versions": "4.2.0, 5.0.0"}
+    )
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    report = {"tethysVersions": ["4.2.0", "5.0.0"], "installedApps": {}}
+    mock_report = mocker.patch(
+        "tethysapp.app_store.controllers.get_compatibility_report", return_value=report
+    )
+
+    response = get_tethys_compatibility_report(request)
+
+    assert json.loads(response.content) == report
+    assert mock_report.call_args.args[1] == ["4.2.0", "5.0.0"]
+
+
+def test_get_tethys_compatibility_report_no_versions(mocker, mock_admin_get_request, tmp_path):
+    request = mock_admin_get_request("/app-store/compatibility_report")
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+
+    response = get_tethys_compatibility_report(request)
+
+    assert response.status_code == 400
+
+
+def test_get_install_plan(mocker, mock_admin_get_request, tmp_path, resource):
+    request = mock_admin_get_request(
+        "/app-store/install_plan",
+        {"name": "test_app", "channel": "test_channel", "label": "main", "update": "true"},
+    )
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    mocker.patch(
+        "tethysapp.app_store.controllers.get_resource",
+        return_value=resource("test_app", "test_channel", "main"),
+    )
+    plan = {"success": True, "specs": []}
+    mock_plan = mocker.patch(
+        "tethysapp.app_store.controllers.request_install_plan", return_value=plan
+    )
+
+    response = get_install_plan(request)
+
+    assert json.loads(response.content) == plan
+    mock_plan.assert_called_once_with(
+        [{"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}],
+        update=True,
+        refresh=False,
+    )
+
+
+def test_get_install_plan_incompatible_latest_version(mocker, mock_admin_get_request, tmp_path, resource):
+    request = mock_admin_get_request(
+        "/app-store/install_plan", {"name": "test_app", "channel": "test_channel", "label": "main"}
+    )
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource["latestVersion"]["test_channel"]["main"] = "1.0*"
+    mocker.patch("tethysapp.app_store.controllers.get_resource", return_value=app_resource)
+    mock_plan = mocker.patch("tethysapp.app_store.controllers.request_install_plan")
+
+    response = get_install_plan(request)
+
+    assert response.status_code == 400
+    assert json.loads(response.content) == {
+        "error": "The latest version of test_app is not compatible with this Tethys Portal. "
+        "Choose a version to install."
+    }
+    mock_plan.assert_not_called()
+
+
+def test_get_install_plan_pending(mocker, mock_admin_get_request, tmp_path):
+    request = mock_admin_get_request(
+        "/app-store/install_plan", {"name": "test_app", "channel": "test_channel", "version": "1.0"}
+    )
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    mocker.patch("tethysapp.app_store.controllers.request_install_plan", return_value=None)
+
+    response = get_install_plan(request)
+
+    assert response.status_code == 202
+    assert json.loads(response.content)["pending"]
+
+
+def test_cancel_job(mocker, rf, admin_user, tmp_path):
+    request = rf.post("/app-store/cancel_job", {"name": "test_app"})
+    request.user = admin_user
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    job = {"id": "job_id", "type": "begin_install", "state": "running"}
+    mock_cancel = mocker.patch(
+        "tethysapp.app_store.controllers.cancel_scheduled_job", return_value=job
+    )
+
+    response = cancel_job(request)
+
+    assert json.loads(response.content) == {"job": job}
+    mock_cancel.assert_called_once_with(mocker.ANY, job_id=None, name="test_app")
+
+
+def test_cancel_job_other_process(mocker, rf, admin_user, tmp_path):
+    request = rf.post("/app-store/cancel_job", {"job_id": "job_id"})
+    request.user = admin_user
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    job = {"id": "job_id", "data": {"name": None}, "state": "cancelPending", "cancelRequestId": "request_id"}
+    mocker.patch(
+        "tethysapp.app_store.controllers.cancel_scheduled_job", return_value=job
+    )
+
+    response = cancel_job(request)
+
+    assert response.status_code == 202
+    assert json.loads(response.content) == {"job": job}
+
+
+def test_cancel_job_not_cancellable(mocker, rf, admin_user, tmp_path):
+    request = rf.post("/app-store/cancel_job", {"job_id": "job_id"})
+    request.user = admin_user
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    mocker.patch(
+        "tethysapp.app_store.controllers.cancel_scheduled_job", return_value=None
+    )
+
+    response = cancel_job(request)
+
+    assert response.status_code == 409
+
+
+def test_cancel_job_bad_request(mocker, mock_admin_get_request, rf, admin_user, tmp_path):
+    mocker.patch(
+        "tethys_apps.base.workspace.get_app_workspace", return_value=str(tmp_path)
+    )
+    mocker.patch("tethys_apps.utilities.get_active_app")
+    response = cancel_job(mock_admin_get_request("/app-store/cancel_job", {"name": "test_app"}))
+    assert response.status_code == 405
+
+    request = rf.post("/app-store/cancel_job", {})
+    request.user = admin_user
+    response = cancel_job(request)
+    assert response.status_code == 400
@@ -2,6 +2,7 @@ import pytest
 import json
 from unittest.mock import MagicMock
 from django.urls import reverse
+from tethysapp.app_store.environment_lock import get_environment_lock_status
 
 
 @pytest.mark.django_db
@@ -65,7 +66,7 @@ def test_scaffold_command(mock_admin_api_post_request, mocker, tmp_path):
     json_response = json.loads(api_response.content)
     assert json_response["status"] == "true"
     assert json_response["message"] == "App scaffold Succeeded."
-    assert (tmp_path / "install_status" / "scaffoldRunning").is_file()
+    assert get_environment_lock_status(mock_workspace)["lease"] is None
     app_name = data["name"].replace("-", "_").lower()
     assert (tmp_path / "develop" / f"tethysapp-{app_name}" / "install.yml").is_file()
     assert (tmp_path / "develop" / f"tethysapp-{app_name}" / "setup.py").is_file()
@@ -224,7 +225,6 @@ def test_scaffold_command_unable_to_overwrite(
         json_response["message"]
         == f"Error: Unable to overwrite {str(project_root)}. Please remove the directory and try again."
     )  # noqa: E501
-    assert (tmp_path / "install_status" / "scaffoldRunning").is_file()
 
 
 @pytest.mark.django_db
@@ -267,7 +267,6 @@ def test_scaffold_command_overwrite_false(
         == f"Error: App directory exists {project_root} and Overwrite was not permitted. "
         "Please remove the directory and try again."
     )
-    assert (tmp_path / "install_status" / "scaffoldRunning").is_file()
 
 
 @pytest.mark.django_db
@@ -300,7 +299,7 @@ def test_scaffold_command_install_failed(mock_admin_api_post_request, mocker, tm
     json_response = json.loads(api_response.content)
     assert json_response["status"] == "false"
     assert json_response["message"] == "App scaffold failed. Check logs."
-    assert (tmp_path / "install_status" / "scaffoldRunning").is_file()
+    assert get_environment_lock_status(mock_workspace)["lease"] is None
     app_name = data["name"].replace("-", "_").lower()
     assert (tmp_path / "develop" / f"tethysapp-{app_name}" / "install.yml").is_file()
     assert (tmp_path / "develop" / f"tethysapp-{app_name}" / "setup.py").is_file()
@@ -0,0 +1,152 @@
+import pytest
+from tethysapp.app_store.app_declarations import (
+    AppDeclarations,
+    DynamicDeclarationError,
+    parse_app_declarations,
+    get_app_declarations,
+)
+
+APP_PY = '''
+from tethys_sdk.app_settings import CustomSetting, PersistentStoreDatabaseSetting
+from tethys_sdk.base import TethysAppBase
+
+
+class TestApp(TethysAppBase):
+    """Tethys app class for Test App."""
+
+    name = "Test App"
+    package = "test_app"
+    index = "home"
+
+    def custom_settings(self):
+        """Custom settings of the app."""
+        custom_settings = (
+            CustomSetting(
+                name="max_count",
+                type=CustomSetting.TYPE_INTEGER,
+                description="Maximum number of items.",
+                required=True,
+                default=10,
+            ),
+            CustomSetting(name="title", type=CustomSetting.TYPE_STRING),
+        )
+        return custom_settings
+
+    def persistent_store_settings(self):
+        return [
+            PersistentStoreDatabaseSetting(name="primary_db", description="Primary database.", required=True),
+        ]
+'''
+
+
+def write_app_py(tmp_path, content):
+    app_package = tmp_path / "test_app"
+    app_package.mkdir()
+    (app_package / "app.py").write_text(content)
+    return app_package
+
+
+def test_parse_app_declarations(tmp_path):
+    app_package = write_app_py(tmp_path, APP_PY)
+
+    app_declarations = parse_app_declarations(str(app_package / "app.py"))
+
+    assert app_declarations.name == "Test App"
+    assert app_declarations.package == "test_app"
+    custom_settings = app_declarations.custom_settings()
+    assert [setting.name for setting in custom_settings] == ["max_count", "title"]
+    assert custom_settings[0].description == "Maximum number of items."
+    assert custom_settings[0].required
+    assert custom_settings[0].default == 10
+    assert custom_settings[1].description == ""
+    assert not custom_settings[1].required
+    assert custom_settings[1].default is None
+    service_settings = app_declarations.declared_service_settings
+    assert list(service_settings) == ["persistent_store_settings"]
+    assert service_settings["persistent_store_settings"][0].name == "primary_db"
+    assert service_settings["persistent_store_settings"][0].setting_class == "PersistentStoreDatabaseSetting"
+
+
+def test_parse_app_declarations_no_settings(tmp_path):
+    content = '''
+from tethys_sdk.base import TethysAppBase
+
+
+class TestApp(TethysAppBase):
+    name = "Test App"
+    package = "test_app"
+
+    def custom_settings(self):
+        return None
+'''
+    app_package = write_app_py(tmp_path, content)
+
+    app_declarations = parse_app_declarations(str(app_package / "app.py"))
+
+    assert app_declarations.custom_settings() == []
+    assert app_declarations.declared_service_settings == {}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        # Settings built in a loop
+        "settings = []\n        for name in ['a', 'b']:\n            settings.append(CustomSetting(name=name))\n"
+        "        return settings",
+        # Default computed at runtime
+        "return [CustomSetting(name='path', default=get_default_path())]",
+        # Settings returned from a helper
+        "return build_settings()",
+        # Positional arguments
+        "return [CustomSetting('title', CustomSetting.TYPE_STRING)]",
+    ],
+)
+def test_parse_app_declarations_dynamic(tmp_path, body):
+    content = f'''
+class TestApp(TethysAppBase):
+    name = "Test App"
+    package = "test_app"
+
+    def custom_settings(self):
+        {body}
+'''
+    app_package = write_app_py(tmp_path, content)
+
+    with pytest.raises(DynamicDeclarationError):
+        parse_app_declarations(str(app_package / "app.py"))
+
+
+def test_parse_app_declarations_no_app_class(tmp_path):
+    app_package = write_app_py(tmp_path, "class TestApp(BaseApp):\n    package = 'test_app'\n")
+
+    with pytest.raises(DynamicDeclarationError):
+        parse_app_declarations(str(app_package / "app.py"))
+
+
+def test_get_app_declarations(mocker, tmp_path):
+    app_package = write_app_py(tmp_path, APP_PY)
+    mock_load_app_instance = mocker.patch("tethysapp.app_store.app_declarations.load_app_instance")
+
+    app_declarations = get_app_declarations(str(app_package))
+
+    assert isinstance(app_declarations, AppDeclarations)
+    mock_load_app_instance.assert_not_called()
+
+
+def test_get_app_declarations_fallback(mocker, tmp_path, caplog):
+    app_package = write_app_py(tmp_path, "class TestApp(TethysAppBase):\n    package = get_package()\n")
+    mock_load_app_instance = mocker.patch("tethysapp.app_store.app_declarations.load_app_instance")
+
+    app_declarations = get_app_declarations(str(app_package))
+
+    assert app_declarations == mock_load_app_instance.return_value
+    mock_load_app_instance.assert_called_once_with(str(app_package))
+    assert any(message.startswith("Importing the app to read its settings.") for message in caplog.messages)
+
+
+def test_get_app_declarations_namespace_folder(mocker, tmp_path):
+    mock_load_app_instance = mocker.patch("tethysapp.app_store.app_declarations.load_app_instance")
+
+    app_declarations = get_app_declarations(str(tmp_path))
+
+    assert app_declarations == mock_load_app_instance.return_value
@@ -0,0 +1,213 @@
+import sys
+import json
+import types
+import importlib.metadata
+from pathlib import PurePosixPath
+from unittest.mock import MagicMock
+from tethysapp.app_store import app_discovery
+from tethysapp.app_store.app_discovery import (
+    find_app_package_in_conda_meta,
+    find_app_package_in_dist_info,
+    find_app_package,
+    add_to_tethysapp_path,
+    get_app_class,
+    load_app_instance,
+    invalidate_app_instance,
+)
+
+
+def write_conda_meta(prefix, name, files):
+    conda_meta = prefix / "conda-meta"
+    conda_meta.mkdir(parents=True, exist_ok=True)
+    record = {"name": name, "version": "1.0", "files": files}
+    (conda_meta / f"{name}-1.0-py_0.json").write_text(json.dumps(record))
+
+
+def test_find_app_package_in_conda_meta(tmp_path):
+    write_conda_meta(
+        tmp_path,
+        "test_app",
+        [
+            "lib/python3.10/site-packages/tethysapp/test_app/__init__.py",
+            "lib/python3.10/site-packages/tethysapp/test_app/app.py",
+        ],
+    )
+    # An app whose name starts with the same name must not match
+    write_conda_meta(
+        tmp_path,
+        "test_app-extra",
+        ["lib/python3.10/site-packages/tethysapp/test_app_extra/app.py"],
+    )
+
+    app_package_path = find_app_package_in_conda_meta("test_app", prefix=str(tmp_path))
+
+    assert app_package_path == str(tmp_path / "lib" / "python3.10" / "site-packages" / "tethysapp" / "test_app")
+
+
+def test_find_app_package_in_conda_meta_not_found(tmp_path):
+    write_conda_meta(tmp_path, "test_app", ["lib/python3.10/site-packages/test_app/__init__.py"])
+    (tmp_path / "conda-meta" / "test_app-bad.json").write_text("not json")
+
+    assert find_app_package_in_conda_meta("test_app", prefix=str(tmp_path)) is None
+    assert find_app_package_in_conda_meta("other_app", prefix=str(tmp_path)) is None
+
+
+def test_find_app_package_in_dist_info(mocker, tmp_path):
+    mock_distribution = MagicMock()
+    mock_distribution.files = [
+        PurePosixPath("tethysapp/test_app/__init__.py"),
+        PurePosixPath("tethysapp/test_app/app.py"),
+    ]
+    mock_distribution.locate_file.side_effect = lambda file_path: tmp_path / file_path
+    mock_metadata = mocker.patch("tethysapp.app_store.app_discovery.importlib.metadata.distribution")
+    mock_metadata.side_effect = [
+        importlib.metadata.PackageNotFoundError("test_app"),
+        mock_distribution,
+    ]
+
+    app_package_path = find_app_package_in_dist_info("test_app")
+
+    assert app_package_path == str(tmp_path / "tethysapp" / "test_app")
+    assert mock_metadata.call_args.args == ("tethysapp-test_app",)
+
+
+def test_find_app_package(mocker, tmp_path):
+    app_package = tmp_path / "tethysapp" / "test_app"
+    app_package.mkdir(parents=True)
+    (app_package / "app.py").touch()
+    mocker.patch("tethysapp.app_store.app_discovery.find_app_package_in_conda_meta", return_value=None)
+    mocker.patch("tethysapp.app_store.app_discovery.find_app_package_in_dist_info", return_value=None)
+    mocker.patch("tethysapp.app_store.app_discovery.get_app_package_path", return_value=str(app_package))
+
+    assert find_app_package("test_app") == str(app_package)
+
+
+def test_find_app_package_no_app_py(mocker, tmp_path):
+    mocker.patch("tethysapp.app_store.app_discovery.find_app_package_in_conda_meta", return_value=str(tmp_path))
+    mock_dist_info = mocker.patch("tethysapp.app_store.app_discovery.find_app_package_in_dist_info")
+
+    assert find_app_package("test_app") is None
+    mock_dist_info.assert_not_called()
+
+
+def test_add_to_tethysapp_path(mocker, tmp_path):
+    mock_tethysapp = mocker.patch("tethysapp.app_store.app_discovery.tethysapp")
+    mock_tethysapp.__path__ = []
+    app_package = tmp_path / "tethysapp" / "test_app"
+
+    add_to_tethysapp_path(str(app_package))
+    add_to_tethysapp_path(str(app_package))
+
+    assert mock_tethysapp.__path__ == [str(tmp_path / "tethysapp")]
+
+
+def test_get_app_class(tethysapp):
+    class ImportedApp(tethysapp):
+        pass
+
+    ImportedApp.__module__ = "tethysapp.other_app.app"
+    app_module = types.ModuleType("tethysapp.test_app.app")
+    app_module.ImportedApp = ImportedApp
+    app_module.TestApp = tethysapp
+    tethysapp_module = tethysapp.__module__
+    tethysapp.__module__ = "tethysapp.test_app.app"
+    try:
+        assert get_app_class(app_module) is tethysapp
+    finally:
+        tethysapp.__module__ = tethysapp_module
+
+
+def test_get_app_class_no_app():
+    app_module = types.ModuleType("tethysapp.test_app.app")
+    app_module.value = "Not a Class"
+
+    assert get_app_class(app_module) is None
+
+
+def test_load_app_instance(mocker, tmp_path, tethysapp):
+    app_package = tmp_path / "tethysapp" / "test_app"
+    app_package.mkdir(parents=True)
+    (app_package / "app.py").touch()
+    mocker.patch.dict("tethysapp.app_store.app_discovery._app_instances", clear=True)
+    mock_add_to_path = mocker.patch("tethysapp.app_store.app_discovery.add_to_tethysapp_path")
+    mocker.patch("tethysapp.app_store.app_discovery.get_app_class", return_value=tethysapp)
+    # Patched last since mocker resolves the patch targets with import_module
+    mock_import = mocker.patch("tethysapp.app_store.app_discovery.importlib.import_module")
+    mock_sync = mocker.patch.object(tethysapp, "sync_with_tethys_db", create=True)
+
+    app_instance = load_app_instance(str(app_package))
+
+    assert app_instance.init_ran
+    mock_add_to_path.assert_called_once_with(str(app_package))
+    mock_import.assert_called_once_with("tethysapp.test_app.app")
+    mock_sync.assert_called_once()
+
+
+def test_load_app_instance_namespace_folder(mocker, tmp_path):
+    mock_get_instance = mocker.patch("tethysapp.app_store.app_discovery.get_app_instance_from_path")
+    mock_import = mocker.patch("tethysapp.app_store.app_discovery.importlib.import_module")
+
+    app_instance = load_app_instance(str(tmp_path))
+
+    assert app_instance == mock_get_instance.return_value
+    mock_get_instance.assert_called_once_with([str(tmp_path)])
+    mock_import.assert_not_called()
+
+
+def test_load_app_instance_no_app_class(mocker, tmp_path, caplog):
+    (tmp_path / "app.py").touch()
+    mocker.patch.dict("tethysapp.app_store.app_discovery._app_instances", clear=True)
+    mocker.patch("tethysapp.app_store.app_discovery.add_to_tethysapp_path")
+    mocker.patch("tethysapp.app_store.app_discovery.get_app_class", return_value=None)
+    mock_import = mocker.patch("tethysapp.app_store.app_discovery.importlib.import_module")
+    mock_import.return_value.__name__ = "tethysapp.test_app.app"
+
+    assert load_app_instance(str(tmp_path)) is None
+    assert "Couldn't find the app class in tethysapp.test_app.app" in caplog.messages
+
+
+def test_load_app_instance_reuses_instance(mocker, tmp_path, tethysapp):
+    app_package = tmp_path / "tethysapp" / "test_app"
+    app_package.mkdir(parents=True)
+    (app_package / "app.py").touch()
+    mocker.patch.dict("tethysapp.app_store.app_discovery._app_instances", clear=True)
+    mocker.patch("tethysapp.app_store.app_discovery.add_to_tethysapp_path")
+    mocker.patch("tethysapp.app_store.app_discovery.get_app_class", return_value=tethysapp)
+    # Patched last since mocker resolves the patch targets with import_module
+    mock_import = mocker.patch("tethysapp.app_store.app_discovery.importlib.import_module")
+    mock_sync = mocker.patch.object(tethysapp, "sync_with_tethys_db", create=True)
+
+    app_instance = load_app_instance(str(app_package))
+
+    assert load_app_instance(str(app_package)) is app_instance
+    mock_import.assert_called_once()
+    mock_sync.assert_called_once()
+
+    invalidate_app_instance("test_app")
+
+    assert load_app_instance(str(app_package)) is not app_instance
+    assert mock_import.call_count == 2
+    assert mock_sync.call_count == 2
+
+
+def test_invalidate_app_instance(mocker):
+    mocker.patch.dict(
+        "tethysapp.app_store.app_discovery._app_instances",
+        {("test_app", "/path/test_app"): "test_app", ("other_app", "/path/other_app"): "other_app"},
+        clear=True,
+    )
+    mocker.patch.dict(
+        "sys.modules",
+        {
+            "tethysapp.test_app": "module",
+            "tethysapp.test_app.app": "module",
+            "tethysapp.test_app_extra": "module",
+        },
+    )
+
+    invalidate_app_instance("test_app")
+
+    assert app_discovery._app_instances == {("other_app", "/path/other_app"): "other_app"}
+    assert "tethysapp.test_app" not in sys.modules
+    assert "tethysapp.test_app.app" not in sys.modules
+    assert "tethysapp.test_app_extra" in sys.modules
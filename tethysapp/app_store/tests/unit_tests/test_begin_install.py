@@ -1,11 +1,35 @@
 from unittest.mock import call, MagicMock
+import pytest
 import yaml
+from tethysapp.app_store.process_runner import ProcessCancelled
 from tethysapp.app_store.begin_install import (
     handle_property_not_present,
     process_post_install_scripts,
     detect_app_dependencies,
     begin_install,
+    batch_install,
+    resume_install,
 )
+from tethysapp.app_store.install_journal import (
+    InstallJournal,
+    get_interrupted_journals,
+    CONDA_INSTALL,
+    APP_DEPENDENCIES,
+    JOURNAL_COMPLETED,
+    JOURNAL_FAILED,
+)
+
+
+@pytest.fixture(autouse=True)
+def journal_dir(mocker, tmp_path):
+    journal_dir = tmp_path / "journals"
+    journal_dir.mkdir()
+    mocker.patch("tethysapp.app_store.install_journal.get_journal_dir", return_value=str(journal_dir))
+    return journal_dir
+
+
+def get_journals(journal_dir):
+    return [InstallJournal.load(MagicMock(), path.stem).journal for path in journal_dir.glob("*.json")]
 
 
 def test_handle_property_not_present():
@@ -20,28 +44,28 @@ def test_process_post_install_scripts(tmp_path):
 
 
 def test_detect_app_dependencies_pip_no_settings(
-    mocker, tethysapp_base_with_application_files
+    mock_run_process, mocker, tethysapp_base_with_application_files
 ):
     app_name = "test_app"
     channel_layer = MagicMock()
     mock_ws = MagicMock()
-    mocker.patch("tethysapp.app_store.begin_install.call")
-    mocker.patch("tethysapp.app_store.begin_install.cache")
-    mocker.patch("tethysapp.app_store.begin_install.importlib")
-    mock_subprocess = mocker.patch("tethysapp.app_store.begin_install.subprocess")
-    mock_subprocess.Popen().stdout.readline.side_effect = [
+    mocker.patch("tethysapp.app_store.begin_install.sync_tethys_db")
+    mocker.patch("tethysapp.app_store.begin_install.add_to_tethysapp_path")
+    mock_rp = mock_run_process("tethysapp.app_store.begin_install")
+    mock_rp.lines = [
         "still_running",
         "PIP Install Complete",
     ]
-    mock_tethysapp = mocker.patch("tethysapp.app_store.begin_install.tethysapp")
     mock_app = MagicMock()
     mock_app.custom_settings.return_value = []
     mocker.patch(
-        "tethysapp.app_store.begin_install.get_app_instance_from_path",
+        "tethysapp.app_store.begin_install.get_app_declarations",
         return_value=mock_app,
     )
-
-    mock_tethysapp.__path__ = [str(tethysapp_base_with_application_files / "tethysapp")]
+    mocker.patch(
+        "tethysapp.app_store.begin_install.find_app_package",
+        return_value=str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
+    )
 
     detect_app_dependencies(app_name, channel_layer, mock_ws)
 
@@ -49,7 +73,7 @@ def test_detect_app_dependencies_pip_no_settings(
         "data": [],
         "returnMethod": "set_custom_settings",
         "jsHelperFunction": "processCustomSettings",
-        "app_py_path": str(tethysapp_base_with_application_files / "tethysapp"),
+        "app_py_path": str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
     }
     mock_ws.assert_has_calls(
         [
@@ -58,21 +82,18 @@ def test_detect_app_dependencies_pip_no_settings(
             call(expected_data_json, channel_layer),
         ]
     )
-    assert mock_subprocess.Popen().stdout.readline.call_count == 2
+    mock_rp.assert_called_once()
 
 
 def test_detect_app_dependencies_pip_settings(
-    mocker, tethysapp_base_with_application_files
+    mock_run_process, mocker, tethysapp_base_with_application_files
 ):
     app_name = "test_app"
     channel_layer = MagicMock()
     mock_ws = MagicMock()
-    mocker.patch("tethysapp.app_store.begin_install.call")
-    mocker.patch("tethysapp.app_store.begin_install.cache")
-    mocker.patch("tethysapp.app_store.begin_install.importlib")
-    mock_subprocess = mocker.patch("tethysapp.app_store.begin_install.subprocess")
-    mock_subprocess.Popen().stdout.readline.side_effect = [""]
-    mock_tethysapp = mocker.patch("tethysapp.app_store.begin_install.tethysapp")
+    mocker.patch("tethysapp.app_store.begin_install.sync_tethys_db")
+    mocker.patch("tethysapp.app_store.begin_install.add_to_tethysapp_path")
+    mock_rp = mock_run_process("tethysapp.app_store.begin_install")
     mock_app = MagicMock()
     mock_setting = MagicMock(
         default="some_value", description="description", required=True
@@ -80,11 +101,13 @@ def test_detect_app_dependencies_pip_settings(
     mock_setting.name = "name"
     mock_app.custom_settings.return_value = [mock_setting]
     mocker.patch(
-        "tethysapp.app_store.begin_install.get_app_instance_from_path",
+        "tethysapp.app_store.begin_install.get_app_declarations",
         return_value=mock_app,
     )
-
-    mock_tethysapp.__path__ = [str(tethysapp_base_with_application_files / "tethysapp")]
+    mocker.patch(
+        "tethysapp.app_store.begin_install.find_app_package",
+        return_value=str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
+    )
 
     detect_app_dependencies(app_name, channel_layer, mock_ws)
 
@@ -99,7 +122,7 @@ def test_detect_app_dependencies_pip_settings(
         ],
         "returnMethod": "set_custom_settings",
         "jsHelperFunction": "processCustomSettings",
-        "app_py_path": str(tethysapp_base_with_application_files / "tethysapp"),
+        "app_py_path": str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
     }
     mock_ws.assert_has_calls(
         [
@@ -109,21 +132,18 @@ def test_detect_app_dependencies_pip_settings(
             call(expected_data_json, channel_layer),
         ]
     )
-    assert mock_subprocess.Popen().stdout.readline.call_count == 1
+    mock_rp.assert_called_once()
 
 
 def test_detect_app_dependencies_pip_settings_workspace_default(
-    mocker, tethysapp_base_with_application_files, tmp_path
+    mock_run_process, mocker, tethysapp_base_with_application_files, tmp_path
 ):
     app_name = "test_app"
     channel_layer = MagicMock()
     mock_ws = MagicMock()
-    mocker.patch("tethysapp.app_store.begin_install.call")
-    mocker.patch("tethysapp.app_store.begin_install.cache")
-    mocker.patch("tethysapp.app_store.begin_install.importlib")
-    mock_subprocess = mocker.patch("tethysapp.app_store.begin_install.subprocess")
-    mock_subprocess.Popen().stdout.readline.side_effect = [""]
-    mock_tethysapp = mocker.patch("tethysapp.app_store.begin_install.tethysapp")
+    mocker.patch("tethysapp.app_store.begin_install.sync_tethys_db")
+    mocker.patch("tethysapp.app_store.begin_install.add_to_tethysapp_path")
+    mock_rp = mock_run_process("tethysapp.app_store.begin_install")
     mock_app = MagicMock()
     mock_workspace = MagicMock(path=str(tmp_path))
     mocker.patch("tethysapp.app_store.begin_install.isinstance", return_value=True)
@@ -133,11 +153,13 @@ def test_detect_app_dependencies_pip_settings_workspace_default(
     mock_setting.name = "name"
     mock_app.custom_settings.return_value = [mock_setting]
     mocker.patch(
-        "tethysapp.app_store.begin_install.get_app_instance_from_path",
+        "tethysapp.app_store.begin_install.get_app_declarations",
         return_value=mock_app,
     )
-
-    mock_tethysapp.__path__ = [str(tethysapp_base_with_application_files / "tethysapp")]
+    mocker.patch(
+        "tethysapp.app_store.begin_install.find_app_package",
+        return_value=str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
+    )
 
     detect_app_dependencies(app_name, channel_layer, mock_ws)
 
@@ -152,7 +174,7 @@ def test_detect_app_dependencies_pip_settings_workspace_default(
         ],
         "returnMethod": "set_custom_settings",
         "jsHelperFunction": "processCustomSettings",
-        "app_py_path": str(tethysapp_base_with_application_files / "tethysapp"),
+        "app_py_path": str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
     }
     mock_ws.assert_has_calls(
         [
@@ -162,11 +184,42 @@ def test_detect_app_dependencies_pip_settings_workspace_default(
             call(expected_data_json, channel_layer),
         ]
     )
-    assert mock_subprocess.Popen().stdout.readline.call_count == 1
+    mock_rp.assert_called_once()
+
+
+def test_detect_app_dependencies_pip_failed(
+    mock_run_process, mocker, tethysapp_base_with_application_files, caplog
+):
+    app_name = "test_app"
+    channel_layer = MagicMock()
+    mock_ws = MagicMock()
+    mocker.patch("tethysapp.app_store.begin_install.sync_tethys_db")
+    mocker.patch("tethysapp.app_store.begin_install.add_to_tethysapp_path")
+    mock_run_process("tethysapp.app_store.begin_install", returncode=1)
+    mock_app = MagicMock()
+    mock_app.custom_settings.return_value = []
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_app_declarations",
+        return_value=mock_app,
+    )
+    mocker.patch(
+        "tethysapp.app_store.begin_install.find_app_package",
+        return_value=str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
+    )
+
+    detect_app_dependencies(app_name, channel_layer, mock_ws)
+
+    mock_ws.assert_has_calls(
+        [
+            call("Running PIP install....", channel_layer),
+            call("PIP install failed. Check logs for more details.", channel_layer),
+        ]
+    )
+    assert "PIP install failed. The process exited with code 1" in caplog.messages
 
 
 def test_detect_app_dependencies_no_pip_no_settings(
-    mocker, tethysapp_base_with_application_files
+    mock_run_process, mocker, tethysapp_base_with_application_files
 ):
     test_install_pip = (
         tethysapp_base_with_application_files
@@ -179,19 +232,19 @@ def test_detect_app_dependencies_no_pip_no_settings(
     app_name = "test_app"
     channel_layer = MagicMock()
     mock_ws = MagicMock()
-    mocker.patch("tethysapp.app_store.begin_install.call")
-    mocker.patch("tethysapp.app_store.begin_install.cache")
-    mocker.patch("tethysapp.app_store.begin_install.importlib")
-    mock_subprocess = mocker.patch("tethysapp.app_store.begin_install.subprocess")
-    mock_tethysapp = mocker.patch("tethysapp.app_store.begin_install.tethysapp")
+    mocker.patch("tethysapp.app_store.begin_install.sync_tethys_db")
+    mocker.patch("tethysapp.app_store.begin_install.add_to_tethysapp_path")
+    mock_rp = mock_run_process("tethysapp.app_store.begin_install")
     mock_app = MagicMock()
     mock_app.custom_settings.return_value = []
     mocker.patch(
-        "tethysapp.app_store.begin_install.get_app_instance_from_path",
+        "tethysapp.app_store.begin_install.get_app_declarations",
         return_value=mock_app,
     )
-
-    mock_tethysapp.__path__ = [str(tethysapp_base_with_application_files / "tethysapp")]
+    mocker.patch(
+        "tethysapp.app_store.begin_install.find_app_package",
+        return_value=str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
+    )
 
     detect_app_dependencies(app_name, channel_layer, mock_ws)
 
@@ -199,22 +252,19 @@ def test_detect_app_dependencies_no_pip_no_settings(
         "data": [],
         "returnMethod": "set_custom_settings",
         "jsHelperFunction": "processCustomSettings",
-        "app_py_path": str(tethysapp_base_with_application_files / "tethysapp"),
+        "app_py_path": str(tethysapp_base_with_application_files / "tethysapp" / "test_app"),
     }
     mock_ws.assert_called_once_with(expected_data_json, channel_layer)
-    assert mock_subprocess.Popen().stdout.readline.call_count == 0
+    mock_rp.assert_not_called()
 
 
 def test_detect_app_dependencies_no_app_path(mocker, caplog):
     app_name = "test_app"
     channel_layer = MagicMock()
     mock_ws = MagicMock()
-    mocker.patch("tethysapp.app_store.begin_install.call")
-    mocker.patch("tethysapp.app_store.begin_install.cache")
-    mocker.patch("tethysapp.app_store.begin_install.importlib")
-    mock_tethysapp = mocker.patch("tethysapp.app_store.begin_install.tethysapp")
-
-    mock_tethysapp.__path__ = []
+    mocker.patch("tethysapp.app_store.begin_install.sync_tethys_db")
+    mocker.patch("tethysapp.app_store.begin_install.add_to_tethysapp_path")
+    mocker.patch("tethysapp.app_store.begin_install.find_app_package", return_value=None)
 
     detect_app_dependencies(app_name, channel_layer, mock_ws)
 
@@ -346,7 +396,7 @@ def test_begin_install_proxyapp(
 
     mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
     mocker.patch(
-        "tethysapp.app_store.begin_install.subprocess.__file__", subprocess_location
+        "tethysapp.app_store.package_index.subprocess.__file__", subprocess_location
     )
     mocker.patch(
         "tethysapp.app_store.begin_install.get_resource", return_value=app_resource
@@ -391,6 +441,71 @@ def test_begin_install_proxyapp(
     )
 
 
+def test_begin_install_proxyapp_cancelled(
+    resource, mocker, proxyapp_site_package, test_files_dir
+):
+    mock_channel = MagicMock()
+    app_name = "proxyapp_test_app"
+    app_channel = "test_channel"
+    app_label = "main"
+    app_resource = resource(app_name, app_channel, app_label, app_type="proxyapp")
+    install_data = {
+        "name": app_name,
+        "label": app_label,
+        "channel": app_channel,
+        "version": app_resource["latestVersion"][app_channel][app_label],
+    }
+
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch(
+        "tethysapp.app_store.package_index.subprocess.__file__", str(proxyapp_site_package / "subprocess")
+    )
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_resource", return_value=app_resource
+    )
+    mocker.patch("tethysapp.app_store.begin_install.list_proxy_apps", return_value=[])
+    mocker.patch("tethysapp.app_store.begin_install.create_proxy_app")
+    mocker.patch("tethysapp.app_store.begin_install.mamba_download", return_value=True)
+    mocker.patch(
+        "tethysapp.app_store.begin_install.check_cancelled", side_effect=[None, ProcessCancelled()]
+    )
+    mock_delete_proxy_app = mocker.patch("tethysapp.app_store.begin_install.delete_proxy_app")
+
+    with pytest.raises(ProcessCancelled):
+        begin_install(install_data, mock_channel, MagicMock())
+
+    expected_proxy_app_data = yaml.safe_load(
+        (test_files_dir / "proxyapp.yaml").read_text()
+    )
+    mock_delete_proxy_app.assert_called_once_with(
+        {"app_name": expected_proxy_app_data["app_name"]}, mock_channel
+    )
+    mock_ws.assert_called_with("Application installation cancelled.", mock_channel)
+
+
+def test_begin_install_tethysapp_cancelled(resource, mocker):
+    mock_channel = MagicMock()
+    app_name = "test_app"
+    app_channel = "test_channel"
+    app_label = "main"
+    app_resource = resource(app_name, app_channel, app_label)
+    install_data = {"name": app_name, "label": app_label, "channel": app_channel, "version": ""}
+
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_resource", return_value=app_resource
+    )
+    mocker.patch("tethysapp.app_store.begin_install.get_cached_install_plan", return_value=None)
+    mocker.patch("tethysapp.app_store.begin_install.mamba_install", side_effect=ProcessCancelled())
+    mock_delete_proxy_app = mocker.patch("tethysapp.app_store.begin_install.delete_proxy_app")
+
+    with pytest.raises(ProcessCancelled):
+        begin_install(install_data, mock_channel, MagicMock())
+
+    mock_delete_proxy_app.assert_not_called()
+    mock_ws.assert_called_with("Application installation cancelled.", mock_channel)
+
+
 def test_begin_install_proxyapp_already_installed(resource, mocker, proxyapp):
     mock_channel = MagicMock()
     mock_workspace = MagicMock()
@@ -440,3 +555,363 @@ def test_begin_install_proxyapp_already_installed(resource, mocker, proxyapp):
             ),
         ]
     )
+
+
+def test_begin_install_tethysapp_incompatible_latest_version(resource, mocker):
+    mock_channel = MagicMock()
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource["latestVersion"]["test_channel"]["main"] = "1.0*"
+    install_data = {"name": "test_app", "label": "main", "channel": "test_channel", "version": ""}
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch("tethysapp.app_store.begin_install.get_resource", return_value=app_resource)
+    mock_install = mocker.patch("tethysapp.app_store.begin_install.mamba_install")
+    mock_batch_install = mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install")
+
+    begin_install(install_data, mock_channel, MagicMock())
+
+    mock_install.assert_not_called()
+    mock_batch_install.assert_not_called()
+    mock_ws.assert_has_calls(
+        [
+            call(
+                "The latest version of test_app is not compatible with this Tethys Portal. Choose a version to "
+                "install.",
+                mock_channel,
+            ),
+            call("Application installation failed. Check logs for more details.", mock_channel),
+        ]
+    )
+
+
+def test_batch_install(resource, mocker):
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock()
+    app_channel = "test_channel"
+    app_resource = resource("test_app", app_channel, "main")
+    app_resource2 = resource("test_app2", app_channel, "dev")
+    install_data = {
+        "apps": [
+            {"name": "test_app", "channel": app_channel, "label": "main", "version": "1.0"},
+            {"name": "test_app2", "channel": app_channel, "label": "dev", "version": ""},
+        ]
+    }
+
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_resource",
+        side_effect=[app_resource, app_resource2],
+    )
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_cached_install_plan", return_value=None
+    )
+    mock_install = mocker.patch(
+        "tethysapp.app_store.begin_install.mamba_batch_install", return_value=True
+    )
+    mock_deps = mocker.patch(
+        "tethysapp.app_store.begin_install.detect_app_dependencies"
+    )
+
+    batch_install(install_data, mock_channel, mock_workspace)
+
+    expected_apps = [
+        {"name": "test_app", "channel": app_channel, "label": "main", "version": "1.0"},
+        {
+            "name": "test_app2",
+            "channel": app_channel,
+            "label": "dev",
+            "version": app_resource2["latestVersion"][app_channel]["dev"],
+        },
+    ]
+    mock_install.assert_called_once_with(expected_apps, mock_channel, specs=None)
+    mock_deps.assert_has_calls(
+        [call("test_app", mock_channel), call("test_app2", mock_channel)]
+    )
+    mock_ws.assert_called_once_with(
+        "Starting installation of apps: test_app (1.0), test_app2 (1.0)", mock_channel
+    )
+
+
+def test_batch_install_proxyapp_and_missing_resource(resource, mocker):
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock()
+    app_channel = "test_channel"
+    proxy_resource = resource("proxyapp_test_app", app_channel, "main")
+    proxy_resource["app_type"] = "proxyapp"
+    proxy_data = {"name": "proxyapp_test_app", "channel": app_channel, "label": "main", "version": "1.0"}
+    install_data = {
+        "apps": [
+            proxy_data,
+            {"name": "missing_app", "channel": app_channel, "label": "main", "version": "1.0"},
+        ]
+    }
+
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_resource",
+        side_effect=[proxy_resource, None],
+    )
+    mock_begin_install = mocker.patch("tethysapp.app_store.begin_install.begin_install")
+    mock_install = mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install")
+
+    batch_install(install_data, mock_channel, mock_workspace)
+
+    mock_begin_install.assert_called_once_with(proxy_data, mock_channel, mock_workspace)
+    mock_ws.assert_called_once_with("Failed to get the missing_app resource", mock_channel)
+    mock_install.assert_not_called()
+
+
+def test_batch_install_incompatible_latest_version(resource, mocker):
+    mock_channel = MagicMock()
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource2 = resource("test_app2", "test_channel", "main")
+    app_resource2["latestVersion"]["test_channel"]["main"] = "2.0*"
+    install_data = {
+        "apps": [
+            {"name": "test_app", "channel": "test_channel", "label": "main", "version": ""},
+            {"name": "test_app2", "channel": "test_channel", "label": "main", "version": ""},
+        ]
+    }
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_resource",
+        side_effect=[app_resource, app_resource2],
+    )
+    mocker.patch("tethysapp.app_store.begin_install.get_cached_install_plan", return_value=None)
+    mock_install = mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install", return_value=True)
+    mocker.patch("tethysapp.app_store.begin_install.detect_app_dependencies")
+
+    batch_install(install_data, mock_channel, MagicMock())
+
+    # The incompatible latest version isn't installed as a fuzzy 2.0* spec
+    mock_install.assert_called_once_with(
+        [{"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}],
+        mock_channel,
+        specs=None,
+    )
+    mock_ws.assert_any_call(
+        "The latest version of test_app2 is not compatible with this Tethys Portal. Choose a version to install.",
+        mock_channel,
+    )
+
+
+def test_batch_install_failed_install(resource, mocker):
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock()
+    app_channel = "test_channel"
+    install_data = {
+        "apps": [{"name": "test_app", "channel": app_channel, "label": "main", "version": "1.0"}]
+    }
+
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_resource",
+        return_value=resource("test_app", app_channel, "main"),
+    )
+    mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install", return_value=False)
+    mock_deps = mocker.patch(
+        "tethysapp.app_store.begin_install.detect_app_dependencies"
+    )
+
+    batch_install(install_data, mock_channel, mock_workspace)
+
+    mock_ws.assert_called_with(
+        "Application installation failed. Check logs for more details.", mock_channel
+    )
+    mock_deps.assert_not_called()
+
+
+def test_batch_install_failed_dependencies(resource, mocker):
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock()
+    app_channel = "test_channel"
+    install_data = {
+        "apps": [
+            {"name": "test_app", "channel": app_channel, "label": "main", "version": "1.0"},
+            {"name": "test_app2", "channel": app_channel, "label": "main", "version": "1.0"},
+        ]
+    }
+
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_resource",
+        side_effect=[
+            resource("test_app", app_channel, "main"),
+            resource("test_app2", app_channel, "main"),
+        ],
+    )
+    mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install", return_value=True)
+    mock_deps = mocker.patch(
+        "tethysapp.app_store.begin_install.detect_app_dependencies",
+        side_effect=[Exception("no app.py"), None],
+    )
+
+    batch_install(install_data, mock_channel, mock_workspace)
+
+    assert mock_deps.call_count == 2
+    mock_ws.assert_called_with(
+        "Failed to process the dependencies of test_app. Check logs for more details.",
+        mock_channel,
+    )
+
+
+def test_begin_install_tethysapp_install_plan(resource, mocker):
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock()
+    app_name = "test_app"
+    app_channel = "test_channel"
+    app_label = "main"
+    app_resource = resource(app_name, app_channel, app_label)
+    install_data = {
+        "name": app_name,
+        "label": app_label,
+        "channel": app_channel,
+        "version": "",
+    }
+    install_plan = {"success": True, "specs": ["test_channel::test_app==1.0=py_0"]}
+
+    mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch(
+        "tethysapp.app_store.begin_install.get_resource", return_value=app_resource
+    )
+    mock_get_plan = mocker.patch(
+        "tethysapp.app_store.begin_install.get_cached_install_plan", return_value=install_plan
+    )
+    mock_install = mocker.patch("tethysapp.app_store.begin_install.mamba_install")
+    mock_batch_install = mocker.patch(
+        "tethysapp.app_store.begin_install.mamba_batch_install", return_value=True
+    )
+    mock_deps = mocker.patch(
+        "tethysapp.app_store.begin_install.detect_app_dependencies"
+    )
+
+    begin_install(install_data, mock_channel, mock_workspace)
+
+    apps = [
+        {
+            "name": app_name,
+            "channel": app_channel,
+            "label": app_label,
+            "version": app_resource["latestVersion"][app_channel][app_label],
+        }
+    ]
+    mock_get_plan.assert_called_once_with(apps)
+    mock_batch_install.assert_called_once_with(apps, mock_channel, specs=install_plan["specs"])
+    mock_install.assert_not_called()
+    mock_deps.assert_called_with(app_name, mock_channel)
+
+
+def test_begin_install_tethysapp_journal(resource, mocker, journal_dir):
+    mock_channel = MagicMock()
+    app_resource = resource("test_app", "test_channel", "main")
+    install_data = {"name": "test_app", "label": "main", "channel": "test_channel", "version": "1.0"}
+    install_plan = {"success": True, "specs": ["test_channel::test_app==1.0=py_0"]}
+
+    mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch("tethysapp.app_store.begin_install.get_resource", return_value=app_resource)
+    mocker.patch("tethysapp.app_store.begin_install.get_cached_install_plan", return_value=install_plan)
+    mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install", return_value=True)
+    mocker.patch("tethysapp.app_store.begin_install.detect_app_dependencies")
+
+    begin_install(install_data, mock_channel, MagicMock())
+
+    journal = get_journals(journal_dir)[0]
+    assert journal["state"] == JOURNAL_COMPLETED
+    assert journal["specs"] == install_plan["specs"]
+    assert journal["steps"][CONDA_INSTALL] is True
+    assert journal["steps"][APP_DEPENDENCIES] == {"test_app": True}
+
+
+def test_begin_install_tethysapp_journal_failed(resource, mocker, journal_dir):
+    app_resource = resource("test_app", "test_channel", "main")
+    install_data = {"name": "test_app", "label": "main", "channel": "test_channel", "version": "1.0"}
+
+    mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mocker.patch("tethysapp.app_store.begin_install.get_resource", return_value=app_resource)
+    mocker.patch("tethysapp.app_store.begin_install.get_cached_install_plan", return_value=None)
+    mocker.patch("tethysapp.app_store.begin_install.mamba_install", return_value=False)
+
+    begin_install(install_data, MagicMock(), MagicMock())
+
+    journal = get_journals(journal_dir)[0]
+    assert journal["state"] == JOURNAL_FAILED
+    assert journal["errorMessage"] == "Mamba install script failed to install application."
+
+
+def test_resume_install_after_conda_install(mocker):
+    mock_channel = MagicMock()
+    apps = [
+        {"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"},
+        {"name": "test_app2", "channel": "test_channel", "label": "main", "version": "1.0"},
+    ]
+    install_journal = InstallJournal.create(MagicMock(), apps)
+    install_journal.record_solve(["test_channel::test_app==1.0=py_0"])
+    install_journal.complete_step(CONDA_INSTALL)
+    install_journal.complete_step(APP_DEPENDENCIES, "test_app")
+
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mock_install = mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install")
+    mock_deps = mocker.patch("tethysapp.app_store.begin_install.detect_app_dependencies")
+
+    resume_install({"journalId": install_journal.journal_id, "apps": apps}, mock_channel, MagicMock())
+
+    mock_install.assert_not_called()
+    mock_deps.assert_called_once_with("test_app2", mock_channel)
+    mock_ws.assert_called_once_with(
+        "Resuming the interrupted installation of apps: test_app (1.0), test_app2 (1.0)", mock_channel
+    )
+    assert InstallJournal.load(MagicMock(), install_journal.journal_id).journal["state"] == JOURNAL_COMPLETED
+
+
+def test_resume_install_conda_install(mocker):
+    mock_channel = MagicMock()
+    apps = [{"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}]
+    install_journal = InstallJournal.create(MagicMock(), apps)
+    install_journal.record_solve(["test_channel::test_app==1.0=py_0"])
+    install_journal.start_step(CONDA_INSTALL)
+
+    mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mock_get_plan = mocker.patch("tethysapp.app_store.begin_install.get_cached_install_plan")
+    mock_install = mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install", return_value=True)
+    mock_deps = mocker.patch("tethysapp.app_store.begin_install.detect_app_dependencies")
+
+    resume_install({"journalId": install_journal.journal_id, "apps": apps}, mock_channel, MagicMock())
+
+    # The packages picked by the original solve are installed without solving again
+    mock_get_plan.assert_not_called()
+    mock_install.assert_called_once_with(apps, mock_channel, specs=["test_channel::test_app==1.0=py_0"])
+    mock_deps.assert_called_once_with("test_app", mock_channel)
+    assert get_interrupted_journals(MagicMock()) == []
+
+
+@pytest.mark.parametrize("state, owner", [(JOURNAL_COMPLETED, None), (JOURNAL_FAILED, None), (None, "other_process")])
+def test_resume_install_no_longer_interrupted(state, owner, mocker):
+    mock_channel = MagicMock()
+    apps = [{"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}]
+    install_journal = InstallJournal.create(MagicMock(), apps)
+    install_journal.start_step(CONDA_INSTALL)
+    if state:
+        install_journal.finish(state)
+    if owner:
+        install_journal.journal["owner"] = owner
+        install_journal.save()
+
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mock_install = mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install")
+    mock_deps = mocker.patch("tethysapp.app_store.begin_install.detect_app_dependencies")
+
+    resume_install({"journalId": install_journal.journal_id, "apps": apps}, mock_channel, MagicMock())
+
+    mock_ws.assert_not_called()
+    mock_install.assert_not_called()
+    mock_deps.assert_not_called()
+
+
+def test_resume_install_missing_journal(mocker):
+    mock_channel = MagicMock()
+    mock_ws = mocker.patch("tethysapp.app_store.begin_install.send_notification")
+    mock_install = mocker.patch("tethysapp.app_store.begin_install.mamba_batch_install")
+
+    resume_install({"journalId": "missing", "apps": []}, mock_channel, MagicMock())
+
+    mock_install.assert_not_called()
+    mock_ws.assert_called_once_with("Failed to resume the interrupted installation", mock_channel)
@@ -0,0 +1,176 @@
+import copy
+import pickle
+import tracemalloc
+from tethysapp.app_store.catalog import (
+    AppRecord,
+    LicenseTable,
+    UNSET,
+    intern_string,
+    share_tuple,
+    records_from_resources,
+    resources_from_records,
+)
+
+
+def test_intern_string():
+    first = "".join(["conda_", "channel"])
+    second = "".join(["conda_", "channel"])
+
+    assert intern_string(first) is intern_string(second)
+    assert intern_string(None) is None
+
+
+def test_share_tuple():
+    first = share_tuple(["1.0", "1.1"])
+    second = share_tuple(["1.0", "1.1"])
+
+    assert first == ("1.0", "1.1")
+    assert first is second
+
+
+def test_share_tuple_unhashable():
+    shared = share_tuple([["1.0"], ["1.1"]])
+
+    assert shared == (["1.0"], ["1.1"])
+
+
+def test_license_table_share():
+    table = LicenseTable()
+    first = "".join(["{'tethys_version': ", "'>=4.0.0'}"])
+    second = "".join(["{'tethys_version': ", "'>=4.0.0'}"])
+
+    assert table.share(first) is table.share(second)
+    assert table.share(None) is None
+    assert len(table) == 1
+
+
+def test_license_table_parse(mocker):
+    table = LicenseTable()
+    mock_json = mocker.patch("tethysapp.app_store.catalog.json")
+    mock_json.loads.return_value = {"tethys_version": ">=4.0.0"}
+    license = "{'tethys_version': '>=4.0.0'}"
+
+    first = table.parse(license)
+    second = table.parse("".join(["{'tethys_version': ", "'>=4.0.0'}"]))
+
+    assert first == {"tethys_version": ">=4.0.0"}
+    assert first is second
+    mock_json.loads.assert_called_once_with('{"tethys_version": ">=4.0.0"}')
+
+
+def test_license_table_parse_not_json():
+    table = LicenseTable()
+
+    assert table.parse("BSD") is None
+    assert table.parse("5") is None
+    assert table.parse(None) is None
+
+
+def test_license_table_clear():
+    table = LicenseTable()
+    table.share("BSD")
+
+    table.clear()
+
+    assert len(table) == 0
+
+
+def test_app_record_round_trip(resource):
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource["compatibility"]["test_channel"]["main"] = {"1.0": ">=4.0.0"}
+    app_resource["updateAvailable"] = {"test_channel": {"main": True}}
+
+    record = AppRecord.from_dict(app_resource, "test_channel", "main")
+
+    assert record.to_dict() == app_resource
+
+
+def test_app_record_round_trip_fresh_resource(fresh_resource):
+    app_resource = fresh_resource("test_app", "test_channel", "main")
+
+    record = AppRecord.from_dict(app_resource, "test_channel", "main")
+
+    assert record.installed_version is None
+    assert record.to_dict() == app_resource
+
+
+def test_app_record_unset_metadata(resource):
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource["keywords"] = {"test_channel": {}}
+
+    record = AppRecord.from_dict(app_resource, "test_channel", "main")
+
+    assert ("keywords", UNSET) in record.metadata
+    assert record.to_dict() == app_resource
+
+
+def test_app_record_shares_versions(resource):
+    main_resource = resource("test_app", "test_channel", "main")
+    dev_resource = resource("test_app", "test_channel", "dev")
+
+    main_record = AppRecord.from_dict(main_resource, "test_channel", "main")
+    dev_record = AppRecord.from_dict(dev_resource, "test_channel", "dev")
+
+    assert main_record.versions is dev_record.versions
+    assert main_record.channel is dev_record.channel
+
+
+def test_app_record_pickle(resource):
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource["keywords"] = {"test_channel": {}}
+    record = AppRecord.from_dict(app_resource, "test_channel", "main")
+
+    unpickled_record = pickle.loads(pickle.dumps(record))
+
+    assert unpickled_record == record
+    assert unpickled_record.to_dict() == app_resource
+
+
+def test_records_from_resources_and_back(resource):
+    app_resources = [
+        resource("test_app", "test_channel", "main"),
+        resource("test_app2", "test_channel", "main"),
+    ]
+
+    records = records_from_resources(app_resources, "test_channel", "main")
+
+    assert all(isinstance(record, AppRecord) for record in records)
+    assert resources_from_records(records) == app_resources
+
+
+def test_resources_from_records_legacy_dictionaries(resource):
+    app_resources = [resource("test_app", "test_channel", "main")]
+
+    assert resources_from_records(app_resources) == app_resources
+
+
+def test_catalog_memory_10k_apps(resource):
+    """Benchmark the memory used by a catalog of 10k apps in each conda label"""
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource["versions"]["test_channel"]["main"] = ["1.0", "1.1", "1.2", "2.0"]
+    app_resource["versionURLs"]["test_channel"]["main"] = [
+        f"https://conda.anaconda.org/test_channel/noarch/test_app-{version}-py_0.tar.bz2"
+        for version in ["1.0", "1.1", "1.2", "2.0"]
+    ]
+    app_resource["compatibility"]["test_channel"]["main"] = {"2.0": ">=4.0.0"}
+
+    def build_resources():
+        resources = []
+        for index in range(10000):
+            new_resource = copy.deepcopy(app_resource)
+            new_resource["name"] = f"test_app_{index}"
+            resources.append(new_resource)
+        return resources
+
+    tracemalloc.start()
+    legacy_catalog = build_resources()
+    legacy_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    compact_catalog = records_from_resources(build_resources(), "test_channel", "main")
+    compact_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert compact_size < legacy_size / 4
+    assert len(pickle.dumps(compact_catalog)) < len(pickle.dumps(legacy_catalog)) / 2
@@ -0,0 +1,140 @@
+import os
+from unittest.mock import MagicMock
+from tethysapp.app_store.collect_helpers import (
+    collect_app_static,
+    collect_app_workspace,
+    collect_apps,
+    get_app_package_path,
+    is_file_unchanged,
+    is_incremental_collect_enabled,
+    sync_directory,
+)
+
+
+def create_app_package(tmp_path, app_name="test_app"):
+    app_path = tmp_path / "tethysapp" / app_name
+    (app_path / "public" / "js").mkdir(parents=True)
+    (app_path / "public" / "js" / "main.js").write_text("main")
+    (app_path / "public" / "css.css").write_text("css")
+    (app_path / "workspaces" / "app_workspace").mkdir(parents=True)
+    (app_path / "workspaces" / "app_workspace" / "data.txt").write_text("data")
+    return app_path
+
+
+def test_is_incremental_collect_enabled(mocker):
+    mocker.patch("tethysapp.app_store.collect_helpers.get_app_store_setting", return_value=False)
+
+    assert not is_incremental_collect_enabled()
+
+
+def test_get_app_package_path(mocker):
+    mock_find_spec = mocker.patch("tethysapp.app_store.collect_helpers.importlib.util.find_spec")
+    mock_find_spec.return_value = MagicMock(submodule_search_locations=["/tethysapp/test_app"])
+
+    assert get_app_package_path("test_app") == "/tethysapp/test_app"
+    mock_find_spec.assert_called_with("tethysapp.test_app")
+
+    mock_find_spec.return_value = None
+    assert get_app_package_path("test_app") is None
+
+    mock_find_spec.side_effect = ImportError
+    assert get_app_package_path("test_app") is None
+
+
+def test_is_file_unchanged(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("source")
+    destination = tmp_path / "destination.txt"
+
+    assert not is_file_unchanged(str(source), str(destination))
+    destination.write_text("source")
+    os.utime(destination, (0, 0))
+    assert not is_file_unchanged(str(source), str(destination))
+    os.utime(destination, (os.stat(source).st_atime, os.stat(source).st_mtime))
+    assert is_file_unchanged(str(source), str(destination))
+
+
+def test_sync_directory(tmp_path):
+    app_path = create_app_package(tmp_path)
+    destination = tmp_path / "static" / "test_app"
+
+    stats = sync_directory(str(app_path / "public"), str(destination))
+
+    assert stats == {"copied": 2, "skipped": 0, "removed": 0}
+    assert (destination / "js" / "main.js").read_text() == "main"
+
+    (app_path / "public" / "css.css").unlink()
+    (app_path / "public" / "js" / "main.js").write_text("changed")
+    os.utime(app_path / "public" / "js" / "main.js", (1, 1))
+    (destination / "stale.txt").write_text("stale")
+
+    stats = sync_directory(str(app_path / "public"), str(destination))
+
+    assert stats == {"copied": 1, "skipped": 0, "removed": 2}
+    assert (destination / "js" / "main.js").read_text() == "changed"
+    assert not (destination / "css.css").exists()
+
+    assert sync_directory(str(app_path / "public"), str(destination)) == {"copied": 0, "skipped": 1, "removed": 0}
+
+
+def test_collect_app_static(tmp_path):
+    app_path = create_app_package(tmp_path)
+
+    stats = collect_app_static("test_app", str(app_path), str(tmp_path / "static"))
+
+    assert stats["copied"] == 2
+    assert (tmp_path / "static" / "test_app" / "css.css").is_file()
+    assert collect_app_static("test_app", str(tmp_path / "tethysapp"), str(tmp_path / "static")) == {
+        "copied": 0,
+        "skipped": 0,
+        "removed": 0,
+    }
+
+
+def test_collect_app_workspace(tmp_path):
+    app_path = create_app_package(tmp_path)
+    workspaces_root = tmp_path / "workspaces"
+    (workspaces_root / "test_app" / "user_workspaces").mkdir(parents=True)
+    (workspaces_root / "test_app" / "user_workspaces" / "user.txt").write_text("user")
+
+    stats = collect_app_workspace("test_app", str(app_path), str(workspaces_root))
+
+    assert stats["copied"] == 1
+    assert os.path.islink(app_path / "workspaces")
+    assert (app_path / "workspaces" / "app_workspace" / "data.txt").read_text() == "data"
+    # User data in the workspaces root is kept
+    assert (workspaces_root / "test_app" / "user_workspaces" / "user.txt").is_file()
+    assert collect_app_workspace("test_app", str(app_path), str(workspaces_root))["copied"] == 0
+
+
+def test_collect_apps(tmp_path, mocker):
+    app_path = create_app_package(tmp_path)
+    mocker.patch(
+        "tethysapp.app_store.collect_helpers.settings",
+        STATIC_ROOT=str(tmp_path / "static"),
+        TETHYS_WORKSPACES_ROOT=str(tmp_path / "workspaces"),
+    )
+    mocker.patch("tethysapp.app_store.collect_helpers.get_app_package_path", return_value=str(app_path))
+
+    assert collect_apps(["test_app"])
+    assert (tmp_path / "static" / "test_app" / "js" / "main.js").is_file()
+    assert (tmp_path / "workspaces" / "test_app" / "app_workspace" / "data.txt").is_file()
+
+
+def test_collect_apps_missing_app(tmp_path, mocker, caplog):
+    mocker.patch(
+        "tethysapp.app_store.collect_helpers.settings",
+        STATIC_ROOT=str(tmp_path / "static"),
+        TETHYS_WORKSPACES_ROOT=str(tmp_path / "workspaces"),
+    )
+    mocker.patch("tethysapp.app_store.collect_helpers.get_app_package_path", return_value=None)
+
+    assert not collect_apps(["test_app"])
+    assert "Couldn't find the test_app package. Collecting all apps" in caplog.messages
+
+
+def test_collect_apps_no_static_root(mocker, caplog):
+    mocker.patch("tethysapp.app_store.collect_helpers.settings", STATIC_ROOT=None, TETHYS_WORKSPACES_ROOT=None)
+
+    assert not collect_apps(["test_app"])
+    assert "STATIC_ROOT or TETHYS_WORKSPACES_ROOT is not set. Collecting all apps" in caplog.messages
@@ -0,0 +1,112 @@
+import pytest
+import semver
+from tethysapp.app_store.compatibility_matrix import (
+    CompatibilityMatrix,
+    DEFAULT_COMPATIBILITY,
+    MAX_KEY,
+    MIN_KEY,
+    parse_compatibility,
+    version_key,
+)
+
+
+def test_version_key():
+    assert version_key("4.2.0") > version_key("4.1.10")
+    assert version_key("4.2") == version_key("4.2.0")
+    assert version_key("10.0.0") > version_key("9.99.99")
+    assert version_key("1.0.dev3") == version_key("1.0.0")
+    assert version_key("dev") == MIN_KEY
+
+
+def test_parse_compatibility():
+    key = version_key("4.0.0")
+
+    assert parse_compatibility(">=4.0.0") == (key, True, MAX_KEY, True, MIN_KEY)
+    assert parse_compatibility(">4.0.0") == (key, False, MAX_KEY, True, MIN_KEY)
+    assert parse_compatibility("<=4.0.0") == (MIN_KEY, True, key, True, MIN_KEY)
+    assert parse_compatibility("<4.0.0") == (MIN_KEY, True, key, False, MIN_KEY)
+    assert parse_compatibility("==4.0.0") == (key, True, key, True, MIN_KEY)
+    assert parse_compatibility("!=4.0.0") == (MIN_KEY, True, MAX_KEY, True, key)
+    assert parse_compatibility(">=4.0") is None
+    assert parse_compatibility("4.0.0") is None
+
+
+@pytest.mark.parametrize(
+    "spec", [">=4.0.0", ">4.0.0", "<=4.0.0", "<4.0.0", "==4.0.0", "!=4.0.0"]
+)
+@pytest.mark.parametrize("tethys_version", ["3.4.4", "4.0.0", "4.0.1", "4.2.0"])
+def test_compatible_matches_semver(spec, tethys_version):
+    matrix = CompatibilityMatrix()
+    matrix.add_app("test_app", ["1.0"], {"1.0": spec})
+
+    assert matrix.compatible(tethys_version) == [semver.match(tethys_version, spec)]
+
+
+def test_compatible_default_compatibility():
+    matrix = CompatibilityMatrix()
+    matrix.add_app("test_app", ["1.0"], {})
+
+    assert matrix.specs == [DEFAULT_COMPATIBILITY]
+    assert matrix.compatible("3.4.4") == [True]
+    assert matrix.compatible("4.0.0") == [False]
+
+
+def test_compatible_fallback(mocker):
+    mock_semver = mocker.patch("tethysapp.app_store.compatibility_matrix.semver")
+    mock_semver.match.return_value = True
+    matrix = CompatibilityMatrix()
+    matrix.add_app("test_app", ["1.0", "2.0"], {"1.0": ">=4.0.0-beta", "2.0": ">=4.0.0"})
+
+    mask = matrix.compatible("4.0.0")
+
+    assert mask == [True, True]
+    assert list(matrix.fallback) == [1, 0]
+    mock_semver.match.assert_called_once_with("4.0.0", ">=4.0.0-beta")
+
+
+def test_from_resources(resource):
+    first_app = resource("test_app", "test_channel", "main")
+    first_app["versions"]["test_channel"]["main"] = ["1.0", "2.0"]
+    first_app["compatibility"]["test_channel"]["main"] = {"2.0": ">=4.0.0"}
+    second_app = resource("test_app2", "test_channel", "main")
+
+    matrix = CompatibilityMatrix.from_resources(
+        [first_app, second_app], "test_channel", "main"
+    )
+
+    assert len(matrix) == 3
+    assert matrix.apps == ["test_app", "test_app2"]
+    assert list(matrix.app_ids) == [0, 0, 1]
+    assert matrix.versions == ["1.0", "2.0", "1.0"]
+
+
+def test_split_versions():
+    matrix = CompatibilityMatrix()
+    matrix.add_app("test_app", ["1.0", "2.0"], {"2.0": ">=4.0.0"})
+    matrix.add_app("test_app2", ["1.0"], {"1.0": ">=4.0.0"})
+
+    split = matrix.split_versions(matrix.compatible("4.0.0"))
+
+    assert split == [(["2.0"], ["1.0"]), (["1.0"], [])]
+
+
+def test_compatible_batch():
+    matrix = CompatibilityMatrix()
+    matrix.add_app("test_app", ["1.0", "2.0"], {"1.0": "<4.0.0", "2.0": ">=4.0.0"})
+
+    masks = matrix.compatible_batch(["3.4.4", "4.2.0"])
+
+    assert masks == {"3.4.4": [True, False], "4.2.0": [False, True]}
+
+
+def test_latest_compatible():
+    matrix = CompatibilityMatrix()
+    matrix.add_app(
+        "test_app",
+        ["1.10.0", "1.9.0", "2.0.0"],
+        {"1.10.0": ">=4.0.0", "1.9.0": ">=4.0.0", "2.0.0": ">=5.0.0"},
+    )
+    matrix.add_app("test_app2", ["1.0"], {"1.0": ">=5.0.0"})
+
+    assert matrix.latest_compatible(matrix.compatible("4.2.0")) == ["1.10.0", None]
+    assert matrix.latest_compatible(matrix.compatible("5.0.0")) == ["2.0.0", "1.0"]
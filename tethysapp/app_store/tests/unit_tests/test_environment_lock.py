@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import threading
+import pytest
+from unittest.mock import MagicMock
+from tethysapp.app_store.process_runner import ProcessCancelled
+from tethysapp.app_store.environment_lock import (
+    EnvironmentLockTimeout,
+    LockGuard,
+    acquire_environment_lock,
+    get_environment_lock_status,
+    get_lock_path,
+    read_lock_state,
+    HOSTNAME,
+)
+
+
+@pytest.fixture()
+def lock_workspace(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.environment_lock.POLL_INTERVAL", 0.01)
+    return MagicMock(path=str(tmp_path))
+
+
+def write_lease(app_workspace, **lease):
+    lock_path = get_lock_path(app_workspace)
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    now = time.time()
+    lease = {"owner": "other_job", "pid": os.getpid(), "host": HOSTNAME, "acquired": now, "heartbeat": now,
+             "expires": now + 60, **lease}
+    with open(lock_path, "w") as lock_file:
+        json.dump({"lease": lease, "queue": []}, lock_file)
+
+
+def test_acquire_environment_lock(lock_workspace):
+    lease = acquire_environment_lock(lock_workspace, "job1", lease_seconds=60)
+
+    status = get_environment_lock_status(lock_workspace)
+    assert status["lease"]["owner"] == "job1"
+    assert status["lease"]["pid"] == os.getpid()
+    assert status["lease"]["host"] == HOSTNAME
+    assert status["queue"] == []
+
+    lease.release()
+
+    assert get_environment_lock_status(lock_workspace)["lease"] is None
+    assert not lease.heartbeat_thread.is_alive()
+
+
+def test_acquire_environment_lock_context_manager(lock_workspace):
+    with acquire_environment_lock(lock_workspace, "job1"):
+        assert get_environment_lock_status(lock_workspace)["lease"]["owner"] == "job1"
+
+    assert get_environment_lock_status(lock_workspace)["lease"] is None
+
+
+def test_acquire_environment_lock_waits_in_order(lock_workspace):
+    lease = acquire_environment_lock(lock_workspace, "job1")
+    acquired = []
+    positions = {"job2": [], "job3": []}
+
+    def wait_for_lock(owner):
+        with acquire_environment_lock(lock_workspace, owner, on_wait=positions[owner].append):
+            acquired.append(owner)
+
+    job2 = threading.Thread(target=wait_for_lock, args=("job2",))
+    job2.start()
+    while not positions["job2"]:
+        time.sleep(0.01)
+    job3 = threading.Thread(target=wait_for_lock, args=("job3",))
+    job3.start()
+    while not positions["job3"]:
+        time.sleep(0.01)
+
+    assert [waiter["owner"] for waiter in get_environment_lock_status(lock_workspace)["queue"]] == ["job2", "job3"]
+    lease.release()
+    job2.join(5)
+    job3.join(5)
+
+    assert acquired == ["job2", "job3"]
+    assert positions["job2"] == [1]
+    assert positions["job3"][0] == 2
+    assert get_environment_lock_status(lock_workspace) == {"lease": None, "queue": []}
+
+
+def test_acquire_environment_lock_timeout(lock_workspace):
+    write_lease(lock_workspace)
+
+    with pytest.raises(EnvironmentLockTimeout):
+        acquire_environment_lock(lock_workspace, "job1", timeout=0.05)
+
+    # The owner leaves the queue when it gives up
+    assert get_environment_lock_status(lock_workspace)["queue"] == []
+
+
+def test_acquire_environment_lock_cancelled(lock_workspace, mocker):
+    write_lease(lock_workspace)
+    mocker.patch(
+        "tethysapp.app_store.environment_lock.check_cancelled", side_effect=ProcessCancelled("cancelled")
+    )
+
+    with pytest.raises(ProcessCancelled):
+        acquire_environment_lock(lock_workspace, "job1")
+
+    assert get_environment_lock_status(lock_workspace)["queue"] == []
+
+
+def test_acquire_environment_lock_expired_lease(lock_workspace, caplog):
+    write_lease(lock_workspace, expires=time.time() - 1)
+
+    with acquire_environment_lock(lock_workspace, "job1", timeout=1):
+        assert get_environment_lock_status(lock_workspace)["lease"]["owner"] == "job1"
+
+    assert "Releasing the expired environment lock of other_job" in caplog.messages
+
+
+def test_acquire_environment_lock_dead_process(lock_workspace, mocker):
+    write_lease(lock_workspace, pid=12345)
+    mocker.patch("tethysapp.app_store.environment_lock.is_process_alive", side_effect=lambda pid: pid != 12345)
+
+    with acquire_environment_lock(lock_workspace, "job1", timeout=1):
+        assert get_environment_lock_status(lock_workspace)["lease"]["owner"] == "job1"
+
+
+def test_lease_heartbeat(lock_workspace):
+    lease = acquire_environment_lock(lock_workspace, "job1", lease_seconds=0.15)
+    first_expiry = read_lock_state(get_lock_path(lock_workspace))["lease"]["expires"]
+    time.sleep(0.3)
+
+    # The heartbeat keeps the lease from expiring while it is held
+    status = get_environment_lock_status(lock_workspace)
+    assert status["lease"]["owner"] == "job1"
+    assert status["lease"]["expires"] > first_expiry
+    lease.release()
+
+
+def test_lock_guard_stale(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.environment_lock.GUARD_STALE_SECONDS", 0)
+    lock_path = str(tmp_path / "environment_lock.json")
+    (tmp_path / "environment_lock.json.guard").touch()
+    time.sleep(0.01)
+
+    with LockGuard(lock_path):
+        assert (tmp_path / "environment_lock.json.guard").exists()
+
+    assert not (tmp_path / "environment_lock.json.guard").exists()
@@ -176,11 +176,11 @@ def test_write_logs():
 
 def test_continue_install(app_store_workspace, mocker):
     mock_popen = mocker.patch("tethysapp.app_store.git_install_handlers.Popen")
-    mock_popen().wait.return_value = 0
     mock_popen().communicate.return_value = ["processed"]
-    mock_pipe = mocker.patch("tethysapp.app_store.git_install_handlers.PIPE")
-    mock_stdout = mocker.patch("tethysapp.app_store.git_install_handlers.STDOUT")
-    mock_stdout.side_effect = [b"Simulating output", b"Final output"]
+    mock_db_sync = mocker.patch(
+        "tethysapp.app_store.git_install_handlers.sync_tethys_db",
+        return_value={"step": "tethys db sync", "seconds": 1.0, "success": True, "inProcess": True},
+    )
     mock_restart_server = mocker.patch(
         "tethysapp.app_store.git_install_handlers.restart_server"
     )
@@ -217,10 +217,7 @@ def test_continue_install(app_store_workspace, mocker):
     assert git_status["status"]["dbSync"]
     assert git_status["status"]["post"]
     assert git_status["status"]["setupPy"]
-    assert (
-        call(["tethys", "db", "sync"], stdout=mock_pipe, stderr=mock_stdout)
-        in mock_popen.mock_calls
-    )
+    mock_db_sync.assert_called_once()
     assert call("Running post installation tasks...") in mock_logger.info.mock_calls
     assert call("Post Script Result: processed") in mock_logger.info.mock_calls
     assert call("Install completed") in mock_logger.info.mock_calls
@@ -236,11 +233,11 @@ def test_continue_install_fail_db_sync(app_store_workspace, mocker):
     mock_datetime = mocker.patch("tethysapp.app_store.git_install_handlers.datetime")
     mock_datetime.now().strftime.return_value = "2024-01-02T00:00:00:0000"
     mock_popen = mocker.patch("tethysapp.app_store.git_install_handlers.Popen")
-    mock_popen().wait.return_value = 1
     mock_popen().communicate.return_value = ["processed"]
-    mock_pipe = mocker.patch("tethysapp.app_store.git_install_handlers.PIPE")
-    mock_stdout = mocker.patch("tethysapp.app_store.git_install_handlers.STDOUT")
-    mock_stdout.side_effect = [b"Simulating output", b"Final output"]
+    mock_db_sync = mocker.patch(
+        "tethysapp.app_store.git_install_handlers.sync_tethys_db",
+        return_value={"step": "tethys db sync", "seconds": 1.0, "success": False, "inProcess": True},
+    )
     mock_restart_server = mocker.patch(
         "tethysapp.app_store.git_install_handlers.restart_server"
     )
@@ -280,10 +277,7 @@ def test_continue_install_fail_db_sync(app_store_workspace, mocker):
     assert git_status["errorMessage"] == err_msg
     assert git_status["status"]["post"]
     assert git_status["status"]["setupPy"]
-    assert (
-        call(["tethys", "db", "sync"], stdout=mock_pipe, stderr=mock_stdout)
-        in mock_popen.mock_calls
-    )
+    mock_db_sync.assert_called_once()
     assert call("Running post installation tasks...") in mock_logger.info.mock_calls
     assert call("Post Script Result: processed") in mock_logger.info.mock_calls
     assert call("Install completed") in mock_logger.info.mock_calls
@@ -299,6 +293,7 @@ def test_install_worker(app_store_workspace, mocker):
     mock_logger = MagicMock()
     workspace_app = str(app_store_workspace / "apps" / "github_installed" / "test_app")
     status_file_path = app_store_workspace / "install_status" / "github" / "abc123.json"
+    mock_lock = mocker.patch("tethysapp.app_store.git_install_handlers.acquire_environment_lock")
     mocker.patch("tethysapp.app_store.git_install_handlers.write_logs")
     mock_popen = mocker.patch("tethysapp.app_store.git_install_handlers.Popen")
     mock_popen().wait.return_value = 0
@@ -319,6 +314,8 @@ def test_install_worker(app_store_workspace, mocker):
         str(app_store_workspace),
     )
 
+    mock_lock.assert_called_once_with(str(app_store_workspace), "github_install-abc123")
+
     conda_config = {"channels": "conda-forge", "packages": ["numpy"]}
     mock_install_packages.assert_called_with(
         conda_config, mock_logger, str(status_file_path)
@@ -372,6 +369,7 @@ def test_install_worker_skip_package(app_store_workspace, mocker):
     mock_logger = MagicMock()
     workspace_app = str(app_store_workspace / "apps" / "github_installed" / "test_app")
     status_file_path = app_store_workspace / "install_status" / "github" / "abc123.json"
+    mock_lock = mocker.patch("tethysapp.app_store.git_install_handlers.acquire_environment_lock")
     mocker.patch("tethysapp.app_store.git_install_handlers.write_logs")
     mock_popen = mocker.patch("tethysapp.app_store.git_install_handlers.Popen")
     mock_popen().wait.return_value = 0
@@ -399,6 +397,8 @@ def test_install_worker_skip_package(app_store_workspace, mocker):
         str(app_store_workspace),
     )
 
+    mock_lock.assert_called_once_with(str(app_store_workspace), "github_install-abc123")
+
     mock_install_packages.assert_not_called()
     git_status = json.loads(status_file_path.read_text())
     assert (
@@ -0,0 +1,157 @@
+import os
+import json
+from unittest.mock import MagicMock
+from tethysapp.app_store import install_journal as journal_module
+from tethysapp.app_store.job_queue import JobScheduler
+from tethysapp.app_store.environment_lock import acquire_environment_lock
+from tethysapp.app_store.install_journal import (
+    InstallJournal,
+    get_journal_dir,
+    get_interrupted_journals,
+    prune_journals,
+    resume_interrupted_installs,
+    CONDA_INSTALL,
+    APP_DEPENDENCIES,
+    SOLVE,
+    PENDING,
+    RUNNING,
+    JOURNAL_COMPLETED,
+    JOURNAL_FAILED,
+    JOURNAL_RUNNING,
+)
+
+APPS = [{"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}]
+
+
+def test_create(tmp_path):
+    app_workspace = MagicMock(path=str(tmp_path))
+
+    install_journal = InstallJournal.create(app_workspace, APPS)
+
+    assert install_journal.path == str(tmp_path / "install_status" / "conda" / f"{install_journal.journal_id}.json")
+    with open(install_journal.path) as journal_file:
+        journal = json.load(journal_file)
+    assert journal["state"] == JOURNAL_RUNNING
+    assert journal["owner"] == journal_module.PROCESS_TOKEN
+    assert journal["pid"] == os.getpid()
+    assert journal["host"] == journal_module.HOSTNAME
+    assert journal["apps"] == APPS
+    assert journal["steps"] == {SOLVE: PENDING, CONDA_INSTALL: PENDING, APP_DEPENDENCIES: {"test_app": PENDING}}
+
+
+def test_steps(tmp_path):
+    app_workspace = MagicMock(path=str(tmp_path))
+    install_journal = InstallJournal.create(app_workspace, APPS)
+
+    install_journal.record_solve(["test_channel::test_app==1.0=py_0"])
+    install_journal.start_step(CONDA_INSTALL)
+    install_journal.complete_step(APP_DEPENDENCIES, "test_app")
+
+    loaded_journal = InstallJournal.load(app_workspace, install_journal.journal_id)
+    assert loaded_journal.specs == ["test_channel::test_app==1.0=py_0"]
+    assert loaded_journal.is_completed(SOLVE)
+    assert loaded_journal.journal["steps"][CONDA_INSTALL] == RUNNING
+    assert not loaded_journal.is_completed(CONDA_INSTALL)
+    assert loaded_journal.is_completed(APP_DEPENDENCIES, "test_app")
+    assert not (tmp_path / "install_status" / "conda" / f"{install_journal.journal_id}.json.tmp").exists()
+
+
+def test_load_missing(tmp_path, caplog):
+    assert InstallJournal.load(MagicMock(path=str(tmp_path)), "missing") is None
+    assert any(message.startswith("Failed to load the install journal missing") for message in caplog.messages)
+
+
+def test_get_interrupted_journals(tmp_path, mocker):
+    app_workspace = MagicMock(path=str(tmp_path))
+    running_journal = InstallJournal.create(app_workspace, APPS)
+    InstallJournal.create(app_workspace, APPS).finish(JOURNAL_FAILED, "install failed")
+    (tmp_path / "install_status" / "conda" / "corrupted.json").write_text("{not json")
+
+    # Journals of this process are still running
+    assert get_interrupted_journals(app_workspace) == []
+
+    # The install of another live worker process on this host is still running
+    mocker.patch("tethysapp.app_store.install_journal.PROCESS_TOKEN", "new_process")
+    assert get_interrupted_journals(app_workspace) == []
+
+    mocker.patch("tethysapp.app_store.install_journal.is_process_alive", return_value=False)
+    interrupted_journals = get_interrupted_journals(app_workspace)
+
+    assert [journal.journal_id for journal in interrupted_journals] == [running_journal.journal_id]
+
+
+def test_get_interrupted_journals_other_host(tmp_path, mocker):
+    app_workspace = MagicMock(path=str(tmp_path))
+    running_journal = InstallJournal.create(app_workspace, APPS)
+    running_journal.journal.update({"host": "other_host", "jobId": "job_id"})
+    running_journal.save()
+    mocker.patch("tethysapp.app_store.install_journal.PROCESS_TOKEN", "new_process")
+
+    # The job of the install on the other host still holds the environment lock
+    with acquire_environment_lock(app_workspace, "job_id"):
+        assert get_interrupted_journals(app_workspace) == []
+
+    interrupted_journals = get_interrupted_journals(app_workspace)
+
+    assert [journal.journal_id for journal in interrupted_journals] == [running_journal.journal_id]
+
+
+def test_prune_journals(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.install_journal.MAX_FINISHED_JOURNALS", 1)
+    app_workspace = MagicMock(path=str(tmp_path))
+    running_journal = InstallJournal.create(app_workspace, APPS)
+    old_journal = InstallJournal.create(app_workspace, APPS)
+    old_journal.finish()
+    new_journal = InstallJournal.create(app_workspace, APPS)
+    new_journal.finish()
+
+    prune_journals(get_journal_dir(app_workspace))
+
+    journal_ids = [path.stem for path in (tmp_path / "install_status" / "conda").glob("*.json")]
+    assert sorted(journal_ids) == sorted([running_journal.journal_id, new_journal.journal_id])
+
+
+def test_resume_interrupted_installs(tmp_path, mocker):
+    app_workspace = MagicMock(path=str(tmp_path))
+    channel_layer = MagicMock()
+    interrupted_journal = InstallJournal.create(app_workspace, APPS)
+    InstallJournal.create(app_workspace, APPS).finish(JOURNAL_COMPLETED)
+    mocker.patch("tethysapp.app_store.install_journal.PROCESS_TOKEN", "new_process")
+    mocker.patch("tethysapp.app_store.install_journal.is_process_alive", return_value=False)
+    scheduler = MagicMock(app_workspace=app_workspace)
+    scheduler.get_active_jobs.return_value = []
+
+    job_ids = resume_interrupted_installs(scheduler, channel_layer)
+
+    assert job_ids == [scheduler.submit.return_value]
+    scheduler.submit.assert_called_once_with(
+        "resume_install",
+        {"journalId": interrupted_journal.journal_id, "apps": APPS},
+        channel_layer,
+        with_workspace=True,
+    )
+    # The journal now belongs to this process so it isn't resumed twice
+    assert get_interrupted_journals(app_workspace) == []
+
+
+def test_resume_interrupted_installs_already_queued(tmp_path, mocker):
+    app_workspace = MagicMock(path=str(tmp_path))
+    interrupted_journal = InstallJournal.create(app_workspace, APPS)
+    mocker.patch("tethysapp.app_store.install_journal.PROCESS_TOKEN", "new_process")
+    mocker.patch("tethysapp.app_store.install_journal.is_process_alive", return_value=False)
+    mocker.patch("tethysapp.app_store.job_queue.get_channel_layer")
+    scheduler = JobScheduler(app_workspace, MagicMock(), max_workers=1)
+    mocker.patch.object(scheduler, "start_workers")
+    scheduler.submit("resume_install", {"journalId": interrupted_journal.journal_id, "apps": APPS}, MagicMock())
+
+    assert resume_interrupted_installs(scheduler, MagicMock()) == []
+    assert len(scheduler.get_active_jobs("resume_install")) == 1
+
+
+def test_resume_interrupted_installs_no_journals(tmp_path, mocker):
+    mock_get_channel_layer = mocker.patch("tethysapp.app_store.install_journal.get_channel_layer")
+    scheduler = MagicMock(app_workspace=MagicMock(path=str(tmp_path)))
+
+    assert resume_interrupted_installs(scheduler) == []
+    scheduler.submit.assert_not_called()
+    mock_get_channel_layer.assert_not_called()
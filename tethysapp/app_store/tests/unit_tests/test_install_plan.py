@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+from unittest.mock import MagicMock
+from tethysapp.app_store.install_plan import (
+    get_environment_fingerprint,
+    get_plan_cache_key,
+    get_package_spec,
+    parse_dry_run_output,
+    create_install_plan,
+    get_cached_install_plan,
+    request_install_plan,
+)
+
+APPS = [{"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}]
+
+DRY_RUN_OUTPUT = {
+    "success": True,
+    "dry_run": True,
+    "actions": {
+        "FETCH": [
+            {
+                "name": "test_app",
+                "version": "1.0",
+                "size": 1000,
+                "fn": "test_app-1.0-py_0.tar.bz2",
+                "url": "https://conda.anaconda.org/test_channel/noarch/test_app-1.0-py_0.tar.bz2",
+                "md5": "abc",
+            },
+            {"name": "numpy", "version": "1.26.4", "size": 5000},
+        ],
+        "LINK": [
+            {"name": "test_app", "version": "1.0", "build_string": "py_0", "channel": "test_channel"},
+            {"name": "numpy", "version": "1.26.4", "build_string": "py311_0", "channel": "conda-forge"},
+        ],
+        "UNLINK": [
+            {"name": "numpy", "version": "1.25.0", "build_string": "py311_0", "channel": "conda-forge"},
+            {"name": "old_package", "version": "0.1", "build_string": "0", "channel": "conda-forge"},
+        ],
+    },
+}
+
+
+def test_get_environment_fingerprint(tmp_path):
+    (tmp_path / "conda-meta").mkdir()
+    history_path = tmp_path / "conda-meta" / "history"
+    history_path.write_text("==> 2024-01-01 <==\n")
+
+    fingerprint = get_environment_fingerprint(str(tmp_path))
+
+    assert fingerprint == get_environment_fingerprint(str(tmp_path))
+    history_path.write_text("==> 2024-01-01 <==\n==> 2024-01-02 <==\n")
+    os.utime(history_path, ns=(1, 1))
+    assert get_environment_fingerprint(str(tmp_path)) != fingerprint
+
+
+def test_get_environment_fingerprint_no_history(tmp_path):
+    assert get_environment_fingerprint(str(tmp_path)) == get_environment_fingerprint(str(tmp_path))
+
+
+def test_get_plan_cache_key():
+    key = get_plan_cache_key(APPS, fingerprint="abc")
+
+    assert key.startswith("install_plan_abc_")
+    assert get_plan_cache_key(APPS, fingerprint="abc") == key
+    assert get_plan_cache_key(APPS, fingerprint="def") != key
+    assert get_plan_cache_key(APPS, update=True, fingerprint="abc") != key
+
+
+def test_get_package_spec():
+    assert get_package_spec(
+        {"name": "numpy", "version": "1.26.4", "build_string": "py311_0", "channel": "conda-forge"}
+    ) == "conda-forge::numpy==1.26.4=py311_0"
+    assert get_package_spec({"name": "numpy", "version": "1.26.4"}) == "numpy==1.26.4"
+
+
+def test_parse_dry_run_output():
+    plan = parse_dry_run_output(json.dumps(DRY_RUN_OUTPUT))
+
+    assert plan == {
+        "success": True,
+        "error": None,
+        "add": [{"name": "test_app", "version": "1.0", "channel": "test_channel"}],
+        "remove": [{"name": "old_package", "version": "0.1", "channel": "conda-forge"}],
+        "change": [{"name": "numpy", "from": "1.25.0", "to": "1.26.4", "channel": "conda-forge"}],
+        "downloadSize": 6000,
+        "specs": ["test_channel::test_app==1.0=py_0", "conda-forge::numpy==1.26.4=py311_0"],
+        "fetch": [
+            {
+                "fn": "test_app-1.0-py_0.tar.bz2",
+                "url": "https://conda.anaconda.org/test_channel/noarch/test_app-1.0-py_0.tar.bz2",
+                "size": 1000,
+                "md5": "abc",
+                "sha256": None,
+            }
+        ],
+    }
+
+
+def test_parse_dry_run_output_already_installed():
+    plan = parse_dry_run_output(json.dumps({"success": True, "message": "All requested packages already installed."}))
+
+    assert plan["success"]
+    assert plan["specs"] == []
+
+
+def test_parse_dry_run_output_failed():
+    plan = parse_dry_run_output(json.dumps({"error": "PackagesNotFoundError", "message": "Package not found"}))
+
+    assert not plan["success"]
+    assert plan["error"] == "Package not found"
+
+
+def test_parse_dry_run_output_not_json():
+    plan = parse_dry_run_output(None)
+
+    assert not plan["success"]
+    assert plan["error"] == "Could not read the output of the dry run"
+
+
+def test_create_install_plan(mocker):
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", return_value="abc")
+    mock_cache = mocker.patch("tethysapp.app_store.install_plan.cache")
+    mock_cache.get.return_value = None
+    mock_conda = mocker.patch(
+        "tethysapp.app_store.install_plan.conda_run", return_value=[json.dumps(DRY_RUN_OUTPUT), "", 0]
+    )
+
+    plan = create_install_plan(APPS)
+
+    assert plan["success"]
+    assert plan["fingerprint"] == "abc"
+    assert plan["apps"] == APPS
+    dry_run_args = mock_conda.call_args.args[1]
+    assert "--dry-run" in dry_run_args
+    assert "--freeze-installed" in dry_run_args
+    assert dry_run_args[-1] == "test_channel::test_app=1.0"
+    mock_cache.set.assert_called_once_with(get_plan_cache_key(APPS, fingerprint="abc"), plan, 600)
+
+
+def test_create_install_plan_update(mocker):
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", return_value="abc")
+    mock_cache = mocker.patch("tethysapp.app_store.install_plan.cache")
+    mock_cache.get.return_value = None
+    mock_conda = mocker.patch(
+        "tethysapp.app_store.install_plan.conda_run", return_value=[json.dumps(DRY_RUN_OUTPUT), "", 0]
+    )
+
+    plan = create_install_plan(APPS, update=True)
+
+    assert plan["update"]
+    assert "--freeze-installed" not in mock_conda.call_args.args[1]
+
+
+def test_create_install_plan_cached(mocker):
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", return_value="abc")
+    mock_cache = mocker.patch("tethysapp.app_store.install_plan.cache")
+    cached_plan = {"success": True}
+    mock_cache.get.return_value = cached_plan
+    mock_conda = mocker.patch("tethysapp.app_store.install_plan.conda_run")
+
+    assert create_install_plan(APPS) is cached_plan
+    mock_conda.assert_not_called()
+
+    mock_conda.return_value = [json.dumps(DRY_RUN_OUTPUT), "", 0]
+    assert create_install_plan(APPS, refresh=True)["success"]
+    mock_conda.assert_called_once()
+
+
+def test_create_install_plan_timeout(mocker):
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", return_value="abc")
+    mock_cache = mocker.patch("tethysapp.app_store.install_plan.cache")
+    mock_cache.get.return_value = None
+    mocker.patch("tethysapp.app_store.install_plan.conda_run", return_value=[json.dumps(DRY_RUN_OUTPUT), "", 0])
+
+    plan = create_install_plan(APPS, timeout=3600)
+
+    mock_cache.set.assert_called_once_with(get_plan_cache_key(APPS, fingerprint="abc"), plan, 3600)
+
+
+def test_request_install_plan(mocker):
+    plan = {"success": True, "specs": []}
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", return_value="abc")
+    mock_create = mocker.patch("tethysapp.app_store.install_plan.create_install_plan", return_value=plan)
+
+    assert request_install_plan(APPS, update=True, timeout=5) == plan
+    mock_create.assert_called_once_with(APPS, update=True, refresh=False)
+
+
+def test_request_install_plan_still_solving(mocker):
+    plan = {"success": True, "specs": []}
+    solved = threading.Event()
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", return_value="abc")
+
+    def slow_solve(apps, update, refresh):
+        solved.wait(5)
+        return plan
+
+    mock_create = mocker.patch("tethysapp.app_store.install_plan.create_install_plan", side_effect=slow_solve)
+
+    assert request_install_plan(APPS, timeout=0.05) is None
+    # The same request waits for the solve that is already running
+    assert request_install_plan(APPS, timeout=0.05) is None
+    mock_create.assert_called_once()
+    solved.set()
+    assert request_install_plan(APPS, timeout=5) == plan
+
+
+def test_create_install_plan_failed(mocker, caplog):
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", return_value="abc")
+    mock_cache = mocker.patch("tethysapp.app_store.install_plan.cache")
+    mock_cache.get.return_value = None
+    mocker.patch("tethysapp.app_store.install_plan.conda_run", side_effect=Exception("conda failed"))
+
+    plan = create_install_plan(APPS)
+
+    assert not plan["success"]
+    assert "conda failed" in caplog.messages
+    mock_cache.set.assert_not_called()
+
+
+def test_get_cached_install_plan(mocker):
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", return_value="abc")
+    mock_cache = mocker.patch("tethysapp.app_store.install_plan.cache")
+    plan = {"success": True, "specs": ["test_channel::test_app==1.0=py_0"]}
+    mock_cache.get.return_value = plan
+
+    assert get_cached_install_plan(APPS) == plan
+    mock_cache.get.assert_called_with(get_plan_cache_key(APPS, fingerprint="abc"))
+
+    mock_cache.get.return_value = {"success": True, "specs": []}
+    assert get_cached_install_plan(APPS) is None
+
+    mock_cache.get.return_value = None
+    assert get_cached_install_plan(APPS) is None
+
+
+def test_get_cached_install_plan_environment_changed(tmp_path, mocker):
+    mock_cache = MagicMock()
+    mocker.patch("tethysapp.app_store.install_plan.cache", mock_cache)
+    mocker.patch("tethysapp.app_store.install_plan.get_environment_fingerprint", side_effect=["abc", "def"])
+
+    get_cached_install_plan(APPS)
+    get_cached_install_plan(APPS)
+
+    first_key, second_key = [call_args.args[0] for call_args in mock_cache.get.call_args_list]
+    assert first_key != second_key
@@ -1,7 +1,8 @@
 from unittest.mock import MagicMock, call
 from argparse import Namespace
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from tethys_sdk.app_settings import CustomSetting
+from tethysapp.app_store.app_declarations import AppDeclarations
 from tethysapp.app_store.installation_handlers import (
     get_service_options,
     continueAfterInstall,
@@ -13,6 +14,7 @@ from tethysapp.app_store.installation_handlers import (
 
 
 def test_get_service_options(mocker):
+    mocker.patch.dict("tethysapp.app_store.installation_handlers._service_options", clear=True)
     mock_query_set = MagicMock(id=1)
     mock_query_set.name = "service_setting"
     mock_services_list_command = mocker.patch(
@@ -29,6 +31,56 @@ def test_get_service_options(mocker):
     mock_services_list_command.asserrt_called_with(expected_args)
 
 
+def test_get_service_options_cached(mocker):
+    mocker.patch.dict("tethysapp.app_store.installation_handlers._service_options", clear=True)
+    mock_query = mocker.patch(
+        "tethysapp.app_store.installation_handlers.query_service_options",
+        side_effect=lambda service_type: [{"name": f"{service_type}_service", "id": 1}],
+    )
+
+    assert get_service_options("spatial") == [{"name": "spatial_service", "id": 1}]
+    assert get_service_options("spatial") == [{"name": "spatial_service", "id": 1}]
+    assert get_service_options("persistent") == [{"name": "persistent_service", "id": 1}]
+    assert mock_query.call_args_list == [call("spatial"), call("persistent")]
+
+    get_service_options("spatial", refresh=True)
+    assert mock_query.call_count == 3
+
+    # Cached options are queried again once they are older than the TTL
+    mocker.patch("tethysapp.app_store.installation_handlers.get_app_store_setting", return_value=0)
+    get_service_options("persistent")
+    assert mock_query.call_count == 4
+
+
+def test_process_settings_queries_each_service_type_once(tmp_path, tethysapp, mocker):
+    mock_ws = mocker.patch("tethysapp.app_store.installation_handlers.send_notification")
+    mock_settings = []
+    for name in ["spatial_1", "spatial_2", "spatial_3"]:
+        mock_setting = MagicMock(required=True, description="description")
+        mock_setting.name = name
+        mock_settings.append(mock_setting)
+    mocker.patch(
+        "tethysapp.app_store.installation_handlers.get_app_settings",
+        return_value={"unlinked_settings": mock_settings},
+    )
+    mocker.patch(
+        "tethysapp.app_store.installation_handlers.get_service_type_from_setting", return_value="spatial"
+    )
+    mocker.patch(
+        "tethysapp.app_store.installation_handlers.get_setting_type_from_setting", return_value="ds_spatial"
+    )
+    service_options = [{"name": "spatial_service", "id": 1}]
+    mock_get_options = mocker.patch(
+        "tethysapp.app_store.installation_handlers.get_service_options", return_value=service_options
+    )
+
+    process_settings(tethysapp(), tmp_path, MagicMock())
+
+    mock_get_options.assert_called_once_with("spatial")
+    services = mock_ws.call_args.args[0]["data"]
+    assert [service["options"] for service in services] == [service_options] * 3
+
+
 def test_continueAfterInstall(mocker):
     mock_ws = mocker.patch(
         "tethysapp.app_store.installation_handlers.send_notification"
@@ -82,7 +134,7 @@ def test_set_custom_settings(tethysapp, tmp_path, mocker):
     app = tethysapp()
     tethysapp_object = MagicMock(id=1)
     mocker.patch(
-        "tethysapp.app_store.installation_handlers.get_app_instance_from_path",
+        "tethysapp.app_store.installation_handlers.get_app_declarations",
         return_value=app,
     )
     mock_process_settings = mocker.patch(
@@ -93,10 +145,17 @@ def test_set_custom_settings(tethysapp, tmp_path, mocker):
         return_value=tethysapp_object,
     )
     mock_actual_setting = MagicMock(value="test")
-    mocker.patch(
-        "tethysapp.app_store.installation_handlers.CustomSetting.objects.get",
-        return_value=mock_actual_setting,
+    mock_actual_setting.name = "mock_setting"
+    mock_other_setting = MagicMock(value="other")
+    mock_other_setting.name = "other_setting"
+    mock_filter = mocker.patch(
+        "tethysapp.app_store.installation_handlers.CustomSetting.objects.filter",
+        return_value=[mock_actual_setting, mock_other_setting],
+    )
+    mock_bulk_update = mocker.patch(
+        "tethysapp.app_store.installation_handlers.CustomSetting.objects.bulk_update"
     )
+    mocker.patch("tethysapp.app_store.installation_handlers.transaction")
     custom_settings_data = {
         "app_py_path": tmp_path,
         "settings": {"mock_setting": "setting_value"},
@@ -105,6 +164,9 @@ def test_set_custom_settings(tethysapp, tmp_path, mocker):
 
     set_custom_settings(custom_settings_data, mock_channel)
 
+    mock_filter.assert_called_once_with(tethys_app=tethysapp_object.id)
+    mock_bulk_update.assert_called_once_with([mock_actual_setting], ["value"])
+
     mock_ws.assert_has_calls(
         [
             call("Custom Settings configured.", mock_channel),
@@ -117,7 +179,67 @@ def test_set_custom_settings(tethysapp, tmp_path, mocker):
     mock_process_settings.assert_called_once()
     assert mock_actual_setting.value == custom_settings_data["settings"]["mock_setting"]
     assert mock_actual_setting.clean.call_count == 1
-    assert mock_actual_setting.save.call_count == 1
+    assert mock_actual_setting.save.call_count == 0
+    assert mock_other_setting.value == "other"
+
+
+def test_set_custom_settings_invalid(tethysapp, tmp_path, mocker, caplog):
+    mock_ws = mocker.patch(
+        "tethysapp.app_store.installation_handlers.send_notification"
+    )
+    app = tethysapp()
+    declared_settings = app.custom_settings()
+    for setting_name in ["valid_setting", "missing_setting"]:
+        declared_setting = MagicMock()
+        declared_setting.name = setting_name
+        declared_settings.append(declared_setting)
+    app.custom_settings = MagicMock(return_value=declared_settings)
+    mocker.patch(
+        "tethysapp.app_store.installation_handlers.get_app_declarations",
+        return_value=app,
+    )
+    mock_process_settings = mocker.patch(
+        "tethysapp.app_store.installation_handlers.process_settings"
+    )
+    mocker.patch(
+        "tethysapp.app_store.installation_handlers.TethysApp.objects.get",
+        return_value=MagicMock(id=1),
+    )
+    mock_actual_setting = MagicMock()
+    mock_actual_setting.name = "mock_setting"
+    mock_actual_setting.clean.side_effect = ValidationError("Value must be an integer.")
+    mock_valid_setting = MagicMock()
+    mock_valid_setting.name = "valid_setting"
+    mocker.patch(
+        "tethysapp.app_store.installation_handlers.CustomSetting.objects.filter",
+        return_value=[mock_actual_setting, mock_valid_setting],
+    )
+    mock_bulk_update = mocker.patch(
+        "tethysapp.app_store.installation_handlers.CustomSetting.objects.bulk_update"
+    )
+    custom_settings_data = {
+        "app_py_path": tmp_path,
+        "settings": {"mock_setting": "abc", "valid_setting": "1", "missing_setting": "2"},
+    }
+    mock_channel = MagicMock()
+
+    set_custom_settings(custom_settings_data, mock_channel)
+
+    # Nothing is written when any setting is invalid and every error is reported at once
+    mock_bulk_update.assert_not_called()
+    mock_process_settings.assert_not_called()
+    mock_ws.assert_called_once_with(
+        {
+            "data": {
+                "errors": {
+                    "mock_setting": "Value must be an integer.",
+                    "missing_setting": "This setting is not registered for the app",
+                }
+            },
+            "jsHelperFunction": "customSettingConfigErrors",
+        },
+        mock_channel,
+    )
 
 
 def test_set_custom_settings_skip(tethysapp, tmp_path, mocker, caplog):
@@ -126,7 +248,7 @@ def test_set_custom_settings_skip(tethysapp, tmp_path, mocker, caplog):
     )
     app = tethysapp()
     mocker.patch(
-        "tethysapp.app_store.installation_handlers.get_app_instance_from_path",
+        "tethysapp.app_store.installation_handlers.get_app_declarations",
         return_value=app,
     )
     mock_process_settings = mocker.patch(
@@ -152,7 +274,7 @@ def test_set_custom_settings_object_dne(tethysapp, tmp_path, mocker, caplog):
     )
     app = tethysapp()
     mocker.patch(
-        "tethysapp.app_store.installation_handlers.get_app_instance_from_path",
+        "tethysapp.app_store.installation_handlers.get_app_declarations",
         return_value=app,
     )
     mocker.patch(
@@ -251,6 +373,22 @@ def test_process_settings_no_settings(tmp_path, tethysapp, mocker):
     mock_ws.assert_called_with("No Services found to configure.", mock_channel)
 
 
+def test_process_settings_no_declared_services(tmp_path, mocker):
+    mock_ws = mocker.patch(
+        "tethysapp.app_store.installation_handlers.send_notification"
+    )
+    mock_get_app_settings = mocker.patch(
+        "tethysapp.app_store.installation_handlers.get_app_settings"
+    )
+    app = AppDeclarations("Test App", "test_app", [], {})
+    mock_channel = MagicMock()
+
+    process_settings(app, tmp_path, mock_channel)
+
+    mock_ws.assert_called_with("No Services found to configure.", mock_channel)
+    mock_get_app_settings.assert_not_called()
+
+
 def test_configure_services(mocker):
     mock_ws = mocker.patch(
         "tethysapp.app_store.installation_handlers.send_notification"
@@ -309,7 +447,7 @@ def test_getServiceList(mocker):
         "tethysapp.app_store.installation_handlers.send_notification"
     )
     service_options = {"name": "spatial_service", "id": 1}
-    mocker.patch(
+    mock_get_options = mocker.patch(
         "tethysapp.app_store.installation_handlers.get_service_options",
         return_value=service_options,
     )
@@ -318,6 +456,8 @@ def test_getServiceList(mocker):
 
     getServiceList(data, mock_channel)
 
+    mock_get_options.assert_called_once_with("spatial", refresh=True)
+
     get_data_json = {
         "data": {"settingType": data["settingType"], "newOptions": service_options},
         "jsHelperFunction": "updateServiceListing",
@@ -0,0 +1,500 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+from tethysapp.app_store import job_queue
+from tethysapp.app_store.process_runner import run_process, disable_cancel
+from tethysapp.app_store.environment_lock import acquire_environment_lock, get_environment_lock_status
+from tethysapp.app_store.job_queue import (
+    JobScheduler,
+    cancel_job,
+    get_cancel_requests_path,
+    get_job_queue_path,
+    get_job_scheduler,
+    get_idempotency_key,
+    job_matches_app,
+    CANCEL_PENDING,
+    CANCELLED,
+    COMPLETED,
+    FAILED,
+    INTERRUPTED,
+    QUEUED,
+    RUNNING,
+)
+
+
+def wait_for_jobs(scheduler, job_ids, timeout=5):
+    end_time = time.time() + timeout
+    while time.time() < end_time:
+        if all(scheduler.get_job(job_id)["state"] in [COMPLETED, FAILED, CANCELLED] for job_id in job_ids):
+            return
+        time.sleep(0.01)
+    raise AssertionError("Jobs did not finish")
+
+
+def test_submit(tmp_path):
+    app_workspace = MagicMock(path=str(tmp_path))
+    mock_function = MagicMock()
+    channel_layer = MagicMock()
+    scheduler = JobScheduler(app_workspace, lambda job_type: mock_function, max_workers=2)
+
+    job_id = scheduler.submit("begin_install", {"name": "test_app"}, channel_layer, with_workspace=True)
+    wait_for_jobs(scheduler, [job_id])
+
+    mock_function.assert_called_once_with({"name": "test_app"}, channel_layer, app_workspace)
+    job = scheduler.get_job(job_id)
+    assert job["state"] == COMPLETED
+    assert job["exclusive"]
+    with open(get_job_queue_path(app_workspace)) as queue_file:
+        assert json.load(queue_file)[0]["state"] == COMPLETED
+
+
+def test_submit_failed_job(tmp_path):
+    app_workspace = MagicMock(path=str(tmp_path))
+    mock_function = MagicMock(side_effect=Exception("install failed"))
+    scheduler = JobScheduler(app_workspace, lambda job_type: mock_function)
+
+    job_id = scheduler.submit("get_log_file", {}, MagicMock())
+    wait_for_jobs(scheduler, [job_id])
+
+    job = scheduler.get_job(job_id)
+    assert job["state"] == FAILED
+    assert job["error"] == "install failed"
+    assert not job["exclusive"]
+
+
+def test_exclusive_jobs_are_serialized(tmp_path):
+    app_workspace = MagicMock(path=str(tmp_path))
+    running = []
+    overlaps = []
+    release = threading.Event()
+    read_only_ran = threading.Event()
+
+    def exclusive_job(data, channel_layer):
+        running.append(data["name"])
+        if len(running) > 1:
+            overlaps.append(list(running))
+        release.wait(5)
+        running.remove(data["name"])
+
+    def read_only_job(data, channel_layer):
+        read_only_ran.set()
+
+    functions = {"begin_install": exclusive_job, "update_app": exclusive_job, "get_log_file": read_only_job}
+    scheduler = JobScheduler(app_workspace, functions.get, max_workers=4)
+
+    job_ids = [
+        scheduler.submit("begin_install", {"name": "app1"}, MagicMock()),
+        scheduler.submit("update_app", {"name": "app2"}, MagicMock()),
+    ]
+    job_ids.append(scheduler.submit("get_log_file", {}, MagicMock()))
+
+    # Read only jobs don't wait for the running install
+    assert read_only_ran.wait(5)
+    assert scheduler.get_job(job_ids[1])["state"] == QUEUED
+    release.set()
+    wait_for_jobs(scheduler, job_ids)
+
+    assert overlaps == []
+
+
+def test_exclusive_job_holds_environment_lock(tmp_path, mocker):
+    mock_sn = mocker.patch("tethysapp.app_store.job_queue.send_notification")
+    mocker.patch("tethysapp.app_store.environment_lock.POLL_INTERVAL", 0.01)
+    app_workspace = MagicMock(path=str(tmp_path))
+    channel_layer = MagicMock()
+    lock_owners = []
+
+    def install(data, channel_layer):
+        lock_owners.append(get_environment_lock_status(app_workspace)["lease"]["owner"])
+
+    scheduler = JobScheduler(app_workspace, lambda job_type: install)
+    # Another worker process holds the lock
+    lease = acquire_environment_lock(app_workspace, "other_process_job")
+    job_id = scheduler.submit("begin_install", {"name": "test_app"}, channel_layer)
+    end_time = time.time() + 5
+    while not mock_sn.called and time.time() < end_time:
+        time.sleep(0.01)
+    lease.release()
+    wait_for_jobs(scheduler, [job_id])
+
+    mock_sn.assert_called_once_with("Waiting for another install to finish. Position in queue: 1", channel_layer)
+    assert lock_owners == [job_id]
+    assert get_environment_lock_status(app_workspace)["lease"] is None
+
+
+def test_priority(tmp_path):
+    app_workspace = MagicMock(path=str(tmp_path))
+    order = []
+    release = threading.Event()
+
+    def blocking_job(data, channel_layer):
+        release.wait(5)
+
+    def record_job(data, channel_layer):
+        order.append(data["name"])
+
+    functions = {"begin_install": blocking_job, "get_log_file": record_job}
+    scheduler = JobScheduler(app_workspace, functions.get, max_workers=1)
+
+    job_ids = [scheduler.submit("begin_install", {}, MagicMock())]
+    job_ids.append(scheduler.submit("get_log_file", {"name": "low"}, MagicMock()))
+    job_ids.append(scheduler.submit("get_log_file", {"name": "high"}, MagicMock(), priority=5))
+    job_ids.append(scheduler.submit("get_log_file", {"name": "default"}, MagicMock()))
+    release.set()
+    wait_for_jobs(scheduler, job_ids)
+
+    assert order == ["high", "low", "default"]
+
+
+def test_load_jobs(tmp_path, mocker):
+    app_workspace = MagicMock(path=str(tmp_path))
+    channel_layer = MagicMock()
+    mocker.patch("tethysapp.app_store.job_queue.get_channel_layer", return_value=channel_layer)
+    queue_path = get_job_queue_path(app_workspace)
+    (tmp_path / "install_status").mkdir()
+    jobs = [
+        {"id": "running_job", "type": "begin_install", "data": {}, "with_workspace": True, "exclusive": True,
+         "priority": 0, "sequence": 0, "state": RUNNING, "created": 0, "started": 0, "finished": None,
+         "error": None},
+        {"id": "queued_job", "type": "update_app", "data": {"name": "test_app"}, "with_workspace": True,
+         "exclusive": True, "priority": 0, "sequence": 1, "state": QUEUED, "created": 0, "started": None,
+         "finished": None, "error": None},
+    ]
+    with open(queue_path, "w") as queue_file:
+        json.dump(jobs, queue_file)
+    mock_function = MagicMock()
+
+    scheduler = JobScheduler(app_workspace, lambda job_type: mock_function)
+    wait_for_jobs(scheduler, ["queued_job"])
+
+    assert scheduler.get_job("running_job")["state"] == INTERRUPTED
+    mock_function.assert_called_once_with({"name": "test_app"}, channel_layer, app_workspace)
+    assert scheduler.submit("get_log_file", {}, MagicMock()) != "queued_job"
+    assert scheduler.list_jobs()[-1]["sequence"] == 2
+
+
+def test_load_jobs_corrupted(tmp_path, caplog):
+    app_workspace = MagicMock(path=str(tmp_path))
+    (tmp_path / "install_status").mkdir()
+    with open(get_job_queue_path(app_workspace), "w") as queue_file:
+        queue_file.write("{not json")
+
+    scheduler = JobScheduler(app_workspace, MagicMock())
+
+    assert scheduler.list_jobs() == []
+    assert "Job queue file is corrupted. Starting a new job queue" in caplog.messages
+
+
+def test_save_jobs_prunes_finished_jobs(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.job_queue.MAX_FINISHED_JOBS", 2)
+    app_workspace = MagicMock(path=str(tmp_path))
+    scheduler = JobScheduler(app_workspace, lambda job_type: MagicMock(), max_workers=1)
+
+    job_ids = [scheduler.submit("get_log_file", {}, MagicMock()) for _ in range(4)]
+    wait_for_jobs(scheduler, job_ids[-1:])
+    scheduler.save_jobs()
+
+    assert [job["id"] for job in scheduler.list_jobs()] == job_ids[2:]
+
+
+def test_get_job_scheduler(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", None)
+    app_workspace = MagicMock(path=str(tmp_path))
+
+    scheduler = get_job_scheduler(app_workspace, MagicMock())
+
+    assert get_job_scheduler(app_workspace, MagicMock()) is scheduler
+    assert job_queue._scheduler is scheduler
+
+
+def test_get_job_scheduler_resumes_interrupted_installs(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", None)
+    mock_resume = mocker.patch("tethysapp.app_store.job_queue.resume_interrupted_installs")
+    app_workspace = MagicMock(path=str(tmp_path))
+
+    scheduler = get_job_scheduler(app_workspace, MagicMock())
+    get_job_scheduler(app_workspace, MagicMock())
+
+    mock_resume.assert_called_once_with(scheduler)
+
+
+def test_get_active_jobs(tmp_path, mocker):
+    app_workspace = MagicMock(path=str(tmp_path))
+    scheduler = JobScheduler(app_workspace, MagicMock())
+    mocker.patch.object(scheduler, "start_workers")
+
+    job_id = scheduler.submit("resume_install", {"journalId": "journal"}, MagicMock())
+    scheduler.submit("get_log_file", {}, MagicMock())
+
+    assert [job["id"] for job in scheduler.get_active_jobs("resume_install")] == [job_id]
+
+
+def test_cancel_queued_job(tmp_path, mocker):
+    mock_sn = mocker.patch("tethysapp.app_store.job_queue.send_notification")
+    app_workspace = MagicMock(path=str(tmp_path))
+    release = threading.Event()
+    functions = {"begin_install": lambda data, channel_layer: release.wait(5), "update_app": MagicMock()}
+    scheduler = JobScheduler(app_workspace, functions.get, max_workers=2)
+    channel_layer = MagicMock()
+
+    running_id = scheduler.submit("begin_install", {"name": "app1"}, MagicMock())
+    queued_id = scheduler.submit("update_app", {"name": "app2"}, channel_layer)
+    job = scheduler.cancel(queued_id)
+    release.set()
+    wait_for_jobs(scheduler, [running_id])
+
+    assert job["state"] == CANCELLED
+    functions["update_app"].assert_not_called()
+    mock_sn.assert_called_once_with(
+        {
+            "data": {"jobId": queued_id, "jobType": "update_app", "name": "app2", "state": CANCELLED},
+            "jsHelperFunction": "jobCancelled",
+        },
+        channel_layer,
+    )
+    assert scheduler.cancel(queued_id) is None
+    assert scheduler.cancel("not_a_job") is None
+
+
+def test_cancel_running_job(tmp_path, mocker):
+    mock_sn = mocker.patch("tethysapp.app_store.job_queue.send_notification")
+    mocker.patch("tethysapp.app_store.process_runner.POLL_INTERVAL", 0.05)
+    app_workspace = MagicMock(path=str(tmp_path))
+    started = threading.Event()
+
+    def install(data, channel_layer):
+        run_process(["sh", "-c", "echo started; sleep 5"], on_line=lambda line: started.set(), timeout=0)
+
+    after_cancel = MagicMock()
+    functions = {"begin_install": install, "update_app": after_cancel}
+    scheduler = JobScheduler(app_workspace, functions.get, max_workers=1)
+
+    job_id = scheduler.submit("begin_install", {"name": "test_app"}, MagicMock())
+    next_job_id = scheduler.submit("update_app", {"name": "test_app"}, MagicMock())
+    assert started.wait(5)
+    assert scheduler.cancel(job_id)["state"] == RUNNING
+    wait_for_jobs(scheduler, [job_id, next_job_id])
+
+    assert scheduler.get_job(job_id)["state"] == CANCELLED
+    assert get_environment_lock_status(app_workspace)["lease"] is None
+    assert mock_sn.call_args.args[0]["data"]["state"] == CANCELLED
+    # The worker slot is freed for the next exclusive job
+    after_cancel.assert_called_once()
+
+
+def test_cancel_running_job_finished_first(tmp_path, mocker):
+    mock_sn = mocker.patch("tethysapp.app_store.job_queue.send_notification")
+    app_workspace = MagicMock(path=str(tmp_path))
+    release = threading.Event()
+    started = threading.Event()
+
+    def install(data, channel_layer):
+        started.set()
+        release.wait(5)
+
+    scheduler = JobScheduler(app_workspace, lambda job_type: install)
+
+    job_id = scheduler.submit("begin_install", {"name": "test_app"}, MagicMock())
+    assert started.wait(5)
+    scheduler.cancel(job_id)
+    release.set()
+    wait_for_jobs(scheduler, [job_id])
+
+    assert scheduler.get_job(job_id)["state"] == COMPLETED
+    assert mock_sn.call_args.args[0]["data"]["state"] == COMPLETED
+
+
+def test_cancel_running_job_not_cancellable(tmp_path, mocker):
+    mock_sn = mocker.patch("tethysapp.app_store.job_queue.send_notification")
+    mocker.patch("tethysapp.app_store.job_queue.get_channel_layer")
+    app_workspace = MagicMock(path=str(tmp_path))
+    release = threading.Event()
+    started = threading.Event()
+
+    def uninstall(data, channel_layer):
+        disable_cancel()
+        started.set()
+        release.wait(5)
+
+    scheduler = JobScheduler(app_workspace, lambda job_type: uninstall)
+
+    job_id = scheduler.submit("uninstall_app", {"name": "test_app"}, MagicMock())
+    assert started.wait(5)
+    assert scheduler.cancel(job_id) is None
+    release.set()
+    wait_for_jobs(scheduler, [job_id])
+
+    assert scheduler.get_job(job_id)["state"] == COMPLETED
+    assert not scheduler.get_job(job_id)["cancelRequested"]
+    mock_sn.assert_called_once()
+    assert mock_sn.call_args.args[0]["jsHelperFunction"] == "jobNotCancellable"
+    assert mock_sn.call_args.args[0]["data"]["state"] == RUNNING
+
+
+def test_find_active_job(tmp_path):
+    app_workspace = MagicMock(path=str(tmp_path))
+    release = threading.Event()
+    functions = {"begin_install": lambda data, channel_layer: release.wait(5), "get_log_file": MagicMock()}
+    scheduler = JobScheduler(app_workspace, functions.get, max_workers=1)
+
+    running_id = scheduler.submit("begin_install", {"name": "app1"}, MagicMock())
+    queued_id = scheduler.submit("begin_install", {"name": "app2"}, MagicMock())
+
+    assert scheduler.find_active_job()["id"] == running_id
+    assert scheduler.find_active_job(name="app2")["id"] == queued_id
+    assert scheduler.find_active_job(name="app3") is None
+    release.set()
+    wait_for_jobs(scheduler, [running_id, queued_id])
+    assert scheduler.find_active_job() is None
+
+
+def test_job_matches_app():
+    assert job_matches_app({"data": {"name": "test_app"}}, "test_app")
+    assert job_matches_app({"data": {"apps": [{"name": "app1"}, {"name": "test_app"}]}}, "test_app")
+    assert not job_matches_app({"data": {"name": "app1"}}, "test_app")
+
+
+def test_cancel_job(mocker):
+    mock_post = mocker.patch("tethysapp.app_store.job_queue.post_cancel_request", return_value={"id": "request_id"})
+    mock_scheduler = MagicMock()
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", mock_scheduler)
+    mock_scheduler.find_cancel_target.return_value = {"id": "job_id"}
+    app_workspace = MagicMock()
+
+    assert cancel_job(app_workspace, name="test_app") == mock_scheduler.cancel.return_value
+    mock_scheduler.find_cancel_target.assert_called_with(job_id=None, name="test_app")
+    mock_scheduler.cancel.assert_called_with("job_id")
+    mock_post.assert_not_called()
+
+
+def test_cancel_job_other_process(mocker):
+    mock_post = mocker.patch("tethysapp.app_store.job_queue.post_cancel_request", return_value={"id": "request_id"})
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", None)
+    app_workspace = MagicMock()
+
+    job = cancel_job(app_workspace, job_id="job_id")
+
+    assert job == {"id": "job_id", "data": {"name": None}, "state": CANCEL_PENDING, "cancelRequestId": "request_id"}
+    mock_post.assert_called_once_with(app_workspace, job_id="job_id", name=None)
+
+
+def test_cancel_job_from_other_process(tmp_path, mocker):
+    mock_sn = mocker.patch("tethysapp.app_store.job_queue.send_notification")
+    mocker.patch("tethysapp.app_store.job_queue.CANCEL_POLL_INTERVAL", 0.05)
+    mocker.patch("tethysapp.app_store.process_runner.POLL_INTERVAL", 0.05)
+    app_workspace = MagicMock(path=str(tmp_path))
+    started = threading.Event()
+
+    def install(data, channel_layer):
+        run_process(["sh", "-c", "echo started; sleep 5"], on_line=lambda line: started.set(), timeout=0)
+
+    # The job runs in the scheduler of another worker process that shares the workspace
+    owning_scheduler = JobScheduler(app_workspace, lambda job_type: install, max_workers=1)
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", None)
+
+    job_id = owning_scheduler.submit("begin_install", {"name": "test_app"}, MagicMock())
+    assert started.wait(5)
+    assert cancel_job(app_workspace, name="test_app")["state"] == CANCEL_PENDING
+    wait_for_jobs(owning_scheduler, [job_id])
+
+    assert owning_scheduler.get_job(job_id)["state"] == CANCELLED
+    assert mock_sn.call_args.args[0]["jsHelperFunction"] == "jobCancelled"
+    with open(get_cancel_requests_path(app_workspace)) as requests_file:
+        assert json.load(requests_file) == []
+
+
+def test_process_cancel_requests_other_jobs(tmp_path, mocker):
+    app_workspace = MagicMock(path=str(tmp_path))
+    scheduler = JobScheduler(app_workspace, MagicMock())
+    requests_path = get_cancel_requests_path(app_workspace)
+    (tmp_path / "install_status").mkdir(exist_ok=True)
+    cancel_requests = [
+        {"id": "expired", "jobId": "old_job", "name": None, "requested": time.time() - 120},
+        {"id": "other", "jobId": "other_job", "name": None, "requested": time.time()},
+    ]
+    with open(requests_path, "w") as requests_file:
+        json.dump(cancel_requests, requests_file)
+
+    # Requests for the jobs of other processes are left for them, and requests no process picked up expire
+    assert scheduler.process_cancel_requests() == []
+    assert [request["id"] for request in job_queue.read_cancel_requests(requests_path)] == ["other"]
+
+
+def test_has_exclusive_jobs(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", None)
+    assert not job_queue.has_exclusive_jobs()
+
+    app_workspace = MagicMock(path=str(tmp_path))
+    release = threading.Event()
+    functions = {"begin_install": lambda data, channel_layer: release.wait(5), "get_log_file": MagicMock()}
+    scheduler = JobScheduler(app_workspace, functions.get)
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", scheduler)
+
+    job_id = scheduler.submit("begin_install", {"name": "test_app"}, MagicMock())
+    assert job_queue.has_exclusive_jobs()
+    release.set()
+    wait_for_jobs(scheduler, [job_id])
+    assert not job_queue.has_exclusive_jobs()
+
+
+def test_run_exclusive(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", None)
+    assert job_queue.run_exclusive(lambda value: value, "result") == "result"
+
+    app_workspace = MagicMock(path=str(tmp_path))
+    mock_install = MagicMock()
+    scheduler = JobScheduler(app_workspace, lambda job_type: mock_install)
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", scheduler)
+    job_ids = []
+
+    def restart():
+        job_ids.append(scheduler.submit("begin_install", {"name": "test_app"}, MagicMock()))
+        time.sleep(0.1)
+        # The install waits until the exclusive slot is released
+        assert scheduler.get_job(job_ids[0])["state"] == QUEUED
+        return "restarted"
+
+    assert job_queue.run_exclusive(restart) == "restarted"
+    wait_for_jobs(scheduler, job_ids)
+    mock_install.assert_called_once()
+
+
+def test_get_idempotency_key():
+    app_data = {"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}
+    app_data2 = {"name": "test_app2", "channel": "test_channel", "label": "dev", "version": ""}
+
+    assert get_idempotency_key("begin_install", app_data) == "install|test_app:test_channel:main:1.0"
+    assert get_idempotency_key("batch_install", {"apps": [app_data, app_data2]}) == get_idempotency_key(
+        "batch_install", {"apps": [app_data2, app_data]}
+    )
+    assert get_idempotency_key("begin_install", {**app_data, "version": "2.0"}) != get_idempotency_key(
+        "begin_install", app_data
+    )
+    assert get_idempotency_key("update_app", app_data) is None
+
+
+def test_submit_duplicate_install(tmp_path, mocker):
+    mock_sn = mocker.patch("tethysapp.app_store.job_queue.send_notification")
+    app_workspace = MagicMock(path=str(tmp_path))
+    release = threading.Event()
+    mock_function = MagicMock(side_effect=lambda *args: release.wait(5))
+    scheduler = JobScheduler(app_workspace, lambda job_type: mock_function)
+    install_data = {"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}
+    channel_layer = MagicMock()
+
+    job_id = scheduler.submit("begin_install", install_data, channel_layer, with_workspace=True)
+    duplicate_id = scheduler.submit("begin_install", dict(install_data), channel_layer, with_workspace=True)
+    other_id = scheduler.submit("begin_install", {**install_data, "version": "2.0"}, channel_layer)
+    release.set()
+    wait_for_jobs(scheduler, [job_id, other_id])
+
+    assert duplicate_id == job_id
+    assert mock_function.call_count == 2
+    attached = mock_sn.call_args_list[0].args[0]
+    assert attached["jsHelperFunction"] == "jobAttached"
+    assert attached["data"]["jobId"] == job_id
+    assert attached["data"]["name"] == "test_app"
+
+    # A finished install doesn't stop the same install from running again
+    assert scheduler.submit("begin_install", install_data, channel_layer) != job_id
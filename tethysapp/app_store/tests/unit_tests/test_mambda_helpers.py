@@ -1,19 +1,21 @@
-from unittest.mock import MagicMock, call
+from unittest.mock import ANY, MagicMock, call
 from tethysapp.app_store.mamba_helpers import (
     send_uninstall_messages,
     mamba_install,
     mamba_uninstall,
     mamba_download,
+    mamba_batch_install,
+    get_label_channel,
 )
 
 
-def test_mamba_uninstall(mocker, tmp_path):
+def test_mamba_uninstall(mock_run_process, mocker, tmp_path):
     mamba_helpers_file = tmp_path / "mamba_helpers.py"
     mamba_helpers_file.mkdir()
     mocker.patch("tethysapp.app_store.mamba_helpers.__file__", str(mamba_helpers_file))
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_sm = mocker.patch("tethysapp.app_store.mamba_helpers.send_uninstall_messages")
-    mock_sp.Popen().stdout.readline.side_effect = [
+    mock_rp.lines = [
         "Running Mamba remove",
         "Transaction starting",
         "Transaction finished",
@@ -25,9 +27,7 @@ def test_mamba_uninstall(mocker, tmp_path):
     mamba_uninstall(app_name, mock_channel)
 
     script_path = str(tmp_path / "scripts" / "mamba_uninstall.sh")
-    mock_sp.Popen.assert_called_with(
-        [script_path, app_name], stdout=mock_sp.PIPE, stderr=mock_sp.STDOUT
-    )
+    mock_rp.assert_called_with([script_path, app_name], on_line=ANY)
     mock_sm.assert_has_calls(
         [
             call("Running uninstall script", mock_channel),
@@ -37,22 +37,19 @@ def test_mamba_uninstall(mocker, tmp_path):
     )
 
 
-def test_mamba_uninstall2(mocker, tmp_path):
+def test_mamba_uninstall2(mock_run_process, mocker, tmp_path):
     mamba_helpers_file = tmp_path / "mamba_helpers.py"
     mamba_helpers_file.mkdir()
     mocker.patch("tethysapp.app_store.mamba_helpers.__file__", str(mamba_helpers_file))
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_sm = mocker.patch("tethysapp.app_store.mamba_helpers.send_uninstall_messages")
-    mock_sp.Popen().stdout.readline.side_effect = [""]
     app_name = "test_app"
     mock_channel = MagicMock()
 
     mamba_uninstall(app_name, mock_channel)
 
     script_path = str(tmp_path / "scripts" / "mamba_uninstall.sh")
-    mock_sp.Popen.assert_called_with(
-        [script_path, app_name], stdout=mock_sp.PIPE, stderr=mock_sp.STDOUT
-    )
+    mock_rp.assert_called_with([script_path, app_name], on_line=ANY)
     mock_sm.assert_not_called()
 
 
@@ -67,17 +64,17 @@ def test_send_uninstall_messages(mocker):
     mock_sn.assert_called_with(expected_json, mock_channel)
 
 
-def test_mamba_download_success(resource, mocker):
+def test_mamba_download_success(mock_run_process, resource, mocker):
     app_channel = "test_channel"
     app_label = "dev"
     app_version = ""
     app_resource = resource("test_app", app_channel, app_label)
     mock_channel = MagicMock()
     mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
     mock_time.time.side_effect = [10, 20]
-    mock_sp.Popen().stdout.readline.side_effect = ["Mamba Download Complete"]
+    mock_rp.lines = ["Mamba Download Complete"]
 
     successful_install = mamba_download(
         app_resource, app_channel, app_label, app_version, mock_channel
@@ -96,17 +93,16 @@ def test_mamba_download_success(resource, mocker):
     assert successful_install
 
 
-def test_mamba_download_success2(resource, mocker):
+def test_mamba_download_success2(mock_run_process, resource, mocker):
     app_channel = "test_channel"
     app_label = "dev"
     app_version = ""
     app_resource = resource("test_app", app_channel, app_label)
     mock_channel = MagicMock()
     mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
     mock_time.time.side_effect = [10, 20]
-    mock_sp.Popen().stdout.readline.side_effect = [""]
 
     successful_install = mamba_download(
         app_resource, app_channel, app_label, app_version, mock_channel
@@ -125,17 +121,17 @@ def test_mamba_download_success2(resource, mocker):
     assert successful_install
 
 
-def test_mamba_download_failure(resource, mocker):
+def test_mamba_download_failure(mock_run_process, resource, mocker):
     app_channel = "test_channel"
     app_label = "dev"
     app_version = ""
     app_resource = resource("test_app", app_channel, app_label)
     mock_channel = MagicMock()
     mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
     mock_time.time.side_effect = [10, 20]
-    mock_sp.Popen().stdout.readline.side_effect = [
+    mock_rp.lines = [
         "All requested packages already installed",
         "Mamba Download Complete",
     ]
@@ -156,23 +152,25 @@ def test_mamba_download_failure(resource, mocker):
     assert not successful_install
 
 
-def test_mamba_install_success(resource, mocker):
+def test_mamba_install_success(mock_run_process, resource, mocker):
     app_channel = "test_channel"
     app_label = "dev"
     app_version = ""
     app_resource = resource("test_app", app_channel, app_label)
     mock_channel = MagicMock()
     mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
     mock_time.time.side_effect = [10, 20]
-    mock_sp.Popen().stdout.readline.side_effect = [
+    mock_rp.lines = [
         "Running Mamba Install",
-        "Collecting package metadata: done",
-        "Solving environment: done",
-        "Verifying transaction: done",
-        "All requested packages already installed.",
+        'APPSTORE_EVENT {"type": "solve_start", "tool": "mamba"}',
+        "{",
+        '  "actions": {"LINK": [{"name": "test_app"}, {"name": "numpy"}]},',
+        '  "success": true',
+        "}",
         "Mamba Install Success",
+        'APPSTORE_EVENT {"type": "complete", "success": true}',
         "Install Complete",
     ]
 
@@ -180,41 +178,72 @@ def test_mamba_install_success(resource, mocker):
         app_resource, app_channel, app_label, app_version, mock_channel
     )
 
+    assert mock_ws.call_args_list == [
+        call(
+            "Mamba install may take a couple minutes to complete depending on how complicated the "
+            "environment is. Please wait....",
+            mock_channel,
+        ),
+        call("Solving Environment: Started", mock_channel),
+        call("Solving Environment: Done", mock_channel),
+        call("Linking Packages: 2 packages linked", mock_channel),
+        call("Transaction: Done", mock_channel),
+        call("Mamba install completed in 10.00 seconds.", mock_channel),
+    ]
+    assert successful_install
+    # mamba prints nothing with --json until it is done, so only the overall timeout applies
+    assert mock_rp.call_args.kwargs["idle_timeout"] == 0
+
+
+def test_mamba_install_already_installed(mock_run_process, resource, mocker):
+    app_channel = "test_channel"
+    app_label = "dev"
+    app_resource = resource("test_app", app_channel, app_label)
+    mock_channel = MagicMock()
+    mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
+    mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
+    mock_time.time.side_effect = [10, 20]
+    mock_rp.lines = [
+        'APPSTORE_EVENT {"type": "solve_start", "tool": "mamba"}',
+        '{"message": "All requested packages already installed.", "success": true}',
+        'APPSTORE_EVENT {"type": "complete", "success": true}',
+        "Install Complete",
+    ]
+
+    successful_install = mamba_install(
+        app_resource, app_channel, app_label, "1.0", mock_channel
+    )
+
     mock_ws.assert_has_calls(
         [
-            call(
-                "Mamba install may take a couple minutes to complete depending on how complicated the "
-                "environment is. Please wait....",
-                mock_channel,
-            ),
-            call("Package Metadata Collection: Done", mock_channel),
             call("Solving Environment: Done", mock_channel),
-            call("Verifying Transaction: Done", mock_channel),
-            call(
-                "Application package is already installed in this conda environment.",
-                mock_channel,
-            ),
-            call("Mamba install completed in 10.00 seconds.", mock_channel),
+            call("All requested packages already installed.", mock_channel),
+            call("Transaction: Done", mock_channel),
         ]
     )
     assert successful_install
 
 
-def test_mamba_install_mamba_failure_conda_success(resource, mocker):
+def test_mamba_install_mamba_failure_conda_success(mock_run_process, resource, mocker):
     app_channel = "test_channel"
     app_label = "dev"
     app_version = ""
     app_resource = resource("test_app", app_channel, app_label)
     mock_channel = MagicMock()
     mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
     mock_time.time.side_effect = [10, 20]
-    mock_sp.Popen().stdout.readline.side_effect = [
+    mock_rp.lines = [
         "Running Mamba Install",
-        "critical libmamba Could not solve for environment specs",
+        'APPSTORE_EVENT {"type": "solve_start", "tool": "mamba"}',
+        '{"success": false, "error": "Could not solve for environment specs"}',
         "Mamba failed. Trying conda now.",
-        "Conda Install Success",
+        'APPSTORE_EVENT {"type": "retry", "tool": "conda"}',
+        'APPSTORE_EVENT {"type": "solve_start", "tool": "conda"}',
+        '{"fetch": "test_app-1.0 | 1 KB", "finished": true, "maxval": 1, "progress": 1.0}\x00',
+        'APPSTORE_EVENT {"type": "complete", "success": true}',
         "Install Complete",
     ]
 
@@ -222,36 +251,46 @@ def test_mamba_install_mamba_failure_conda_success(resource, mocker):
         app_resource, app_channel, app_label, app_version, mock_channel
     )
 
-    mock_ws.assert_has_calls(
-        [
-            call(
-                "Mamba install may take a couple minutes to complete depending on how complicated the "
-                "environment is. Please wait....",
-                mock_channel,
-            ),
-            call("Failed to resolve environment specs when installing.", mock_channel),
-            call("Install failed using mamba. Trying now with conda.", mock_channel),
-            call("Install succeeded with conda.", mock_channel),
-            call("Mamba install completed in 10.00 seconds.", mock_channel),
-        ]
-    )
+    assert mock_ws.call_args_list == [
+        call(
+            "Mamba install may take a couple minutes to complete depending on how complicated the "
+            "environment is. Please wait....",
+            mock_channel,
+        ),
+        call("Solving Environment: Started", mock_channel),
+        call("Solving Environment: Done", mock_channel),
+        call("Install error: Could not solve for environment specs", mock_channel),
+        call("Install failed. Trying now with conda.", mock_channel),
+        call("Solving Environment: Started", mock_channel),
+        call("Solving Environment: Done", mock_channel),
+        call("Downloading test_app-1.0: 100%", mock_channel),
+        call("Transaction: Done", mock_channel),
+        call("Mamba install completed in 10.00 seconds.", mock_channel),
+    ]
     assert successful_install
 
 
-def test_mamba_install_mamba_failure_conda_failure(resource, mocker):
+def test_mamba_install_mamba_failure_conda_failure(mock_run_process, resource, mocker):
+    app_name = "test_app"
     app_channel = "test_channel"
     app_label = "dev"
-    app_version = ""
-    app_resource = resource("test_app", app_channel, app_label)
+    app_resource = resource(app_name, app_channel, app_label)
+    app_version = app_resource["latestVersion"][app_channel][app_label]
     mock_channel = MagicMock()
     mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
     mock_time.time.side_effect = [10, 20]
-    mock_sp.Popen().stdout.readline.side_effect = [
-        "Running Mamba Install",
-        "critical libmamba Could not solve for environment specs",
-        "Mamba failed. Trying conda now.",
+    mock_rp.lines = [
+        'APPSTORE_EVENT {"type": "solve_start", "tool": "mamba"}',
+        '{"success": false, "error": "Could not solve for environment specs"}',
+        'APPSTORE_EVENT {"type": "retry", "tool": "conda"}',
+        'APPSTORE_EVENT {"type": "solve_start", "tool": "conda"}',
+        "{",
+        '  "exception_name": "UnsatisfiableError",',
+        '  "message": "Found conflicts!"',
+        "}",
+        'APPSTORE_EVENT {"type": "complete", "success": false}',
         "Install Complete",
     ]
 
@@ -261,34 +300,37 @@ def test_mamba_install_mamba_failure_conda_failure(resource, mocker):
 
     mock_ws.assert_has_calls(
         [
+            call("Install failed. Trying now with conda.", mock_channel),
+            call("Solving Environment: Started", mock_channel),
+            call("Solving Environment: Done", mock_channel),
+            call("Install error: Found conflicts!", mock_channel),
+            call("Transaction: Failed", mock_channel),
             call(
-                "Mamba install may take a couple minutes to complete depending on how complicated the "
-                "environment is. Please wait....",
+                "Please try running the following command in your terminal's conda environment to attempt a "
+                f"manual installation : mamba install -c {app_channel}/label/{app_label} {app_name}={app_version}",
                 mock_channel,
             ),
-            call("Failed to resolve environment specs when installing.", mock_channel),
-            call("Install failed using mamba. Trying now with conda.", mock_channel),
             call("Mamba install completed in 10.00 seconds.", mock_channel),
         ]
     )
     assert not successful_install
 
 
-def test_mamba_install_output_failure2(resource, mocker):
+def test_mamba_install_output_ends_without_complete_event(mock_run_process, resource, mocker):
     app_name = "test_app"
     app_channel = "test_channel"
-    app_label = "dev"
+    app_label = "main"
     app_resource = resource(app_name, app_channel, app_label)
     app_version = app_resource["latestVersion"][app_channel][app_label]
     mock_channel = MagicMock()
     mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
     mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
     mock_time.time.side_effect = [10, 20]
-    mock_sp.Popen().stdout.readline.side_effect = [
+    mock_rp.lines = [
         "Running Mamba Install",
-        "Found conflicts!",
-        "Install Complete",
+        'APPSTORE_EVENT {"type": "solve_start", "tool": "mamba"}',
+        "",
     ]
 
     successful_install = mamba_install(
@@ -297,24 +339,68 @@ def test_mamba_install_output_failure2(resource, mocker):
 
     mock_ws.assert_has_calls(
         [
+            call("Solving Environment: Started", mock_channel),
             call(
-                "Mamba install may take a couple minutes to complete depending on how complicated the "
-                "environment is. Please wait....",
+                "Please try running the following command in your terminal's conda environment to attempt a "
+                f"manual installation : mamba install -c {app_channel} {app_name}={app_version}",
                 mock_channel,
             ),
+            call("Mamba install completed in 10.00 seconds.", mock_channel),
+        ]
+    )
+    assert not successful_install
+
+
+def test_get_label_channel():
+    assert get_label_channel("test_channel", "main") == "test_channel"
+    assert get_label_channel("test_channel", "dev") == "test_channel/label/dev"
+
+
+def test_mamba_batch_install(mock_run_process, mocker):
+    apps = [
+        {"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"},
+        {"name": "test_app2", "channel": "test_channel", "label": "dev", "version": "2.0"},
+        {"name": "test_app3", "channel": "test_channel", "label": "main", "version": "3.0"},
+    ]
+    mock_channel = MagicMock()
+    mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers")
+    mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
+    mock_time.time.side_effect = [10, 20]
+    mock_rp.lines = [
+        "Running Mamba Install",
+        'APPSTORE_EVENT {"type": "complete", "success": false}',
+        "Install Complete",
+    ]
+
+    successful_install = mamba_batch_install(apps, mock_channel)
+
+    install_command = mock_rp.call_args.args[0]
+    assert install_command[0].endswith("mamba_batch_install.sh")
+    assert mock_rp.call_args.kwargs["idle_timeout"] == 0
+    assert install_command[1:] == [
+        "test_channel,test_channel/label/dev",
+        "test_channel::test_app=1.0",
+        "test_channel/label/dev::test_app2=2.0",
+        "test_channel::test_app3=3.0",
+    ]
+    mock_ws.assert_has_calls(
+        [
+            call("Transaction: Failed", mock_channel),
             call(
-                "Mamba install found conflicts. Please try running the following command in your terminal's "
-                f"conda environment to attempt a manual installation : mamba install -c {app_channel}/label/{app_label}"
-                f" {app_name}={app_version}",
+                "Please try running the following command in your terminal's "
+                "conda environment to attempt a manual installation : "
+                "mamba install -c test_channel -c test_channel/label/dev test_channel::test_app=1.0 "
+                "test_channel/label/dev::test_app2=2.0 test_channel::test_app3=3.0",
                 mock_channel,
             ),
-            call("Mamba install completed in 10.00 seconds.", mock_channel),
+            call("Mamba batch install completed in 10.00 seconds.", mock_channel),
         ]
     )
     assert not successful_install
 
 
-def test_mamba_install_output_failure3(resource, mocker):
+def test_mamba_install_script_failed(mock_run_process, resource, mocker):
     app_name = "test_app"
     app_channel = "test_channel"
     app_label = "main"
@@ -322,14 +408,10 @@ def test_mamba_install_output_failure3(resource, mocker):
     app_version = app_resource["latestVersion"][app_channel][app_label]
     mock_channel = MagicMock()
     mock_ws = mocker.patch("tethysapp.app_store.mamba_helpers.send_notification")
-    mock_sp = mocker.patch("tethysapp.app_store.mamba_helpers.subprocess")
+    mock_rp = mock_run_process("tethysapp.app_store.mamba_helpers", returncode=1)
+    mock_rp.lines = ['APPSTORE_EVENT {"type": "complete", "success": true}']
     mock_time = mocker.patch("tethysapp.app_store.mamba_helpers.time")
     mock_time.time.side_effect = [10, 20]
-    mock_sp.Popen().stdout.readline.side_effect = [
-        "Running Mamba Install",
-        "Found conflicts!",
-        "",
-    ]
 
     successful_install = mamba_install(
         app_resource, app_channel, app_label, app_version, mock_channel
@@ -337,18 +419,13 @@ def test_mamba_install_output_failure3(resource, mocker):
 
     mock_ws.assert_has_calls(
         [
+            call("Transaction: Done", mock_channel),
+            call("Install script failed. The process exited with code 1.", mock_channel),
             call(
-                "Mamba install may take a couple minutes to complete depending on how complicated the "
-                "environment is. Please wait....",
-                mock_channel,
-            ),
-            call(
-                "Mamba install found conflicts. Please try running the following command in your terminal's "
-                f"conda environment to attempt a manual installation : mamba install -c {app_channel} "
-                f"{app_name}={app_version}",
+                "Please try running the following command in your terminal's conda environment to attempt a "
+                f"manual installation : mamba install -c {app_channel} {app_name}={app_version}",
                 mock_channel,
             ),
-            call("Mamba install completed in 10.00 seconds.", mock_channel),
         ]
     )
     assert not successful_install
@@ -0,0 +1,194 @@
+import pytest
+from unittest.mock import call
+from tethysapp.app_store import management_commands
+from tethysapp.app_store.process_runner import ProcessCancelled, ProcessResult
+from tethysapp.app_store.management_commands import (
+    get_step_timings,
+    record_step_timing,
+    run_command_groups,
+    run_management_command,
+    sync_tethys_db,
+)
+
+
+def test_record_step_timing(mocker):
+    mocker.patch.object(management_commands, "_step_timings", management_commands.deque(maxlen=2))
+
+    record_step_timing("step1", 1.23456, True, True)
+    record_step_timing("step2", 2, False, False)
+    timing = record_step_timing("step3", 3, True, False)
+
+    assert timing["step"] == "step3"
+    assert [timing["step"] for timing in get_step_timings()] == ["step2", "step3"]
+    assert get_step_timings()[0]["seconds"] == 2
+    assert not get_step_timings()[0]["success"]
+
+
+def test_run_management_command_in_process(mocker):
+    mocker.patch("tethysapp.app_store.management_commands.get_app_store_setting", return_value=True)
+    mock_call_command = mocker.patch("tethysapp.app_store.management_commands.call_command")
+    mock_run_process = mocker.patch("tethysapp.app_store.management_commands.run_process")
+
+    timing = run_management_command(["syncstores", "test_app", "-f"])
+
+    assert mock_call_command.call_args.args == ("syncstores", "test_app", "-f")
+    mock_run_process.assert_not_called()
+    assert timing["step"] == "syncstores test_app -f"
+    assert timing["success"]
+    assert timing["inProcess"]
+
+
+def test_run_management_command_fallback(mocker, caplog):
+    mocker.patch("tethysapp.app_store.management_commands.get_app_store_setting", return_value=True)
+    mocker.patch("tethysapp.app_store.management_commands.call_command", side_effect=Exception("Command failed"))
+    mocker.patch("tethysapp.app_store.management_commands.get_manage_path", return_value="manage_path")
+    mock_run_process = mocker.patch(
+        "tethysapp.app_store.management_commands.run_process", return_value=ProcessResult(0)
+    )
+
+    timing = run_management_command(["syncstores", "test_app", "-f"])
+
+    mock_run_process.assert_called_once_with(["python", "manage_path", "syncstores", "test_app", "-f"])
+    assert (
+        "Running 'syncstores test_app -f' in process failed: Command failed. Running it with manage.py"
+        in caplog.messages
+    )
+    assert timing["success"]
+    assert not timing["inProcess"]
+
+
+def test_run_management_command_disabled(mocker):
+    mocker.patch("tethysapp.app_store.management_commands.get_app_store_setting", return_value=False)
+    mock_call_command = mocker.patch("tethysapp.app_store.management_commands.call_command")
+    mocker.patch("tethysapp.app_store.management_commands.get_manage_path", return_value="manage_path")
+    mock_run_process = mocker.patch(
+        "tethysapp.app_store.management_commands.run_process", return_value=ProcessResult(1)
+    )
+
+    timing = run_management_command(["pre_collectstatic"])
+
+    mock_call_command.assert_not_called()
+    mock_run_process.assert_called_once_with(["python", "manage_path", "pre_collectstatic"])
+    assert not timing["success"]
+
+
+@pytest.mark.parametrize("error", [KeyboardInterrupt(), ProcessCancelled("cancelled")])
+def test_run_management_command_interrupted(mocker, error):
+    mocker.patch("tethysapp.app_store.management_commands.get_app_store_setting", return_value=True)
+    mocker.patch("tethysapp.app_store.management_commands.call_command", side_effect=error)
+    mock_run_process = mocker.patch("tethysapp.app_store.management_commands.run_process")
+
+    with pytest.raises(type(error)):
+        run_management_command(["syncstores", "test_app", "-f"])
+
+    mock_run_process.assert_not_called()
+
+
+@pytest.mark.parametrize("command", [["pre_collectstatic"], ["collectstatic", "--noinput"], ["collectworkspaces"]])
+def test_run_management_command_collects_new_app(command, mocker, tmp_path):
+    apps_dir = tmp_path / "tethysapp"
+    (apps_dir / "old_app" / "public").mkdir(parents=True)
+    static_root = tmp_path / "static"
+    static_root.mkdir()
+
+    def collect(apps):
+        for app in apps:
+            (static_root / app).touch()
+
+    # The finders of the server process only know the apps that were installed when it started
+    startup_apps = sorted(app.name for app in apps_dir.iterdir())
+    (apps_dir / "new_app" / "public").mkdir(parents=True)
+    mocker.patch("tethysapp.app_store.management_commands.get_app_store_setting", return_value=True)
+    mock_call_command = mocker.patch(
+        "tethysapp.app_store.management_commands.call_command",
+        side_effect=lambda *args, **kwargs: collect(startup_apps),
+    )
+    mocker.patch("tethysapp.app_store.management_commands.get_manage_path", return_value="manage_path")
+
+    def manage_py(process_command):
+        collect(sorted(app.name for app in apps_dir.iterdir()))
+        return ProcessResult(0)
+
+    mock_run_process = mocker.patch("tethysapp.app_store.management_commands.run_process", side_effect=manage_py)
+
+    timing = run_management_command(command)
+
+    mock_call_command.assert_not_called()
+    mock_run_process.assert_called_once_with(["python", "manage_path"] + command)
+    assert (static_root / "new_app").exists()
+    assert timing["success"]
+    assert not timing["inProcess"]
+
+
+def test_run_command_groups(mocker):
+    mock_connections = mocker.patch("tethysapp.app_store.management_commands.connections")
+    mock_run_command = mocker.patch(
+        "tethysapp.app_store.management_commands.run_management_command",
+        side_effect=lambda command: {"step": " ".join(command)},
+    )
+    command_groups = [
+        [["syncstores", "app1", "-f"]],
+        [["pre_collectstatic"], ["collectstatic", "--noinput"]],
+    ]
+
+    timings = run_command_groups(command_groups, max_workers=2)
+
+    assert [timing["step"] for timing in timings] == [
+        "syncstores app1 -f",
+        "pre_collectstatic",
+        "collectstatic --noinput",
+    ]
+    mock_run_command.assert_has_calls(
+        [call(["pre_collectstatic"]), call(["collectstatic", "--noinput"])]
+    )
+    assert mock_connections.close_all.call_count == 2
+
+
+def test_run_command_groups_empty(mocker):
+    mock_run_command = mocker.patch("tethysapp.app_store.management_commands.run_management_command")
+
+    assert run_command_groups([]) == []
+    mock_run_command.assert_not_called()
+
+
+def test_sync_tethys_db_in_process(mocker):
+    mocker.patch("tethysapp.app_store.management_commands.get_app_store_setting", return_value=True)
+    mock_call_command = mocker.patch("tethysapp.app_store.management_commands.call_command")
+    mock_harvester = mocker.patch("tethys_apps.harvester.SingletonHarvester")
+    mock_run_process = mocker.patch("tethysapp.app_store.management_commands.run_process")
+
+    timing = sync_tethys_db()
+
+    assert mock_call_command.call_args.args == ("migrate",)
+    assert not mock_call_command.call_args.kwargs["interactive"]
+    mock_harvester().harvest.assert_called_once()
+    mock_run_process.assert_not_called()
+    assert timing["step"] == "tethys db sync"
+    assert timing["success"]
+    assert timing["inProcess"]
+
+
+def test_sync_tethys_db_fallback(mocker):
+    mocker.patch("tethysapp.app_store.management_commands.get_app_store_setting", return_value=True)
+    mocker.patch("tethysapp.app_store.management_commands.call_command", side_effect=Exception("No database"))
+    mock_run_process = mocker.patch(
+        "tethysapp.app_store.management_commands.run_process", return_value=ProcessResult(0)
+    )
+
+    timing = sync_tethys_db()
+
+    mock_run_process.assert_called_once_with(["tethys", "db", "sync"])
+    assert timing["success"]
+    assert not timing["inProcess"]
+
+
+def test_sync_tethys_db_fallback_failed(mocker):
+    mocker.patch("tethysapp.app_store.management_commands.get_app_store_setting", return_value=True)
+    mocker.patch("tethysapp.app_store.management_commands.call_command", side_effect=Exception("No database"))
+    mocker.patch(
+        "tethysapp.app_store.management_commands.run_process", return_value=ProcessResult(None, timed_out=True)
+    )
+
+    timing = sync_tethys_db()
+
+    assert not timing["success"]
@@ -1,16 +1,27 @@
 import pytest
 import json
+import asyncio
+import threading
 from unittest.mock import AsyncMock, MagicMock
 from channels.testing import WebsocketCommunicator
 from channels.layers import get_channel_layer
 from django.test import override_settings
 from django.contrib.auth.models import User
 from tethysapp.app_store.notifications import (
+    JOB_FUNCTIONS,
     notificationsConsumer,
     check_user_permissions,
+    get_job_function,
 )
 
 
+def test_get_job_function():
+    assert get_job_function("uninstall_app") == JOB_FUNCTIONS["uninstall_app"]
+
+    with pytest.raises(ValueError):
+        get_job_function("logger")
+
+
 @pytest.mark.asyncio
 async def test_check_user_permissions(mocker):
     mock_user = MagicMock()
@@ -133,17 +144,19 @@ async def test_notificationsConsumer_install_notifications(mocker, caplog):
 
 @pytest.mark.asyncio
 async def test_notificationsConsumer_receive_begin_install(mocker, caplog):
-    mock_begin_install = mocker.patch("tethysapp.app_store.notifications.begin_install")
+    mock_begin_install = MagicMock()
+    mocker.patch.dict(JOB_FUNCTIONS, {"begin_install": mock_begin_install})
     mock_duser = mocker.patch("tethysapp.app_store.notifications.User")
     mock_duser.objects.get().has_perm.return_value = True
     mock_user = MagicMock(id=1)
     mock_workspace = MagicMock()
-    mock_get_workspace = AsyncMock(return_value=mock_workspace)
     mocker.patch(
-        "tethysapp.app_store.notifications.sync_to_async",
-        side_effect=[mock_get_workspace],
+        "tethysapp.app_store.notifications.get_app_workspace",
+        return_value=mock_workspace,
+    )
+    mock_get_scheduler = mocker.patch(
+        "tethysapp.app_store.notifications.get_job_scheduler"
     )
-    mock_threading = mocker.patch("tethysapp.app_store.notifications.threading")
     consumer = notificationsConsumer
     consumer._authorized = True
     consumer.channel_layer_alias = "testlayer"
@@ -169,6 +182,7 @@ async def test_notificationsConsumer_receive_begin_install(mocker, caplog):
                 "version": "current_version",
             },
             "type": "begin_install",
+            "priority": 100,
         }
         await communicator.send_json_to(install_data)
 
@@ -179,11 +193,15 @@ async def test_notificationsConsumer_receive_begin_install(mocker, caplog):
             in caplog.messages
         )
         assert f"Removed {channel_name} channel from notifications" in caplog.messages
-        mock_threading.Thread.assert_called_with(
-            target=mock_begin_install,
-            args=[install_data["data"], channel_layer, mock_workspace],
+        assert mock_get_scheduler.call_args.args[0] == mock_workspace
+        assert mock_get_scheduler.call_args.args[1]("begin_install") == mock_begin_install
+        # The client can't change the priority of the job
+        mock_get_scheduler().submit.assert_called_once_with(
+            "begin_install",
+            install_data["data"],
+            channel_layer,
+            with_workspace=True,
         )
-        mock_threading.Thread().start.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -219,3 +237,162 @@ async def test_notificationsConsumer_receive_invalid_type(mocker, caplog):
         )
         assert "Can't redirect incoming message." in caplog.messages
         assert f"Removed {channel_name} channel from notifications" in caplog.messages
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("function_name", ["not_a_function", "get_app_workspace", "logger"])
+async def test_notificationsConsumer_receive_unknown_function(mocker, caplog, function_name):
+    mock_duser = mocker.patch("tethysapp.app_store.notifications.User")
+    mock_duser.objects.get().has_perm.return_value = True
+    mock_user = MagicMock(id=1)
+    mock_get_scheduler = mocker.patch(
+        "tethysapp.app_store.notifications.get_job_scheduler"
+    )
+    consumer = notificationsConsumer
+    consumer._authorized = True
+    consumer.channel_layer_alias = "testlayer"
+    channel_layers_setting = {
+        "testlayer": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+    with override_settings(CHANNEL_LAYERS=channel_layers_setting):
+        communicator = WebsocketCommunicator(
+            consumer.as_asgi(), "GET", "install/notifications"
+        )
+        communicator.scope["user"] = mock_user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        await communicator.send_json_to({"data": {}, "type": function_name})
+
+        await communicator.disconnect()
+        # Other names of the consumer module aren't commands
+        assert f"Can't redirect incoming message of type {function_name}." in caplog.messages
+        mock_get_scheduler.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_notificationsConsumer_receive_cancel_job(mocker, caplog):
+    mock_duser = mocker.patch("tethysapp.app_store.notifications.User")
+    mock_duser.objects.get().has_perm.return_value = True
+    mock_user = MagicMock(id=1)
+    mock_get_scheduler = mocker.patch(
+        "tethysapp.app_store.notifications.get_job_scheduler"
+    )
+    mock_cancel_job = MagicMock(return_value=None)
+    mocker.patch(
+        "tethysapp.app_store.notifications.sync_to_async",
+        return_value=AsyncMock(side_effect=mock_cancel_job),
+    )
+    consumer = notificationsConsumer
+    consumer._authorized = True
+    consumer.channel_layer_alias = "testlayer"
+    channel_layers_setting = {
+        "testlayer": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+    with override_settings(CHANNEL_LAYERS=channel_layers_setting):
+        communicator = WebsocketCommunicator(
+            consumer.as_asgi(), "GET", "install/notifications"
+        )
+        communicator.scope["user"] = mock_user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        await communicator.send_json_to({"data": {"name": "test_app"}, "type": "cancel_job"})
+
+        await communicator.disconnect()
+        mock_cancel_job.assert_called_once_with(None, "test_app")
+        assert "The job can no longer be cancelled." in caplog.messages
+        mock_get_scheduler.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_notificationsConsumer_connect_schedules_prefetch(mocker):
+    mock_duser = mocker.patch("tethysapp.app_store.notifications.User")
+    mock_duser.objects.get().has_perm.return_value = True
+    mock_user = MagicMock(id=1)
+    mocker.patch("tethysapp.app_store.notifications.is_prefetch_enabled", return_value=True)
+    mock_workspace = MagicMock()
+    mocker.patch(
+        "tethysapp.app_store.notifications.get_app_workspace",
+        return_value=mock_workspace,
+    )
+    mock_schedule_prefetch = mocker.patch(
+        "tethysapp.app_store.notifications.schedule_prefetch"
+    )
+    mock_get_scheduler = mocker.patch(
+        "tethysapp.app_store.notifications.get_job_scheduler"
+    )
+    consumer = notificationsConsumer
+    consumer._authorized = True
+    consumer.channel_layer_alias = "testlayer"
+    channel_layers_setting = {
+        "testlayer": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+    with override_settings(CHANNEL_LAYERS=channel_layers_setting):
+        communicator = WebsocketCommunicator(
+            consumer.as_asgi(), "GET", "install/notifications"
+        )
+        communicator.scope["user"] = mock_user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        await communicator.disconnect()
+        assert mock_get_scheduler.call_args.args[0] == mock_workspace
+        mock_schedule_prefetch.assert_called_once_with(
+            mock_get_scheduler(), get_channel_layer("testlayer")
+        )
+
+
+@pytest.mark.asyncio
+async def test_notificationsConsumer_receive_duplicate_install(mocker, tmp_path):
+    mock_duser = mocker.patch("tethysapp.app_store.notifications.User")
+    mock_duser.objects.get().has_perm.return_value = True
+    mock_user = MagicMock(id=1)
+    mocker.patch(
+        "tethysapp.app_store.notifications.get_app_workspace",
+        return_value=MagicMock(path=str(tmp_path)),
+    )
+    mocker.patch("tethysapp.app_store.job_queue._scheduler", None)
+    install_started = threading.Event()
+    finish_install = threading.Event()
+
+    def blocking_install(*args):
+        install_started.set()
+        finish_install.wait(5)
+
+    mock_begin_install = MagicMock(side_effect=blocking_install)
+    mocker.patch.dict(JOB_FUNCTIONS, {"begin_install": mock_begin_install})
+    consumer = notificationsConsumer
+    consumer._authorized = True
+    consumer.channel_layer_alias = "testlayer"
+    channel_layers_setting = {
+        "testlayer": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+    with override_settings(CHANNEL_LAYERS=channel_layers_setting):
+        communicator = WebsocketCommunicator(
+            consumer.as_asgi(), "GET", "install/notifications"
+        )
+        communicator.scope["user"] = mock_user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        install_data = {
+            "data": {"name": "appName", "channel": "channel_app", "label": "main", "version": "1.0"},
+            "type": "begin_install",
+        }
+        await communicator.send_json_to(install_data)
+        await asyncio.get_running_loop().run_in_executor(None, install_started.wait, 5)
+        # The second click is attached to the running install, and the notification is sent from outside of the
+        # event loop
+        await communicator.send_json_to(install_data)
+
+        message = None
+        while not isinstance(message, dict) or message.get("jsHelperFunction") != "jobAttached":
+            message = (await communicator.receive_json_from(timeout=5))["message"]
+
+        finish_install.set()
+        await communicator.disconnect()
+
+    assert message["data"]["name"] == "appName"
+    assert message["data"]["state"] == "running"
+    assert mock_begin_install.call_count == 1
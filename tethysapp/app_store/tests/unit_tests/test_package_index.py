@@ -0,0 +1,114 @@
+import json
+from tethysapp.app_store.package_index import (
+    get_package_name_from_record,
+    get_package_index,
+    get_package_files,
+    find_package_file,
+    find_proxy_app_config,
+)
+
+
+def write_conda_meta(prefix, name, files, version="1.0", build="py_0"):
+    conda_meta = prefix / "conda-meta"
+    conda_meta.mkdir(parents=True, exist_ok=True)
+    record = {"name": name, "version": version, "files": files}
+    (conda_meta / f"{name}-{version}-{build}.json").write_text(json.dumps(record))
+
+
+def test_get_package_name_from_record():
+    assert get_package_name_from_record("numpy-1.26.4-py310_0.json") == "numpy"
+    assert get_package_name_from_record("proxyapp_test-app-1.0-py_0.json") == "proxyapp_test-app"
+    assert get_package_name_from_record("history") is None
+    assert get_package_name_from_record("bad.json") is None
+
+
+def test_get_package_index(mocker, tmp_path):
+    mocker.patch.dict("tethysapp.app_store.package_index._package_indexes", clear=True)
+    mock_fingerprint = mocker.patch(
+        "tethysapp.app_store.package_index.get_environment_fingerprint", return_value="fingerprint1"
+    )
+    write_conda_meta(tmp_path, "test_app", [])
+    write_conda_meta(tmp_path, "test_app_extra", [])
+
+    index = get_package_index(str(tmp_path))
+
+    assert index["fingerprint"] == "fingerprint1"
+    assert set(index["records"]) == {"test_app", "test_app_extra"}
+    assert get_package_index(str(tmp_path)) is index
+
+    # A new conda transaction changes the fingerprint of the environment
+    mock_fingerprint.return_value = "fingerprint2"
+    write_conda_meta(tmp_path, "other_app", [])
+
+    new_index = get_package_index(str(tmp_path))
+
+    assert new_index is not index
+    assert "other_app" in new_index["records"]
+
+
+def test_get_package_index_no_conda_meta(mocker, tmp_path):
+    mocker.patch.dict("tethysapp.app_store.package_index._package_indexes", clear=True)
+
+    assert get_package_index(str(tmp_path))["records"] == {}
+
+
+def test_get_package_files(mocker, tmp_path):
+    mocker.patch.dict("tethysapp.app_store.package_index._package_indexes", clear=True)
+    write_conda_meta(tmp_path, "test_app", ["lib/site-packages/test_app/__init__.py"])
+    spy_load = mocker.spy(json, "load")
+
+    assert get_package_files("test_app", str(tmp_path)) == ["lib/site-packages/test_app/__init__.py"]
+    assert get_package_files("test_app", str(tmp_path)) == ["lib/site-packages/test_app/__init__.py"]
+    assert spy_load.call_count == 1
+    assert get_package_files("missing_app", str(tmp_path)) is None
+
+
+def test_get_package_files_bad_record(mocker, tmp_path, caplog):
+    mocker.patch.dict("tethysapp.app_store.package_index._package_indexes", clear=True)
+    (tmp_path / "conda-meta").mkdir()
+    (tmp_path / "conda-meta" / "test_app-1.0-py_0.json").write_text("not json")
+
+    assert get_package_files("test_app", str(tmp_path)) is None
+    assert any(message.startswith("Failed to read the conda-meta record of test_app") for message in caplog.messages)
+
+
+def test_find_package_file(mocker, tmp_path):
+    mocker.patch.dict("tethysapp.app_store.package_index._package_indexes", clear=True)
+    write_conda_meta(
+        tmp_path,
+        "proxyapp_test_app",
+        ["lib/site-packages/proxyapp_test_app/__init__.py", "lib/site-packages/proxyapp_test_app/config/proxyapp.yaml"],
+    )
+    write_conda_meta(
+        tmp_path,
+        "proxyapp_test_app_extra",
+        ["lib/site-packages/proxyapp_test_app_extra/config/proxyapp.yaml"],
+    )
+
+    proxyapp_yaml = find_package_file("proxyapp_test_app", "config/proxyapp.yaml", str(tmp_path))
+
+    assert proxyapp_yaml == str(tmp_path / "lib/site-packages/proxyapp_test_app/config/proxyapp.yaml")
+    assert find_package_file("proxyapp_test_app", "config/other.yaml", str(tmp_path)) is None
+
+
+def test_find_proxy_app_config(mocker, tmp_path):
+    proxyapp_yaml = tmp_path / "proxyapp.yaml"
+    proxyapp_yaml.touch()
+    mocker.patch("tethysapp.app_store.package_index.find_package_file", return_value=str(proxyapp_yaml))
+
+    assert find_proxy_app_config("proxyapp_test_app") == str(proxyapp_yaml)
+
+
+def test_find_proxy_app_config_site_packages(mocker, proxyapp_site_package):
+    mocker.patch("tethysapp.app_store.package_index.find_package_file", return_value=None)
+    mocker.patch(
+        "tethysapp.app_store.package_index.subprocess.__file__", str(proxyapp_site_package / "subprocess")
+    )
+
+    proxyapp_yaml = find_proxy_app_config("proxyapp_test_app")
+
+    assert proxyapp_yaml == str(
+        proxyapp_site_package / "site-packages" / "proxyapp_test_app" / "config" / "proxyapp.yaml"
+    )
+    # Names that only contain the app name don't match
+    assert find_proxy_app_config("test_app") is None
@@ -0,0 +1,307 @@
+import hashlib
+import json
+from unittest.mock import MagicMock
+import pytest
+from tethysapp.app_store.process_runner import ProcessCancelled
+from tethysapp.app_store.prefetch import (
+    BandwidthLimiter,
+    download_package,
+    evict_prefetched_packages,
+    get_prefetch_budget,
+    get_prefetch_interval,
+    get_prefetch_index_path,
+    is_package_cached,
+    prefetch_packages,
+    read_prefetch_index,
+    schedule_prefetch,
+    select_prefetch_apps,
+    wait_for_idle,
+)
+
+
+def create_package(tmp_path, fn, content=b"package"):
+    source_dir = tmp_path / "channel"
+    source_dir.mkdir(exist_ok=True)
+    (source_dir / fn).write_bytes(content)
+    return {
+        "fn": fn,
+        "url": (source_dir / fn).as_uri(),
+        "size": len(content),
+        "md5": hashlib.md5(content).hexdigest(),
+        "sha256": None,
+    }
+
+
+def create_store_app(name, versions, installed=False, update=False, timestamp=0, app_type="tethysapp"):
+    app = {
+        "name": name,
+        "app_type": app_type,
+        "installed": {"test_channel": {"main": installed}},
+        "versions": {"test_channel": {"main": versions}},
+        "timestamp": {"test_channel": {"main": timestamp}},
+    }
+    if installed:
+        app["updateAvailable"] = {"test_channel": {"main": update}}
+    return app
+
+
+def test_get_prefetch_budget(mocker):
+    mocker.patch("tethysapp.app_store.prefetch.get_app_store_setting", return_value=2)
+
+    assert get_prefetch_budget() == 2 * 1024 * 1024
+
+
+def test_get_prefetch_interval(mocker):
+    mocker.patch("tethysapp.app_store.prefetch.get_app_store_setting", return_value="60")
+
+    assert get_prefetch_interval() == 60
+
+
+def test_bandwidth_limiter(mocker):
+    mock_time = mocker.patch("tethysapp.app_store.prefetch.time")
+    mock_time.monotonic.return_value = 0
+    limiter = BandwidthLimiter(100)
+
+    limiter.consume(50)
+    mock_time.sleep.assert_called_once_with(0.5)
+
+    BandwidthLimiter(0).consume(50)
+    mock_time.sleep.assert_called_once()
+
+
+def test_is_package_cached(tmp_path):
+    package = {"fn": "test_app-1.0-py_0.tar.bz2"}
+    assert not is_package_cached(package, str(tmp_path))
+
+    (tmp_path / "test_app-1.0-py_0").mkdir()
+    assert is_package_cached(package, str(tmp_path))
+    assert is_package_cached({"fn": "test_app-1.0-py_0.conda"}, str(tmp_path))
+
+
+def test_download_package(tmp_path):
+    pkgs_dir = tmp_path / "pkgs"
+    pkgs_dir.mkdir()
+    package = create_package(tmp_path, "test_app-1.0-py_0.tar.bz2")
+
+    package_path = download_package(package, str(pkgs_dir), BandwidthLimiter(0))
+
+    assert (pkgs_dir / "test_app-1.0-py_0.tar.bz2").read_bytes() == b"package"
+    assert package_path == str(pkgs_dir / "test_app-1.0-py_0.tar.bz2")
+    assert (pkgs_dir / "urls.txt").read_text() == f"{package['url']}\n"
+
+
+def test_download_package_checksum_mismatch(tmp_path):
+    pkgs_dir = tmp_path / "pkgs"
+    pkgs_dir.mkdir()
+    package = create_package(tmp_path, "test_app-1.0-py_0.tar.bz2")
+    package["md5"] = "bad"
+
+    with pytest.raises(ValueError):
+        download_package(package, str(pkgs_dir), BandwidthLimiter(0))
+
+    assert list(pkgs_dir.iterdir()) == []
+
+
+def test_download_package_cancelled(tmp_path, mocker):
+    mocker.patch("tethysapp.app_store.prefetch.is_cancelled", return_value=True)
+    pkgs_dir = tmp_path / "pkgs"
+    pkgs_dir.mkdir()
+    package = create_package(tmp_path, "test_app-1.0-py_0.tar.bz2")
+
+    with pytest.raises(ProcessCancelled):
+        download_package(package, str(pkgs_dir), BandwidthLimiter(0), owner="job_id")
+
+    assert list(pkgs_dir.iterdir()) == []
+
+
+def test_wait_for_idle(mocker):
+    mocker.patch("tethysapp.app_store.prefetch.has_exclusive_jobs", side_effect=[True, False])
+    mocker.patch("tethysapp.app_store.prefetch.is_cancelled", return_value=False)
+    mock_time = mocker.patch("tethysapp.app_store.prefetch.time")
+
+    wait_for_idle("job_id")
+
+    mock_time.sleep.assert_called_once()
+
+
+def test_wait_for_idle_cancelled(mocker):
+    mocker.patch("tethysapp.app_store.prefetch.has_exclusive_jobs", return_value=True)
+    mocker.patch("tethysapp.app_store.prefetch.is_cancelled", return_value=True)
+
+    with pytest.raises(ProcessCancelled):
+        wait_for_idle("job_id")
+
+
+def test_select_prefetch_apps(mocker):
+    stores = {
+        "availableApps": {
+            "old_app": create_store_app("old_app", ["1.0"], timestamp=1),
+            "new_app": create_store_app("new_app", ["1.0", "2.0"], timestamp=2),
+            "installed_app": create_store_app("installed_app", ["1.0"], installed=True),
+            "update_app": create_store_app("update_app", ["1.0", "1.1"], installed=True, update=True),
+            "proxy_app": create_store_app("proxy_app", ["1.0"], app_type="proxyapp"),
+            "no_versions": create_store_app("no_versions", []),
+        }
+    }
+    mocker.patch("tethysapp.app_store.prefetch.get_stores_reformatted", return_value=stores)
+
+    apps = select_prefetch_apps(MagicMock(), app_names=[], limit=3)
+
+    assert apps == [
+        {"name": "update_app", "channel": "test_channel", "label": "main", "version": "1.1", "update": True},
+        {"name": "new_app", "channel": "test_channel", "label": "main", "version": "2.0", "update": False},
+        {"name": "old_app", "channel": "test_channel", "label": "main", "version": "1.0", "update": False},
+    ]
+
+    apps = select_prefetch_apps(MagicMock(), app_names=["old_app", "installed_app"], limit=3)
+
+    assert apps == [
+        {"name": "old_app", "channel": "test_channel", "label": "main", "version": "1.0", "update": False},
+    ]
+
+
+def test_prefetch_packages(tmp_path, mocker):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    pkgs_dir = tmp_path / "pkgs"
+    pkgs_dir.mkdir()
+    (pkgs_dir / "cached-1.0-0").mkdir()
+    app_package = create_package(tmp_path, "test_app-1.0-py_0.tar.bz2", b"app")
+    dependency = create_package(tmp_path, "dependency-1.0-0.tar.bz2", b"dependency")
+    large_package = create_package(tmp_path, "large_app-1.0-py_0.tar.bz2", b"0" * 100)
+    plans = {
+        "test_app": {"success": True, "fetch": [app_package, dependency, {"fn": "cached-1.0-0.tar.bz2", "size": 1}]},
+        "large_app": {"success": True, "fetch": [large_package]},
+        "failed_app": {"success": False, "error": "Could not solve", "fetch": []},
+    }
+    settings = {"APP_STORE_PREFETCH_BUDGET_MB": 50 / (1024 * 1024)}
+    mocker.patch(
+        "tethysapp.app_store.prefetch.get_app_store_setting",
+        side_effect=lambda name, default=None: settings.get(name, default),
+    )
+    mocker.patch("tethysapp.app_store.prefetch.get_package_cache_dir", return_value=str(pkgs_dir))
+    mocker.patch("tethysapp.app_store.prefetch.has_exclusive_jobs", return_value=False)
+    mocker.patch(
+        "tethysapp.app_store.prefetch.select_prefetch_apps",
+        return_value=[
+            {"name": name, "channel": "test_channel", "label": "main", "version": "1.0", "update": False}
+            for name in plans
+        ],
+    )
+    mock_plan = mocker.patch(
+        "tethysapp.app_store.prefetch.create_install_plan",
+        side_effect=lambda apps, update, timeout: plans[apps[0]["name"]],
+    )
+
+    prefetch_packages({}, MagicMock(), mock_workspace)
+
+    assert (pkgs_dir / "test_app-1.0-py_0.tar.bz2").exists()
+    assert (pkgs_dir / "dependency-1.0-0.tar.bz2").exists()
+    # The large app would go over the disk budget
+    assert not (pkgs_dir / "large_app-1.0-py_0.tar.bz2").exists()
+    mock_plan.assert_any_call(
+        [{"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0"}],
+        update=False,
+        timeout=3600,
+    )
+    index = read_prefetch_index(mock_workspace)
+    assert sorted(index) == ["dependency-1.0-0.tar.bz2", "test_app-1.0-py_0.tar.bz2"]
+    assert index["test_app-1.0-py_0.tar.bz2"]["app"] == "test_app"
+
+
+def write_prefetched_packages(app_workspace, pkgs_dir, packages):
+    (pkgs_dir.parent / "apps").mkdir(exist_ok=True)
+    index = {}
+    for fn, size, fetched in packages:
+        (pkgs_dir / fn).write_bytes(b"0" * size)
+        index[fn] = {"path": str(pkgs_dir / fn), "size": size, "app": fn.split("-")[0], "fetched": fetched}
+    with open(get_prefetch_index_path(app_workspace), "w") as index_file:
+        json.dump(index, index_file)
+
+
+def test_evict_prefetched_packages(tmp_path):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    pkgs_dir = tmp_path / "pkgs"
+    pkgs_dir.mkdir()
+    write_prefetched_packages(
+        mock_workspace,
+        pkgs_dir,
+        [
+            ("old_app-1.0-py_0.tar.bz2", 10, 1),
+            ("kept_app-1.0-py_0.tar.bz2", 10, 0),
+            ("new_app-1.0-py_0.tar.bz2", 10, 2),
+        ],
+    )
+
+    # Not enough space can be freed without removing a kept package
+    assert evict_prefetched_packages(mock_workspace, 25, {"kept_app-1.0-py_0.tar.bz2"}) == 0
+    assert len(read_prefetch_index(mock_workspace)) == 3
+
+    assert evict_prefetched_packages(mock_workspace, 5, {"kept_app-1.0-py_0.tar.bz2"}) == 10
+
+    assert not (pkgs_dir / "old_app-1.0-py_0.tar.bz2").exists()
+    assert (pkgs_dir / "new_app-1.0-py_0.tar.bz2").exists()
+    assert sorted(read_prefetch_index(mock_workspace)) == ["kept_app-1.0-py_0.tar.bz2", "new_app-1.0-py_0.tar.bz2"]
+
+
+def test_prefetch_packages_evicts_old_packages(tmp_path, mocker):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    pkgs_dir = tmp_path / "pkgs"
+    pkgs_dir.mkdir()
+    write_prefetched_packages(mock_workspace, pkgs_dir, [("old_app-1.0-py_0.tar.bz2", 40, 0)])
+    app_package = create_package(tmp_path, "test_app-1.0-py_0.tar.bz2", b"0" * 20)
+    settings = {"APP_STORE_PREFETCH_BUDGET_MB": 50 / (1024 * 1024)}
+    mocker.patch(
+        "tethysapp.app_store.prefetch.get_app_store_setting",
+        side_effect=lambda name, default=None: settings.get(name, default),
+    )
+    mocker.patch("tethysapp.app_store.prefetch.get_package_cache_dir", return_value=str(pkgs_dir))
+    mocker.patch("tethysapp.app_store.prefetch.has_exclusive_jobs", return_value=False)
+    mocker.patch(
+        "tethysapp.app_store.prefetch.select_prefetch_apps",
+        return_value=[
+            {"name": "test_app", "channel": "test_channel", "label": "main", "version": "1.0", "update": False}
+        ],
+    )
+    mocker.patch(
+        "tethysapp.app_store.prefetch.create_install_plan", return_value={"success": True, "fetch": [app_package]}
+    )
+
+    prefetch_packages({}, MagicMock(), mock_workspace)
+
+    assert not (pkgs_dir / "old_app-1.0-py_0.tar.bz2").exists()
+    assert (pkgs_dir / "test_app-1.0-py_0.tar.bz2").exists()
+    assert list(read_prefetch_index(mock_workspace)) == ["test_app-1.0-py_0.tar.bz2"]
+
+
+def test_read_prefetch_index_drops_missing(tmp_path):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    (tmp_path / "apps").mkdir()
+    package_path = tmp_path / "test_app-1.0-py_0.tar.bz2"
+    package_path.write_bytes(b"app")
+    index = {
+        "test_app-1.0-py_0.tar.bz2": {"path": str(package_path), "size": 3, "app": "test_app", "fetched": 0},
+        "missing-1.0-0.tar.bz2": {"path": str(tmp_path / "missing"), "size": 3, "app": "test_app", "fetched": 0},
+    }
+    with open(get_prefetch_index_path(mock_workspace), "w") as index_file:
+        json.dump(index, index_file)
+
+    assert list(read_prefetch_index(mock_workspace)) == ["test_app-1.0-py_0.tar.bz2"]
+
+
+def test_schedule_prefetch(mocker):
+    mock_enabled = mocker.patch("tethysapp.app_store.prefetch.is_prefetch_enabled", return_value=True)
+    mock_cache = mocker.patch("tethysapp.app_store.prefetch.cache")
+    mock_cache.add.return_value = True
+    mock_scheduler = MagicMock()
+    mock_scheduler.find_active_job.return_value = None
+    mock_channel = MagicMock()
+
+    assert schedule_prefetch(mock_scheduler, mock_channel) == mock_scheduler.submit.return_value
+    mock_scheduler.submit.assert_called_once_with("prefetch_packages", {}, mock_channel, with_workspace=True)
+
+    mock_cache.add.return_value = False
+    assert schedule_prefetch(mock_scheduler, mock_channel) is None
+
+    mock_enabled.return_value = False
+    assert schedule_prefetch(mock_scheduler, mock_channel) is None
+    mock_scheduler.submit.assert_called_once()
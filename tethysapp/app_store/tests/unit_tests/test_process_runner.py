@@ -0,0 +1,232 @@
+import threading
+import time
+import pytest
+from tethysapp.app_store.process_runner import (
+    ProcessCancelled,
+    ProcessResult,
+    ProcessRunner,
+    cancel_processes,
+    check_cancelled,
+    disable_cancel,
+    is_cancelled,
+    release_process_owner,
+    run_process,
+    set_process_owner,
+)
+
+
+def test_run_process_streams_lines():
+    lines = []
+
+    result = run_process(["sh", "-c", "echo first; echo second"], on_line=lines.append, timeout=0, idle_timeout=0)
+
+    assert lines == ["first", "second"]
+    assert result.success
+    assert result.returncode == 0
+
+
+def test_run_process_no_trailing_new_line():
+    lines = []
+
+    result = run_process(["printf", "no new line"], on_line=lines.append)
+
+    assert lines == ["no new line"]
+    assert result.success
+
+
+def test_run_process_stderr():
+    lines = []
+
+    run_process(["sh", "-c", "echo error 1>&2"], on_line=lines.append)
+
+    assert lines == ["error"]
+
+
+def test_run_process_exit_code():
+    result = run_process(["sh", "-c", "exit 3"])
+
+    assert not result.success
+    assert result.returncode == 3
+    assert result.describe() == "The process exited with code 3"
+
+
+def test_run_process_timeout(mocker):
+    mocker.patch("tethysapp.app_store.process_runner.POLL_INTERVAL", 0.05)
+    start_time = time.monotonic()
+
+    result = run_process(["sh", "-c", "echo started; sleep 5"], timeout=0.3, idle_timeout=0)
+
+    assert time.monotonic() - start_time < 4
+    assert result.timed_out
+    assert not result.success
+    assert result.describe() == "The process took too long and was stopped"
+
+
+def test_run_process_idle_timeout(mocker):
+    mocker.patch("tethysapp.app_store.process_runner.POLL_INTERVAL", 0.05)
+    lines = []
+
+    result = run_process(["sh", "-c", "echo started; sleep 5"], on_line=lines.append, timeout=0, idle_timeout=0.3)
+
+    assert lines == ["started"]
+    assert result.idle_timed_out
+    assert result.describe() == "The process stopped responding and was stopped"
+
+
+def test_run_process_on_line_error(caplog):
+    lines = []
+
+    def on_line(line):
+        lines.append(line)
+        raise Exception("channel layer is down")
+
+    result = run_process(["sh", "-c", "echo first; echo second"], on_line=on_line, timeout=0, idle_timeout=0)
+
+    assert lines == ["first", "second"]
+    assert result.success
+    assert "Failed to handle the output of sh: channel layer is down" in caplog.messages
+
+
+def test_run_process_interrupted_kills_process(mocker):
+    mocker.patch("tethysapp.app_store.process_runner.KILL_GRACE_PERIOD", 0.5)
+    runner = ProcessRunner(["sh", "-c", "echo started; sleep 5"], timeout=0, idle_timeout=0)
+
+    def on_line(line):
+        raise KeyboardInterrupt()
+
+    start_time = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(on_line)
+
+    assert runner.process.poll() is not None
+    assert time.monotonic() - start_time < 5
+
+
+def test_run_process_silent_without_idle_timeout(mocker):
+    mocker.patch("tethysapp.app_store.process_runner.POLL_INTERVAL", 0.05)
+    mocker.patch("tethysapp.app_store.process_runner.get_app_store_setting", return_value=0.1)
+    lines = []
+
+    # A live child that prints nothing for longer than the default idle timeout runs until it is done
+    result = run_process(["sh", "-c", "sleep 0.5; echo done"], on_line=lines.append, timeout=5, idle_timeout=0)
+
+    assert lines == ["done"]
+    assert not result.idle_timed_out
+    assert result.success
+
+
+def test_process_runner_default_timeouts(mocker):
+    mocker.patch(
+        "tethysapp.app_store.process_runner.get_app_store_setting", side_effect=lambda name, default: default
+    )
+
+    runner = ProcessRunner(["true"])
+
+    assert runner.timeout == 3600
+    assert runner.idle_timeout == 900
+
+
+def test_process_runner_cancel(mocker):
+    mocker.patch("tethysapp.app_store.process_runner.POLL_INTERVAL", 0.05)
+    runner = ProcessRunner(["sh", "-c", "echo started; sleep 5"], timeout=0, idle_timeout=0)
+    started = threading.Event()
+
+    def on_line(line):
+        started.set()
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(runner.run(on_line)))
+    thread.start()
+    assert started.wait(5)
+    runner.cancel()
+    thread.join(5)
+
+    assert results[0].cancelled
+    assert not results[0].success
+    assert results[0].describe() == "The process was cancelled"
+
+
+def test_process_runner_cancel_before_start():
+    runner = ProcessRunner(["sh", "-c", "sleep 5"], timeout=0, idle_timeout=0)
+    runner.cancel()
+
+    result = runner.run()
+
+    assert result.cancelled
+
+
+def test_process_result():
+    assert ProcessResult(0).success
+    assert not ProcessResult(0, timed_out=True).success
+    assert repr(ProcessResult(1)) == (
+        "ProcessResult(returncode=1, timed_out=False, idle_timed_out=False, cancelled=False)"
+    )
+
+
+def test_cancel_processes(mocker):
+    mocker.patch("tethysapp.app_store.process_runner.POLL_INTERVAL", 0.05)
+    started = threading.Event()
+    errors = []
+
+    def job():
+        set_process_owner("job_id")
+        try:
+            run_process(["sh", "-c", "echo started; sleep 5"], on_line=lambda line: started.set(), timeout=0)
+        except ProcessCancelled as e:
+            errors.append(e)
+        finally:
+            set_process_owner(None)
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    assert started.wait(5)
+    assert cancel_processes("job_id") == 1
+    thread.join(5)
+
+    assert len(errors) == 1
+    assert is_cancelled("job_id")
+    release_process_owner("job_id")
+    assert not is_cancelled("job_id")
+
+
+def test_cancelled_owner_does_not_start_processes():
+    cancel_processes("job_id")
+    set_process_owner("job_id")
+    try:
+        with pytest.raises(ProcessCancelled):
+            check_cancelled()
+        result = ProcessRunner(["sh", "-c", "echo started"]).run()
+    finally:
+        set_process_owner(None)
+        release_process_owner("job_id")
+
+    assert result.cancelled
+    assert result.returncode is None
+    check_cancelled()
+
+
+def test_disable_cancel():
+    set_process_owner("job_id")
+    try:
+        disable_cancel()
+        assert cancel_processes("job_id") is None
+        assert not is_cancelled("job_id")
+        check_cancelled()
+    finally:
+        set_process_owner(None)
+        release_process_owner("job_id")
+
+    # A new job with the same owner can be cancelled again
+    assert cancel_processes("job_id") == 0
+    release_process_owner("job_id")
+
+
+def test_disable_cancel_already_cancelled():
+    cancel_processes("job_id")
+    set_process_owner("job_id")
+    try:
+        with pytest.raises(ProcessCancelled):
+            disable_cancel()
+    finally:
+        set_process_owner(None)
+        release_process_owner("job_id")
@@ -0,0 +1,141 @@
+from unittest.mock import MagicMock, call
+from tethysapp.app_store.progress_events import (
+    ProgressEvent,
+    ProgressNotifier,
+    ProgressParser,
+    decode_output_line,
+    COMPLETE,
+    DOWNLOAD,
+    ERROR,
+    LINK,
+    MESSAGE,
+    RETRY,
+    SOLVE_END,
+    SOLVE_START,
+)
+
+
+def test_decode_output_line():
+    assert decode_output_line(b"Install Complete\n") == "Install Complete"
+    assert decode_output_line('{"fetch": "numpy"}\x00\n') == '{"fetch": "numpy"}'
+    assert decode_output_line(b"\xff\n") == "�"
+
+
+def test_progress_event_to_dict():
+    event = ProgressEvent(DOWNLOAD, package="numpy-1.26.4", percent=50.0)
+
+    assert event.to_dict() == {"type": DOWNLOAD, "package": "numpy-1.26.4", "percent": 50.0}
+    assert event == ProgressEvent(DOWNLOAD, package="numpy-1.26.4", percent=50.0)
+
+
+def test_progress_event_describe():
+    assert ProgressEvent(SOLVE_START).describe() == "Solving Environment: Started"
+    assert ProgressEvent(SOLVE_END).describe() == "Solving Environment: Done"
+    assert ProgressEvent(DOWNLOAD, package="numpy", percent=50.0).describe() == "Downloading numpy: 50%"
+    assert (
+        ProgressEvent(DOWNLOAD, package="numpy", percent=50.0, downloaded=1048576, total=2097152).describe()
+        == "Downloading numpy: 50% (1.0 of 2.0 MB)"
+    )
+    assert ProgressEvent(LINK, total=3).describe() == "Linking Packages: 3 packages linked"
+    assert ProgressEvent(RETRY, message="conda").describe() == "Install failed. Trying now with conda."
+    assert ProgressEvent(ERROR, message="Found conflicts!").describe() == "Install error: Found conflicts!"
+    assert ProgressEvent(COMPLETE, success=True).describe() == "Transaction: Done"
+    assert ProgressEvent(COMPLETE, success=False).describe() == "Transaction: Failed"
+    assert ProgressEvent(MESSAGE, message="All requested packages already installed.").describe() == (
+        "All requested packages already installed."
+    )
+
+
+def test_progress_parser_script_events():
+    parser = ProgressParser()
+
+    assert parser.feed(b'APPSTORE_EVENT {"type": "solve_start", "tool": "mamba"}\n') == [
+        ProgressEvent(SOLVE_START, message="mamba")
+    ]
+    assert parser.feed(b'APPSTORE_EVENT {"type": "complete", "success": true}\n') == [
+        ProgressEvent(SOLVE_END),
+        ProgressEvent(COMPLETE, success=True),
+    ]
+    assert parser.success
+    assert parser.feed(b"APPSTORE_EVENT not json\n") == []
+
+
+def test_progress_parser_plain_output():
+    parser = ProgressParser()
+
+    assert parser.feed(b"Running Mamba Install\n") == []
+    assert parser.feed(b"{not json}\n") == []
+    assert parser.success is None
+
+
+def test_progress_parser_fetch():
+    parser = ProgressParser(package_sizes={"numpy-1.26.4": 2000})
+    parser.feed(b'APPSTORE_EVENT {"type": "solve_start"}\n')
+
+    events = parser.feed(b'{"fetch": "numpy-1.26.4 | 2 KB", "finished": false, "maxval": 1, "progress": 0.25}\x00\n')
+
+    assert events == [
+        ProgressEvent(SOLVE_END),
+        ProgressEvent(DOWNLOAD, package="numpy-1.26.4", percent=25.0, downloaded=500, total=2000),
+    ]
+    assert parser.feed(b'{"fetch": "numpy-1.26.4 | 2 KB", "finished": true, "maxval": 1, "progress": 0.9}\n') == [
+        ProgressEvent(DOWNLOAD, package="numpy-1.26.4", percent=100.0, downloaded=2000, total=2000)
+    ]
+
+
+def test_progress_parser_multi_line_result():
+    parser = ProgressParser()
+    lines = [
+        b"{\n",
+        b'  "actions": {\n',
+        b'    "LINK": [{"name": "test_app"}, {"name": "numpy"}],\n',
+        b'    "UNLINK": []\n',
+        b"  },\n",
+        b'  "success": true\n',
+    ]
+
+    for line in lines:
+        assert parser.feed(line) == []
+
+    assert parser.feed(b"}\n") == [ProgressEvent(LINK, percent=100.0, total=2)]
+    assert parser.json_lines is None
+
+
+def test_progress_parser_result_error():
+    parser = ProgressParser()
+
+    assert parser.feed(b'{"success": false, "error": "Could not solve"}\n') == [
+        ProgressEvent(ERROR, message="Could not solve")
+    ]
+    assert parser.feed(b'{"exception_name": "UnsatisfiableError"}\n') == [
+        ProgressEvent(ERROR, message="UnsatisfiableError")
+    ]
+
+
+def test_progress_parser_result_message():
+    parser = ProgressParser()
+
+    assert parser.feed(b'{"message": "All requested packages already installed.", "success": true}\n') == [
+        ProgressEvent(MESSAGE, message="All requested packages already installed.")
+    ]
+
+
+def test_progress_notifier_throttles_downloads(mocker):
+    mock_time = mocker.patch("tethysapp.app_store.progress_events.time")
+    mock_time.monotonic.side_effect = [0, 0.5, 1.5]
+    mock_notification = MagicMock()
+    mock_channel = MagicMock()
+    notifier = ProgressNotifier(mock_channel, mock_notification, interval=1)
+
+    assert notifier.send(ProgressEvent(DOWNLOAD, package="numpy", percent=10.0))
+    assert not notifier.send(ProgressEvent(DOWNLOAD, package="numpy", percent=20.0))
+    assert notifier.send(ProgressEvent(DOWNLOAD, package="numpy", percent=30.0))
+    assert notifier.send(ProgressEvent(DOWNLOAD, package="numpy", percent=100.0))
+    assert notifier.send(ProgressEvent(SOLVE_END))
+
+    assert mock_notification.call_args_list == [
+        call("Downloading numpy: 10%", mock_channel),
+        call("Downloading numpy: 30%", mock_channel),
+        call("Downloading numpy: 100%", mock_channel),
+        call("Solving Environment: Done", mock_channel),
+    ]
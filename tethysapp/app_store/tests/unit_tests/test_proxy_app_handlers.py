@@ -2,6 +2,7 @@ from unittest.mock import MagicMock
 from tethysapp.app_store.proxy_app_handlers import (
     create_proxy_app,
     list_proxy_apps,
+    get_proxy_app_table_version,
     delete_proxy_app,
     update_proxy_app,
     submit_proxy_app,
@@ -77,6 +78,20 @@ def test_list_proxy_apps(proxyapp, mocker):
     assert proxy_apps == expected_proxy_apps
 
 
+def test_get_proxy_app_table_version(mocker):
+    mock_values = mocker.patch("tethys_apps.models.ProxyApp.objects.order_by")
+    mock_values.return_value.values_list.return_value = [(1, "test_app", "conda_channel_test,app_version_1.0")]
+
+    version = get_proxy_app_table_version()
+
+    mock_values.assert_called_once_with("id")
+    mock_values.return_value.values_list.assert_called_once_with("id", "name", "tags")
+    assert version == get_proxy_app_table_version()
+
+    mock_values.return_value.values_list.return_value = [(1, "test_app", "conda_channel_test,app_version_1.1")]
+    assert get_proxy_app_table_version() != version
+
+
 def test_delete_proxy_app(mocker):
     mock_app = MagicMock()
     mocker.patch("tethys_apps.models.ProxyApp.objects.get", return_value=mock_app)
@@ -4,9 +4,12 @@ import pytest
 import shutil
 import sys
 from conda.exceptions import PackagesNotFoundError
+from tethysapp.app_store import catalog
+from tethysapp.app_store.catalog import records_from_resources, LicenseTable
 from tethysapp.app_store.resource_helpers import (
     create_pre_multiple_stores_labels_obj,
     get_resources_single_store,
+    get_compatibility_report,
     get_new_stores_reformated_by_labels,
     get_stores_reformated_by_channel,
     get_app_channel_for_stores,
@@ -22,9 +25,20 @@ from tethysapp.app_store.resource_helpers import (
     check_if_app_installed,
     add_keys_to_app_metadata,
     get_app_instance_from_path,
+    get_installed_state_fingerprint,
+    get_installed_state,
+    apply_installed_state,
+    is_update_available,
 )
 
 
+@pytest.fixture()
+def installed_state_fingerprint(mocker):
+    return mocker.patch(
+        "tethysapp.app_store.resource_helpers.get_installed_state_fingerprint", return_value="fingerprint"
+    )
+
+
 def test_clear_conda_channel_cache(mocker, store):
     store_name = "active_default"
     conda_labels = ["main", "dev"]
@@ -122,6 +136,106 @@ def test_get_resources_single_store_compatible_and_installed(
     assert expected_resources == resources
 
 
+def test_get_resources_single_store_split_versions(tmp_path, mocker, resource):
+    conda_channel = "test_channel"
+    conda_label = "main"
+
+    app_resource = resource("proxyapp_test_app", conda_channel, conda_label)
+    app_resource["versions"][conda_channel][conda_label] = ["1.0", "2.0", "3.0"]
+    app_resource["compatibility"][conda_channel][conda_label] = {
+        "2.0": ">=4.0.0",
+        "3.0": ">=5.0.0",
+    }
+
+    mocker.patch(
+        "tethysapp.app_store.resource_helpers.fetch_resources",
+        return_value=[app_resource],
+    )
+    mocker.patch(
+        "tethysapp.app_store.resource_helpers.tethys_portal",
+        MagicMock(__version__="4.2.0.dev1"),
+    )
+
+    resources = get_resources_single_store(
+        tmp_path, False, conda_channel, conda_label, "test_cache_key"
+    )
+
+    assert resources["tethysVersion"] == "4.2.0"
+    assert resources["installedApps"] == {}
+    assert resources["availableApps"]["test_app"]["versions"] == {
+        conda_channel: {conda_label: ["2.0"]}
+    }
+    assert resources["incompatibleApps"]["test_app"]["versions"] == {
+        conda_channel: {conda_label: ["1.0", "3.0"]}
+    }
+
+
+def test_get_compatibility_report(tmp_path, mocker, store, resource):
+    active_store = store("active_default")
+    conda_channel = active_store["conda_channel"]
+    conda_label = active_store["conda_labels"][0]
+
+    installed_app = resource("test_app", conda_channel, conda_label)
+    installed_app["installed"][conda_channel][conda_label] = True
+    installed_app["installedVersion"] = {conda_channel: {conda_label: "1.0"}}
+    installed_app["versions"][conda_channel][conda_label] = ["1.0", "2.0"]
+    installed_app["compatibility"][conda_channel][conda_label] = {
+        "1.0": "<5.0.0",
+        "2.0": ">=4.0.0",
+    }
+    available_app = resource("test_app2", conda_channel, conda_label)
+
+    mocker.patch(
+        "tethysapp.app_store.resource_helpers.get_conda_stores",
+        return_value=[active_store],
+    )
+    mock_fetch = mocker.patch(
+        "tethysapp.app_store.resource_helpers.fetch_resources",
+        return_value=[installed_app, available_app],
+    )
+
+    report = get_compatibility_report(tmp_path, ["4.2.0.dev1", "5.0.0"])
+
+    assert report == {
+        "tethysVersions": ["4.2.0", "5.0.0"],
+        "installedApps": {
+            "test_app": {
+                conda_channel: {
+                    conda_label: {
+                        "installedVersion": "1.0",
+                        "targets": {
+                            "4.2.0": {
+                                "compatible": ["1.0", "2.0"],
+                                "incompatible": [],
+                                "latestCompatible": "2.0",
+                                "installedCompatible": True,
+                            },
+                            "5.0.0": {
+                                "compatible": ["2.0"],
+                                "incompatible": ["1.0"],
+                                "latestCompatible": "2.0",
+                                "installedCompatible": False,
+                            },
+                        },
+                    }
+                }
+            }
+        },
+    }
+    mock_fetch.assert_called_once_with(
+        tmp_path,
+        conda_channel,
+        conda_label=conda_label,
+        cache_key=f"{conda_channel}_{conda_label}_app_resources",
+        refresh=False,
+    )
+
+
+def test_get_compatibility_report_invalid_version(tmp_path):
+    with pytest.raises(ValueError):
+        get_compatibility_report(tmp_path, ["latest"])
+
+
 def test_get_new_stores_reformated_by_labels(store_with_resources):
     store1, main_resources1 = store_with_resources(
         "store1", ["main"], available_apps_label="main", installed_apps_label="main"
@@ -840,7 +954,7 @@ def test_merge_labels_for_app_in_store(store, resource):
     assert merged_label_store == expected_object_stores
 
 
-def test_fetch_resources(tmp_path, mocker, resource):
+def test_fetch_resources(tmp_path, mocker, installed_state_fingerprint, resource):
     conda_search_rep = json.dumps(
         {
             "test_app": [
@@ -871,7 +985,7 @@ def test_fetch_resources(tmp_path, mocker, resource):
         }
     )
     app_installation = {"isInstalled": False}
-    app_resource = resource("test_app", "conda_channel", "dev")
+    app_resource = resource("test_app", "test_channel", "dev")
     mock_conda = mocker.patch(
         "tethysapp.app_store.resource_helpers.conda_run",
         return_value=[conda_search_rep, None, 0],
@@ -882,10 +996,10 @@ def test_fetch_resources(tmp_path, mocker, resource):
     )
     mocker.patch(
         "tethysapp.app_store.resource_helpers.process_resources",
-        return_value=app_resource,
+        return_value=[app_resource],
     )
     mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
-    mock_cache.get.side_effect = [None]
+    mock_cache.get.return_value = None
 
     fetched_resource = fetch_resources(tmp_path, "test_channel", conda_label="dev")
 
@@ -893,11 +1007,68 @@ def test_fetch_resources(tmp_path, mocker, resource):
         "search",
         ["-c", "test_channel/label/dev", "--override-channels", "-i", "--json"],
     )
-    mock_cache.set.assert_called_with("test_channel", app_resource)
-    assert fetched_resource == app_resource
+    mock_cache.set.assert_called_with(
+        "test_channel", records_from_resources([app_resource], "test_channel", "dev")
+    )
+    assert fetched_resource == [app_resource]
 
 
-def test_fetch_resources_already_installed_no_license(tmp_path, mocker, resource):
+def test_fetch_resources_shared_licenses(tmp_path, mocker, installed_state_fingerprint):
+    license = (
+        "{'name': 'test_app', 'author': 'author', 'app_type': 'proxyapp', 'tethys_version': '>=4.0.0'}"
+    )
+    conda_search_rep = json.dumps(
+        {
+            "test_app": [
+                {
+                    "license": license,
+                    "timestamp": 1663012608139,
+                    "url": f"https://conda.anaconda.org/test_channel/noarch/test_app-{version}-py_0.tar.bz2",
+                    "version": version,
+                }
+                for version in ["1.0", "1.1", "1.2"]
+            ]
+        }
+    )
+    mocker.patch(
+        "tethysapp.app_store.resource_helpers.conda_run",
+        return_value=[conda_search_rep, None, 0],
+    )
+    mocker.patch(
+        "tethysapp.app_store.resource_helpers.check_if_app_installed",
+        return_value={"isInstalled": False},
+    )
+    mocker.patch(
+        "tethysapp.app_store.resource_helpers.process_resources",
+        side_effect=lambda resources, *args: resources,
+    )
+    mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
+    mock_cache.get.return_value = None
+    table = LicenseTable()
+    mocker.patch("tethysapp.app_store.resource_helpers.license_table", table)
+    mock_json_loads = mocker.spy(catalog.json, "loads")
+
+    fetched_resource = fetch_resources(tmp_path, "test_channel")[0]
+
+    licenses = fetched_resource["licenses"]["test_channel"]["main"]
+    assert licenses == [license, license, license]
+    assert licenses[0] is licenses[1] is licenses[2]
+    assert fetched_resource["app_type"] == "proxyapp"
+    assert fetched_resource["compatibility"]["test_channel"]["main"] == {
+        "1.0": ">=4.0.0",
+        "1.1": ">=4.0.0",
+        "1.2": ">=4.0.0",
+    }
+    assert len(table) == 1
+    license_calls = [
+        call_args
+        for call_args in mock_json_loads.call_args_list
+        if call_args.args[0].startswith('{"name"')
+    ]
+    assert len(license_calls) == 1
+
+
+def test_fetch_resources_already_installed_no_license(tmp_path, mocker, installed_state_fingerprint, resource):
     conda_search_rep = json.dumps(
         {
             "test_app": [
@@ -926,7 +1097,7 @@ def test_fetch_resources_already_installed_no_license(tmp_path, mocker, resource
         }
     )
     app_installation = {"isInstalled": True, "channel": "test_channel", "version": "1"}
-    app_resource = resource("test_app", "conda_channel", "main")
+    app_resource = resource("test_app", "test_channel", "main")
     mock_conda = mocker.patch(
         "tethysapp.app_store.resource_helpers.conda_run",
         return_value=[conda_search_rep, None, 0],
@@ -937,18 +1108,20 @@ def test_fetch_resources_already_installed_no_license(tmp_path, mocker, resource
     )
     mocker.patch(
         "tethysapp.app_store.resource_helpers.process_resources",
-        return_value=app_resource,
+        return_value=[app_resource],
     )
     mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
-    mock_cache.get.side_effect = [None]
+    mock_cache.get.return_value = None
 
     fetched_resource = fetch_resources(tmp_path, "test_channel", conda_label="main")
 
     mock_conda.assert_called_with(
         "search", ["-c", "test_channel", "--override-channels", "-i", "--json"]
     )
-    mock_cache.set.assert_called_with("test_channel", app_resource)
-    assert fetched_resource == app_resource
+    mock_cache.set.assert_called_with(
+        "test_channel", records_from_resources([app_resource], "test_channel", "main")
+    )
+    assert fetched_resource == [app_resource]
 
 
 def test_fetch_resources_no_resources(tmp_path, mocker, caplog):
@@ -960,7 +1133,7 @@ def test_fetch_resources_no_resources(tmp_path, mocker, caplog):
         return_value=[conda_search_rep, None, 0],
     )
     mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
-    mock_cache.get.side_effect = [None]
+    mock_cache.get.return_value = None
 
     fetched_resource = fetch_resources(tmp_path, "test_channel", conda_label="dev")
 
@@ -981,7 +1154,7 @@ def test_fetch_resources_packages_not_found(tmp_path, mocker):
         side_effect=[PackagesNotFoundError("No packages found.")],
     )
     mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
-    mock_cache.get.side_effect = [None]
+    mock_cache.get.return_value = None
 
     fetched_resource = fetch_resources(tmp_path, "test_channel", conda_label="dev")
 
@@ -1007,15 +1180,67 @@ def test_fetch_resources_non_zero_code(tmp_path, mocker):
     )
 
 
-def test_fetch_resources_cached(tmp_path, mocker, resource, caplog):
-    app_resource = resource("test_app", "conda_channel", "main")
+def test_fetch_resources_cached(tmp_path, mocker, resource, caplog, installed_state_fingerprint):
+    app_resource = resource("test_app", "test_channel", "main")
+    cached = {
+        "test_channel": records_from_resources([app_resource], "test_channel", "main"),
+        "installed_state_fingerprint": {
+            "tethysapp:test_app": {"isInstalled": True, "channel": "test_channel", "version": "1.0"}
+        },
+    }
     mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
-    mock_cache.get.return_value = app_resource
+    mock_cache.get.side_effect = cached.get
+    mock_check = mocker.patch("tethysapp.app_store.resource_helpers.check_if_app_installed")
 
     fetched_resource = fetch_resources(tmp_path, "test_channel")
 
     assert "Found in cache" in caplog.messages
-    assert fetched_resource == app_resource
+    app_resource["installed"]["test_channel"]["main"] = True
+    app_resource["updateAvailable"] = {"test_channel": {"main": False}}
+    assert fetched_resource == [app_resource]
+    mock_check.assert_not_called()
+    mock_cache.set.assert_not_called()
+
+
+def test_fetch_resources_cached_environment_changed(tmp_path, mocker, resource, installed_state_fingerprint):
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource["installed"]["test_channel"]["main"] = True
+    cached = {
+        "test_channel": records_from_resources([app_resource], "test_channel", "main"),
+        "installed_state_old_fingerprint": {
+            "tethysapp:test_app": {"isInstalled": True, "channel": "test_channel", "version": "1.0"}
+        },
+    }
+    mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
+    mock_cache.get.side_effect = cached.get
+    mock_check = mocker.patch(
+        "tethysapp.app_store.resource_helpers.check_if_app_installed", return_value={"isInstalled": False}
+    )
+
+    fetched_resource = fetch_resources(tmp_path, "test_channel")
+
+    # The app was uninstalled outside of the app store, so the catalog cache is kept but the installed state isn't
+    mock_check.assert_called_once_with("test_app", app_type="tethysapp")
+    mock_cache.set.assert_called_once_with(
+        "installed_state_fingerprint", {"tethysapp:test_app": {"isInstalled": False}}
+    )
+    assert fetched_resource[0]["installed"] == {"test_channel": {"main": False}}
+    assert "installedVersion" not in fetched_resource[0]
+    assert "updateAvailable" not in fetched_resource[0]
+
+
+def test_fetch_resources_cached_legacy_dictionaries(tmp_path, mocker, resource, installed_state_fingerprint):
+    app_resource = resource("test_app", "test_channel", "main")
+    mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
+    mock_cache.get.side_effect = {"test_channel": [app_resource]}.get
+    mocker.patch(
+        "tethysapp.app_store.resource_helpers.check_if_app_installed", return_value={"isInstalled": False}
+    )
+
+    fetched_resource = fetch_resources(tmp_path, "test_channel")
+
+    assert fetched_resource == [app_resource]
+    assert fetched_resource[0]["installed"] == {"test_channel": {"main": False}}
 
 
 def test_process_resources_with_license_installed_update_available(
@@ -1508,6 +1733,116 @@ def test_check_if_app_installed_no_app_type(mocker):
     assert response == expected_response
 
 
+def test_get_installed_state_fingerprint(mocker):
+    mock_environment = mocker.patch(
+        "tethysapp.app_store.resource_helpers.get_environment_fingerprint", return_value="environment"
+    )
+    mock_proxy_apps = mocker.patch(
+        "tethysapp.app_store.resource_helpers.get_proxy_app_table_version", return_value="proxy_apps"
+    )
+
+    fingerprint = get_installed_state_fingerprint()
+
+    assert fingerprint == get_installed_state_fingerprint()
+    mock_proxy_apps.return_value = "proxy_apps_changed"
+    assert get_installed_state_fingerprint() != fingerprint
+    mock_environment.return_value = "environment_changed"
+    mock_proxy_apps.return_value = "proxy_apps"
+    assert get_installed_state_fingerprint() != fingerprint
+
+
+def test_get_installed_state(mocker, resource, installed_state_fingerprint):
+    cached_state = {"tethysapp:app_1": {"isInstalled": False}}
+    mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
+    mock_cache.get.return_value = cached_state
+    mock_check = mocker.patch(
+        "tethysapp.app_store.resource_helpers.check_if_app_installed", return_value={"isInstalled": False}
+    )
+    resources = [
+        resource("app_1", "test_channel", "main"),
+        resource("app_2", "test_channel", "main", app_type="proxyapp"),
+    ]
+
+    installed_state = get_installed_state(resources)
+
+    # Only the app that isn't in the cache for the current fingerprint is checked
+    mock_cache.get.assert_called_once_with("installed_state_fingerprint")
+    mock_check.assert_called_once_with("app_2", app_type="proxyapp")
+    assert installed_state == {
+        "tethysapp:app_1": {"isInstalled": False},
+        "proxyapp:app_2": {"isInstalled": False},
+    }
+    mock_cache.set.assert_called_once_with("installed_state_fingerprint", installed_state)
+
+
+def test_get_installed_state_cached(mocker, resource, installed_state_fingerprint):
+    mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
+    mock_cache.get.return_value = {"tethysapp:app_1": {"isInstalled": False}}
+    mock_check = mocker.patch("tethysapp.app_store.resource_helpers.check_if_app_installed")
+
+    installed_state = get_installed_state([resource("app_1", "test_channel", "main")])
+
+    assert installed_state == {"tethysapp:app_1": {"isInstalled": False}}
+    mock_check.assert_not_called()
+    mock_cache.set.assert_not_called()
+
+
+def test_get_installed_state_refresh(mocker, resource, installed_state_fingerprint):
+    mock_cache = mocker.patch("tethysapp.app_store.resource_helpers.cache")
+    mock_cache.get.return_value = {
+        "tethysapp:app_1": {"isInstalled": False},
+        "tethysapp:app_2": {"isInstalled": False},
+    }
+    mocker.patch(
+        "tethysapp.app_store.resource_helpers.check_if_app_installed",
+        return_value={"isInstalled": True, "channel": "test_channel", "version": "1.0"},
+    )
+
+    installed_state = get_installed_state([resource("app_1", "test_channel", "main")], refresh=True)
+
+    # The states of the apps of other channels are kept
+    assert installed_state == {
+        "tethysapp:app_1": {"isInstalled": True, "channel": "test_channel", "version": "1.0"},
+        "tethysapp:app_2": {"isInstalled": False},
+    }
+
+
+@pytest.mark.parametrize(
+    "installed_app, expected_installed, expected_installed_version, expected_update_available",
+    [
+        ({"isInstalled": True, "channel": "test_channel", "version": "0.9"}, True, "0.9", True),
+        ({"isInstalled": True, "channel": "test_channel", "version": "1.0"}, True, "1.0", False),
+        ({"isInstalled": True, "channel": "test_channel", "version": None}, True, None, False),
+        ({"isInstalled": True, "channel": "other_channel", "version": "0.9"}, False, None, None),
+        ({"isInstalled": False}, False, None, None),
+    ],
+)
+def test_apply_installed_state(
+    resource, installed_app, expected_installed, expected_installed_version, expected_update_available
+):
+    app_resource = resource("test_app", "test_channel", "main")
+    app_resource["updateAvailable"] = {"test_channel": {"main": True}}
+
+    apply_installed_state(app_resource, installed_app, "test_channel", "main")
+
+    assert app_resource["installed"] == {"test_channel": {"main": expected_installed}}
+    if expected_installed_version is None:
+        assert "installedVersion" not in app_resource
+    else:
+        assert app_resource["installedVersion"] == {"test_channel": {"main": expected_installed_version}}
+    if expected_update_available is None:
+        assert "updateAvailable" not in app_resource
+    else:
+        assert app_resource["updateAvailable"] == {"test_channel": {"main": expected_update_available}}
+
+
+def test_is_update_available():
+    assert is_update_available("1.1", "1.0")
+    assert not is_update_available("1.0", "1.0")
+    assert not is_update_available("1.1*", "1.0")
+    assert not is_update_available("1.1", None)
+
+
 def test_add_keys_to_app_metadata():
     conda_channel = "conda_channel"
     conda_label = "conda_label"
@@ -0,0 +1,295 @@
+import threading
+from unittest.mock import MagicMock, call
+from tethysapp.app_store import restart_coordinator
+from tethysapp.app_store.restart_coordinator import (
+    RestartCoordinator,
+    get_restart_coordinator,
+    restart_portal,
+    restart_server,
+)
+from tethysapp.app_store.environment_lock import get_environment_lock_status
+
+
+def test_restart_portal_dev_server(mocker, caplog, tmp_path):
+    app_files = tmp_path / "tethysapp" / "app_store"
+    app_files.mkdir(parents=True)
+    function_file = app_files / "fake_file.py"
+    mock_ws = mocker.patch("tethysapp.app_store.restart_coordinator.send_notification")
+    mock_run_commands = mocker.patch("tethysapp.app_store.restart_coordinator.run_command_groups")
+    mocker.patch("tethysapp.app_store.restart_coordinator.sys.argv", ["manage_path", "runserver"])
+    mocker.patch(
+        "tethysapp.app_store.restart_coordinator.os.path.realpath", return_value=function_file
+    )
+    data = {"name": "test_app", "restart_type": "install"}
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock(path=str(tmp_path))
+
+    restart_portal([data["name"]], [mock_channel], mock_workspace)
+
+    assert f"Running Syncstores for app: {data['name']}" in caplog.messages
+    mock_ws.assert_called_with(
+        f"Running Syncstores for app: {data['name']}", mock_channel
+    )
+    mock_run_commands.assert_called_once_with([[["syncstores", data["name"], "-f"]]])
+    assert "Dev Mode. Attempting to restart by changing file" in caplog.messages
+    model_py = app_files / "model.py"
+    assert model_py.read_text() == f'print("{data["name"]} installed in dev mode")\n'
+
+
+def test_restart_portal_dev_server_uninstall_only(mocker, tmp_path):
+    app_files = tmp_path / "tethysapp" / "app_store"
+    app_files.mkdir(parents=True)
+    function_file = app_files / "fake_file.py"
+    mocker.patch("tethysapp.app_store.restart_coordinator.send_notification")
+    mock_run_commands = mocker.patch("tethysapp.app_store.restart_coordinator.run_command_groups")
+    mocker.patch("tethysapp.app_store.restart_coordinator.sys.argv", ["manage_path", "runserver"])
+    mocker.patch(
+        "tethysapp.app_store.restart_coordinator.os.path.realpath", return_value=function_file
+    )
+    mocker.patch("tethysapp.app_store.restart_coordinator.acquire_environment_lock")
+    batch = [
+        {
+            "data": {"name": "test_app", "restart_type": "uninstall"},
+            "channel_layer": MagicMock(),
+            "app_workspace": MagicMock(path=str(tmp_path)),
+            "run_collect_all": True,
+        }
+    ]
+
+    RestartCoordinator(debounce=0, max_wait=0).restart(batch)
+
+    mock_run_commands.assert_called_once_with([])
+    model_py = app_files / "model.py"
+    assert model_py.read_text() == 'print("Restarted in dev mode")\n'
+
+
+def test_restart_portal_prod_server_run_collect_all(mocker, caplog, tmp_path):
+    mocker.patch("tethysapp.app_store.restart_coordinator.is_incremental_collect_enabled", return_value=False)
+    mock_ws = mocker.patch("tethysapp.app_store.restart_coordinator.send_notification")
+    mock_run_commands = mocker.patch("tethysapp.app_store.restart_coordinator.run_command_groups")
+    mock_subprocess = mocker.patch("tethysapp.app_store.restart_coordinator.subprocess")
+    mocker.patch(
+        "tethysapp.app_store.restart_coordinator.app.get_custom_setting",
+        return_value="custom_setting",
+    )
+    mock_os_system = mocker.patch("tethysapp.app_store.restart_coordinator.os.system")
+    data = {"name": "test_app", "restart_type": "install"}
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock(path=str(tmp_path))
+
+    restart_portal([data["name"]], [mock_channel], mock_workspace)
+
+    assert f"Running Syncstores for app: {data['name']}" in caplog.messages
+    mock_ws.assert_has_calls(
+        [
+            call(f"Running Syncstores for app: {data['name']}", mock_channel),
+            call(f"Running Tethys Collectall for apps: {data['name']}", mock_channel),
+            call("Server Restarting . . .", mock_channel),
+        ]
+    )
+    mock_run_commands.assert_called_once_with(
+        [
+            [["syncstores", data["name"], "-f"]],
+            [["pre_collectstatic"], ["collectstatic", "--noinput"]],
+            [["collectworkspaces", "--force"]],
+        ]
+    )
+    mock_subprocess.run.assert_called_with(["sudo", "-h"], check=True)
+    mock_os_system.assert_called_with(
+        "echo custom_setting|sudo -S supervisorctl restart all"
+    )
+    assert "Running Tethys Collectall" in caplog.messages
+
+
+def test_restart_portal_prod_server_docker(mocker, caplog, tmp_path):
+    mock_ws = mocker.patch("tethysapp.app_store.restart_coordinator.send_notification")
+    mock_run_commands = mocker.patch("tethysapp.app_store.restart_coordinator.run_command_groups")
+    mocker.patch(
+        "tethysapp.app_store.restart_coordinator.subprocess.run", side_effect=[Exception("No sudo")]
+    )
+    mocker.patch("tethysapp.app_store.restart_coordinator.os.path.isdir", return_value=True)
+    restart = tmp_path / "restart"
+    mocker.patch("tethysapp.app_store.restart_coordinator.Path", return_value=restart)
+    data = {"name": "test_app", "restart_type": "install"}
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock(path=str(tmp_path))
+
+    restart_portal([data["name"]], [mock_channel], mock_workspace, run_collect_all=False)
+
+    assert f"Running Syncstores for app: {data['name']}" in caplog.messages
+    mock_ws.assert_has_calls(
+        [
+            call(f"Running Syncstores for app: {data['name']}", mock_channel),
+            call("Server Restarting . . .", mock_channel),
+        ]
+    )
+    mock_run_commands.assert_called_once_with([[["syncstores", data["name"], "-f"]]])
+    assert "No sudo" in caplog.messages
+    assert (
+        "No SUDO. Docker container implied. Restarting without SUDO" in caplog.messages
+    )
+    assert "Restart Directory found. Creating restart file." in caplog.messages
+    assert restart.is_file()
+
+
+def test_restart_portal_prod_server_docker_retry_no_sudo(mocker, caplog, tmp_path):
+    mock_ws = mocker.patch("tethysapp.app_store.restart_coordinator.send_notification")
+    mock_run_commands = mocker.patch("tethysapp.app_store.restart_coordinator.run_command_groups")
+    mocker.patch(
+        "tethysapp.app_store.restart_coordinator.subprocess.run", side_effect=[Exception("No sudo")]
+    )
+    mocker.patch("tethysapp.app_store.restart_coordinator.os.path.isdir", return_value=False)
+    mock_os_system = mocker.patch("tethysapp.app_store.restart_coordinator.os.system")
+    data = {"name": "test_app", "restart_type": "install"}
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock(path=str(tmp_path))
+
+    restart_portal([data["name"]], [mock_channel], mock_workspace, run_collect_all=False)
+
+    assert f"Running Syncstores for app: {data['name']}" in caplog.messages
+    mock_ws.assert_has_calls(
+        [
+            call(f"Running Syncstores for app: {data['name']}", mock_channel),
+            call("Server Restarting . . .", mock_channel),
+        ]
+    )
+    mock_run_commands.assert_called_once_with([[["syncstores", data["name"], "-f"]]])
+    assert "No sudo" in caplog.messages
+    assert (
+        "No SUDO. Docker container implied. Restarting without SUDO" in caplog.messages
+    )
+    mock_os_system.assert_called_with("supervisorctl restart all")
+
+
+def test_restart_portal_batch(mocker, tmp_path):
+    mocker.patch("tethysapp.app_store.restart_coordinator.is_incremental_collect_enabled", return_value=False)
+    mock_ws = mocker.patch("tethysapp.app_store.restart_coordinator.send_notification")
+    mock_run_commands = mocker.patch("tethysapp.app_store.restart_coordinator.run_command_groups")
+    mocker.patch("tethysapp.app_store.restart_coordinator.subprocess")
+    mocker.patch("tethysapp.app_store.restart_coordinator.app.get_custom_setting", return_value="custom_setting")
+    mock_os_system = mocker.patch("tethysapp.app_store.restart_coordinator.os.system")
+    mock_channels = [MagicMock(), MagicMock()]
+
+    restart_portal(["app1", "app2"], mock_channels, MagicMock(path=str(tmp_path)))
+
+    mock_run_commands.assert_called_once_with(
+        [
+            [["syncstores", "app1", "-f"]],
+            [["syncstores", "app2", "-f"]],
+            [["pre_collectstatic"], ["collectstatic", "--noinput"]],
+            [["collectworkspaces", "--force"]],
+        ]
+    )
+    mock_ws.assert_any_call("Running Tethys Collectall for apps: app1, app2", mock_channels[1])
+    mock_ws.assert_any_call("Server Restarting . . .", mock_channels[0])
+    mock_ws.assert_any_call("Server Restarting . . .", mock_channels[1])
+    mock_os_system.assert_called_once_with("echo custom_setting|sudo -S supervisorctl restart all")
+
+
+def test_restart_portal_incremental_collect(mocker, tmp_path):
+    mocker.patch("tethysapp.app_store.restart_coordinator.send_notification")
+    mock_run_commands = mocker.patch("tethysapp.app_store.restart_coordinator.run_command_groups")
+    mocker.patch("tethysapp.app_store.restart_coordinator.subprocess")
+    mocker.patch("tethysapp.app_store.restart_coordinator.app.get_custom_setting", return_value="custom_setting")
+    mocker.patch("tethysapp.app_store.restart_coordinator.os.system")
+    mocker.patch("tethysapp.app_store.restart_coordinator.is_incremental_collect_enabled", return_value=True)
+    mock_collect_apps = mocker.patch("tethysapp.app_store.restart_coordinator.collect_apps", return_value=True)
+
+    restart_portal(["app1", "app2"], [MagicMock()], MagicMock(path=str(tmp_path)))
+
+    mock_collect_apps.assert_called_once_with(["app1", "app2"])
+    mock_run_commands.assert_called_once_with([[["syncstores", "app1", "-f"]], [["syncstores", "app2", "-f"]]])
+
+
+def test_restart_coordinator_batches_requests(mocker):
+    mocker.patch("tethysapp.app_store.restart_coordinator.has_exclusive_jobs", return_value=False)
+    restarted = threading.Event()
+    mock_restart_portal = mocker.patch(
+        "tethysapp.app_store.restart_coordinator.restart_portal", side_effect=lambda *args, **kwargs: restarted.set()
+    )
+    mocker.patch("tethysapp.app_store.restart_coordinator.acquire_environment_lock")
+    coordinator = RestartCoordinator(debounce=0.2, max_wait=5)
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock()
+
+    coordinator.request({"name": "app1", "restart_type": "install"}, mock_channel, mock_workspace)
+    coordinator.request({"name": "app2", "restart_type": "update"}, mock_channel, mock_workspace)
+    coordinator.request({"name": "app1", "restart_type": "install"}, None, mock_workspace, run_collect_all=False)
+    coordinator.request({"name": "app3", "restart_type": "uninstall"}, mock_channel, mock_workspace)
+    worker = coordinator.worker
+
+    assert restarted.wait(5)
+    worker.join(5)
+    mock_restart_portal.assert_called_once_with(
+        ["app1", "app2"], [mock_channel], mock_workspace, run_collect_all=True
+    )
+    assert coordinator.worker is None
+    assert coordinator.pending == []
+
+
+def test_restart_coordinator_holds_environment_lock(mocker, tmp_path):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    lock_owners = []
+    mocker.patch(
+        "tethysapp.app_store.restart_coordinator.restart_portal",
+        side_effect=lambda *args, **kwargs: lock_owners.append(
+            get_environment_lock_status(mock_workspace)["lease"]["owner"]
+        ),
+    )
+    coordinator = RestartCoordinator(debounce=0, max_wait=0)
+
+    coordinator.restart([{"data": {"name": "app1", "restart_type": "install"}, "channel_layer": None,
+                          "app_workspace": mock_workspace, "run_collect_all": True}])
+
+    assert lock_owners[0].startswith("restart-")
+    assert get_environment_lock_status(mock_workspace)["lease"] is None
+
+
+def test_restart_coordinator_waits_for_exclusive_jobs(mocker):
+    mocker.patch("tethysapp.app_store.restart_coordinator.EXCLUSIVE_POLL_INTERVAL", 0.01)
+    mocker.patch("tethysapp.app_store.restart_coordinator.has_exclusive_jobs", side_effect=[True, True, False])
+    coordinator = RestartCoordinator(debounce=0, max_wait=0)
+    coordinator.pending = [{"data": {}}]
+    coordinator.first_request = coordinator.last_request = 0
+
+    assert coordinator.next_batch() == [{"data": {}}]
+    assert coordinator.pending == []
+
+
+def test_restart_coordinator_restart_failed(mocker, caplog):
+    mocker.patch("tethysapp.app_store.restart_coordinator.has_exclusive_jobs", return_value=False)
+    mock_run_exclusive = mocker.patch(
+        "tethysapp.app_store.restart_coordinator.run_exclusive", side_effect=Exception("restart failed")
+    )
+    coordinator = RestartCoordinator(debounce=0, max_wait=0)
+    coordinator.request({"name": "app1", "restart_type": "install"}, None, MagicMock())
+    worker = coordinator.worker
+    worker.join(5)
+
+    mock_run_exclusive.assert_called_once()
+    assert "Failed to restart the server: restart failed" in caplog.messages
+
+
+def test_restart_server(mocker):
+    mock_coordinator = MagicMock()
+    mocker.patch("tethysapp.app_store.restart_coordinator._coordinator", mock_coordinator)
+    data = {"name": "app1", "restart_type": "install"}
+    mock_channel = MagicMock()
+    mock_workspace = MagicMock()
+
+    restart_server(data, mock_channel, mock_workspace, run_collect_all=False)
+
+    assert get_restart_coordinator() is mock_coordinator
+    mock_coordinator.request.assert_called_once_with(data, mock_channel, mock_workspace, run_collect_all=False)
+
+
+def test_get_restart_coordinator(mocker):
+    mocker.patch("tethysapp.app_store.restart_coordinator._coordinator", None)
+    mocker.patch("tethysapp.app_store.restart_coordinator.get_app_store_setting", side_effect=[1, 2])
+
+    coordinator = get_restart_coordinator()
+
+    assert coordinator.debounce == 1
+    assert coordinator.max_wait == 2
+    assert get_restart_coordinator() is coordinator
+    assert restart_coordinator._coordinator is coordinator
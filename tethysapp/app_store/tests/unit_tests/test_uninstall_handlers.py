@@ -1,5 +1,12 @@
+import pytest
 from conda.exceptions import PackagesNotFoundError
 from unittest.mock import MagicMock, call
+from tethysapp.app_store.process_runner import (
+    ProcessCancelled,
+    cancel_processes,
+    release_process_owner,
+    set_process_owner,
+)
 from tethys_apps.exceptions import TethysAppSettingNotAssigned
 from tethysapp.app_store.uninstall_handlers import uninstall_app
 
@@ -321,3 +328,48 @@ def test_uninstall_app_proxyapp_PackagesNotFoundError(mocker):
     )
     mock_shutil.rmtree.assert_called_with("app_path")
     mock_clear_github_cache_list.assert_called()
+
+
+def test_uninstall_app_not_cancellable_after_start(mocker):
+    mocker.patch("tethysapp.app_store.uninstall_handlers.send_uninstall_messages")
+    mock_subprocess = mocker.patch("tethysapp.app_store.uninstall_handlers.subprocess")
+    mocker.patch("tethysapp.app_store.uninstall_handlers.get_manage_path", return_value="manage_path")
+    mocker.patch("tethysapp.app_store.uninstall_handlers.TethysApp.objects.filter", side_effect=[[]])
+    cancel_results = []
+
+    def remove_app_records(process):
+        # The user cancels after the portal records of the app are gone
+        cancel_results.append(cancel_processes("uninstall_job"))
+
+    mock_subprocess.call.side_effect = remove_app_records
+    mock_mamba_uninstall = mocker.patch("tethysapp.app_store.uninstall_handlers.mamba_uninstall")
+    mock_channel = MagicMock()
+
+    set_process_owner("uninstall_job")
+    try:
+        uninstall_app({"name": "test_app", "app_type": "tethysapp"}, mock_channel, MagicMock())
+    finally:
+        set_process_owner(None)
+        release_process_owner("uninstall_job")
+
+    assert cancel_results == [None]
+    mock_mamba_uninstall.assert_called_once_with("test_app", mock_channel)
+
+
+def test_uninstall_app_cancelled_before_start(mocker):
+    mocker.patch("tethysapp.app_store.uninstall_handlers.send_uninstall_messages")
+    mock_subprocess = mocker.patch("tethysapp.app_store.uninstall_handlers.subprocess")
+    mocker.patch("tethysapp.app_store.uninstall_handlers.get_manage_path", return_value="manage_path")
+    mock_mamba_uninstall = mocker.patch("tethysapp.app_store.uninstall_handlers.mamba_uninstall")
+
+    cancel_processes("uninstall_job")
+    set_process_owner("uninstall_job")
+    try:
+        with pytest.raises(ProcessCancelled):
+            uninstall_app({"name": "test_app", "app_type": "tethysapp"}, MagicMock(), MagicMock())
+    finally:
+        set_process_owner(None)
+        release_process_owner("uninstall_job")
+
+    mock_subprocess.call.assert_not_called()
+    mock_mamba_uninstall.assert_not_called()
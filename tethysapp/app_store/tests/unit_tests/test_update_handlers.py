@@ -1,5 +1,7 @@
-from unittest.mock import MagicMock, call
+from unittest.mock import ANY, MagicMock, call
+import pytest
 import yaml
+from tethysapp.app_store.process_runner import ProcessCancelled
 from tethysapp.app_store.update_handlers import (
     update_app,
     send_update_msg,
@@ -18,19 +20,18 @@ def test_send_update_msg(mocker):
     mock_sn.assert_called_with(expected_json, mock_channel)
 
 
-def test_conda_update(mocker, app_store_dir):
+def test_conda_update(mock_run_process, mocker, app_store_dir):
     mocker.patch("tethysapp.app_store.update_handlers.time.time", side_effect=[10, 20])
     mock_send_update_msg = mocker.patch(
         "tethysapp.app_store.update_handlers.send_update_msg"
     )
-    mock_subprocess = mocker.patch("tethysapp.app_store.update_handlers.subprocess")
-    mock_subprocess.Popen().stdout.readline.side_effect = [
-        "Collecting package metadata: done".encode("utf-8"),
-        "Solving environment: done".encode("utf-8"),
-        "Verifying transaction: done".encode("utf-8"),
-        "All requested packages already installed.".encode("utf-8"),
-        "Found conflicts!: conflicting requests".encode("utf-8"),
-        "Mamba Update Complete".encode("utf-8"),
+    mock_rp = mock_run_process("tethysapp.app_store.update_handlers")
+    mock_rp.lines = [
+        "Running Mamba Update",
+        'APPSTORE_EVENT {"type": "solve_start", "tool": "mamba"}',
+        '{"success": false, "exception_name": "UnsatisfiableError", "message": "Found conflicts!"}',
+        'APPSTORE_EVENT {"type": "complete", "success": false}',
+        "Mamba Update Complete",
     ]
     mock_channel = MagicMock()
     app_name = "test_app"
@@ -38,17 +39,18 @@ def test_conda_update(mocker, app_store_dir):
     conda_channel = "conda_channel"
     conda_label = "conda_label"
 
-    conda_update(app_name, app_version, conda_channel, conda_label, mock_channel)
+    successful_update = conda_update(app_name, app_version, conda_channel, conda_label, mock_channel)
 
+    assert not successful_update
     update_script = str(app_store_dir / "scripts" / "mamba_update.sh")
-    mock_subprocess.Popen.assert_called_with(
+    mock_rp.assert_called_with(
         [
             update_script,
             f"{app_name}={app_version}",
             f"{conda_channel}/label/{conda_label}",
         ],
-        stdout=mock_subprocess.PIPE,
-        stderr=mock_subprocess.STDOUT,
+        on_line=ANY,
+        idle_timeout=0,
     )
     mock_send_update_msg.assert_has_calls(
         [
@@ -57,30 +59,26 @@ def test_conda_update(mocker, app_store_dir):
                 "complicated the environment is. Please wait....",
                 mock_channel,
             ),
-            call("Package Metadata Collection: Done", mock_channel),
+            call("Solving Environment: Started", mock_channel),
             call("Solving Environment: Done", mock_channel),
-            call("Verifying Transaction: Done", mock_channel),
+            call("Install error: Found conflicts!", mock_channel),
             call(
-                "Application package is already installed in this conda environment.",
-                mock_channel,
-            ),
-            call(
-                "Mamba install found conflicts. Please try running the following command in your terminal's conda "
-                f"environment to attempt a manual installation :  mamba install -c {conda_channel} {app_name}",
+                "Please try running the following command in your terminal's conda environment to attempt a "
+                f"manual installation :  mamba install -c {conda_channel}/label/{conda_label} {app_name}={app_version}",
                 mock_channel,
             ),
+            call("Transaction: Failed", mock_channel),
             call("Conda update completed in 10.00 seconds.", mock_channel),
         ]
     )
 
 
-def test_conda_update_2(mocker, app_store_dir):
+def test_conda_update_2(mock_run_process, mocker, app_store_dir):
     mocker.patch("tethysapp.app_store.update_handlers.time.time", side_effect=[10, 20])
     mock_send_update_msg = mocker.patch(
         "tethysapp.app_store.update_handlers.send_update_msg"
     )
-    mock_subprocess = mocker.patch("tethysapp.app_store.update_handlers.subprocess")
-    mock_subprocess.Popen().stdout.readline.return_value = ""
+    mock_rp = mock_run_process("tethysapp.app_store.update_handlers")
     mock_channel = MagicMock()
     app_name = "test_app"
     app_version = "1.0.0"
@@ -90,14 +88,14 @@ def test_conda_update_2(mocker, app_store_dir):
     conda_update(app_name, app_version, conda_channel, conda_label, mock_channel)
 
     update_script = str(app_store_dir / "scripts" / "mamba_update.sh")
-    mock_subprocess.Popen.assert_called_with(
+    mock_rp.assert_called_with(
         [
             update_script,
             f"{app_name}={app_version}",
             f"{conda_channel}/label/{conda_label}",
         ],
-        stdout=mock_subprocess.PIPE,
-        stderr=mock_subprocess.STDOUT,
+        on_line=ANY,
+        idle_timeout=0,
     )
     mock_send_update_msg.assert_has_calls(
         [
@@ -113,7 +111,9 @@ def test_conda_update_2(mocker, app_store_dir):
 
 def test_update_app(mocker):
     mock_restart = mocker.patch("tethysapp.app_store.update_handlers.restart_server")
-    mock_conda_update = mocker.patch("tethysapp.app_store.update_handlers.conda_update")
+    mock_conda_update = mocker.patch(
+        "tethysapp.app_store.update_handlers.conda_update", return_value=True
+    )
     mock_channel = MagicMock()
     mock_workspace = MagicMock()
     data = {
@@ -150,7 +150,7 @@ def test_update_app_proxyapp(mocker, proxyapp_site_package, test_files_dir):
     subprocess_location = str(proxyapp_site_package / "subprocess")
 
     mocker.patch(
-        "tethysapp.app_store.begin_install.subprocess.__file__", subprocess_location
+        "tethysapp.app_store.package_index.subprocess.__file__", subprocess_location
     )
     mock_channel = MagicMock()
     mock_workspace = MagicMock()
@@ -181,6 +181,39 @@ def test_update_app_proxyapp(mocker, proxyapp_site_package, test_files_dir):
     mock_send_update_msg.assert_called_with("Proxy app has been updated.", mock_channel)
 
 
+def test_update_app_proxyapp_missing_config(mocker, caplog):
+    mock_send_update_msg = mocker.patch(
+        "tethysapp.app_store.update_handlers.send_update_msg"
+    )
+    mock_restart = mocker.patch("tethysapp.app_store.update_handlers.restart_server")
+    mocker.patch("tethysapp.app_store.update_handlers.conda_update", return_value=True)
+    mocker.patch("tethysapp.app_store.update_handlers.find_proxy_app_config", return_value=None)
+    mock_delete_proxy_app = mocker.patch(
+        "tethysapp.app_store.update_handlers.delete_proxy_app"
+    )
+    mock_create_proxy_app = mocker.patch(
+        "tethysapp.app_store.update_handlers.create_proxy_app"
+    )
+    mock_channel = MagicMock()
+    data = {
+        "name": "proxyapp_test_app",
+        "app_type": "proxyapp",
+        "version": "1.0.0",
+        "channel": "conda_channel",
+        "label": "conda_label",
+    }
+
+    update_app(data, mock_channel, MagicMock())
+
+    assert "Couldn't find the proxyapp.yaml of proxyapp_test_app" in caplog.messages
+    mock_send_update_msg.assert_called_with(
+        "Application update failed. Check logs for more details.", mock_channel
+    )
+    mock_delete_proxy_app.assert_not_called()
+    mock_create_proxy_app.assert_not_called()
+    mock_restart.assert_not_called()
+
+
 def test_update_app_exception(mocker, caplog):
     mock_restart = mocker.patch("tethysapp.app_store.update_handlers.restart_server")
     mock_send_update_msg = mocker.patch(
@@ -206,3 +239,52 @@ def test_update_app_exception(mocker, caplog):
         "Application update failed. Check logs for more details.", mock_channel
     )
     mock_restart.assert_not_called()
+
+
+def test_update_app_cancelled(mocker):
+    mock_restart = mocker.patch("tethysapp.app_store.update_handlers.restart_server")
+    mock_send_update_msg = mocker.patch(
+        "tethysapp.app_store.update_handlers.send_update_msg"
+    )
+    mocker.patch(
+        "tethysapp.app_store.update_handlers.conda_update",
+        side_effect=[ProcessCancelled()],
+    )
+    mock_channel = MagicMock()
+    data = {
+        "name": "test_app",
+        "version": "1.0.0",
+        "channel": "conda_channel",
+        "label": "conda_label",
+    }
+
+    with pytest.raises(ProcessCancelled):
+        update_app(data, mock_channel, MagicMock())
+
+    mock_send_update_msg.assert_called_with("Application update cancelled.", mock_channel)
+    mock_restart.assert_not_called()
+
+
+def test_update_app_failed_update(mocker, caplog):
+    mock_restart = mocker.patch("tethysapp.app_store.update_handlers.restart_server")
+    mock_send_update_msg = mocker.patch(
+        "tethysapp.app_store.update_handlers.send_update_msg"
+    )
+    mocker.patch(
+        "tethysapp.app_store.update_handlers.conda_update", return_value=False
+    )
+    mock_channel = MagicMock()
+    data = {
+        "name": "test_app",
+        "version": "1.0.0",
+        "channel": "conda_channel",
+        "label": "conda_label",
+    }
+
+    update_app(data, mock_channel, MagicMock())
+
+    assert "Mamba update script failed to update application." in caplog.messages
+    mock_send_update_msg.assert_called_with(
+        "Application update failed. Check logs for more details.", mock_channel
+    )
+    mock_restart.assert_not_called()
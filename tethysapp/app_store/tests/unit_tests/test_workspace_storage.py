@@ -0,0 +1,140 @@
+from unittest.mock import MagicMock
+import json
+from tethysapp.app_store.workspace_storage import (
+    get_workspace_quota,
+    get_storage_index_path,
+    get_path_size,
+    read_storage_index,
+    record_workspace_artifact,
+    touch_workspace_artifact,
+    evict_workspace_artifacts,
+    get_workspace_usage,
+)
+
+
+def create_artifact(tmp_path, app_name, size):
+    artifact_dir = tmp_path / "apps" / "test_channel" / "main" / app_name
+    artifact_dir.mkdir(parents=True)
+    (artifact_dir / "file.txt").write_bytes(b"0" * size)
+    tarball = tmp_path / "apps" / "test_channel" / "main" / f"{app_name}.tar.bz2"
+    tarball.write_bytes(b"0" * size)
+
+    return str(artifact_dir), [str(tarball), str(artifact_dir)]
+
+
+def test_get_workspace_quota(mocker):
+    mocker.patch(
+        "tethysapp.app_store.workspace_storage.get_app_store_setting", return_value=2
+    )
+
+    assert get_workspace_quota() == 2 * 1024 * 1024
+
+
+def test_get_path_size(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_bytes(b"0" * 10)
+    (tmp_path / "b.txt").write_bytes(b"0" * 5)
+
+    assert get_path_size(str(tmp_path)) == 15
+    assert get_path_size(str(tmp_path / "b.txt")) == 5
+
+
+def test_record_workspace_artifact(tmp_path):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    artifact_key, paths = create_artifact(tmp_path, "test_app", 10)
+
+    record_workspace_artifact(mock_workspace, artifact_key, paths)
+
+    with open(get_storage_index_path(mock_workspace)) as index_file:
+        index = json.load(index_file)
+    assert index[artifact_key]["size"] == 20
+    assert index[artifact_key]["paths"] == paths
+
+
+def test_read_storage_index_drops_missing(tmp_path):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    artifact_key, paths = create_artifact(tmp_path, "test_app", 10)
+    record_workspace_artifact(mock_workspace, artifact_key, paths)
+    record_workspace_artifact(mock_workspace, "missing", [str(tmp_path / "missing")])
+
+    index = read_storage_index(mock_workspace)
+
+    assert list(index.keys()) == [artifact_key]
+
+
+def test_read_storage_index_corrupted(tmp_path, caplog):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    (tmp_path / "apps").mkdir()
+    with open(get_storage_index_path(mock_workspace), "w") as index_file:
+        index_file.write("not json")
+
+    assert read_storage_index(mock_workspace) == {}
+    assert "Workspace storage index is corrupted. Starting a new one" in caplog.messages
+
+
+def test_touch_workspace_artifact(tmp_path, mocker):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    mock_time = mocker.patch("tethysapp.app_store.workspace_storage.time")
+    mock_time.time.side_effect = [10, 20]
+    artifact_key, paths = create_artifact(tmp_path, "test_app", 10)
+
+    touch_workspace_artifact(mock_workspace, artifact_key, paths)
+    touch_workspace_artifact(mock_workspace, artifact_key, paths)
+
+    assert read_storage_index(mock_workspace)[artifact_key]["last_access"] == 20
+
+
+def test_evict_workspace_artifacts(tmp_path, mocker):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    mock_time = mocker.patch("tethysapp.app_store.workspace_storage.time")
+    mock_time.time.side_effect = [10, 20, 30]
+    old_key, old_paths = create_artifact(tmp_path, "old_app", 10)
+    middle_key, middle_paths = create_artifact(tmp_path, "middle_app", 10)
+    new_key, new_paths = create_artifact(tmp_path, "new_app", 10)
+    record_workspace_artifact(mock_workspace, old_key, old_paths)
+    record_workspace_artifact(mock_workspace, middle_key, middle_paths)
+    record_workspace_artifact(mock_workspace, new_key, new_paths)
+
+    evicted = evict_workspace_artifacts(mock_workspace, quota=45, keep=[old_key])
+
+    assert evicted == [middle_key]
+    assert not (tmp_path / "apps" / "test_channel" / "main" / "middle_app").exists()
+    assert not (tmp_path / "apps" / "test_channel" / "main" / "middle_app.tar.bz2").exists()
+    assert sorted(read_storage_index(mock_workspace).keys()) == sorted([old_key, new_key])
+
+
+def test_evict_workspace_artifacts_under_quota(tmp_path):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    artifact_key, paths = create_artifact(tmp_path, "test_app", 10)
+    record_workspace_artifact(mock_workspace, artifact_key, paths)
+
+    evicted = evict_workspace_artifacts(mock_workspace, quota=1000)
+
+    assert evicted == []
+    assert (tmp_path / "apps" / "test_channel" / "main" / "test_app").exists()
+
+
+def test_get_workspace_usage(tmp_path, mocker):
+    mock_workspace = MagicMock(path=str(tmp_path))
+    mocker.patch(
+        "tethysapp.app_store.workspace_storage.get_workspace_quota", return_value=200
+    )
+    mock_time = mocker.patch("tethysapp.app_store.workspace_storage.time")
+    mock_time.time.side_effect = [10, 20]
+    first_key, first_paths = create_artifact(tmp_path, "first_app", 10)
+    second_key, second_paths = create_artifact(tmp_path, "second_app", 40)
+    record_workspace_artifact(mock_workspace, first_key, first_paths)
+    record_workspace_artifact(mock_workspace, second_key, second_paths)
+
+    usage = get_workspace_usage(mock_workspace)
+
+    assert usage == {
+        "totalSize": 100,
+        "quota": 200,
+        "percentUsed": 50.0,
+        "artifactCount": 2,
+        "artifacts": [
+            {"path": second_key, "size": 80, "lastAccess": 20},
+            {"path": first_key, "size": 20, "lastAccess": 10},
+        ],
+    }
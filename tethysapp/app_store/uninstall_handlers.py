@@ -8,6 +8,8 @@ import shutil
 from .helpers import logger, get_github_install_metadata, clear_github_cache_list
 from .mamba_helpers import mamba_uninstall, send_uninstall_messages
 from .proxy_app_handlers import delete_proxy_app
+from .app_discovery import invalidate_app_instance
+from .process_runner import disable_cancel
 
 
 def uninstall_app(data, channel_layer, app_workspace):
@@ -23,6 +25,9 @@ def uninstall_app(data, channel_layer, app_workspace):
     app_name = data["name"]
 
     send_uninstall_messages("Starting Uninstall. Please wait...", channel_layer)
+    # Dropping the databases, removing the portal records, and removing the package can't be rolled back, so a
+    # cancel can only stop the uninstall before it starts
+    disable_cancel()
     if data["app_type"] == "proxyapp":
         data["app_name"] = data["name"].replace("proxyapp_", "")
         send_uninstall_messages("Uninstalling Proxy App", channel_layer)
@@ -65,6 +70,7 @@ def uninstall_app(data, channel_layer, app_workspace):
             subprocess.call(process)
         except KeyboardInterrupt:
             pass
+        invalidate_app_instance(app_name)
 
         send_uninstall_messages(
             "Tethys App Uninstalled. Running Conda/GitHub Cleanup...", channel_layer
@@ -1,10 +1,15 @@
-import subprocess
 import os
 import time
 import yaml
 
-from .helpers import logger, send_notification, check_all_present, restart_server
+from .helpers import logger, send_notification
+from .restart_coordinator import restart_server
 from .proxy_app_handlers import delete_proxy_app, create_proxy_app
+from .progress_events import ProgressParser, ProgressNotifier, ERROR
+from .process_runner import run_process, ProcessCancelled
+from .app_discovery import invalidate_app_instance
+from .package_index import find_proxy_app_config
+from .mamba_helpers import JSON_SCRIPT_IDLE_TIMEOUT
 
 
 def send_update_msg(msg, channel_layer):
@@ -27,6 +32,9 @@ def conda_update(app_name, app_version, conda_channel, conda_label, channel_laye
         conda_channel (str): Name of the conda channel to use for app discovery
         conda_label (str, optional): Name of the conda label to use for app discovery.
         channel_layer (Django Channels Layer): Asynchronous Django channel layer from the websocket consumer
+
+    Returns:
+        bool: True if the update succeeded
     """
     start_time = time.time()
     start_msg = (
@@ -46,47 +54,32 @@ def conda_update(app_name, app_version, conda_channel, conda_label, channel_laye
         label_channel = f"{conda_channel}/label/{conda_label}"
     install_command = [script_path, app_name_with_version, label_channel]
 
-    # Running this sub process, in case the library isn't installed, triggers a restart.
-    p = subprocess.Popen(
-        install_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
-    )
+    parser = ProgressParser()
+    notifier = ProgressNotifier(channel_layer, send_update_msg)
 
-    while True:
-        output = p.stdout.readline()
-        if output == "":
-            break
-        if output:
-            str_output = str(output.strip().decode("utf-8"))
-            if check_all_present(str_output, ["Collecting package metadata", "done"]):
-                send_update_msg("Package Metadata Collection: Done", channel_layer)
-            if check_all_present(str_output, ["Solving environment", "done"]):
-                send_update_msg("Solving Environment: Done", channel_layer)
-            if check_all_present(str_output, ["Verifying transaction", "done"]):
-                send_update_msg("Verifying Transaction: Done", channel_layer)
-            if check_all_present(
-                str_output, ["All requested packages already installed."]
-            ):
+    def handle_output(str_output):
+        logger.info(str_output)
+        for event in parser.feed(str_output):
+            notifier.send(event)
+            if event.type == ERROR:
                 send_update_msg(
-                    "Application package is already installed in this conda environment.",
-                    channel_layer,
-                )
-            if check_all_present(str_output, ["Mamba Update Complete"]):
-                break
-            if check_all_present(
-                str_output, ["Found conflicts!", "conflicting requests"]
-            ):
-                send_update_msg(
-                    "Mamba install found conflicts. Please try running the following command in your "
-                    "terminal's conda environment to attempt a manual installation :  mamba install -c "
-                    f"{conda_channel} {app_name}",
+                    "Please try running the following command in your terminal's conda environment to attempt a "
+                    f"manual installation :  mamba install -c {label_channel} {app_name_with_version}",
                     channel_layer,
                 )
 
+    # Running this sub process, in case the library isn't installed, triggers a restart.
+    result = run_process(install_command, on_line=handle_output, idle_timeout=JSON_SCRIPT_IDLE_TIMEOUT)
+    if not result.success:
+        send_update_msg(f"Update script failed. {result.describe()}.", channel_layer)
+
     send_update_msg(
         "Conda update completed in %.2f seconds." % (time.time() - start_time),
         channel_layer,
     )
 
+    return bool(parser.success) and result.success
+
 
 def update_app(data, channel_layer, app_workspace):
     """Attempts to update an application to the specified version. Restarts the server after updating
@@ -97,9 +90,23 @@ def update_app(data, channel_layer, app_workspace):
         app_workspace (TethysWorkspace): workspace object bound to the app workspace.
     """
     try:
-        conda_update(
+        successful_update = conda_update(
             data["name"], data["version"], data["channel"], data["label"], channel_layer
         )
+        if not successful_update:
+            raise Exception("Mamba update script failed to update application.")
+
+        proxy_app_data = None
+        if data["app_type"] == "proxyapp":
+            # Read the config of the updated package before the old proxy app is deleted
+            proxyapp_yaml = find_proxy_app_config(data["name"])
+            if proxyapp_yaml is None:
+                raise Exception(f"Couldn't find the proxyapp.yaml of {data['name']}")
+            with open(proxyapp_yaml) as f:
+                proxy_app_data = yaml.safe_load(f)
+    except ProcessCancelled:
+        send_update_msg("Application update cancelled.", channel_layer)
+        raise
     except Exception as e:
         logger.error(e)
         send_update_msg(
@@ -107,23 +114,12 @@ def update_app(data, channel_layer, app_workspace):
         )
         return
 
-    if data["app_type"] == "proxyapp":
+    invalidate_app_instance(data["name"])
+
+    if proxy_app_data is not None:
         data["app_name"] = data["name"].replace("proxyapp_", "")
         delete_proxy_app(data, channel_layer)
-
-        site_packages = os.path.join(
-            os.path.dirname(subprocess.__file__), "site-packages"
-        )
-        proxy_package = [
-            package for package in os.listdir(site_packages) if data["name"] in package
-        ][0]
-        proxyapp_yaml = os.path.join(
-            site_packages, proxy_package, "config", "proxyapp.yaml"
-        )
-        with open(proxyapp_yaml) as f:
-            install_data = yaml.safe_load(f)
-
-        create_proxy_app(install_data, channel_layer)
+        create_proxy_app(proxy_app_data, channel_layer)
         send_update_msg("Proxy app has been updated.", channel_layer)
 
     # Since all settings are preserved, continue to standard cleanup/restart command
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import shutil
+import threading
+
+from .helpers import logger, get_app_store_setting
+
+STORAGE_INDEX_FILE = "storage_index.json"
+DEFAULT_WORKSPACE_QUOTA_MB = 1024
+
+_index_lock = threading.Lock()
+
+
+def get_workspace_quota():
+    """Returns the maximum number of bytes that downloaded packages may use in the app workspace. The quota is set in
+    megabytes with the APP_STORE_WORKSPACE_QUOTA_MB portal setting
+
+    Returns:
+        int: quota in bytes
+    """
+    quota_mb = get_app_store_setting("APP_STORE_WORKSPACE_QUOTA_MB", DEFAULT_WORKSPACE_QUOTA_MB)
+    return int(float(quota_mb) * 1024 * 1024)
+
+
+def get_storage_index_path(app_workspace):
+    """Get the path to the file tracking the downloaded packages in the app workspace
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        str: Path to the storage index file
+    """
+    return os.path.join(app_workspace.path, "apps", STORAGE_INDEX_FILE)
+
+
+def get_path_size(path):
+    """Get the size of a file or the total size of all the files in a directory
+
+    Args:
+        path (str): Path to a file or directory
+
+    Returns:
+        int: size in bytes
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    total_size = 0
+    for root, _directories, filenames in os.walk(path):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            if not os.path.islink(file_path):
+                total_size += os.path.getsize(file_path)
+
+    return total_size
+
+
+def read_storage_index(app_workspace):
+    """Read the storage index from the app workspace. Entries whose files no longer exist are dropped
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        dict: Dictionary of artifacts keyed by the artifact path. See the example below.
+
+        {
+            '/workspace/apps/conda_channel/main/app_name': {
+                'paths': ['/workspace/apps/conda_channel/main/app_name-1.0-py_0.tar.bz2',
+                          '/workspace/apps/conda_channel/main/app_name'],
+                'size': 102400,
+                'last_access': 1700000000.0
+            }
+        }
+    """
+    index_path = get_storage_index_path(app_workspace)
+    if not os.path.exists(index_path):
+        return {}
+
+    try:
+        with open(index_path, "r") as index_file:
+            index = json.load(index_file)
+    except ValueError:
+        logger.warning("Workspace storage index is corrupted. Starting a new one")
+        return {}
+
+    return {
+        key: artifact
+        for key, artifact in index.items()
+        if any(os.path.exists(path) for path in artifact["paths"])
+    }
+
+
+def write_storage_index(app_workspace, index):
+    """Write the storage index to the app workspace
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        index (dict): Dictionary of artifacts keyed by the artifact path
+    """
+    index_path = get_storage_index_path(app_workspace)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, "w") as index_file:
+        json.dump(index, index_file)
+    os.replace(temp_path, index_path)
+
+
+def record_workspace_artifact(app_workspace, artifact_key, paths):
+    """Track a downloaded or extracted package in the app workspace. Related paths, like a tarball and the folder it
+    was extracted to, are tracked together so they are always evicted together
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        artifact_key (str): Key used to identify the artifact, usually the extracted folder path
+        paths (list): List of files and folders that belong to the artifact
+    """
+    with _index_lock:
+        index = read_storage_index(app_workspace)
+        existing_paths = [path for path in paths if os.path.exists(path)]
+        index[artifact_key] = {
+            "paths": existing_paths,
+            "size": sum(get_path_size(path) for path in existing_paths),
+            "last_access": time.time(),
+        }
+        write_storage_index(app_workspace, index)
+
+
+def touch_workspace_artifact(app_workspace, artifact_key, paths):
+    """Update the last access time of an artifact. Artifacts that are not tracked yet are recorded
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        artifact_key (str): Key used to identify the artifact, usually the extracted folder path
+        paths (list): List of files and folders that belong to the artifact
+    """
+    with _index_lock:
+        index = read_storage_index(app_workspace)
+        if artifact_key in index:
+            index[artifact_key]["last_access"] = time.time()
+            write_storage_index(app_workspace, index)
+            return
+
+    record_workspace_artifact(app_workspace, artifact_key, paths)
+
+
+def remove_artifact_paths(artifact):
+    """Delete all the files and folders of an artifact
+
+    Args:
+        artifact (dict): Artifact information from the storage index
+    """
+    for path in artifact["paths"]:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def evict_workspace_artifacts(app_workspace, quota=None, keep=None):
+    """Remove the least recently used artifacts from the app workspace until the total size is below the quota
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+        quota (int, optional): Maximum size in bytes. Defaults to the APP_STORE_WORKSPACE_QUOTA_MB setting.
+        keep (list, optional): Artifact keys that should not be evicted. Defaults to None.
+
+    Returns:
+        list: Keys of the evicted artifacts
+    """
+    if quota is None:
+        quota = get_workspace_quota()
+    keep = set(keep or [])
+
+    evicted = []
+    with _index_lock:
+        index = read_storage_index(app_workspace)
+        total_size = sum(artifact["size"] for artifact in index.values())
+        lru_artifacts = sorted(index.items(), key=lambda item: item[1]["last_access"])
+        for artifact_key, artifact in lru_artifacts:
+            if total_size <= quota:
+                break
+            if artifact_key in keep:
+                continue
+
+            logger.info(f"Evicting {artifact_key} from the app workspace to stay within the storage quota")
+            remove_artifact_paths(artifact)
+            total_size -= artifact["size"]
+            del index[artifact_key]
+            evicted.append(artifact_key)
+
+        write_storage_index(app_workspace, index)
+
+    return evicted
+
+
+def get_workspace_usage(app_workspace):
+    """Get usage statistics for the downloaded packages in the app workspace
+
+    Args:
+        app_workspace (TethysWorkspace): workspace object bound to the app workspace.
+
+    Returns:
+        dict: Usage statistics. See the example below.
+
+        {
+            'totalSize': 102400,
+            'quota': 1073741824,
+            'percentUsed': 0.01,
+            'artifactCount': 1,
+            'artifacts': [{'path': <artifact_key>, 'size': 102400, 'lastAccess': 1700000000.0}]
+        }
+    """
+    with _index_lock:
+        index = read_storage_index(app_workspace)
+
+    quota = get_workspace_quota()
+    total_size = sum(artifact["size"] for artifact in index.values())
+    artifacts = [
+        {"path": key, "size": artifact["size"], "lastAccess": artifact["last_access"]}
+        for key, artifact in sorted(index.items(), key=lambda item: item[1]["last_access"], reverse=True)
+    ]
+
+    return {
+        "totalSize": total_size,
+        "quota": quota,
+        "percentUsed": round(total_size / quota * 100, 2) if quota else 0,
+        "artifactCount": len(artifacts),
+        "artifacts": artifacts,
+    }